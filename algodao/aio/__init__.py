@@ -0,0 +1,30 @@
+"""
+Asyncio clients of algod and of the deployed contracts. The sync API blocks
+the calling thread through each HTTP request and confirmation wait, so
+driving many voters or claimers at once needs a thread per call in flight;
+with these clients a single event loop drives them all:
+
+    client = AsyncAlgodClient.fromclient(algodao.helpers.createclient())
+    proposal = await AsyncProposal.load(client, appid)
+    await asyncio.gather(*(
+        proposal.call_vote(addr, privkey, option, amount)
+        for addr, privkey, option, amount in votes
+    ))
+"""
+from algodao.aio.algod import AsyncAlgodClient
+from algodao.aio.confirmations import AsyncConfirmationTracker, wait_for_confirmation
+from algodao.aio.contracts import AsyncCommittee, AsyncContract, AsyncDao, AsyncGate, AsyncProposal, AsyncTree
+from algodao.aio.params import AsyncParamsProvider
+
+__all__ = [
+    'AsyncAlgodClient',
+    'AsyncCommittee',
+    'AsyncConfirmationTracker',
+    'AsyncContract',
+    'AsyncDao',
+    'AsyncGate',
+    'AsyncParamsProvider',
+    'AsyncProposal',
+    'AsyncTree',
+    'wait_for_confirmation',
+]
@@ -0,0 +1,170 @@
+"""
+An asyncio counterpart of algosdk's AlgodClient for the endpoints used by this
+package. Requests, responses and errors are the same as algosdk's, but each
+method is a coroutine and requests share a pool of keep-alive connections.
+"""
+import base64
+import json
+import urllib.parse
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+import algosdk.constants
+import algosdk.encoding
+import algosdk.error
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient, api_version_path_prefix
+
+from algodao.aio.http import AsyncHTTPTransport, DEFAULT_MAXCONNECTIONS, DEFAULT_TIMEOUT
+from algodao.types import AccountInfo, ApplicationInfo, PendingTransactionInfo
+
+if TYPE_CHECKING:
+    from algodao.aio.confirmations import AsyncConfirmationTracker
+    from algodao.aio.params import AsyncParamsProvider
+
+
+class AsyncAlgodClient:
+    def __init__(
+            self,
+            algod_token: str,
+            algod_address: str,
+            headers: Optional[Dict[str, str]] = None,
+            maxconnections: int = DEFAULT_MAXCONNECTIONS,
+            timeout: Optional[float] = DEFAULT_TIMEOUT,
+    ):
+        self.algod_token: str = algod_token
+        self.algod_address: str = algod_address
+        self.headers: Dict[str, str] = dict(headers or {})
+        self._transport = AsyncHTTPTransport(algod_address, maxconnections, timeout)
+        # the client's params provider and confirmation tracker, created by
+        # algodao.aio.params.provider and algodao.aio.confirmations.tracker
+        self._paramsprovider: Optional['AsyncParamsProvider'] = None
+        self._tracker: Optional['AsyncConfirmationTracker'] = None
+
+    @classmethod
+    def fromclient(cls, algod: AlgodClient, **kwargs) -> 'AsyncAlgodClient':
+        """An async client of the same node as a (sync) algosdk client"""
+        return cls(algod.algod_token, algod.algod_address, algod.headers, **kwargs)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return self._transport.stats
+
+    async def close(self):
+        await self._transport.close()
+
+    async def algod_request(
+            self,
+            method: str,
+            requrl: str,
+            params: Optional[Dict[str, Any]] = None,
+            data: Optional[bytes] = None,
+            headers: Optional[Dict[str, str]] = None,
+            response_format: str = 'json',
+    ) -> Any:
+        header = {'User-Agent': 'algodao-aio'}
+        header.update(self.headers)
+        if headers:
+            header.update(headers)
+        if requrl not in algosdk.constants.no_auth:
+            header[algosdk.constants.algod_auth_header] = self.algod_token
+        if requrl not in algosdk.constants.unversioned_paths:
+            requrl = api_version_path_prefix + requrl
+        if params:
+            requrl = requrl + '?' + urllib.parse.urlencode(params)
+        response = await self._transport.request(method, requrl, data, header)
+        if response.status >= 400:
+            message: Any = response.body.decode('utf-8', errors='replace')
+            try:
+                message = json.loads(message)['message']
+            except (ValueError, KeyError, TypeError):
+                pass
+            raise algosdk.error.AlgodHTTPError(message, response.status)
+        if response_format == 'json':
+            try:
+                return json.loads(response.body)
+            except ValueError as exc:
+                raise algosdk.error.AlgodResponseError("Failed to parse JSON response from algod") from exc
+        return response.body
+
+    async def status(self) -> Dict[str, Any]:
+        status: Dict[str, Any] = await self.algod_request('GET', '/status')
+        return status
+
+    async def status_after_block(self, block_num: int) -> Dict[str, Any]:
+        status: Dict[str, Any] = await self.algod_request('GET', f'/status/wait-for-block-after/{block_num}')
+        return status
+
+    async def suggested_params(self) -> transaction.SuggestedParams:
+        res = await self.algod_request('GET', '/transactions/params')
+        return transaction.SuggestedParams(
+            res['fee'],
+            res['last-round'],
+            res['last-round'] + 1000,
+            res['genesis-hash'],
+            res['genesis-id'],
+            False,
+            res['consensus-version'],
+            res['min-fee'],
+        )
+
+    async def send_raw_transaction(self, txn: bytes) -> str:
+        """Send signed, msgpack-encoded transactions and return the first transaction ID"""
+        res = await self.algod_request(
+            'POST',
+            '/transactions',
+            data=txn,
+            headers={'Content-Type': 'application/x-binary'},
+        )
+        txid: str = res['txId']
+        return txid
+
+    async def send_transactions(self, txns: List[transaction.SignedTransaction]) -> str:
+        serialized = [base64.b64decode(algosdk.encoding.msgpack_encode(txn)) for txn in txns]
+        return await self.send_raw_transaction(b''.join(serialized))
+
+    async def send_transaction(self, txn: transaction.SignedTransaction) -> str:
+        return await self.send_transactions([txn])
+
+    async def pending_transaction_info(
+            self,
+            transaction_id: str,
+            response_format: str = 'json',
+    ) -> PendingTransactionInfo:
+        info: PendingTransactionInfo = await self.algod_request(
+            'GET',
+            f'/transactions/pending/{transaction_id}',
+            params={'format': response_format},
+            response_format=response_format,
+        )
+        return info
+
+    async def pending_transactions(self, max_txns: int = 0, response_format: str = 'json') -> Any:
+        params: Dict[str, Any] = {'format': response_format}
+        if max_txns:
+            params['max'] = max_txns
+        return await self.algod_request(
+            'GET',
+            '/transactions/pending',
+            params=params,
+            response_format=response_format,
+        )
+
+    async def block_info(self, block: int, response_format: str = 'json') -> Any:
+        return await self.algod_request(
+            'GET',
+            f'/blocks/{block}',
+            params={'format': response_format},
+            response_format=response_format,
+        )
+
+    async def application_info(self, application_id: int) -> ApplicationInfo:
+        info: ApplicationInfo = await self.algod_request('GET', f'/applications/{application_id}')
+        return info
+
+    async def account_info(self, address: str) -> AccountInfo:
+        info: AccountInfo = await self.algod_request('GET', f'/accounts/{address}')
+        return info
+
+    async def asset_info(self, asset_id: int) -> Dict[str, Any]:
+        info: Dict[str, Any] = await self.algod_request('GET', f'/assets/{asset_id}')
+        return info
@@ -0,0 +1,182 @@
+"""
+Confirmation tracking for async clients: a single task per client follows the
+chain once per round, exactly like algodao.confirmations.ConfirmationTracker
+(and sharing its bookkeeping), and resolves an asyncio future per tracked
+transaction.
+"""
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+import algosdk.error
+from algosdk.future import transaction
+
+import algodao.aio.params
+from algodao.aio.algod import AsyncAlgodClient
+from algodao.confirmations import FOLLOW_MAX_ERRORS, FOLLOW_RETRY_SECONDS, Waiters, pooltxids, readblock
+from algodao.types import PendingTransactionInfo
+
+log = logging.getLogger(__name__)
+
+
+class AsyncConfirmationTracker:
+    def __init__(self, client: AsyncAlgodClient):
+        self._client: AsyncAlgodClient = client
+        self._waiters = Waiters()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._follower: Optional[asyncio.Task] = None
+        self._status: Optional[asyncio.Future] = None
+        self._stats: Dict[str, int] = {
+            'rounds': 0,
+            'blocks': 0,
+            'poolchecks': 0,
+            'lookups': 0,
+        }
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    @property
+    def pending(self) -> int:
+        return len(self._waiters)
+
+    async def track(
+            self,
+            txid: str,
+            lastvalid: Optional[int] = None,
+            timeout: Optional[int] = None,
+    ) -> int:
+        """
+        Wait for a submitted transaction to be confirmed and return the
+        confirmed round. Raises the errors of ConfirmationTracker.track.
+        """
+        await self._startround()
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._waiters.add(txid, future, lastvalid, timeout)
+        if len(self._waiters):
+            self._startfollower()
+        confirmed: int = await future
+        return confirmed
+
+    async def tracksigned(self, signed: transaction.SignedTransaction, timeout: Optional[int] = None) -> int:
+        """Wait for a submitted signed transaction until its last valid round"""
+        return await self.track(signed.get_txid(), signed.transaction.last_valid_round, timeout)
+
+    async def wait(self, txid: str, timeout: Optional[int] = None) -> PendingTransactionInfo:
+        """Wait for the transaction to be confirmed and return its pending transaction information"""
+        await self.track(txid, timeout=timeout)
+        return await self._client.pending_transaction_info(txid)
+
+    async def close(self) -> None:
+        if self._follower is not None:
+            self._follower.cancel()
+            try:
+                await self._follower
+            except asyncio.CancelledError:
+                pass
+            self._follower = None
+
+    async def _startround(self) -> None:
+        # while transactions are tracked the follower keeps up with the chain
+        if len(self._waiters) and self._waiters.round is not None:
+            return
+        if self._status is None:
+            # a burst of calls when idle shares a single status request
+            self._status = asyncio.ensure_future(self._client.status())
+        status = self._status
+        try:
+            lastround = (await asyncio.shield(status))['last-round']
+        finally:
+            if self._status is status and status.done():
+                self._status = None
+        # the transactions may already be in the latest block, so that is the
+        # first block the follower reads
+        if self._waiters.round is None or self._waiters.round < lastround - 1:
+            self._waiters.round = lastround - 1
+
+    def _startfollower(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._follower is None or self._follower.done():
+            self._follower = asyncio.ensure_future(self._follow())
+
+    async def _follow(self) -> None:
+        params = algodao.aio.params.provider(self._client)
+        # _startfollower creates the event before starting the follower
+        wakeup = self._wakeup
+        assert wakeup is not None
+        errors = 0
+        while True:
+            if not len(self._waiters):
+                wakeup.clear()
+                await wakeup.wait()
+                continue
+            processed = self._waiters.round
+            assert processed is not None, "_startround sets the round before waiting"
+            try:
+                # wait for a new block, then snapshot the pool and read every
+                # block produced before the snapshot
+                await self._client.status_after_block(processed)
+                self._stats['rounds'] += 1
+                self._stats['poolchecks'] += 1
+                self._waiters.poolrequested()
+                inpool = pooltxids(await self._client.pending_transactions(response_format='msgpack'))
+                lastround = (await self._client.status())['last-round']
+                self._waiters.observed(lastround)
+                for algoround in range(processed + 1, lastround + 1):
+                    response = await self._client.block_info(algoround, response_format='msgpack')
+                    self._stats['blocks'] += 1
+                    self._waiters.blockread(algoround, readblock(response))
+                    params.observeround(algoround)
+                await self._checkpool(inpool)
+                errors = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                errors += 1
+                log.exception("Error following the chain for confirmations")
+                if errors >= FOLLOW_MAX_ERRORS:
+                    # the chain cannot be followed: the waits fail rather
+                    # than hang
+                    self._waiters.failall(exc)
+                    errors = 0
+                else:
+                    await asyncio.sleep(FOLLOW_RETRY_SECONDS)
+
+    async def _checkpool(self, inpool: Set[str]) -> None:
+        """
+        Look up the transactions that are neither confirmed nor in the pool
+        (see Waiters.poolchecked): they have either been rejected or were not
+        submitted yet
+        """
+        missing = self._waiters.poolchecked(inpool)
+        self._stats['lookups'] += len(missing)
+        infos = await asyncio.gather(
+            *(self._client.pending_transaction_info(missingtxid) for missingtxid in missing),
+            return_exceptions=True,
+        )
+        for missingtxid, info in zip(missing, infos):
+            if isinstance(info, algosdk.error.AlgodHTTPError):
+                # not known to the node (yet)
+                continue
+            if isinstance(info, BaseException):
+                raise info
+            self._waiters.pendinginfo(missingtxid, info)
+
+
+def tracker(client: AsyncAlgodClient) -> AsyncConfirmationTracker:
+    """The confirmation tracker of an async client"""
+    if client._tracker is None:
+        client._tracker = AsyncConfirmationTracker(client)
+    return client._tracker
+
+
+async def wait_for_confirmation(
+        client: AsyncAlgodClient,
+        transaction_id: str,
+        timeout: int = 4,
+) -> PendingTransactionInfo:
+    """The async counterpart of algodao.helpers.wait_for_confirmation"""
+    return await tracker(client).wait(transaction_id, timeout)
@@ -0,0 +1,318 @@
+"""
+Async clients of the deployed contracts. Each wraps the corresponding
+Deployed* object, whose build_* methods build the transactions, and
+provides a coroutine for each of its call_* methods (taking the same
+arguments but the algod client). Transactions are sent and confirmed
+through an AsyncAlgodClient, so a single event loop can drive any number of
+contract calls concurrently.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import List, Optional, Tuple
+
+from algosdk.future import transaction
+
+import algodao.aio.confirmations
+import algodao.aio.params
+import algodao.signing
+from algodao.aio.algod import AsyncAlgodClient
+from algodao.assets import TokenDistributionTree
+from algodao.committee import Committee
+from algodao.contract import AppState, DeployedContract, signgroup
+from algodao.governance import AlgoDao, PreapprovalGate
+from algodao.types import PendingTransactionInfo
+from algodao.voting import Proposal, ProposalType, VoteType
+
+
+class AsyncContract:
+    def __init__(self, client: AsyncAlgodClient, deployed: DeployedContract):
+        self._client: AsyncAlgodClient = client
+        self._deployed = deployed
+
+    @property
+    def appid(self) -> int:
+        return self._deployed.appid
+
+    @property
+    def deployed(self) -> DeployedContract:
+        return self._deployed
+
+    async def params(self) -> transaction.SuggestedParams:
+        return await algodao.aio.params.suggested_params(self._client)
+
+    async def send(self, privkey: str, txns: List[transaction.Transaction]) -> str:
+        """Sign and send the transactions (as an atomic group if there are several)"""
+        return await self._client.send_transactions(signgroup(txns, privkey))
+
+    async def submit(self, privkey: str, txns: List[transaction.Transaction]) -> PendingTransactionInfo:
+        """
+        Sign and send the transactions and wait for them to be confirmed.
+        Returns the pending transaction information of the first transaction.
+        """
+        txid = await self.send(privkey, txns)
+        return await algodao.aio.confirmations.wait_for_confirmation(self._client, txid)
+
+    async def submitgroups(
+            self,
+            privkey: str,
+            groups: List[List[transaction.Transaction]],
+            signer: Optional[algodao.signing.BatchSigner] = None,
+    ) -> List[str]:
+        """
+        Send all the groups, then wait for them to be confirmed. With a batch
+        signer, the groups are signed by its worker processes (waited for off
+        the event loop). Returns the transaction ID of the first transaction
+        in each group.
+        """
+        if signer is None:
+            txids = await asyncio.gather(*(self.send(privkey, txns) for txns in groups))
+        else:
+            signed = await asyncio.get_running_loop().run_in_executor(
+                None,
+                algodao.signing.signgroups,
+                groups,
+                privkey,
+                signer,
+            )
+            txids = await asyncio.gather(*(self._client.send_raw_transaction(b''.join(blobs)) for blobs in signed))
+        await asyncio.gather(*(
+            algodao.aio.confirmations.wait_for_confirmation(self._client, txid)
+            for txid in txids
+        ))
+        return list(txids)
+
+    async def call_method(
+            self,
+            addr: str,
+            privkey: str,
+            method: bytes,
+            args: List[bytes],
+            accounts=None,
+            foreign_apps=None,
+            foreign_assets=None,
+    ) -> PendingTransactionInfo:
+        txn = self._deployed.method_txn(
+            await self.params(),
+            addr,
+            method,
+            args,
+            accounts=accounts,
+            foreign_apps=foreign_apps,
+            foreign_assets=foreign_assets,
+        )
+        return await self.submit(privkey, [txn])
+
+
+class AsyncProposal(AsyncContract):
+    _deployed: Proposal.DeployedProposal
+
+    @classmethod
+    async def load(cls, client: AsyncAlgodClient, appid: int) -> AsyncProposal:
+        appinfo = await client.application_info(appid)
+        return cls(client, Proposal.DeployedProposal(None, appid, appinfo))
+
+    async def call_optintoken(self, addr: str, privkey: str, assetid: int):
+        return await self.submit(privkey, self._deployed.build_optintoken(await self.params(), addr, assetid))
+
+    async def call_vote(self, addr: str, privkey: str, option: int, amount: int):
+        return await self.submit(privkey, self._deployed.build_vote(await self.params(), addr, option, amount))
+
+    async def call_finalizevote(self, addr: str, privkey: str):
+        return await self.submit(privkey, self._deployed.build_finalizevote(await self.params(), addr))
+
+
+class AsyncCommittee(AsyncContract):
+    _deployed: Committee.DeployedCommittee
+
+    async def call_resign(self, privkey: str, addr: str):
+        return await self.submit(privkey, self._deployed.build_resign(await self.params(), addr))
+
+    async def call_checkmembership(self, privkey: str, addr: str):
+        return await self.submit(privkey, self._deployed.build_checkmembership(await self.params(), addr))
+
+    async def call_optintoken(self, privkey: str, addr: str, assetid: int):
+        return await self.submit(privkey, self._deployed.build_optintoken(await self.params(), addr, assetid))
+
+    async def call_setmembers(
+            self,
+            privkey: str,
+            addr: str,
+            addresses: List[str],
+            signer: Optional[algodao.signing.BatchSigner] = None,
+    ) -> List[str]:
+        """
+        Seed the initial committee members. As with the sync client, the last
+        group is only sent once the others are confirmed.
+        """
+        groups = self._deployed.build_setmembers(await self.params(), addr, addresses)
+        txids = await self.submitgroups(privkey, groups[:-1], signer)
+        txids.extend(await self.submitgroups(privkey, groups[-1:], signer))
+        return txids
+
+    async def call_inittoken(self, privkey: str, addr: str):
+        info = await self.submit(privkey, self._deployed.build_inittoken(await self.params(), addr))
+        return self._deployed.oninittoken(info)
+
+
+class AsyncDao(AsyncContract):
+    _deployed: AlgoDao.DeployedDao
+
+    @classmethod
+    async def load(cls, client: AsyncAlgodClient, appid: int) -> AsyncDao:
+        appinfo = await client.application_info(appid)
+        return cls(client, AlgoDao.DeployedDao(None, appid, appinfo))
+
+    async def call_addcommittee(self, addr: str, privkey: str, committee_id: int):
+        return await self.submit(privkey, self._deployed.build_addcommittee(await self.params(), addr, committee_id))
+
+    async def call_addrule(
+            self,
+            addr: str,
+            privkey: str,
+            proposal_type: ProposalType,
+            vote_type: VoteType,
+            win_pct: int,
+    ):
+        txns = self._deployed.build_addrule(await self.params(), addr, proposal_type, vote_type, win_pct)
+        return await self.submit(privkey, txns)
+
+    async def call_finalize(self, addr: str, privkey: str):
+        return await self.submit(privkey, self._deployed.build_finalize(await self.params(), addr))
+
+    async def call_implementproposal(
+            self,
+            proposal: Proposal.DeployedProposal,
+            addr: str,
+            privkey: str,
+            accounts: List[str],
+    ):
+        txns = self._deployed.build_implementproposal(await self.params(), proposal, addr, accounts)
+        return await self.submit(privkey, txns)
+
+    async def call_implementproposals(
+            self,
+            proposals: List[Tuple[Proposal.DeployedProposal, List[str]]],
+            addr: str,
+            privkey: str,
+            signer: Optional[algodao.signing.BatchSigner] = None,
+    ) -> List[str]:
+        groups = self._deployed.build_implementproposals(await self.params(), proposals, addr)
+        return await self.submitgroups(privkey, groups, signer)
+
+
+class AsyncGate(AsyncContract):
+    _deployed: PreapprovalGate.DeployedGate
+
+    @classmethod
+    async def load(cls, client: AsyncAlgodClient, appid: int) -> AsyncGate:
+        appinfo = await client.application_info(appid)
+        committeeinfo = await client.application_info(
+            AppState.fromapp(appinfo).getint(PreapprovalGate.GlobalInts.CommitteeId)
+        )
+        return cls(client, PreapprovalGate.DeployedGate(None, appid, appinfo, committeeinfo))
+
+    async def call_inittoken(
+            self,
+            addr: str,
+            privkey: str,
+            asset_total: int,
+            asset_unit_name: str,
+            asset_name: str,
+            asset_url: str
+    ):
+        txns = self._deployed.build_inittoken(
+            await self.params(),
+            addr,
+            asset_total,
+            asset_unit_name,
+            asset_name,
+            asset_url,
+        )
+        info = await self.submit(privkey, txns)
+        self._deployed.oninittoken(info)
+        return info
+
+    async def call_assessproposal(
+            self,
+            addr: str,
+            privkey: str,
+            considered_appid: int,
+            slot: Optional[int] = None,
+    ):
+        params = await self.params()
+        if slot is None:
+            slot = self._deployed.freeslotinstate(await self._globalstate(), lambda: params.first)
+        txns = self._deployed.build_assessproposal(params, addr, considered_appid, slot)
+        return await self.submit(privkey, txns)
+
+    async def call_vote(
+            self,
+            addr: str,
+            privkey: str,
+            considered_appid: int,
+            vote: int,
+            slot: Optional[int] = None,
+    ):
+        if slot is None:
+            slot = self._deployed.findslotinstate(await self._globalstate(), considered_appid)
+        txns = self._deployed.build_vote(await self.params(), addr, considered_appid, vote, slot)
+        return await self.submit(privkey, txns)
+
+    async def call_assesshash(
+            self,
+            addr: str,
+            privkey: str,
+            program_hash: bytes,
+            allow: bool = True,
+            slot: Optional[int] = None,
+    ):
+        params = await self.params()
+        if slot is None:
+            slot = self._deployed.freeslotinstate(await self._globalstate(), lambda: params.first)
+        txns = self._deployed.build_assesshash(params, addr, program_hash, allow, slot)
+        return await self.submit(privkey, txns)
+
+    async def call_votehash(
+            self,
+            addr: str,
+            privkey: str,
+            program_hash: bytes,
+            vote: int,
+            slot: Optional[int] = None,
+    ):
+        if slot is None:
+            slot = self._deployed.findhashslotinstate(await self._globalstate(), program_hash)
+        txns = self._deployed.build_votehash(await self.params(), addr, program_hash, vote, slot)
+        return await self.submit(privkey, txns)
+
+    async def call_autotrust(self, addr: str, privkey: str, considered_appid: int):
+        return await self.submit(privkey, self._deployed.build_autotrust(await self.params(), addr, considered_appid))
+
+    async def allowedhashes(self) -> List[bytes]:
+        return self._deployed.allowedhashesinstate(await self._globalstate())
+
+    async def _globalstate(self) -> AppState:
+        return AppState.fromapp(await self._client.application_info(self.appid))
+
+
+class AsyncTree(AsyncContract):
+    _deployed: TokenDistributionTree.DeployedTree
+
+    async def call_inittoken(
+            self,
+            addr: str,
+            privkey: str,
+            assetcount: int,
+            unitname: str,
+            assetname: str,
+            asseturl: str
+    ) -> int:
+        txns = self._deployed.build_inittoken(await self.params(), addr, assetcount, unitname, assetname, asseturl)
+        return self._deployed.oninittoken(await self.submit(privkey, txns))
+
+    async def call_optintoken(self, addr: str, privkey: str) -> PendingTransactionInfo:
+        return await self.submit(privkey, self._deployed.build_optintoken(await self.params(), addr))
+
+    async def call_claim(self, addr: str, privkey: str):
+        return await self.submit(privkey, self._deployed.build_claim(await self.params(), addr))
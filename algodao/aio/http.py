@@ -0,0 +1,150 @@
+"""
+Minimal non-blocking HTTP/1.1 client on asyncio streams, with a pool of
+keep-alive connections per endpoint. It only implements what the algod and
+indexer REST APIs need: GET and POST with a body, responses delimited by
+Content-Length or chunked transfer encoding, and https.
+"""
+import asyncio
+import logging
+import ssl
+import urllib.parse
+from typing import Dict, List, Optional, Tuple
+
+from algodao.transport import HTTPResponse
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAXCONNECTIONS = 64
+# algod holds status_after_block requests for up to a minute
+DEFAULT_TIMEOUT = 120.0
+
+_Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class AsyncHTTPTransport:
+    """
+    Sends requests to a single base URL (e.g. http://localhost:4001 or
+    https://mainnet-algorand.api.purestake.io/ps2) over at most
+    `maxconnections` concurrent connections, which are kept open between
+    requests.
+    """
+    def __init__(
+            self,
+            baseurl: str,
+            maxconnections: int = DEFAULT_MAXCONNECTIONS,
+            timeout: Optional[float] = DEFAULT_TIMEOUT,
+    ):
+        url = urllib.parse.urlsplit(baseurl)
+        if url.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL: {baseurl}")
+        self._host: str = url.hostname or 'localhost'
+        self._port: int = url.port or (443 if url.scheme == 'https' else 80)
+        self._ssl: Optional[ssl.SSLContext] = ssl.create_default_context() if url.scheme == 'https' else None
+        self._basepath: str = url.path.rstrip('/')
+        self._hostheader: str = url.netloc
+        self._timeout: Optional[float] = timeout
+        self._idle: List[_Connection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._maxconnections: int = maxconnections
+        self._stats: Dict[str, int] = {'requests': 0, 'connections': 0}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    async def request(
+            self,
+            method: str,
+            path: str,
+            body: Optional[bytes] = None,
+            headers: Optional[Dict[str, str]] = None,
+    ) -> HTTPResponse:
+        """Send a request for `path` (relative to the base URL, including any query)"""
+        if self._slots is None:
+            # created here so that it belongs to the running event loop
+            self._slots = asyncio.Semaphore(self._maxconnections)
+        async with self._slots:
+            return await asyncio.wait_for(self._send(method, path, body, headers or {}), self._timeout)
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+
+    async def _send(
+            self,
+            method: str,
+            path: str,
+            body: Optional[bytes],
+            headers: Dict[str, str],
+    ) -> HTTPResponse:
+        request = self._encode(method, path, body, headers)
+        while True:
+            reused = bool(self._idle)
+            reader, writer = self._idle.pop() if reused else await self._connect()
+            try:
+                writer.write(request)
+                await writer.drain()
+                response, keepalive = await self._readresponse(reader, method)
+            except (ConnectionError, asyncio.IncompleteReadError) as exc:
+                writer.close()
+                # the server may close an idle connection at any time; retry
+                # on a new connection, but not if a new connection failed
+                if reused:
+                    log.debug(f"Reconnecting after {exc!r} on an idle connection")
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            self._stats['requests'] += 1
+            if keepalive:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+            return response
+
+    async def _connect(self) -> _Connection:
+        self._stats['connections'] += 1
+        return await asyncio.open_connection(self._host, self._port, ssl=self._ssl)
+
+    def _encode(self, method: str, path: str, body: Optional[bytes], headers: Dict[str, str]) -> bytes:
+        lines = [f'{method} {self._basepath}{path} HTTP/1.1', f'Host: {self._hostheader}']
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        if body is not None or method in ('POST', 'PUT'):
+            lines.append(f'Content-Length: {len(body or b"")}')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (body or b'')
+
+    async def _readresponse(self, reader: asyncio.StreamReader, method: str) -> Tuple[HTTPResponse, bool]:
+        statusline = await reader.readuntil(b'\r\n')
+        version, status, reason = (statusline.decode('latin-1').rstrip('\r\n').split(' ', 2) + [''])[:3]
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        keepalive = headers.get('connection', '').lower() != 'close' and version != 'HTTP/1.0'
+        if method == 'HEAD' or int(status) in (204, 304) or 100 <= int(status) < 200:
+            body = b''
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = await self._readchunked(reader)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body = await reader.read()
+            keepalive = False
+        return HTTPResponse(int(status), reason, headers, body), keepalive
+
+    async def _readchunked(self, reader: asyncio.StreamReader) -> bytes:
+        chunks: List[bytes] = []
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            if size == 0:
+                # skip any trailers
+                while await reader.readuntil(b'\r\n') != b'\r\n':
+                    pass
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
@@ -0,0 +1,91 @@
+"""
+Suggested params for async clients, fetched at most once per round as in
+algodao.params. Concurrent callers share a single in-flight fetch, and the
+async confirmation tracker marks the params stale when it reads a new block.
+"""
+import asyncio
+import copy
+import os
+import time
+from typing import Dict, Optional
+
+from algosdk.future.transaction import SuggestedParams
+
+from algodao.aio.algod import AsyncAlgodClient
+from algodao.params import DEFAULT_MAXAGE
+
+
+class AsyncParamsProvider:
+    def __init__(
+            self,
+            client: AsyncAlgodClient,
+            maxrounds: int = 0,
+            maxage: float = DEFAULT_MAXAGE,
+    ):
+        self._client: AsyncAlgodClient = client
+        self._maxrounds: int = maxrounds
+        self._maxage: float = maxage
+        self._params: Optional[SuggestedParams] = None
+        self._fetched: float = 0.0
+        # latest round known to have been produced
+        self._round: int = 0
+        self._fetching: Optional[asyncio.Future] = None
+        self._stats: Dict[str, int] = {'hits': 0, 'fetches': 0}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    async def get(self) -> SuggestedParams:
+        """Return suggested params valid for the current round"""
+        if self._fresh():
+            self._stats['hits'] += 1
+            return copy.copy(self._params)
+        if self._fetching is None:
+            self._fetching = asyncio.ensure_future(self._refresh())
+        fetching = self._fetching
+        try:
+            # shield the fetch shared with other callers from our cancellation
+            return copy.copy(await asyncio.shield(fetching))
+        finally:
+            if self._fetching is fetching and fetching.done():
+                self._fetching = None
+
+    def observeround(self, algoround: int):
+        """Note that a round has been produced, e.g. a block was read"""
+        self._round = max(self._round, algoround)
+
+    def _fresh(self) -> bool:
+        return (
+            self._params is not None
+            and self._round <= self._params.first + self._maxrounds
+            and time.monotonic() - self._fetched < self._maxage
+        )
+
+    async def _refresh(self) -> SuggestedParams:
+        params = await self._client.suggested_params()
+        self._stats['fetches'] += 1
+        if self._params is None or params.first >= self._params.first:
+            self._params = params
+            self._fetched = time.monotonic()
+        self._round = max(self._round, params.first)
+        return self._params
+
+
+def provider(client: AsyncAlgodClient) -> AsyncParamsProvider:
+    """
+    The params provider of an async client. As for sync clients, the validity
+    window can be widened with the ALGODAO_PARAMS_MAXROUNDS environment
+    variable.
+    """
+    if client._paramsprovider is None:
+        client._paramsprovider = AsyncParamsProvider(
+            client,
+            maxrounds=int(os.getenv('ALGODAO_PARAMS_MAXROUNDS', '0')),
+        )
+    return client._paramsprovider
+
+
+async def suggested_params(client: AsyncAlgodClient) -> SuggestedParams:
+    """Suggested params for a new transaction, fetched at most once per round"""
+    return await provider(client).get()
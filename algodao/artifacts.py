@@ -0,0 +1,185 @@
+"""
+Ahead-of-time compiled contract programs. The build step writes the TEAL and
+bytecode of each standard contract to a directory along with a manifest;
+CreateContract.deploy loads the bytecode from there instead of running PyTeal
+and compiling. The manifest records a fingerprint of the package sources and
+the PyTeal version, and artifacts built from different sources are ignored.
+It also records whether the programs were compiled by algod or assembled
+offline; deploy only uses artifacts compiled by algod, so that deployed
+programs hash to what algodao.verify and the PreapprovalGate allowlist
+expect.
+
+    python -m algodao.artifacts [--output DIR] [--algod]
+"""
+import argparse
+import hashlib
+import importlib.metadata
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from algosdk.v2client.algod import AlgodClient
+
+import algodao.compilecache
+import algodao.helpers
+from algodao.compilecache import CompileCache
+
+if TYPE_CHECKING:
+    from algodao.contract import CreateContract
+
+log = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DIRECTORY = os.path.join(PACKAGE_DIR, 'precompiled')
+
+
+def artifacts_directory() -> str:
+    """The artifacts directory, set with the ALGODAO_ARTIFACTS environment variable"""
+    return os.getenv('ALGODAO_ARTIFACTS', DEFAULT_DIRECTORY)
+
+
+def reference_contracts() -> List['CreateContract']:
+    """
+    One instance of each standard contract. Their programs only depend on the
+    contract class, so the settings used here are arbitrary.
+    """
+    from algodao.assets import TokenDistributionTree
+    from algodao.committee import Committee
+    from algodao.governance import AlgoDao, PreapprovalGate
+    from algodao.voting import ElectionToken, Proposal, ProposalType
+    # any valid address; the tree needs at least one leaf
+    addr = 'A' * 52 + 'Y5HFKQ'
+    return [
+        AlgoDao.CreateDao('', 0),
+        PreapprovalGate.CreateGate(0, 0),
+        Committee.CreateCommittee('', 1),
+        Proposal.CreateProposal('', ElectionToken(0), 0, 0, 0, 0, 2, 0, ProposalType.PAYMENT),
+        TokenDistributionTree.CreateTree(ElectionToken(0), OrderedDict({addr: 1}), 0, 0),
+    ]
+
+
+def fingerprint() -> str:
+    """Hash of the package sources and the PyTeal version"""
+    digest = hashlib.sha256()
+    digest.update(f'pyteal {_pytealversion()}\n'.encode())
+    for root, dirs, files in os.walk(PACKAGE_DIR):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        for filename in sorted(files):
+            if not filename.endswith('.py'):
+                continue
+            path = os.path.join(root, filename)
+            digest.update(os.path.relpath(path, PACKAGE_DIR).encode() + b'\n')
+            with open(path, 'rb') as fp:
+                digest.update(fp.read())
+    return digest.hexdigest()
+
+
+def _pytealversion() -> str:
+    try:
+        return importlib.metadata.version('pyteal')
+    except importlib.metadata.PackageNotFoundError:
+        return 'unknown'
+
+
+def build(
+        directory: Optional[str] = None,
+        algod: Optional[AlgodClient] = None,
+        cache: Optional[CompileCache] = None,
+) -> Dict[str, Dict[str, str]]:
+    """
+    Compile the reference contracts and write their artifacts. The programs
+    are assembled offline unless an algod client is given.
+    """
+    if directory is None:
+        directory = artifacts_directory()
+    if cache is None:
+        cache = algodao.compilecache.default_cache()
+    os.makedirs(directory, exist_ok=True)
+    programs: Dict[str, Dict[str, str]] = OrderedDict()
+    for contract in reference_contracts():
+        programkey = contract.programkey()
+        entry: Dict[str, str] = OrderedDict()
+        for name, program in (('approval', contract.approval_program), ('clear', contract.clear_program)):
+            teal = cache.compileteal(f'{programkey}:{name}', program)
+            bytecode = cache.assemble(algod, teal)
+            basename = f'{programkey}.{name}'
+            algodao.compilecache.writeatomic(os.path.join(directory, f'{basename}.teal'), teal.encode())
+            algodao.compilecache.writeatomic(os.path.join(directory, f'{basename}.bin'), bytecode)
+            entry[name] = hashlib.sha256(bytecode).hexdigest()
+        programs[programkey] = entry
+        log.info(f"Built {programkey}")
+    manifest = {
+        'fingerprint': fingerprint(),
+        'assembler': 'offline' if algod is None else 'algod',
+        'programs': programs,
+    }
+    algodao.compilecache.writeatomic(
+        os.path.join(directory, MANIFEST),
+        json.dumps(manifest, indent=2).encode()
+    )
+    _loaded.pop(directory, None)
+    return programs
+
+
+# directory -> manifest, or None if there are no usable artifacts
+_loaded: Dict[str, Optional[Dict[str, Any]]] = {}
+
+
+def load(programkey: str, directory: Optional[str] = None, offline: bool = False) -> Optional[Tuple[bytes, bytes]]:
+    """
+    Return the precompiled approval and clear bytecode of a contract, or None
+    if there is no up to date artifact for it. Artifacts assembled offline
+    are only returned if offline is true.
+    """
+    if directory is None:
+        directory = artifacts_directory()
+    if directory not in _loaded:
+        _loaded[directory] = _readmanifest(directory)
+    manifest = _loaded[directory]
+    if manifest is None or (manifest.get('assembler') != 'algod' and not offline):
+        return None
+    programs: Dict[str, Dict[str, str]] = manifest['programs']
+    if programkey not in programs:
+        return None
+    compiled: List[bytes] = []
+    for name in ('approval', 'clear'):
+        try:
+            with open(os.path.join(directory, f'{programkey}.{name}.bin'), 'rb') as fp:
+                bytecode = fp.read()
+        except FileNotFoundError:
+            return None
+        if hashlib.sha256(bytecode).hexdigest() != programs[programkey][name]:
+            log.warning(f"Ignoring corrupt artifact {programkey}.{name}.bin")
+            return None
+        compiled.append(bytecode)
+    return compiled[0], compiled[1]
+
+
+def _readmanifest(directory: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(directory, MANIFEST)) as fp:
+            manifest: Dict[str, Any] = json.load(fp)
+    except FileNotFoundError:
+        return None
+    if manifest.get('fingerprint') != fingerprint():
+        log.info(f"Ignoring out of date artifacts in {directory}")
+        return None
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build precompiled contract artifacts")
+    parser.add_argument('--output', default=None, help="artifacts directory")
+    parser.add_argument('--algod', action='store_true', help="compile with algod instead of offline")
+    args = parser.parse_args()
+    algodao.helpers.loggingconfig()
+    algod = algodao.helpers.createclient() if args.algod else None
+    for programkey, hashes in build(args.output, algod).items():
+        print(f"{programkey}\t{hashes['approval']}\t{hashes['clear']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,561 @@
+"""
+Offline assembler for TEAL programs (up to version 5), so that contracts can
+be compiled without an algod compile endpoint. It follows the algod assembler
+closely enough to produce identical bytecode for the programs PyTeal generates
+for our contracts:
+
+* `int`, `byte` and `addr` constants are pooled into `intcblock` and
+  `bytecblock`, ordered by how often they are referenced (ties keep the order
+  of first use). From version 4 on, constants referenced only once are not
+  pooled and are pushed with `pushint`/`pushbytes` instead.
+* Branch and `callsub` targets are encoded as 16-bit offsets relative to the
+  end of the branch instruction.
+* Integers in the program header, constant blocks and push instructions are
+  encoded as varuints.
+
+Explicit `intcblock`/`bytecblock` instructions are not supported.
+"""
+import base64
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple, TypeVar, Union
+
+# versions from which backward branches are allowed and constants are optimized
+BACKWARD_BRANCH_VERSION = 4
+OPTIMIZE_CONSTANTS_VERSION = 4
+MAX_VERSION = 5
+
+TXN_FIELDS = [
+    'Sender', 'Fee', 'FirstValid', 'FirstValidTime', 'LastValid', 'Note',
+    'Lease', 'Receiver', 'Amount', 'CloseRemainderTo', 'VotePK',
+    'SelectionPK', 'VoteFirst', 'VoteLast', 'VoteKeyDilution', 'Type',
+    'TypeEnum', 'XferAsset', 'AssetAmount', 'AssetSender', 'AssetReceiver',
+    'AssetCloseTo', 'GroupIndex', 'TxID', 'ApplicationID', 'OnCompletion',
+    'ApplicationArgs', 'NumAppArgs', 'Accounts', 'NumAccounts',
+    'ApprovalProgram', 'ClearStateProgram', 'RekeyTo', 'ConfigAsset',
+    'ConfigAssetTotal', 'ConfigAssetDecimals', 'ConfigAssetDefaultFrozen',
+    'ConfigAssetUnitName', 'ConfigAssetName', 'ConfigAssetURL',
+    'ConfigAssetMetadataHash', 'ConfigAssetManager', 'ConfigAssetReserve',
+    'ConfigAssetFreeze', 'ConfigAssetClawback', 'FreezeAsset',
+    'FreezeAssetAccount', 'FreezeAssetFrozen', 'Assets', 'NumAssets',
+    'Applications', 'NumApplications', 'GlobalNumUint', 'GlobalNumByteSlice',
+    'LocalNumUint', 'LocalNumByteSlice', 'ExtraProgramPages',
+    'Nonparticipation', 'Logs', 'NumLogs', 'CreatedAssetID',
+    'CreatedApplicationID',
+]
+
+GLOBAL_FIELDS = [
+    'MinTxnFee', 'MinBalance', 'MaxTxnLife', 'ZeroAddress', 'GroupSize',
+    'LogicSigVersion', 'Round', 'LatestTimestamp', 'CurrentApplicationID',
+    'CreatorAddress', 'CurrentApplicationAddress', 'GroupID',
+]
+
+ASSET_HOLDING_FIELDS = ['AssetBalance', 'AssetFrozen']
+
+ASSET_PARAMS_FIELDS = [
+    'AssetTotal', 'AssetDecimals', 'AssetDefaultFrozen', 'AssetUnitName',
+    'AssetName', 'AssetURL', 'AssetMetadataHash', 'AssetManager',
+    'AssetReserve', 'AssetFreeze', 'AssetClawback', 'AssetCreator',
+]
+
+APP_PARAMS_FIELDS = [
+    'AppApprovalProgram', 'AppClearStateProgram', 'AppGlobalNumUint',
+    'AppGlobalNumByteSlice', 'AppLocalNumUint', 'AppLocalNumByteSlice',
+    'AppExtraProgramPages', 'AppCreator', 'AppAddress',
+]
+
+ECDSA_CURVES = ['Secp256k1']
+
+# named constants accepted by `int`
+NAMED_INTS = {
+    'NoOp': 0,
+    'OptIn': 1,
+    'CloseOut': 2,
+    'ClearState': 3,
+    'UpdateApplication': 4,
+    'DeleteApplication': 5,
+    'unknown': 0,
+    'pay': 1,
+    'keyreg': 2,
+    'acfg': 3,
+    'axfer': 4,
+    'afrz': 5,
+    'appl': 6,
+}
+
+# immediate argument kinds
+UINT8 = 'uint8'
+TXN = 'txn'
+GLOBAL = 'global'
+HOLDING = 'holding'
+ASSET_PARAMS = 'asset_params'
+APP_PARAMS = 'app_params'
+CURVE = 'curve'
+LABEL = 'label'
+
+FIELD_TABLES: Dict[str, List[str]] = {
+    TXN: TXN_FIELDS,
+    GLOBAL: GLOBAL_FIELDS,
+    HOLDING: ASSET_HOLDING_FIELDS,
+    ASSET_PARAMS: ASSET_PARAMS_FIELDS,
+    APP_PARAMS: APP_PARAMS_FIELDS,
+    CURVE: ECDSA_CURVES,
+}
+
+# opcode, immediate argument kinds
+OPCODES: Dict[str, Tuple[int, Tuple[str, ...]]] = {
+    'err': (0x00, ()),
+    'sha256': (0x01, ()),
+    'keccak256': (0x02, ()),
+    'sha512_256': (0x03, ()),
+    'ed25519verify': (0x04, ()),
+    'ecdsa_verify': (0x05, (CURVE,)),
+    'ecdsa_pk_decompress': (0x06, (CURVE,)),
+    'ecdsa_pk_recover': (0x07, (CURVE,)),
+    '+': (0x08, ()),
+    '-': (0x09, ()),
+    '/': (0x0a, ()),
+    '*': (0x0b, ()),
+    '<': (0x0c, ()),
+    '>': (0x0d, ()),
+    '<=': (0x0e, ()),
+    '>=': (0x0f, ()),
+    '&&': (0x10, ()),
+    '||': (0x11, ()),
+    '==': (0x12, ()),
+    '!=': (0x13, ()),
+    '!': (0x14, ()),
+    'len': (0x15, ()),
+    'itob': (0x16, ()),
+    'btoi': (0x17, ()),
+    '%': (0x18, ()),
+    '|': (0x19, ()),
+    '&': (0x1a, ()),
+    '^': (0x1b, ()),
+    '~': (0x1c, ()),
+    'mulw': (0x1d, ()),
+    'addw': (0x1e, ()),
+    'divmodw': (0x1f, ()),
+    'intc': (0x21, (UINT8,)),
+    'intc_0': (0x22, ()),
+    'intc_1': (0x23, ()),
+    'intc_2': (0x24, ()),
+    'intc_3': (0x25, ()),
+    'bytec': (0x27, (UINT8,)),
+    'bytec_0': (0x28, ()),
+    'bytec_1': (0x29, ()),
+    'bytec_2': (0x2a, ()),
+    'bytec_3': (0x2b, ()),
+    'arg': (0x2c, (UINT8,)),
+    'arg_0': (0x2d, ()),
+    'arg_1': (0x2e, ()),
+    'arg_2': (0x2f, ()),
+    'arg_3': (0x30, ()),
+    'txn': (0x31, (TXN,)),
+    'global': (0x32, (GLOBAL,)),
+    'gtxn': (0x33, (UINT8, TXN)),
+    'load': (0x34, (UINT8,)),
+    'store': (0x35, (UINT8,)),
+    'txna': (0x36, (TXN, UINT8)),
+    'gtxna': (0x37, (UINT8, TXN, UINT8)),
+    'gtxns': (0x38, (TXN,)),
+    'gtxnsa': (0x39, (TXN, UINT8)),
+    'gload': (0x3a, (UINT8, UINT8)),
+    'gloads': (0x3b, (UINT8,)),
+    'gaid': (0x3c, (UINT8,)),
+    'gaids': (0x3d, ()),
+    'loads': (0x3e, ()),
+    'stores': (0x3f, ()),
+    'bnz': (0x40, (LABEL,)),
+    'bz': (0x41, (LABEL,)),
+    'b': (0x42, (LABEL,)),
+    'return': (0x43, ()),
+    'assert': (0x44, ()),
+    'pop': (0x48, ()),
+    'dup': (0x49, ()),
+    'dup2': (0x4a, ()),
+    'dig': (0x4b, (UINT8,)),
+    'swap': (0x4c, ()),
+    'select': (0x4d, ()),
+    'cover': (0x4e, (UINT8,)),
+    'uncover': (0x4f, (UINT8,)),
+    'concat': (0x50, ()),
+    'substring': (0x51, (UINT8, UINT8)),
+    'substring3': (0x52, ()),
+    'getbit': (0x53, ()),
+    'setbit': (0x54, ()),
+    'getbyte': (0x55, ()),
+    'setbyte': (0x56, ()),
+    'extract': (0x57, (UINT8, UINT8)),
+    'extract3': (0x58, ()),
+    'extract_uint16': (0x59, ()),
+    'extract_uint32': (0x5a, ()),
+    'extract_uint64': (0x5b, ()),
+    'balance': (0x60, ()),
+    'app_opted_in': (0x61, ()),
+    'app_local_get': (0x62, ()),
+    'app_local_get_ex': (0x63, ()),
+    'app_global_get': (0x64, ()),
+    'app_global_get_ex': (0x65, ()),
+    'app_local_put': (0x66, ()),
+    'app_global_put': (0x67, ()),
+    'app_local_del': (0x68, ()),
+    'app_global_del': (0x69, ()),
+    'asset_holding_get': (0x70, (HOLDING,)),
+    'asset_params_get': (0x71, (ASSET_PARAMS,)),
+    'app_params_get': (0x72, (APP_PARAMS,)),
+    'min_balance': (0x78, ()),
+    'callsub': (0x88, (LABEL,)),
+    'retsub': (0x89, ()),
+    'shl': (0x90, ()),
+    'shr': (0x91, ()),
+    'sqrt': (0x92, ()),
+    'bitlen': (0x93, ()),
+    'exp': (0x94, ()),
+    'expw': (0x95, ()),
+    'b+': (0xa0, ()),
+    'b-': (0xa1, ()),
+    'b/': (0xa2, ()),
+    'b*': (0xa3, ()),
+    'b<': (0xa4, ()),
+    'b>': (0xa5, ()),
+    'b<=': (0xa6, ()),
+    'b>=': (0xa7, ()),
+    'b==': (0xa8, ()),
+    'b!=': (0xa9, ()),
+    'b%': (0xaa, ()),
+    'b|': (0xab, ()),
+    'b&': (0xac, ()),
+    'b^': (0xad, ()),
+    'b~': (0xae, ()),
+    'bzero': (0xaf, ()),
+    'log': (0xb0, ()),
+    'itxn_begin': (0xb1, ()),
+    'itxn_field': (0xb2, (TXN,)),
+    'itxn_submit': (0xb3, ()),
+    'itxn': (0xb4, (TXN,)),
+    'itxna': (0xb5, (TXN, UINT8)),
+}
+# array fields may be accessed with the non-array opcode, e.g.
+# `txn ApplicationArgs 0`
+ARRAY_OPS = {'txn': 'txna', 'gtxn': 'gtxna', 'gtxns': 'gtxnsa', 'itxn': 'itxna'}
+PUSHBYTES = 0x80
+PUSHINT = 0x81
+INTCBLOCK = 0x20
+BYTECBLOCK = 0x26
+
+LABEL_RE = re.compile(r'^([^\s"]+):$')
+
+
+class TealAssemblyError(Exception):
+    def __init__(self, lineno: int, msg: str):
+        super(TealAssemblyError, self).__init__(f"line {lineno}: {msg}")
+        self.lineno = lineno
+
+
+def varuint(value: int) -> bytes:
+    """Encode an unsigned integer as a (protobuf/Go) varuint"""
+    if value < 0:
+        raise ValueError(value)
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+class _Constant:
+    """A reference to an int or byte constant, resolved once pooling is known"""
+    def __init__(self, value: Union[int, bytes]):
+        self.value: Union[int, bytes] = value
+
+
+class _Branch:
+    """A branch or callsub to a label, resolved once offsets are known"""
+    def __init__(self, opcode: int, label: str, lineno: int):
+        self.opcode = opcode
+        self.label = label
+        self.lineno = lineno
+
+
+Instruction = Union[bytes, _Constant, _Branch]
+# a pooled constant
+C = TypeVar('C', int, bytes)
+
+
+def assemble(teal: str) -> bytes:
+    """Assemble a TEAL program into bytecode"""
+    version = 1
+    instructions: List[Instruction] = []
+    labels: Dict[str, int] = {}
+    for lineno, line in enumerate(teal.splitlines(), start=1):
+        tokens = _tokenize(line, lineno)
+        if not tokens:
+            continue
+        if tokens[0] == '#pragma':
+            if instructions or len(tokens) != 3 or tokens[1] != 'version':
+                raise TealAssemblyError(lineno, f"invalid pragma: {line}")
+            version = int(tokens[2])
+            if version < 1 or version > MAX_VERSION:
+                raise TealAssemblyError(lineno, f"unsupported version {version}")
+            continue
+        match = LABEL_RE.match(tokens[0])
+        if match:
+            if len(tokens) != 1:
+                raise TealAssemblyError(lineno, f"unexpected tokens after label: {line}")
+            if match.group(1) in labels:
+                raise TealAssemblyError(lineno, f"duplicate label {match.group(1)}")
+            labels[match.group(1)] = len(instructions)
+            continue
+        instructions.append(_instruction(tokens, lineno))
+    return _link(version, instructions, labels)
+
+
+def _tokenize(line: str, lineno: int) -> List[str]:
+    """Split a line into tokens, keeping quoted strings whole and dropping comments"""
+    tokens: List[str] = []
+    index = 0
+    while index < len(line):
+        char = line[index]
+        if char.isspace():
+            index += 1
+        elif line.startswith('//', index):
+            break
+        elif char == '"':
+            end = index + 1
+            while end < len(line) and line[end] != '"':
+                end += 2 if line[end] == '\\' else 1
+            if end >= len(line):
+                raise TealAssemblyError(lineno, f"unterminated string: {line}")
+            tokens.append(line[index:end + 1])
+            index = end + 1
+        else:
+            end = index
+            while end < len(line) and not line[end].isspace() and not line.startswith('//', end):
+                end += 1
+            tokens.append(line[index:end])
+            index = end
+    return tokens
+
+
+def _instruction(tokens: List[str], lineno: int) -> Instruction:
+    op, args = tokens[0], tokens[1:]
+    if op in ('int', 'pushint'):
+        _expectargs(op, args, 1, lineno)
+        intvalue = _parseint(args[0], lineno)
+        if op == 'pushint':
+            return bytes([PUSHINT]) + varuint(intvalue)
+        return _Constant(intvalue)
+    if op in ('byte', 'addr', 'pushbytes'):
+        if op == 'addr':
+            _expectargs(op, args, 1, lineno)
+            bytesvalue = _parseaddr(args[0], lineno)
+        else:
+            bytesvalue = _parsebytes(args, lineno)
+        if op == 'pushbytes':
+            return bytes([PUSHBYTES]) + varuint(len(bytesvalue)) + bytesvalue
+        return _Constant(bytesvalue)
+    if op in ('intcblock', 'bytecblock'):
+        raise TealAssemblyError(lineno, f"explicit {op} is not supported")
+    if op in ARRAY_OPS and len(args) == len(OPCODES[op][1]) + 1:
+        op = ARRAY_OPS[op]
+    if op not in OPCODES:
+        raise TealAssemblyError(lineno, f"unknown opcode {op}")
+    opcode, kinds = OPCODES[op]
+    _expectargs(op, args, len(kinds), lineno)
+    if kinds == (LABEL,):
+        return _Branch(opcode, args[0], lineno)
+    out = bytearray([opcode])
+    for kind, arg in zip(kinds, args):
+        if kind == UINT8:
+            value = _parseint(arg, lineno)
+            if value > 255:
+                raise TealAssemblyError(lineno, f"immediate {arg} does not fit in a byte")
+            out.append(value)
+        else:
+            table = FIELD_TABLES[kind]
+            if arg in table:
+                out.append(table.index(arg))
+            else:
+                raise TealAssemblyError(lineno, f"unknown {op} field {arg}")
+    return bytes(out)
+
+
+def _expectargs(op: str, args: List[str], count: int, lineno: int):
+    if len(args) != count:
+        raise TealAssemblyError(lineno, f"{op} expects {count} arguments, got {len(args)}")
+
+
+def _parseint(token: str, lineno: int) -> int:
+    if token in NAMED_INTS:
+        return NAMED_INTS[token]
+    try:
+        value = _parseuint(token)
+    except ValueError:
+        raise TealAssemblyError(lineno, f"invalid integer {token}")
+    if value >= 2 ** 64:
+        raise TealAssemblyError(lineno, f"integer out of range: {token}")
+    return value
+
+
+def _parseuint(token: str) -> int:
+    # like Go's strconv.ParseUint(token, 0, 64): 0x hex, 0o or a leading 0
+    # octal, 0b binary
+    if not token.isalnum():
+        raise ValueError(token)
+    prefix = token[:2].lower()
+    if prefix == '0x':
+        return int(token[2:], 16)
+    if prefix == '0o':
+        return int(token[2:], 8)
+    if prefix == '0b':
+        return int(token[2:], 2)
+    if token.startswith('0') and len(token) > 1:
+        return int(token[1:], 8)
+    return int(token, 10)
+
+
+def _parseaddr(token: str, lineno: int) -> bytes:
+    # an address is the base32 encoding of the 32-byte public key followed
+    # by a 4-byte checksum
+    try:
+        decoded = base64.b32decode(token + '=' * (-len(token) % 8))
+    except ValueError:
+        raise TealAssemblyError(lineno, f"invalid address {token}")
+    if len(decoded) != 36:
+        raise TealAssemblyError(lineno, f"invalid address {token}")
+    return decoded[:32]
+
+
+def _parsebytes(args: List[str], lineno: int) -> bytes:
+    if len(args) == 1:
+        arg = args[0]
+        if arg.startswith('"'):
+            return _parsestring(arg[1:-1], lineno)
+        if arg.startswith('0x'):
+            try:
+                return bytes.fromhex(arg[2:])
+            except ValueError:
+                raise TealAssemblyError(lineno, f"invalid hex {arg}")
+        match = re.match(r'^(base64|b64|base32|b32)\((.*)\)$', arg)
+        if match:
+            return _decodebase(match.group(1), match.group(2), lineno)
+    elif len(args) == 2 and args[0] in ('base64', 'b64', 'base32', 'b32'):
+        return _decodebase(args[0], args[1], lineno)
+    raise TealAssemblyError(lineno, f"invalid byte constant {' '.join(args)}")
+
+
+def _decodebase(encoding: str, value: str, lineno: int) -> bytes:
+    try:
+        if encoding in ('base64', 'b64'):
+            return base64.b64decode(value, validate=True)
+        return base64.b32decode(value + '=' * (-len(value) % 8))
+    except ValueError:
+        raise TealAssemblyError(lineno, f"invalid {encoding} constant {value}")
+
+
+def _parsestring(value: str, lineno: int) -> bytes:
+    out = bytearray()
+    escapes = {'n': b'\n', 'r': b'\r', 't': b'\t', '\\': b'\\', '"': b'"'}
+    index = 0
+    while index < len(value):
+        char = value[index]
+        if char != '\\':
+            out += char.encode()
+            index += 1
+            continue
+        if index + 1 >= len(value):
+            raise TealAssemblyError(lineno, f"invalid escape in \"{value}\"")
+        escape = value[index + 1]
+        if escape in escapes:
+            out += escapes[escape]
+            index += 2
+        elif escape == 'x':
+            try:
+                out.append(int(value[index + 2:index + 4], 16))
+            except ValueError:
+                raise TealAssemblyError(lineno, f"invalid escape in \"{value}\"")
+            index += 4
+        else:
+            raise TealAssemblyError(lineno, f"invalid escape in \"{value}\"")
+    return bytes(out)
+
+
+def _pool(values: List[C], optimize: bool) -> List[C]:
+    """
+    Return the constant block for the referenced values: by descending
+    reference count, first use breaking ties, and (when optimizing) leaving
+    out values only referenced once
+    """
+    counts: Dict[C, int] = OrderedDict()
+    for value in values:
+        counts[value] = counts.get(value, 0) + 1
+    if not optimize:
+        return list(counts)
+    ordered = sorted(counts.items(), key=lambda item: -item[1])
+    return [value for value, count in ordered if count > 1]
+
+
+def _constantref(value: Union[int, bytes], block: Sequence[Union[int, bytes]]) -> bytes:
+    isint = isinstance(value, int)
+    if value not in block:
+        if isinstance(value, int):
+            return bytes([PUSHINT]) + varuint(value)
+        return bytes([PUSHBYTES]) + varuint(len(value)) + value
+    index = block.index(value)
+    first = OPCODES['intc_0' if isint else 'bytec_0'][0]
+    if index < 4:
+        return bytes([first + index])
+    return bytes([OPCODES['intc' if isint else 'bytec'][0], index])
+
+
+def _link(version: int, instructions: List[Instruction], labels: Dict[str, int]) -> bytes:
+    optimize = version >= OPTIMIZE_CONSTANTS_VERSION
+    # ints and bytes are pooled separately; True == 1 in Python, so keep the
+    # two kinds apart explicitly
+    constants = [i.value for i in instructions if isinstance(i, _Constant)]
+    ints = _pool([value for value in constants if isinstance(value, int)], optimize)
+    byteconsts = _pool([value for value in constants if isinstance(value, bytes)], optimize)
+    encoded: List[Optional[bytes]] = []
+    for instruction in instructions:
+        if isinstance(instruction, _Constant):
+            block: Sequence[Union[int, bytes]] = ints if isinstance(instruction.value, int) else byteconsts
+            encoded.append(_constantref(instruction.value, block))
+        elif isinstance(instruction, _Branch):
+            encoded.append(None)
+        else:
+            encoded.append(instruction)
+    # all instructions now have a known size (branches take three bytes), so
+    # the position of every instruction and label is known
+    positions: List[int] = []
+    position = 0
+    for chunk in encoded:
+        positions.append(position)
+        position += 3 if chunk is None else len(chunk)
+    positions.append(position)
+    for index, instruction in enumerate(instructions):
+        if not isinstance(instruction, _Branch):
+            continue
+        if instruction.label not in labels:
+            raise TealAssemblyError(instruction.lineno, f"reference to undefined label {instruction.label}")
+        offset = positions[labels[instruction.label]] - (positions[index] + 3)
+        if offset < 0 and version < BACKWARD_BRANCH_VERSION:
+            raise TealAssemblyError(instruction.lineno, f"backward branch to {instruction.label}")
+        if offset < -0x8000 or offset > 0x7fff:
+            raise TealAssemblyError(instruction.lineno, f"branch to {instruction.label} is too far")
+        encoded[index] = bytes([instruction.opcode]) + (offset & 0xffff).to_bytes(2, 'big')
+    program = bytearray(varuint(version))
+    if ints:
+        program += bytes([INTCBLOCK]) + varuint(len(ints))
+        for value in ints:
+            program += varuint(value)
+    if byteconsts:
+        program += bytes([BYTECBLOCK]) + varuint(len(byteconsts))
+        for constant in byteconsts:
+            program += varuint(len(constant)) + constant
+    for chunk in encoded:
+        # every branch was encoded above
+        assert chunk is not None
+        program += chunk
+    return bytes(program)
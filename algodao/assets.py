@@ -1,6 +1,8 @@
 """
 Contracts and helper functions/classes for dealing with ASAs.
 """
+from __future__ import annotations
+
 import abc
 import binascii
 import enum
@@ -9,22 +11,22 @@ import base64
 import hashlib
 import logging
 from collections import OrderedDict
-from typing import Dict, List
+from typing import Dict, List, TYPE_CHECKING
 
-import pyteal
 import algosdk.logic
 from algosdk.future import transaction
 from algosdk.v2client.algod import AlgodClient
-from pyteal import App, Seq, Bytes, Btoi, Txn, Int, Assert, Return, AssetHolding
-from pyteal import Cond, Global, InnerTxnBuilder, TxnField, TxnType
-from pyteal import InnerTxn, And, ScratchVar, TealType, Sha256, Concat
-from pyteal import OnComplete, Len, For, If, Substring, Expr
 
 import algodao.deploy
+import algodao.holdings
+import algodao.params
 from algodao.contract import CreateContract, DeployedContract, GlobalVariables
 from algodao.helpers import wait_for_confirmation
 from algodao.merkle import MerkleTree
-from algodao.types import PendingTransactionInfo, AccountInfo
+from algodao.types import PendingTransactionInfo
+
+if TYPE_CHECKING:
+    from pyteal import Expr
 
 log = logging.getLogger(__name__)
 
@@ -121,128 +123,12 @@ class TokenDistributionTree:
             ]
 
         def approval_program(self) -> Expr:
-            # creation arguments: RootHash, RegBegin, RegEnd
-            # Claim arguments: address, vote count, Merkle index, Merkle proof
-            GlobalInts = TokenDistributionTree.GlobalInts
-            GlobalBytes = TokenDistributionTree.GlobalBytes
-            on_creation = Seq([
-                Assert(Txn.application_args.length() == Int(3)),
-                GlobalBytes.RootHash.put(Txn.application_args[0]),
-                GlobalInts.RegBegin.put(Btoi(Txn.application_args[1])),
-                GlobalInts.RegEnd.put(Btoi(Txn.application_args[2])),
-                GlobalInts.AssetId.put(Int(0)),
-                Return(Int(1)),
-            ])
-            is_creator = Txn.sender() == Global.creator_address()
-            on_optintoken = Seq([
-                Assert(is_creator),
-                Assert(Txn.application_args.length() == Int(2)),
-                InnerTxnBuilder.Begin(),
-                InnerTxnBuilder.SetFields({
-                    TxnField.type_enum: TxnType.AssetTransfer,
-                    TxnField.asset_receiver: Global.current_application_address(),
-                    TxnField.xfer_asset: Btoi(Txn.application_args[1]),
-                    TxnField.asset_amount: Int(0),
-                }),
-                InnerTxnBuilder.Submit(),
-                GlobalInts.AssetId.put(Btoi(Txn.application_args[1])),
-                Return(Int(1)),
-            ])
-            on_inittoken = Seq([
-                Assert(is_creator),
-                Assert(Txn.application_args.length() == Int(5)),
-                InnerTxnBuilder.Begin(),
-                InnerTxnBuilder.SetFields({
-                    TxnField.type_enum: TxnType.AssetConfig,
-                    TxnField.config_asset_total: Btoi(Txn.application_args[1]),
-                    TxnField.config_asset_unit_name: Txn.application_args[2],
-                    TxnField.config_asset_name: Txn.application_args[3],
-                    TxnField.config_asset_url: Txn.application_args[4],
-                    TxnField.config_asset_manager: Global.current_application_address(),
-                }),
-                InnerTxnBuilder.Submit(),
-                GlobalInts.AssetId.put(InnerTxn.created_asset_id()),
-                Return(Int(1)),
-            ])
-            on_closeout = Return(Int(1))
-            on_register = Return(
-                And(
-                    Global.round() >= App.globalGet(Bytes("RegBegin")),
-                    Global.round() <= App.globalGet(Bytes("RegEnd")),
-                )
-            )
-            count = Txn.application_args[1]  # bytes representation of a uint64
-            index = Btoi(Txn.application_args[2])  # uint64
-            proof = Txn.application_args[3]  # bytes
-            runninghash = ScratchVar(TealType.bytes)
-            on_claim = Seq([
-                Assert(
-                    And(
-                        Txn.application_args.length() == Int(4),
-                        Global.round() >= GlobalInts.RegBegin.get(),
-                        Global.round() <= GlobalInts.RegEnd.get(),
-                    )
-                ),
-                runninghash.store(Sha256(Concat(Txn.sender(), Bytes(':'), count))),
-                self.verifymerkle(index, proof, runninghash, GlobalBytes.RootHash.get()),
-                self.transferelectiontokens(Btoi(count)),
-                Return(Int(1)),
-            ])
-            program = Cond(
-                [Txn.application_id() == Int(0), on_creation],
-                [Txn.on_completion() == OnComplete.DeleteApplication, Return(is_creator)],
-                [Txn.on_completion() == OnComplete.UpdateApplication, Return(is_creator)],
-                [Txn.on_completion() == OnComplete.CloseOut, on_closeout],
-                [Txn.on_completion() == OnComplete.OptIn, on_register],
-                [Txn.application_args[0] == Bytes("claim"), on_claim],
-                [Txn.application_args[0] == Bytes('inittoken'), on_inittoken],
-                [Txn.application_args[0] == Bytes('optintoken'), on_optintoken],
-            )
-            return program
+            from algodao.programs.assets import tree_approval_program
+            return tree_approval_program()
 
         def clear_program(self) -> Expr:
-            return Return(Int(1))
-
-        def verifymerkle(self, index: Expr, proof: Expr, runninghash: ScratchVar, roothash: Expr):
-            i = ScratchVar(TealType.uint64)
-            levelindex = ScratchVar(TealType.uint64)
-            return Seq([
-                Assert(Len(proof) % Int(32) == Int(0)),
-                levelindex.store(index),
-                For(
-                    i.store(Int(0)),
-                    i.load() < Len(proof),
-                    i.store(i.load() + Int(32))
-                ).Do(
-                    Seq([
-                        If(
-                            levelindex.load() % Int(2) == Int(0),
-                            runninghash.store(Sha256(Concat(
-                                runninghash.load(),
-                                Substring(proof, i.load(), i.load() + Int(32)),
-                            ))),
-                            runninghash.store(Sha256(Concat(
-                                Substring(proof, i.load(), i.load() + Int(32)),
-                                runninghash.load()
-                            )))
-                        ),
-                        levelindex.store(levelindex.load() / Int(2)),
-                    ])
-                ),
-                Assert(runninghash.load() == roothash)
-            ])
-
-        def transferelectiontokens(self, count) -> Expr:
-            return Seq([
-                InnerTxnBuilder.Begin(),
-                InnerTxnBuilder.SetFields({
-                    TxnField.type_enum: TxnType.AssetTransfer,
-                    TxnField.xfer_asset: App.globalGet(Bytes("AssetId")),
-                    TxnField.asset_receiver: Txn.sender(),
-                    TxnField.asset_amount: count,
-                }),
-                InnerTxnBuilder.Submit(),
-            ])
+            from algodao.programs.assets import tree_clear_program
+            return tree_clear_program()
 
     class DeployedTree(DeployedContract):
         def __init__(self, appid: int, addr2count: OrderedDict[str, int], tree: MerkleTree):
@@ -250,6 +136,29 @@ class TokenDistributionTree:
             self._tree = tree
             super(TokenDistributionTree.DeployedTree, self).__init__(appid)
 
+        def build_inittoken(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+                assetcount: int,
+                unitname: str,
+                assetname: str,
+                asseturl: str
+        ) -> List[transaction.Transaction]:
+            return [
+                self.method_txn(
+                    params,
+                    addr,
+                    b'inittoken',
+                    [
+                        algodao.helpers.int2bytes(assetcount),
+                        unitname.encode(),
+                        assetname.encode(),
+                        asseturl.encode(),
+                    ],
+                )
+            ]
+
         def call_inittoken(
                 self,
                 algod: AlgodClient,
@@ -260,34 +169,46 @@ class TokenDistributionTree:
                 assetname: str,
                 asseturl: str
         ) -> int:
-            info = self.call_method(
-                algod,
-                addr,
-                privkey,
-                b'inittoken',
-                [
-                    algodao.helpers.int2bytes(assetcount),
-                    unitname.encode(),
-                    assetname.encode(),
-                    asseturl.encode(),
-                ],
-            )
+            params = algodao.params.suggested_params(algod)
+            txns = self.build_inittoken(params, addr, assetcount, unitname, assetname, asseturl)
+            return self.oninittoken(self.submit(algod, privkey, txns))
+
+        def oninittoken(self, info: PendingTransactionInfo) -> int:
+            """Record the election token created by a confirmed inittoken call"""
             self._token = ElectionToken(info['inner-txns'][0]['asset-index'])
             return self._token.asset_id
-    
-        def call_optintoken(self, algod: AlgodClient, addr: str, privkey: str) -> PendingTransactionInfo:
-            return self.call_method(
-                algod,
-                addr,
-                privkey,
-                b'optintoken',
-                [
-                    algodao.helpers.int2bytes(self._token.asset_id),
-                ],
-                foreign_assets=[self._token.asset_id]
-            )
 
-        def call_claim(self, algod: AlgodClient, addr: str, privkey: str):
+        def build_optintoken(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+        ) -> List[transaction.Transaction]:
+            return [
+                self.method_txn(
+                    params,
+                    addr,
+                    b'optintoken',
+                    [
+                        algodao.helpers.int2bytes(self._token.asset_id),
+                    ],
+                    foreign_assets=[self._token.asset_id]
+                )
+            ]
+
+        def call_optintoken(
+                self,
+                algod: AlgodClient,
+                addr: str,
+                privkey: str,
+        ) -> PendingTransactionInfo:
+            params = algodao.params.suggested_params(algod)
+            return self.submit(algod, privkey, self.build_optintoken(params, addr))
+
+        def build_claim(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+        ) -> List[transaction.Transaction]:
             assert addr in self._addr2count
             index = list(self._addr2count.keys()).index(addr)
             proof: List[bytes] = self._tree.createproof(index)
@@ -295,18 +216,23 @@ class TokenDistributionTree:
             # concatenate all the proof hashes together. the contract will index
             # into the byte array as appropriate while stepping through the proof
             proof_bytes: bytes = b''.join(proof)
-            return self.call_method(
-                algod,
-                addr,
-                privkey,
-                b'claim',
-                [
-                    algodao.helpers.int2bytes(count),
-                    algodao.helpers.int2bytes(index),
-                    proof_bytes
-                ],
-                foreign_assets=[self._token.asset_id],
-            )
+            return [
+                self.method_txn(
+                    params,
+                    addr,
+                    b'claim',
+                    [
+                        algodao.helpers.int2bytes(count),
+                        algodao.helpers.int2bytes(index),
+                        proof_bytes
+                    ],
+                    foreign_assets=[self._token.asset_id],
+                )
+            ]
+
+        def call_claim(self, algod: AlgodClient, addr: str, privkey: str):
+            params = algodao.params.suggested_params(algod)
+            return self.submit(algod, privkey, self.build_claim(params, addr))
 
     @classmethod
     def deploy(cls, algod: AlgodClient, createtree: CreateTree, privkey: str):
@@ -321,30 +247,12 @@ class NftCheckProgram:
     simple example.
     """
     def approval_program(self) -> Expr:
-        on_creation = Seq(
-            [
-                Assert(Txn.application_args.length() == Int(1)),
-                App.globalPut(Bytes("AssetId"), Btoi(Txn.application_args[0])),
-                Return(Int(1)),
-            ]
-        )
-        assetbalance = AssetHolding.balance(
-            Txn.sender(),
-            App.globalGet(Bytes("AssetId"))
-        )
-        on_run = Seq(
-            assetbalance,
-            Assert(assetbalance.hasValue()),
-            Assert(assetbalance.value() > Int(0)),
-            Return(Int(1))
-        )
-        program = Cond(
-            [Txn.application_id() == Int(0), on_creation],
-            [Int(1) == Int(1), on_run],
-        )
-        return program
+        from algodao.programs.assets import nftcheck_approval_program
+        return nftcheck_approval_program()
 
     def deploy(self, client: AlgodClient, assetid: int, privkey: str):
+        import pyteal
+        from pyteal import Int, Return
         program = self.approval_program()
         teal = pyteal.compileTeal(
             program,
@@ -403,7 +311,7 @@ def createasset(
         url: str,
 ) -> int:
     log.info(f'Creating asset {assetname}')
-    params = client.suggested_params()
+    params = algodao.params.suggested_params(client)
     metadata_str = json.dumps(metadata)
     # for our purposes, require extra_metadata to always be included and then
     # follow the ARC-3 standard, even if it's just an empty string
@@ -462,8 +370,5 @@ def createasset(
 
 
 def hasasset(client: AlgodClient, addr: str, assetid: int):
-    info: AccountInfo = client.account_info(addr)
-    for asset in info['assets']:
-        if asset['asset-id'] == assetid:
-            return True
-    return False
+    """Whether an account holds (is opted in to) an asset; see algodao.holdings"""
+    return algodao.holdings.hasasset(client, addr, assetid)
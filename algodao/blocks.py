@@ -0,0 +1,149 @@
+"""
+Reading the transactions of blocks from algod. Blocks are fetched as msgpack
+and decoded into dictionaries keyed by the protocol's short field names
+('snd', 'apid', 'apaa', 'aamt', ...), in which addresses are 32-byte public
+keys (see `address`). Each transaction comes with its apply data: its state
+deltas ('dt'), close amounts ('ca', 'aca') and the IDs of the app or asset
+it created ('apid', 'caid'). The inner transactions of app calls are listed
+after their app call.
+
+State keys and byte values are msgpack strings that need not be UTF-8; they
+are decoded with surrogate escapes, and `statebytes` recovers their bytes.
+"""
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import algosdk.encoding
+import msgpack
+from algosdk.v2client.algod import AlgodClient
+
+
+# ValueDelta actions
+SET_BYTES = 1
+SET_UINT = 2
+DELETE = 3
+
+# OnCompletion of app calls
+DELETE_APPLICATION = 5
+
+
+class BlockTxn(NamedTuple):
+    txn: Dict[str, Any]
+    applydata: Dict[str, Any]
+    # position of the (outer) transaction in the block
+    position: int
+    inner: bool
+
+
+class AssetDelta(NamedTuple):
+    """A change of an account's holding of an asset"""
+    assetid: int
+    address: str
+    amount: int
+    # the account opted out of (closed) the asset
+    closed: bool = False
+
+
+def decodeblock(response: bytes) -> Dict[str, Any]:
+    """The block in a msgpack block response"""
+    block: Dict[str, Any] = msgpack.unpackb(
+        response,
+        raw=False,
+        strict_map_key=False,
+        unicode_errors='surrogateescape',
+    )['block']
+    return block
+
+
+def getblock(algod: AlgodClient, algoround: int) -> Dict[str, Any]:
+    return decodeblock(algod.block_info(algoround, response_format='msgpack'))
+
+
+def blocktxns(block: Dict[str, Any]) -> List[BlockTxn]:
+    """The transactions of a block, with the inner transactions of app calls"""
+    txns: List[BlockTxn] = []
+
+    def add(stib: Dict[str, Any], position: int, inner: bool):
+        txns.append(BlockTxn(stib['txn'], stib, position, inner))
+        for innerstib in stib.get('dt', {}).get('itx') or []:
+            add(innerstib, position, True)
+
+    for position, stib in enumerate(block.get('txns') or []):
+        add(stib, position, False)
+    return txns
+
+
+def address(publickey: bytes) -> str:
+    """The address of a public key in a decoded block"""
+    encoded: str = algosdk.encoding.encode_address(publickey)
+    return encoded
+
+
+def appargs(txn: Dict[str, Any]) -> List[bytes]:
+    """The application args of an app call"""
+    return list(txn.get('apaa') or [])
+
+
+def statebytes(value: Union[str, bytes]) -> bytes:
+    """The bytes of a state key or value of a decoded block"""
+    if isinstance(value, bytes):
+        return value
+    return value.encode('utf-8', 'surrogateescape')
+
+
+def txnappid(blocktxn: BlockTxn) -> Optional[int]:
+    """The app an app call was made to, or created"""
+    appid: Optional[int] = blocktxn.txn.get('apid') or blocktxn.applydata.get('apid')
+    return appid
+
+
+def globaldeltas(blocktxn: BlockTxn) -> Iterator[Tuple[bytes, int, Union[int, bytes, None]]]:
+    """The changes an app call made to its app's global state: (key, action, value)"""
+    for key, delta in (blocktxn.applydata.get('dt', {}).get('gd') or {}).items():
+        yield statebytes(key), *_deltavalue(delta)
+
+
+def localdeltas(blocktxn: BlockTxn) -> Iterator[Tuple[str, bytes, int, Union[int, bytes, None]]]:
+    """The changes an app call made to local states: (address, key, action, value)"""
+    txn = blocktxn.txn
+    # accounts are referenced by their index: the sender, then the accounts array
+    accounts = [txn['snd']] + list(txn.get('apat') or [])
+    for index, deltas in (blocktxn.applydata.get('dt', {}).get('ld') or {}).items():
+        addr = address(accounts[index])
+        for key, delta in deltas.items():
+            yield addr, statebytes(key), *_deltavalue(delta)
+
+
+def _deltavalue(delta: Dict[str, Any]) -> Tuple[int, Union[int, bytes, None]]:
+    action: int = delta.get('at', 0)
+    if action == SET_BYTES:
+        return action, statebytes(delta.get('bs', b''))
+    if action == SET_UINT:
+        return action, delta.get('ui', 0)
+    return action, None
+
+
+def assetdeltas(blocktxn: BlockTxn) -> List[AssetDelta]:
+    """The changes to asset holdings made by an asset transfer or creation"""
+    txn = blocktxn.txn
+    sender = address(txn['snd'])
+    if txn.get('type') == 'acfg':
+        createdid = blocktxn.applydata.get('caid')
+        if createdid:
+            # the creator holds the total
+            return [AssetDelta(createdid, sender, (txn.get('apar') or {}).get('t', 0))]
+        return []
+    if txn.get('type') != 'axfer':
+        return []
+    assetid: int = txn.get('xaid', 0)
+    amount: int = txn.get('aamt', 0)
+    # a clawback moves the holding of the revocation target
+    holder = address(txn['asnd']) if txn.get('asnd') else sender
+    receiver = address(txn['arcv']) if txn.get('arcv') else holder
+    deltas = [AssetDelta(assetid, holder, -amount), AssetDelta(assetid, receiver, amount)]
+    if txn.get('aclose'):
+        remainder: int = blocktxn.applydata.get('aca', 0)
+        deltas += [
+            AssetDelta(assetid, holder, -remainder, closed=True),
+            AssetDelta(assetid, address(txn['aclose']), remainder),
+        ]
+    return deltas
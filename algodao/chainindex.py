@@ -0,0 +1,552 @@
+"""
+A local SQLite view of the DAO's apps, kept current by following blocks.
+Questions such as "which proposals are open" or "who is on the trust
+committee" are answered from indexed tables instead of polling algod with
+application_info and account_info.
+
+The indexer walks the blocks from algod (waiting for each with
+status_after_block) and:
+
+- discovers the apps of this package as they are created, by the hash of
+  their programs (see `reference_programs`), and apps given with `track`,
+- applies the global and local state deltas of every call to those apps,
+  and records the calls,
+- follows the holdings of the assets those apps create (e.g. the membership
+  asset of a committee).
+
+Apps created before the first block followed are added with `track`, which
+reads the holdings of their assets and the local states of the accounts
+opted in to them from the indexer.
+
+Each block is applied in one transaction along with the round it brings the
+database to, so an interrupted follower resumes from the last round applied.
+
+    python -m algodao.chainindex DATABASE [--start ROUND] [--track APPID ...]
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, TYPE_CHECKING
+
+import algosdk.error
+import algosdk.logic
+from algosdk.v2client.algod import AlgodClient
+from algosdk.v2client.indexer import IndexerClient
+
+import algodao.artifacts
+import algodao.blocks
+import algodao.contract
+import algodao.helpers
+import algodao.readcache
+import algodao.scheduler
+from algodao.blocks import BlockTxn
+
+if TYPE_CHECKING:
+    from algodao.contract import AppState
+
+log = logging.getLogger(__name__)
+
+# app kinds, by the program key of their reference contract
+KINDS: Dict[str, str] = {
+    'algodao.governance.AlgoDao.CreateDao': 'dao',
+    'algodao.governance.PreapprovalGate.CreateGate': 'gate',
+    'algodao.committee.Committee.CreateCommittee': 'committee',
+    'algodao.voting.Proposal.CreateProposal': 'proposal',
+    'algodao.assets.TokenDistributionTree.CreateTree': 'tree',
+}
+
+# global keys of the assets created by apps of each kind
+CREATED_ASSETS: Dict[str, List[bytes]] = {
+    'committee': [b'AssetId'],
+    'gate': [b'TrustAssetId'],
+}
+
+# OnCompletion of app calls that remove the sender's local state
+CLOSE_OUT = 2
+CLEAR_STATE = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    round INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS apps (
+    appid INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    creator TEXT,
+    created INTEGER,
+    deleted INTEGER
+);
+CREATE INDEX IF NOT EXISTS apps_kind ON apps (kind);
+CREATE TABLE IF NOT EXISTS globalstate (
+    appid INTEGER NOT NULL,
+    key BLOB NOT NULL,
+    uint INTEGER,
+    bytes BLOB,
+    PRIMARY KEY (appid, key)
+);
+CREATE TABLE IF NOT EXISTS localstate (
+    appid INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    key BLOB NOT NULL,
+    uint INTEGER,
+    bytes BLOB,
+    PRIMARY KEY (appid, address, key)
+);
+CREATE INDEX IF NOT EXISTS localstate_address ON localstate (address);
+CREATE TABLE IF NOT EXISTS calls (
+    round INTEGER NOT NULL,
+    txnindex INTEGER NOT NULL,
+    appid INTEGER NOT NULL,
+    sender TEXT NOT NULL,
+    method TEXT NOT NULL,
+    oncompletion INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS calls_app ON calls (appid, round);
+CREATE INDEX IF NOT EXISTS calls_sender ON calls (sender);
+CREATE TABLE IF NOT EXISTS assets (
+    assetid INTEGER PRIMARY KEY,
+    appid INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS holdings (
+    assetid INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    PRIMARY KEY (assetid, address)
+);
+CREATE INDEX IF NOT EXISTS holdings_address ON holdings (address);
+"""
+
+
+def programhash(approval: bytes, clear: bytes) -> str:
+    return hashlib.sha256(approval + clear).hexdigest()
+
+
+def reference_programs() -> Dict[str, str]:
+    """
+    The hashes of the programs of the contracts of this package, mapped to
+    their kind. Precompiled artifacts are used if they are up to date, else
+    the programs are assembled offline.
+    """
+    programs: Dict[str, str] = {}
+    for contract in algodao.artifacts.reference_contracts():
+        programkey = contract.programkey()
+        compiled = algodao.artifacts.load(programkey, offline=True)
+        if compiled is None:
+            compiled = contract.compile(None)
+        programs[programhash(*compiled)] = KINDS[programkey]
+    return programs
+
+
+class ChainIndex:
+    """
+    The SQLite database of the apps followed. The database may be read from
+    any thread while a follower applies blocks.
+    """
+    def __init__(self, path: str, programs: Optional[Dict[str, str]] = None):
+        # program hash -> kind, computed on first use
+        self._programs: Optional[Dict[str, str]] = programs
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    @property
+    def programs(self) -> Dict[str, str]:
+        if self._programs is None:
+            self._programs = reference_programs()
+        return self._programs
+
+    @property
+    def round(self) -> Optional[int]:
+        """The last round applied, or None if no block has been"""
+        row = self._query('SELECT round FROM progress WHERE id = 0')
+        return row[0][0] if row else None
+
+    def track(
+            self,
+            algod: AlgodClient,
+            appid: int,
+            kind: Optional[str] = None,
+            indexer: Optional[IndexerClient] = None,
+    ):
+        """
+        Follow an app created before the blocks followed, starting from its
+        current global state. Its kind is found from its programs unless given.
+        The holdings of the assets it created and the local states of the
+        accounts opted in to it are read from the indexer, which is required
+        for apps that have either and should be caught up with the round the
+        blocks are followed from.
+        """
+        appinfo = algod.application_info(appid)
+        params = appinfo['params']
+        if kind is None:
+            approval = base64.b64decode(params['approval-program'])
+            clear = base64.b64decode(params['clear-state-program'])
+            kind = self.programs.get(programhash(approval, clear))
+            if kind is None:
+                raise ValueError(f"App {appid} is not an app of this package")
+        state = algodao.contract.AppState.fromapp(appinfo)
+        assetids = [state.getint(key) for key in CREATED_ASSETS.get(kind, []) if state.getint(key)]
+        schema = params.get('local-state-schema') or {}
+        haslocalstate = schema.get('num-uint', 0) + schema.get('num-byte-slice', 0) > 0
+        holdings: Dict[int, Dict[str, int]] = {}
+        localstates: Dict[str, AppState] = {}
+        if assetids or haslocalstate:
+            if indexer is None:
+                raise ValueError(f"Tracking {kind} app {appid} needs an indexer to read its assets and local states")
+            # reading the indexer must not hold up interactive calls
+            with algodao.scheduler.bulk():
+                holdings = {assetid: _assetholdings(indexer, assetid) for assetid in assetids}
+                if haslocalstate:
+                    localstates = _localstates(indexer, appid)
+        with self._transaction() as db:
+            db.execute(
+                'INSERT OR REPLACE INTO apps (appid, kind, creator) VALUES (?, ?, ?)',
+                (appid, kind, params.get('creator')),
+            )
+            db.execute('DELETE FROM globalstate WHERE appid = ?', (appid,))
+            db.executemany(
+                'INSERT INTO globalstate (appid, key, uint, bytes) VALUES (?, ?, ?, ?)',
+                [(appid, key, *_columns(value)) for key, value in state.items()],
+            )
+            db.execute('DELETE FROM localstate WHERE appid = ?', (appid,))
+            db.executemany(
+                'INSERT INTO localstate (appid, address, key, uint, bytes) VALUES (?, ?, ?, ?, ?)',
+                [
+                    (appid, addr, key, *_columns(value))
+                    for addr, localstate in localstates.items()
+                    for key, value in localstate.items()
+                ],
+            )
+            for assetid, balances in holdings.items():
+                db.execute('INSERT OR REPLACE INTO assets (assetid, appid) VALUES (?, ?)', (assetid, appid))
+                db.execute('DELETE FROM holdings WHERE assetid = ?', (assetid,))
+                db.executemany(
+                    'INSERT INTO holdings (assetid, address, amount) VALUES (?, ?, ?)',
+                    [(assetid, addr, amount) for addr, amount in balances.items()],
+                )
+        log.info(f"Tracking {kind} app {appid}")
+
+    def applyblock(self, algoround: int, block: Dict[str, Any]):
+        """Apply the calls of a block to the apps followed"""
+        with self._transaction() as db:
+            apps = {appid: kind for appid, kind in db.execute('SELECT appid, kind FROM apps WHERE deleted IS NULL')}
+            assets = {assetid for assetid, in db.execute('SELECT assetid FROM assets')}
+            for blocktxn in algodao.blocks.blocktxns(block):
+                txn = blocktxn.txn
+                if txn.get('type') == 'appl':
+                    self._applycall(db, algoround, blocktxn, apps)
+                elif txn.get('type') in ('acfg', 'axfer'):
+                    self._applyasset(db, blocktxn, apps, assets)
+            db.execute('INSERT OR REPLACE INTO progress (id, round) VALUES (0, ?)', (algoround,))
+
+    def sync(self, algod: AlgodClient, start: Optional[int] = None) -> int:
+        """
+        Apply the blocks produced since the last round applied (or from
+        `start` on a new database, by default the current round) and return
+        the last round applied
+        """
+        lastround: int = algod.status()['last-round']
+        applied = self.round
+        if applied is None:
+            applied = (lastround if start is None else start) - 1
+        for algoround in range(applied + 1, lastround + 1):
+            self.applyblock(algoround, algodao.blocks.getblock(algod, algoround))
+            algodao.readcache.observeround(algod, algoround)
+        return max(applied, lastround)
+
+    def follow(self, algod: AlgodClient, stopped: threading.Event, start: Optional[int] = None):
+        """Apply blocks as they are produced, until stopped"""
+        algoround = self.sync(algod, start)
+        while not stopped.is_set():
+            try:
+                algod.status_after_block(algoround)
+                algoround = self.sync(algod)
+            except Exception:
+                log.exception(f"Following blocks after {algoround} failed")
+                stopped.wait(1)
+
+    def apps(self, kind: Optional[str] = None) -> List[int]:
+        """The apps followed that have not been deleted, by kind"""
+        if kind is None:
+            rows = self._query('SELECT appid FROM apps WHERE deleted IS NULL ORDER BY appid')
+        else:
+            rows = self._query('SELECT appid FROM apps WHERE deleted IS NULL AND kind = ? ORDER BY appid', (kind,))
+        return [appid for appid, in rows]
+
+    def kind(self, appid: int) -> Optional[str]:
+        rows = self._query('SELECT kind FROM apps WHERE appid = ?', (appid,))
+        return rows[0][0] if rows else None
+
+    def globalstate(self, appid: int) -> AppState:
+        rows = self._query('SELECT key, uint, bytes FROM globalstate WHERE appid = ?', (appid,))
+        return algodao.contract.AppState({key: _value(uint, value) for key, uint, value in rows})
+
+    def localstate(self, appid: int, addr: str) -> AppState:
+        rows = self._query(
+            'SELECT key, uint, bytes FROM localstate WHERE appid = ? AND address = ?',
+            (appid, addr),
+        )
+        return algodao.contract.AppState({key: _value(uint, value) for key, uint, value in rows})
+
+    def localstates(self, appid: int) -> Iterator[Tuple[str, AppState]]:
+        """The local states in an app, by account"""
+        rows = self._query(
+            'SELECT address, key, uint, bytes FROM localstate WHERE appid = ? ORDER BY address',
+            (appid,),
+        )
+        addr: Optional[str] = None
+        values: Dict[bytes, algodao.contract.StateValue] = {}
+        for rowaddr, key, uint, value in rows:
+            if rowaddr != addr:
+                if addr is not None:
+                    yield addr, algodao.contract.AppState(values)
+                addr, values = rowaddr, {}
+            values[key] = _value(uint, value)
+        if addr is not None:
+            yield addr, algodao.contract.AppState(values)
+
+    def openproposals(self, algoround: Optional[int] = None) -> List[int]:
+        """The proposals open for votes at a round, by default the last round applied"""
+        if algoround is None:
+            algoround = self.round or 0
+        return [appid for appid, in self._query(
+            """
+            SELECT apps.appid FROM apps
+            JOIN globalstate votebegin ON votebegin.appid = apps.appid AND votebegin.key = ?
+            JOIN globalstate voteend ON voteend.appid = apps.appid AND voteend.key = ?
+            WHERE apps.kind = 'proposal' AND apps.deleted IS NULL
+            AND votebegin.uint <= ? AND ? <= voteend.uint
+            ORDER BY apps.appid
+            """,
+            (b'VoteBegin', b'VoteEnd', algoround, algoround),
+        )]
+
+    def passednotimplemented(self) -> List[int]:
+        """The proposals that passed and have not been implemented"""
+        return [appid for appid, in self._query(
+            """
+            SELECT apps.appid FROM apps
+            JOIN globalstate passed ON passed.appid = apps.appid AND passed.key = ?
+            LEFT JOIN globalstate implemented ON implemented.appid = apps.appid AND implemented.key = ?
+            WHERE apps.kind = 'proposal' AND apps.deleted IS NULL
+            AND passed.uint = 1 AND IFNULL(implemented.uint, 0) = 0
+            ORDER BY apps.appid
+            """,
+            (b'Passed', b'Implemented'),
+        )]
+
+    def calls(self, appid: int, since: int = 0) -> List[Tuple[int, str, str]]:
+        """The calls to an app from a round on: (round, sender, method)"""
+        return list(self._query(
+            'SELECT round, sender, method FROM calls WHERE appid = ? AND round >= ? ORDER BY round, txnindex',
+            (appid, since),
+        ))
+
+    def holders(self, assetid: int) -> Dict[str, int]:
+        """The accounts holding an asset created by an app followed"""
+        return dict(self._query(
+            'SELECT address, amount FROM holdings WHERE assetid = ? AND amount > 0 ORDER BY address',
+            (assetid,),
+        ))
+
+    def committeemembers(self, committee_appid: int) -> List[str]:
+        """The holders of a committee's membership asset, other than the committee"""
+        from algodao.committee import Committee
+        assetid = self.globalstate(committee_appid).getint(Committee.GlobalInts.AssetId)
+        appaddr = algosdk.logic.get_application_address(committee_appid)
+        return [addr for addr in self.holders(assetid) if addr != appaddr]
+
+    def _applycall(self, db: sqlite3.Connection, algoround: int, blocktxn: BlockTxn, apps: Dict[int, str]):
+        txn = blocktxn.txn
+        appid = algodao.blocks.txnappid(blocktxn)
+        if appid is None:
+            return
+        if not txn.get('apid'):
+            # a creation: follow the app if its programs are ours
+            kind = self.programs.get(programhash(txn.get('apap', b''), txn.get('apsu', b'')))
+            if kind is None:
+                return
+            creator = algodao.blocks.address(txn['snd'])
+            db.execute(
+                'INSERT OR REPLACE INTO apps (appid, kind, creator, created) VALUES (?, ?, ?, ?)',
+                (appid, kind, creator, algoround),
+            )
+            apps[appid] = kind
+            log.info(f"Discovered {kind} app {appid} in round {algoround}")
+        elif appid not in apps:
+            return
+        args = algodao.blocks.appargs(txn)
+        oncompletion: int = txn.get('apan', 0)
+        db.execute(
+            'INSERT INTO calls (round, txnindex, appid, sender, method, oncompletion) VALUES (?, ?, ?, ?, ?, ?)',
+            (
+                algoround,
+                blocktxn.position,
+                appid,
+                algodao.blocks.address(txn['snd']),
+                args[0].decode(errors='replace') if args else '',
+                oncompletion,
+            ),
+        )
+        for key, action, value in algodao.blocks.globaldeltas(blocktxn):
+            if action == algodao.blocks.DELETE:
+                db.execute('DELETE FROM globalstate WHERE appid = ? AND key = ?', (appid, key))
+            else:
+                db.execute(
+                    'INSERT OR REPLACE INTO globalstate (appid, key, uint, bytes) VALUES (?, ?, ?, ?)',
+                    (appid, key, *_columns(value)),
+                )
+        for addr, key, action, value in algodao.blocks.localdeltas(blocktxn):
+            if action == algodao.blocks.DELETE:
+                db.execute(
+                    'DELETE FROM localstate WHERE appid = ? AND address = ? AND key = ?',
+                    (appid, addr, key),
+                )
+            else:
+                db.execute(
+                    'INSERT OR REPLACE INTO localstate (appid, address, key, uint, bytes) VALUES (?, ?, ?, ?, ?)',
+                    (appid, addr, key, *_columns(value)),
+                )
+        if oncompletion in (CLOSE_OUT, CLEAR_STATE):
+            db.execute(
+                'DELETE FROM localstate WHERE appid = ? AND address = ?',
+                (appid, algodao.blocks.address(txn['snd'])),
+            )
+        elif oncompletion == algodao.blocks.DELETE_APPLICATION:
+            db.execute('UPDATE apps SET deleted = ? WHERE appid = ?', (algoround, appid))
+            del apps[appid]
+
+    def _applyasset(self, db: sqlite3.Connection, blocktxn: BlockTxn, apps: Dict[int, str], assets: Set[int]):
+        createdid = blocktxn.applydata.get('caid')
+        if createdid:
+            # an asset created by an app followed
+            creator = algodao.blocks.address(blocktxn.txn['snd'])
+            appid = next(
+                (appid for appid in apps if algosdk.logic.get_application_address(appid) == creator),
+                None,
+            )
+            if appid is None:
+                return
+            db.execute('INSERT OR REPLACE INTO assets (assetid, appid) VALUES (?, ?)', (createdid, appid))
+            assets.add(createdid)
+        for delta in algodao.blocks.assetdeltas(blocktxn):
+            if delta.assetid not in assets:
+                continue
+            if delta.closed:
+                db.execute(
+                    'DELETE FROM holdings WHERE assetid = ? AND address = ?',
+                    (delta.assetid, delta.address),
+                )
+                continue
+            db.execute(
+                """
+                INSERT INTO holdings (assetid, address, amount) VALUES (?, ?, ?)
+                ON CONFLICT (assetid, address) DO UPDATE SET amount = amount + excluded.amount
+                """,
+                (delta.assetid, delta.address, delta.amount),
+            )
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _transaction(self) -> '_Transaction':
+        return _Transaction(self._lock, self._db)
+
+
+class _Transaction:
+    """Holds the lock of the database for a transaction, committed unless it raises"""
+    def __init__(self, lock: threading.Lock, db: sqlite3.Connection):
+        self._lock = lock
+        self._db = db
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._lock.acquire()
+        self._db.execute('BEGIN')
+        return self._db
+
+    def __exit__(self, exctype, exc, tb):
+        try:
+            self._db.execute('ROLLBACK' if exctype is not None else 'COMMIT')
+        finally:
+            self._lock.release()
+
+
+def _assetholdings(indexer: IndexerClient, assetid: int) -> Dict[str, int]:
+    """The balances of the accounts opted in to an asset, from the indexer"""
+    search: Callable[[Optional[str]], Dict[str, Any]] = (
+        lambda nextpage: indexer.asset_balances(assetid, next_page=nextpage)
+    )
+    return {balance['address']: balance['amount'] for balance in _pages(search, 'balances')}
+
+
+def _localstates(indexer: IndexerClient, appid: int) -> Dict[str, AppState]:
+    """The local states of the accounts opted in to an app, from the indexer"""
+    search: Callable[[Optional[str]], Dict[str, Any]] = (
+        lambda nextpage: indexer.accounts(application_id=appid, next_page=nextpage)
+    )
+    return {
+        account['address']: algodao.contract.AppState.fromstore(localstate.get('key-value', []))
+        for account in _pages(search, 'accounts')
+        for localstate in account.get('apps-local-state', [])
+        if localstate['id'] == appid
+    }
+
+
+def _pages(search: Callable[[Optional[str]], Dict[str, Any]], field: str) -> Iterator[Dict[str, Any]]:
+    """The results of an indexer search, page by page"""
+    nextpage: Optional[str] = None
+    while True:
+        response = search(nextpage)
+        yield from response[field]
+        nextpage = response.get('next-token')
+        if not nextpage or not response[field]:
+            return
+
+
+def _columns(value: Any) -> Tuple[Optional[int], Optional[bytes]]:
+    if isinstance(value, bytes):
+        return None, value
+    return value, None
+
+
+def _value(uint: Optional[int], value: Optional[bytes]) -> algodao.contract.StateValue:
+    if value is not None:
+        return value
+    return uint if uint is not None else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Follow the DAO's apps into a SQLite database")
+    parser.add_argument('database', help="path of the SQLite database")
+    parser.add_argument('--start', type=int, default=None, help="first round of a new database")
+    parser.add_argument('--track', type=int, nargs='*', default=[], help="apps created before the start round")
+    args = parser.parse_args()
+    algodao.helpers.loggingconfig()
+    algod = algodao.helpers.createclient()
+    index = ChainIndex(args.database)
+    indexer = algodao.helpers.indexer_client() if args.track else None
+    for appid in args.track:
+        index.track(algod, appid, indexer=indexer)
+    stopped = threading.Event()
+    try:
+        index.follow(algod, stopped, args.start)
+    except KeyboardInterrupt:
+        stopped.set()
+    finally:
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
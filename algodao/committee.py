@@ -3,121 +3,65 @@ Methods for creating and managing committees in the DAO. Committees are defined
 to have certain privileges, such as the ability to approve proposals and
 distribute treasury funds.
 """
+from __future__ import annotations
+
+import copy
 import enum
 import logging
-from typing import List
+from typing import List, Optional, TYPE_CHECKING
 
+import algosdk.constants
 import algosdk.encoding
-import pyteal
 from algosdk.v2client.algod import AlgodClient
 from algosdk.future import transaction
-from pyteal import Expr, Seq, Assert, App, Bytes, Btoi, Return, Int, Txn, And
-from pyteal import Len, Subroutine, TealType, For, ScratchVar
-from pyteal import Substring, Concat, Cond, OnComplete, Mode
-from pyteal import InnerTxnBuilder, TxnField, TxnType, Global, InnerTxn
-from pyteal import AssetHolding, Gtxn
-
 
 import algodao.deploy
 import algodao.helpers
+import algodao.holdings
+import algodao.params
+import algodao.programs
+import algodao.readcache
+import algodao.signing
 from algodao.contract import GlobalVariables, CreateContract, DeployedContract
+from algodao.contract import MAX_TXN_ACCOUNTS, MAX_INNER_TXNS
+from algodao.types import PendingTransactionInfo
 
-log = logging.getLogger(__name__)
+if TYPE_CHECKING:
+    from pyteal import Expr
 
+log = logging.getLogger(__name__)
 
-@Subroutine(TealType.uint64)
-def is_member(asset_id: Expr, address: Expr) -> Expr:
-    assetbalance = AssetHolding.balance(address, asset_id)
-    return Seq([
-        assetbalance,
-        Return(And(
-            assetbalance.hasValue(),
-            assetbalance.value() > Int(0))
-        )
-    ])
+# add_member sends the membership token and then freezes it
+INNER_TXNS_PER_MEMBER = 2
+# members that can be added by a single setmembers call; every member must
+# also be passed in the accounts array of the call
+MEMBERS_PER_CALL = min(MAX_TXN_ACCOUNTS, MAX_INNER_TXNS // INNER_TXNS_PER_MEMBER)
+# rounds after creation during which the creator may seed the members
+DEFAULT_SEEDING_ROUNDS = 1000
 
 
-@Subroutine(TealType.uint64)
-def current_committee_size_ex(app_id: Expr, app_addr: Expr):
+def plan_member_chunks(addresses: List[str]) -> List[List[List[str]]]:
     """
-    Find the current number of committee members by subtracting
-    the number of assets currently owned by the Committee contract from
-    the max members allowed (i.e., the total number of assets
-    created).
+    Split the members to add into transaction groups of setmembers calls, each
+    call adding at most MEMBERS_PER_CALL members.
     """
-    assetid = App.globalGetEx(app_id, Bytes("AssetId"))
-    maxmembers = App.globalGetEx(app_id, Bytes("MaxMembers"))
-    reservebalance = AssetHolding.balance(app_addr, assetid.value())
-    return Seq([
-        assetid,
-        Assert(assetid.hasValue()),
-        maxmembers,
-        Assert(maxmembers.hasValue()),
-        reservebalance,
-        Assert(reservebalance.hasValue()),
-        Return(maxmembers.value() - reservebalance.value())
-    ])
-
-
-@Subroutine(TealType.none)
-def set_asset_freeze(address: Expr, assetid: Expr, frozen: Expr) -> Expr:
-    return Seq([
-        InnerTxnBuilder.Begin(),
-        InnerTxnBuilder.SetFields({
-            TxnField.type_enum: TxnType.AssetFreeze,
-            TxnField.freeze_asset_account: address,
-            TxnField.freeze_asset_frozen: frozen,
-            TxnField.freeze_asset: assetid,
-        }),
-        InnerTxnBuilder.Submit(),
-    ])
-
-
-@Subroutine(TealType.none)
-def send_asset(address: Expr, assetid: Expr):
-    return Seq([
-       InnerTxnBuilder.Begin(),
-       InnerTxnBuilder.SetFields({
-           TxnField.type_enum: TxnType.AssetTransfer,
-           TxnField.asset_receiver: address,
-           TxnField.xfer_asset: assetid,
-           TxnField.asset_amount: Int(1),
-       }),
-       InnerTxnBuilder.Submit(),
-    ])
-
-
-@Subroutine(TealType.none)
-def add_member(address: Expr) -> Expr:
-    return Seq([
-        send_asset(address, App.globalGet(Bytes("AssetId"))),
-        set_asset_freeze(address, App.globalGet(Bytes("AssetId")), Int(1)),
-    ])
-
-
-@Subroutine(TealType.none)
-def add_members(addresses: Expr) -> Expr:
-    index = ScratchVar(TealType.uint64)
-    return Seq([
-        Assert(Len(addresses) % Int(32) == Int(0)),
-        For(
-            index.store(Int(0)),
-            index.load() < Len(addresses),
-            index.store(index.load() + Int(32))
-        ).Do(
-            add_member(Substring(
-                addresses,
-                index.load(),
-                index.load() + Int(32)
-            ))
-        ),
-    ])
+    chunks: List[List[str]] = [
+        addresses[index:index + MEMBERS_PER_CALL]
+        for index in range(0, len(addresses), MEMBERS_PER_CALL)
+    ] or [[]]
+    group_limit = algosdk.constants.TX_GROUP_LIMIT
+    return [
+        chunks[index:index + group_limit]
+        for index in range(0, len(chunks), group_limit)
+    ]
 
 
 class Committee:
     class GlobalInts(GlobalVariables):
         AssetId = enum.auto()
         MaxMembers = enum.auto()
+        MembersSet = enum.auto()
+        SeedingEnd = enum.auto()
 
     class GlobalBytes(GlobalVariables):
         CommitteeName = enum.auto()
@@ -127,95 +71,19 @@ class Committee:
                 self,
                 name: str,
                 maxsize: int,
+                seeding_rounds: int = DEFAULT_SEEDING_ROUNDS,
         ):
+            """
+            The creator may seed the members with setmembers for
+            seeding_rounds rounds after the committee is created.
+            """
             self._name: str = name
             self._maxsize: int = maxsize
+            self._seeding_rounds: int = seeding_rounds
 
         def approval_program(self) -> Expr:
-            GlobalInts = Committee.GlobalInts
-            GlobalBytes = Committee.GlobalBytes
-            on_creation = Seq([
-                Assert(Txn.application_args.length() == Int(2)),
-                GlobalBytes.CommitteeName.put(Txn.application_args[0]),
-                GlobalInts.MaxMembers.put(Btoi(Txn.application_args[1])),
-                GlobalInts.AssetId.put(Int(0)),
-                Return(Int(1)),
-            ])
-            on_register = Return(Int(1))
-            on_inittoken = Seq([
-                InnerTxnBuilder.Begin(),
-                InnerTxnBuilder.SetFields({
-                    TxnField.type_enum: TxnType.AssetConfig,
-                    TxnField.config_asset_total: GlobalInts.MaxMembers.get(),
-                    TxnField.config_asset_unit_name: Bytes("CMT"),
-                    TxnField.config_asset_name: Concat(
-                        GlobalBytes.CommitteeName.get(),
-                        Bytes(" Membership")
-                    ),
-                    TxnField.config_asset_url: Txn.application_args[1],
-                    TxnField.config_asset_freeze: Global.current_application_address(),
-                    TxnField.config_asset_clawback: Global.current_application_address(),
-                    TxnField.config_asset_manager: Global.current_application_address(),
-                }),
-                InnerTxnBuilder.Submit(),
-                GlobalInts.AssetId.put(InnerTxn.created_asset_id()),
-                Return(Int(1)),
-            ])
-            on_optintoken = Seq([
-                Assert(Txn.sender() == Global.creator_address()),
-                InnerTxnBuilder.Begin(),
-                InnerTxnBuilder.SetFields({
-                    TxnField.type_enum: TxnType.AssetTransfer,
-                    TxnField.asset_receiver: Global.current_application_address(),
-                    TxnField.xfer_asset: Btoi(Txn.application_args[1]),
-                    TxnField.asset_amount: Int(0),
-                }),
-                Return(Int(1)),
-            ])
-            assetbalance = AssetHolding.balance(
-                Global.current_application_address(),
-                GlobalInts.AssetId.get(),
-            )
-            on_setmembers = Seq([
-                # only allow arbitrary selection of members by creator when no one
-                # is yet on the committee
-                # TODO: allow addition and removal of committee members according
-                # TODO: to DAO charter (e.g., vote)
-                Assert(Global.creator_address() == Txn.sender()),
-                assetbalance,
-                Assert(
-                    And(
-                        assetbalance.hasValue(),
-                        assetbalance.value() == GlobalInts.MaxMembers.get()
-                    )
-                ),
-                add_members(Txn.application_args[1]),
-                Return(Int(1)),
-            ])
-            on_resign = Seq([
-                Assert(And(
-                    Global.group_size() == Int(2),
-                    Txn.group_index() == Int(0),
-                    Gtxn[1].xfer_asset() == GlobalInts.AssetId.get(),
-                    Gtxn[1].asset_amount() == Int(1),
-                    Gtxn[1].asset_receiver() == Global.current_application_address(),
-                )),
-                set_asset_freeze(Txn.sender(), GlobalInts.AssetId.get(), Int(0)),
-                Return(Int(1))
-            ])
-            on_checkmembership = Return(is_member(GlobalInts.AssetId.get(), Txn.sender()))
-            return Cond(
-                [Txn.application_id() == Int(0), on_creation],
-                [Txn.on_completion() == OnComplete.DeleteApplication, Return(Int(0))],
-                [Txn.on_completion() == OnComplete.UpdateApplication, Return(Int(0))],
-                [Txn.on_completion() == OnComplete.CloseOut, Return(Int(1))],
-                [Txn.on_completion() == OnComplete.OptIn, on_register],
-                [Txn.application_args[0] == Bytes("resign"), on_resign],
-                [Txn.application_args[0] == Bytes("checkmembership"), on_checkmembership],
-                [Txn.application_args[0] == Bytes("inittoken"), on_inittoken],
-                [Txn.application_args[0] == Bytes("setmembers"), on_setmembers],
-                [Txn.application_args[0] == Bytes("optintoken"), on_optintoken],
-            )
+            from algodao.programs.committee import committee_approval_program
+            return committee_approval_program()
 
         def global_schema(self) -> transaction.StateSchema:
             return transaction.StateSchema(len(Committee.GlobalInts), len(Committee.GlobalBytes))
@@ -227,17 +95,22 @@ class Committee:
             return [
                 self._name.encode(),
                 algodao.helpers.int2bytes(self._maxsize),
+                algodao.helpers.int2bytes(self._seeding_rounds),
             ]
 
         def clear_program(self) -> Expr:
-            return Return(Int(1))
+            from algodao.programs.committee import committee_clear_program
+            return committee_clear_program()
 
     class DeployedCommittee(DeployedContract):
         def __init__(self, appid: int):
             super(Committee.DeployedCommittee, self).__init__(appid)
 
-        def call_resign(self, algod: AlgodClient, privkey: str, addr: str):
-            params = algod.suggested_params()
+        def build_resign(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+        ) -> List[transaction.Transaction]:
             appaddr = algosdk.logic.get_application_address(self._appid)
             txn1 = transaction.ApplicationNoOpTxn(
                 addr,
@@ -253,62 +126,170 @@ class Committee:
                 1,
                 self._assetid
             )
-            groupid = transaction.calculate_group_id([txn1, txn2])
-            txn1.group = groupid
-            txn2.group = groupid
-            signed1 = txn1.sign(privkey)
-            signed2 = txn2.sign(privkey)
-            txid = algod.send_transactions([signed1, signed2])
-            algodao.helpers.wait_for_confirmation(algod, txid)
+            return [txn1, txn2]
+
+        def call_resign(self, algod: AlgodClient, privkey: str, addr: str):
+            params = algodao.params.suggested_params(algod)
+            return self.submit(algod, privkey, self.build_resign(params, addr))
+
+        def build_checkmembership(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+        ) -> List[transaction.Transaction]:
+            return [
+                self.method_txn(
+                    params,
+                    addr,
+                    b'checkmembership',
+                    [],
+                    foreign_assets=[self.assetid],
+                )
+            ]
 
         def call_checkmembership(self, algod: AlgodClient, privkey: str, addr: str):
-            return self.call_method(
-                algod,
-                addr,
-                privkey,
-                b'checkmembership',
-                [],
-                foreign_assets=[self.assetid],
-            )
+            params = algodao.params.suggested_params(algod)
+            return self.submit(algod, privkey, self.build_checkmembership(params, addr))
+
+        def build_optintoken(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+                assetid: int,
+        ) -> List[transaction.Transaction]:
+            return [
+                self.method_txn(
+                    params,
+                    addr,
+                    b'optintoken',
+                    [
+                        algodao.helpers.int2bytes(assetid),
+                    ],
+                    foreign_assets=[assetid],
+                )
+            ]
 
         def call_optintoken(self, algod: AlgodClient, privkey: str, addr: str, assetid: int):
-            return self.call_method(
-                algod,
-                addr,
-                privkey,
-                b'optintoken',
-                [
-                    algodao.helpers.int2bytes(assetid),
-                ],
-                foreign_assets=[assetid],
-            )
+            params = algodao.params.suggested_params(algod)
+            return self.submit(algod, privkey, self.build_optintoken(params, addr, assetid))
 
-        def call_setmembers(self, algod: AlgodClient, privkey: str, addr: str, addresses: List[str]):
+        def build_setmembers(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+                addresses: List[str],
+                close: bool = True,
+        ) -> List[List[transaction.Transaction]]:
+            """
+            Build the groups of setmembers calls that seed the given members.
+            Members are added in chunks of MEMBERS_PER_CALL per setmembers
+            call and up to TX_GROUP_LIMIT calls per atomic group. The fee of
+            each call covers its inner transactions. Unless close is False,
+            the last call of the last group closes the seeding phase (which
+            also closes once every membership token is given out, or when
+            the seeding rounds of the committee have passed).
+            """
+            min_fee = params.min_fee or algosdk.constants.MIN_TXN_FEE
+            groups = plan_member_chunks(addresses)
+            built: List[List[transaction.Transaction]] = []
+            for groupindex, group in enumerate(groups):
+                final = close and groupindex == len(groups) - 1
+                txns: List[transaction.Transaction] = []
+                for chunkindex, chunk in enumerate(group):
+                    chunkparams = copy.copy(params)
+                    chunkparams.flat_fee = True
+                    chunkparams.fee = min_fee * (1 + INNER_TXNS_PER_MEMBER * len(chunk))
+                    txns.append(self._setmembers_txn(
+                        chunkparams,
+                        addr,
+                        chunk,
+                        final and chunkindex == len(group) - 1
+                    ))
+                built.append(txns)
+            return built
+
+        def call_setmembers(
+                self,
+                algod: AlgodClient,
+                privkey: str,
+                addr: str,
+                addresses: List[str],
+                signer: Optional[algodao.signing.BatchSigner] = None,
+        ):
+            """
+            Seed the initial committee members (see build_setmembers). Every
+            group but the last is submitted at once; the last group, which
+            closes the seeding phase, is sent after they are confirmed.
+            The groups are signed with the batch signer if given. Returns the
+            transaction ID of the first transaction in each group.
+            """
+            params = algodao.params.suggested_params(algod)
+            built = self.build_setmembers(params, addr, addresses)
+            groups = algodao.signing.signgroups(built, privkey, signer)
+            txids: List[str] = []
+            for groupindex, signed in enumerate(groups):
+                if groupindex == len(groups) - 1:
+                    for txid in txids:
+                        algodao.helpers.wait_for_confirmation(algod, txid)
+                try:
+                    txids.append(algodao.signing.sendgroup(algod, signed))
+                except Exception:
+                    algodao.helpers.writedryrun(algod, algodao.signing.decode(signed), 'failed_txn')
+                    raise
+            algodao.helpers.wait_for_confirmation(algod, txids[-1])
+            txns = [txn for group in built for txn in group]
+            algodao.readcache.invalidatetxns(algod, txns)
+            algodao.holdings.observetxns(algod, txns)
+            return txids
+
+        def _setmembers_txn(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+                addresses: List[str],
+                final: bool,
+        ) -> transaction.Transaction:
             addresses_bytes = b''.join(
                 algosdk.encoding.decode_address(member)
                 for member in addresses
             )
-            return self.call_method(
-                algod,
+            return transaction.ApplicationNoOpTxn(
                 addr,
-                privkey,
-                b'setmembers',
-                [addresses_bytes],
+                params,
+                self._appid,
+                [
+                    b'setmembers',
+                    addresses_bytes,
+                    algodao.helpers.int2bytes(int(final)),
+                ],
                 accounts=addresses,
                 foreign_assets=[self.assetid],
             )
 
+        def build_inittoken(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+        ) -> List[transaction.Transaction]:
+            return [
+                self.method_txn(
+                    params,
+                    addr,
+                    b'inittoken',
+                    [b'http://localhost/my/committee/token'],
+                )
+            ]
+
         def call_inittoken(self, algod: AlgodClient, privkey: str, addr: str):
-            info = self.call_method(
-                algod,
-                addr,
-                privkey,
-                b'inittoken',
-                [b'http://localhost/my/committee/token'],
-            )
-            self._assetid = info['inner-txns'][0]['asset-index']
-            log.info(f"Created asset ID for committee: {self._assetid}")
-            return self._assetid
+            params = algodao.params.suggested_params(algod)
+            return self.oninittoken(self.submit(algod, privkey, self.build_inittoken(params, addr)))
+
+        def oninittoken(self, info: PendingTransactionInfo) -> int:
+            """Record the committee token created by a confirmed inittoken call"""
+            assetid: int = info['inner-txns'][0]['asset-index']
+            self._assetid = assetid
+            log.info(f"Created asset ID for committee: {assetid}")
+            return assetid
 
         @property
         def assetid(self):
@@ -318,3 +299,15 @@ class Committee:
     def deploy(cls, algod, createcommittee: CreateCommittee, privkey):
         appid = createcommittee.deploy(algod, privkey)
         return Committee.DeployedCommittee(appid)
+
+
+# PyTeal helpers that moved to algodao.programs.committee, still importable from
+# here; they load PyTeal on first use
+__getattr__ = algodao.programs.forwarder(__name__, [
+    'add_member',
+    'add_members',
+    'current_committee_size_ex',
+    'is_member',
+    'send_asset',
+    'set_asset_freeze',
+])
@@ -0,0 +1,182 @@
+"""
+Content-addressed cache of compiled TEAL programs. Assembling a program takes
+an algod compile round trip (unless it is assembled offline), so the assembled
+bytecode is cached by the SHA-256 of the TEAL source and the TEAL version,
+both in an in-process LRU and in an on-disk directory shared between
+processes. The TEAL generated by PyTeal for each contract class is also kept
+in-process, so repeat deployments of the same contract skip PyTeal as well.
+"""
+import base64
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple, TYPE_CHECKING
+
+from algosdk.v2client.algod import AlgodClient
+
+import algodao.assembler
+
+if TYPE_CHECKING:
+    from pyteal import Expr
+
+log = logging.getLogger(__name__)
+
+TEAL_VERSION = 5
+PRAGMA_RE = re.compile(r'#pragma version (\d+)')
+SLOT_RE = re.compile(r'^(load|store) (\d+)$', re.MULTILINE)
+
+
+class CompileCache:
+    def __init__(self, directory: Optional[str] = None, maxsize: int = 256):
+        self._directory: Optional[str] = directory
+        self._maxsize: int = maxsize
+        self._lock = threading.Lock()
+        # program key -> TEAL source
+        self._teal: Dict[Tuple[str, int], str] = {}
+        # content key -> (TEAL source, bytecode)
+        self._compiled: OrderedDict[str, Tuple[str, bytes]] = OrderedDict()
+        self._stats: Dict[str, int] = {
+            'teal_hits': 0,
+            'teal_misses': 0,
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+        }
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def compileteal(self, programkey: str, program: Callable[[], 'Expr'], version: int = TEAL_VERSION) -> str:
+        """
+        Return the TEAL generated by PyTeal for the program identified by
+        programkey, building the PyTeal expression only on the first call
+        """
+        key = (programkey, version)
+        with self._lock:
+            teal = self._teal.get(key)
+            self._stats['teal_hits' if teal is not None else 'teal_misses'] += 1
+        if teal is None:
+            import pyteal
+            teal = canonicalteal(pyteal.compileTeal(program(), pyteal.Mode.Application, version=version))
+            with self._lock:
+                self._teal[key] = teal
+        return teal
+
+    def assemble(self, algod: Optional[AlgodClient], teal: str) -> bytes:
+        """
+        Return the bytecode for the TEAL source, asking algod to compile it only
+        if it is neither in memory nor on disk. Without an algod client the
+        program is assembled offline.
+        """
+        # bytecode assembled offline is kept apart from algod's, so that
+        # programs compiled through algod never come from the offline assembler
+        key = contentkey(teal, offline=algod is None)
+        with self._lock:
+            entry = self._compiled.get(key)
+            if entry is not None:
+                self._compiled.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return entry[1]
+        bytecode = self._readdisk(key)
+        if bytecode is not None:
+            stat = 'disk_hits'
+        else:
+            stat = 'misses'
+            if algod is None:
+                bytecode = algodao.assembler.assemble(teal)
+            else:
+                compile_response = algod.compile(teal)
+                log.debug(f"Compiler response: {compile_response}")
+                bytecode = base64.b64decode(compile_response['result'])
+                log.info(f"Compiled program {compile_response.get('hash')}")
+            self._writedisk(key, teal, bytecode)
+        with self._lock:
+            self._stats[stat] += 1
+            self._compiled[key] = (teal, bytecode)
+            while len(self._compiled) > self._maxsize:
+                self._compiled.popitem(last=False)
+        return bytecode
+
+    def clear(self):
+        """Clear the in-process cache; the on-disk cache is left in place"""
+        with self._lock:
+            self._teal.clear()
+            self._compiled.clear()
+
+    def _readdisk(self, key: str) -> Optional[bytes]:
+        if self._directory is None:
+            return None
+        try:
+            with open(os.path.join(self._directory, f'{key}.bin'), 'rb') as fp:
+                return fp.read()
+        except FileNotFoundError:
+            return None
+
+    def _writedisk(self, key: str, teal: str, bytecode: bytes):
+        if self._directory is None:
+            return
+        # write the bytecode last (and atomically) since its presence is what
+        # marks an entry as cached
+        writeatomic(os.path.join(self._directory, f'{key}.teal'), teal.encode())
+        writeatomic(os.path.join(self._directory, f'{key}.bin'), bytecode)
+
+
+def canonicalteal(teal: str) -> str:
+    """
+    Renumber the scratch slots of PyTeal output in order of first use. PyTeal
+    numbers slots by a process-wide counter, so building the same program twice
+    can produce different slot numbers (and therefore different bytecode and
+    program hashes) for otherwise identical programs.
+    """
+    slots: Dict[str, str] = {}
+
+    def renumber(match) -> str:
+        slot = slots.setdefault(match.group(2), str(len(slots)))
+        return f'{match.group(1)} {slot}'
+    return SLOT_RE.sub(renumber, teal)
+
+
+def contentkey(teal: str, offline: bool = False) -> str:
+    """
+    Cache key of a TEAL program: its TEAL version and source hash, and
+    whether it was assembled offline
+    """
+    match = PRAGMA_RE.search(teal)
+    version = int(match.group(1)) if match else 1
+    key = f'v{version}-{hashlib.sha256(teal.encode()).hexdigest()}'
+    return f'{key}-offline' if offline else key
+
+
+def writeatomic(path: str, data: bytes):
+    fd, tmppath = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as fp:
+        fp.write(data)
+    os.replace(tmppath, path)
+
+
+_default_cache: Optional[CompileCache] = None
+
+
+def default_cache() -> CompileCache:
+    """
+    The cache used by CreateContract and algodao.deploy.compile_program. The
+    on-disk directory defaults to ~/.cache/algodao/teal and can be set with
+    the ALGODAO_COMPILE_CACHE environment variable (an empty value disables
+    the on-disk cache).
+    """
+    global _default_cache
+    if _default_cache is None:
+        directory: Optional[str] = os.getenv(
+            'ALGODAO_COMPILE_CACHE',
+            os.path.join(os.path.expanduser('~'), '.cache', 'algodao', 'teal')
+        )
+        _default_cache = CompileCache(directory or None)
+    return _default_cache
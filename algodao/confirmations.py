@@ -0,0 +1,421 @@
+"""
+Tracks the confirmation of any number of submitted transactions while
+following the chain only once per round. Rather than polling each transaction,
+the tracker reads each new block, resolves the futures of the transactions it
+contains, and checks the transaction pool once per round so that transactions
+dropped from the pool are reported with their pool error. The RPC load is
+therefore proportional to the number of rounds and not to the number of
+transactions in flight.
+"""
+import base64
+import concurrent.futures
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import algosdk.constants
+import algosdk.encoding
+import algosdk.error
+import msgpack
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+import algodao.blocks
+from algodao.types import PendingTransactionInfo
+
+log = logging.getLogger(__name__)
+
+# confirmed transactions of this many recent blocks are remembered, so that
+# transactions registered just after their block was read still resolve
+HISTORY_ROUNDS = 8
+# seconds to wait before following the chain again after an error
+FOLLOW_RETRY_SECONDS = 1.0
+# consecutive errors following the chain after which the tracked
+# transactions fail with the last error (e.g., when the node is unreachable)
+FOLLOW_MAX_ERRORS = 5
+
+
+class TransactionRejected(Exception):
+    """The transaction was removed from the pool without being confirmed"""
+    def __init__(self, txid: str, reason: str):
+        super(TransactionRejected, self).__init__(f"pool error for {txid}: {reason}")
+        self.txid = txid
+        self.reason = reason
+
+
+class TransactionExpired(Exception):
+    """The last valid round of the transaction passed without it being confirmed"""
+    def __init__(self, txid: str, lastvalid: int):
+        super(TransactionExpired, self).__init__(
+            f"transaction {txid} not confirmed by its last valid round {lastvalid}"
+        )
+        self.txid = txid
+        self.lastvalid = lastvalid
+
+
+class ConfirmationTimeout(Exception):
+    """The transaction was not confirmed within the number of rounds waited"""
+    def __init__(self, txid: str, deadline: int):
+        super(ConfirmationTimeout, self).__init__(
+            f"transaction {txid} not confirmed by round {deadline}"
+        )
+        self.txid = txid
+        self.deadline = deadline
+
+
+def txid(txn: Dict[str, Any]) -> str:
+    """
+    The ID of a transaction given as a dictionary decoded from msgpack, e.g.
+    from a block or the transaction pool
+    """
+    encoded = msgpack.packb(_canonical(txn), use_bin_type=True)
+    digest = algosdk.encoding.checksum(algosdk.constants.txid_prefix + encoded)
+    return base64.b32encode(digest).decode().strip('=')
+
+
+def _canonical(value: Any) -> Any:
+    # canonical msgpack encoding sorts map keys
+    if isinstance(value, dict):
+        return {key: _canonical(value[key]) for key in sorted(value)}
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def blocktxids(block: Dict[str, Any]) -> List[str]:
+    """
+    The IDs of the transactions in a block decoded from msgpack. Transactions
+    are stored in blocks without their genesis hash (and genesis ID, unless
+    "hgi" is set), which are restored from the block header.
+    """
+    txids: List[str] = []
+    for stib in block.get('txns', []):
+        txn = dict(stib['txn'])
+        txn['gh'] = block['gh']
+        if stib.get('hgi'):
+            txn['gen'] = block['gen']
+        txids.append(txid(txn))
+    return txids
+
+
+class _Waiter:
+    def __init__(self, future: Any, lastvalid: Optional[int], timeout: Optional[int]):
+        # a concurrent.futures.Future, or an asyncio.Future for algodao.aio
+        self.future = future
+        # round after which the waiter fails if the transaction is unconfirmed
+        self.deadline: Optional[int] = lastvalid
+        # whether the deadline is a wait timeout rather than the last valid round
+        self.timeout: bool = False
+        # rounds to wait, counted from the first round observed after the
+        # waiter was added (see Waiters.observed)
+        self.rounds: Optional[int] = timeout
+
+    def observed(self, lastround: int) -> None:
+        if self.rounds is not None and (self.deadline is None or lastround + self.rounds < self.deadline):
+            self.deadline = lastround + self.rounds
+            self.timeout = True
+        self.rounds = None
+
+    def setresult(self, result: int) -> None:
+        if not self.future.done():
+            self.future.set_result(result)
+
+    def setexception(self, error: Exception) -> None:
+        if not self.future.done():
+            self.future.set_exception(error)
+
+
+class Waiters:
+    """
+    The bookkeeping of a confirmation tracker: the futures waiting for each
+    transaction, and the transactions confirmed in the last HISTORY_ROUNDS
+    blocks read. It is not thread-safe; ConfirmationTracker holds its lock
+    while using it, and the asyncio tracker in algodao.aio only uses it from
+    the event loop.
+    """
+    def __init__(self) -> None:
+        self._waiters: Dict[str, List[_Waiter]] = {}
+        # txid -> confirmed round for the last HISTORY_ROUNDS blocks
+        self._history: OrderedDict[str, int] = OrderedDict()
+        # last round whose block has been read
+        self.round: Optional[int] = None
+        # transactions added since the last pool snapshot was requested
+        self._recent: Set[str] = set()
+        # waiters added since the last round was observed
+        self._added: List[_Waiter] = []
+
+    def __len__(self) -> int:
+        return len(self._waiters)
+
+    def add(
+            self,
+            txid: str,
+            future: Any,
+            lastvalid: Optional[int],
+            timeout: Optional[int],
+    ) -> None:
+        """
+        Add a future for the transaction, resolving it at once if it was
+        recently confirmed. The future fails once the last valid round, or
+        `timeout` rounds after the next observed round, has passed.
+        """
+        waiter = _Waiter(future, lastvalid, timeout)
+        confirmed = self._history.get(txid)
+        if confirmed is not None:
+            waiter.setresult(confirmed)
+        else:
+            self._waiters.setdefault(txid, []).append(waiter)
+            self._recent.add(txid)
+            if timeout is not None:
+                self._added.append(waiter)
+
+    def observed(self, lastround: int) -> None:
+        """
+        Note the latest round of the chain. Timeouts count from here rather
+        than from the last block read, which may lag behind the chain.
+        """
+        for waiter in self._added:
+            waiter.observed(lastround)
+        self._added = []
+
+    def blockread(self, algoround: int, txids: List[str]) -> None:
+        """Resolve the transactions confirmed in a block, and fail those past their deadline"""
+        self.round = algoround
+        for confirmedtxid in txids:
+            self._history[confirmedtxid] = algoround
+            self.resolve(confirmedtxid, result=algoround)
+        while self._history and next(iter(self._history.values())) <= algoround - HISTORY_ROUNDS:
+            self._history.popitem(last=False)
+        for pendingtxid, waiters in list(self._waiters.items()):
+            for waiter in list(waiters):
+                if waiter.deadline is not None and algoround >= waiter.deadline:
+                    if waiter.timeout:
+                        error: Exception = ConfirmationTimeout(pendingtxid, waiter.deadline)
+                    else:
+                        error = TransactionExpired(pendingtxid, waiter.deadline)
+                    waiter.setexception(error)
+                    waiters.remove(waiter)
+            if not waiters:
+                del self._waiters[pendingtxid]
+
+    def poolrequested(self) -> None:
+        """Note that a snapshot of the pool is being requested"""
+        self._recent = set()
+
+    def poolchecked(self, inpool: Set[str]) -> List[str]:
+        """
+        Given the transactions in the pool snapshot, return those to look up:
+        the ones that are neither confirmed nor in the pool, but were tracked
+        before the snapshot was requested. Every block produced before the
+        snapshot must have been read.
+        """
+        return [
+            txid for txid in self._waiters
+            if txid not in inpool and txid not in self._recent
+        ]
+
+    def pendinginfo(self, txid: str, info: PendingTransactionInfo) -> None:
+        """Resolve a transaction from its pending transaction information"""
+        if info.get('confirmed-round', 0) > 0:
+            self.resolve(txid, result=info['confirmed-round'])
+        elif info.get('pool-error'):
+            self.resolve(txid, error=TransactionRejected(txid, info['pool-error']))
+
+    def resolve(self, txid: str, result: Optional[int] = None, error: Optional[Exception] = None) -> None:
+        for waiter in self._waiters.pop(txid, []):
+            if error is not None:
+                waiter.setexception(error)
+            elif result is not None:
+                waiter.setresult(result)
+
+    def failall(self, error: Exception) -> None:
+        """Fail every tracked transaction, e.g. when the chain cannot be followed"""
+        for waiters in self._waiters.values():
+            for waiter in waiters:
+                waiter.setexception(error)
+        self._waiters = {}
+        self._recent = set()
+        self._added = []
+
+
+def pooltxids(response: bytes) -> Set[str]:
+    """The IDs of the transactions in a msgpack pending transactions response"""
+    pool = msgpack.unpackb(response, raw=False, strict_map_key=False)
+    return {txid(signed['txn']) for signed in pool.get('top-transactions') or []}
+
+
+def readblock(response: bytes) -> List[str]:
+    """The IDs of the transactions in a msgpack block response"""
+    return blocktxids(algodao.blocks.decodeblock(response))
+
+
+class ConfirmationTracker:
+    """
+    Follows the chain of a single algod node and resolves a future for each
+    tracked transaction with the round in which it was confirmed. A background
+    thread follows the chain while any transaction is being tracked.
+    """
+    def __init__(self, algod: AlgodClient):
+        self._algod: AlgodClient = algod
+        self._lock = threading.Condition()
+        self._waiters = Waiters()
+        self._follower: Optional[threading.Thread] = None
+        self._closed: bool = False
+        self._stats: Dict[str, int] = {
+            'rounds': 0,
+            'blocks': 0,
+            'poolchecks': 0,
+            'lookups': 0,
+        }
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._waiters)
+
+    def track(
+            self,
+            txid: str,
+            lastvalid: Optional[int] = None,
+            timeout: Optional[int] = None,
+    ) -> concurrent.futures.Future:
+        """
+        Track a submitted transaction. The returned future resolves to the
+        confirmed round; it fails with TransactionRejected if the transaction
+        leaves the pool with an error, with TransactionExpired once its last
+        valid round has passed, or with ConfirmationTimeout if it is not
+        confirmed within `timeout` rounds of the current round.
+        """
+        self._startround()
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Confirmation tracker is closed")
+            self._waiters.add(txid, future, lastvalid, timeout)
+            if len(self._waiters):
+                self._startfollower()
+                self._lock.notify_all()
+        return future
+
+    def tracksigned(self, signed: transaction.SignedTransaction, timeout: Optional[int] = None) -> concurrent.futures.Future:
+        """Track a submitted signed transaction until its last valid round"""
+        return self.track(signed.get_txid(), signed.transaction.last_valid_round, timeout)
+
+    def wait(self, txid: str, timeout: Optional[int] = None) -> PendingTransactionInfo:
+        """
+        Wait for the transaction to be confirmed and return its pending
+        transaction information (which includes e.g. created app and asset
+        IDs and inner transactions)
+        """
+        self.track(txid, timeout=timeout).result()
+        info: PendingTransactionInfo = self._algod.pending_transaction_info(txid)
+        return info
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+
+    def _startround(self) -> None:
+        with self._lock:
+            # while transactions are tracked the follower keeps up with the chain
+            if len(self._waiters) and self._waiters.round is not None:
+                return
+        lastround = self._algod.status()['last-round']
+        with self._lock:
+            # the transactions may already be in the latest block, so that is
+            # the first block the follower reads
+            if self._waiters.round is None or self._waiters.round < lastround - 1:
+                self._waiters.round = lastround - 1
+
+    def _startfollower(self) -> None:
+        # called with the lock held
+        if self._follower is not None:
+            return
+        self._follower = threading.Thread(
+            target=self._follow,
+            name='algodao-confirmations',
+            daemon=True,
+        )
+        self._follower.start()
+
+    def _follow(self):
+        errors = 0
+        while True:
+            with self._lock:
+                while not len(self._waiters) and not self._closed:
+                    self._lock.wait()
+                if self._closed:
+                    return
+                processed = self._waiters.round
+            try:
+                # wait for a new block, then snapshot the pool and read every
+                # block produced before the snapshot
+                self._algod.status_after_block(processed)
+                with self._lock:
+                    self._stats['rounds'] += 1
+                    self._stats['poolchecks'] += 1
+                    self._waiters.poolrequested()
+                inpool = pooltxids(self._algod.pending_transactions(response_format='msgpack'))
+                lastround = self._algod.status()['last-round']
+                with self._lock:
+                    self._waiters.observed(lastround)
+                for algoround in range(processed + 1, lastround + 1):
+                    txids = readblock(self._algod.block_info(algoround, response_format='msgpack'))
+                    with self._lock:
+                        self._stats['blocks'] += 1
+                        self._waiters.blockread(algoround, txids)
+                self._checkpool(inpool)
+                errors = 0
+            except Exception as exc:
+                errors += 1
+                log.exception("Error following the chain for confirmations")
+                with self._lock:
+                    if errors >= FOLLOW_MAX_ERRORS:
+                        # the chain cannot be followed: the waits fail
+                        # rather than hang
+                        self._waiters.failall(exc)
+                        errors = 0
+                    else:
+                        self._lock.wait(FOLLOW_RETRY_SECONDS)
+
+    def _checkpool(self, inpool: Set[str]):
+        """
+        Look up the transactions that are neither confirmed nor in the pool
+        (see Waiters.poolchecked): they have either been rejected or were not
+        submitted yet
+        """
+        with self._lock:
+            missing = self._waiters.poolchecked(inpool)
+        for missingtxid in missing:
+            with self._lock:
+                self._stats['lookups'] += 1
+            try:
+                info: PendingTransactionInfo = self._algod.pending_transaction_info(missingtxid)
+            except algosdk.error.AlgodHTTPError:
+                # not known to the node (yet)
+                continue
+            with self._lock:
+                self._waiters.pendinginfo(missingtxid, info)
+
+
+# trackers are shared by all clients of the same node
+_trackers: Dict[Tuple[str, str], ConfirmationTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def tracker(algod: AlgodClient) -> ConfirmationTracker:
+    """The confirmation tracker shared by all clients of the given client's node"""
+    key = (algod.algod_address, algod.algod_token)
+    with _trackers_lock:
+        existing = _trackers.get(key)
+        if existing is None:
+            existing = ConfirmationTracker(algod)
+            _trackers[key] = existing
+        return existing
@@ -3,43 +3,186 @@ General construct for building smart contracts. Each smart contract is split
 into two classes - one representing a contract as it is being created
 (CreateContract), and one representing a deployed contract (DeployedContract).
 """
+from __future__ import annotations
+
 import abc
+import base64
 import enum
-from typing import List
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple, Union, TYPE_CHECKING
 
 import algosdk.error
-import pyteal
 from algosdk.future import transaction
 from algosdk.v2client.algod import AlgodClient
-from pyteal import App, Expr, Mode, Bytes
-
+import algodao.artifacts
+import algodao.compilecache
 import algodao.deploy
 import algodao.helpers
-from algodao.types import PendingTransactionInfo
+import algodao.holdings
+import algodao.params
+import algodao.readcache
+from algodao.compilecache import CompileCache
+from algodao.types import AccountInfo, ApplicationInfo, PendingTransactionInfo, TealKeyValueStore
+
+if TYPE_CHECKING:
+    from pyteal import App, Expr, Bytes
+
+# protocol limits on a single application call transaction
+MAX_TXN_ACCOUNTS = 4
+MAX_TXN_REFERENCES = 8
+MAX_INNER_TXNS = 16
+# protocol limits on application state
+MAX_GLOBAL_KEYS = 64
+# TealValue type of byte slices (integers are 2)
+TEAL_BYTES = 1
 
 
 class ContractVariables(enum.Enum):
     @property
     def bytes(self) -> Bytes:
+        from pyteal import Bytes
         return Bytes(self.name)
 
+    @property
+    def isbytes(self) -> bool:
+        """Whether the variable holds a byte slice: the variables of the *Bytes enums do"""
+        return type(self).__name__.endswith('Bytes')
+
 
 class GlobalVariables(ContractVariables):
     def get(self) -> Expr:
+        from pyteal import App
         return App.globalGet(self.bytes)
 
     def put(self, value: Expr) -> App:
+        from pyteal import App
         return App.globalPut(self.bytes, value)
 
 
 class LocalVariables(ContractVariables):
     def get(self, account: Expr) -> Expr:
+        from pyteal import App
         return App.localGet(account, self.bytes)
 
     def put(self, account: Expr, value: Expr) -> App:
+        from pyteal import App
         return App.localPut(account, self.bytes, value)
 
 
+class SlotVariables(ContractVariables):
+    """
+    Variables stored once per slot, keyed by the variable name followed by
+    the 8-byte slot index.
+    """
+    def key(self, slot: Expr) -> Expr:
+        from pyteal import Concat, Itob
+        return Concat(self.bytes, Itob(slot))
+
+    def keybytes(self, slot: int) -> bytes:
+        return self.name.encode() + slot.to_bytes(8, 'big')
+
+
+class SlotGlobalVariables(SlotVariables):
+    def get(self, slot: Expr) -> Expr:
+        from pyteal import App
+        return App.globalGet(self.key(slot))
+
+    def put(self, slot: Expr, value: Expr) -> App:
+        from pyteal import App
+        return App.globalPut(self.key(slot), value)
+
+
+class SlotLocalVariables(SlotVariables):
+    def get(self, account: Expr, slot: Expr) -> Expr:
+        from pyteal import App
+        return App.localGet(account, self.key(slot))
+
+    def put(self, account: Expr, slot: Expr, value: Expr) -> App:
+        from pyteal import App
+        return App.localPut(account, self.key(slot), value)
+
+
+StateValue = Union[int, bytes]
+
+
+class AppState(Mapping[bytes, StateValue]):
+    """
+    The global or local state of an app, decoded once from the TEAL key-value
+    store returned by the API into values keyed by their raw keys. The state
+    variables of a contract look up their own key:
+
+        state = AppState.fromapp(algodao.readcache.application_info(algod, appid))
+        state[Proposal.GlobalInts.VoteEnd]
+
+    Variables that are not set read as 0 (or b'' for the Bytes enums), as
+    they do in TEAL. getint and getbytes also take the slot of a slot
+    variable.
+    """
+    __slots__ = ('_values',)
+
+    def __init__(self, values: Dict[bytes, StateValue]):
+        self._values: Dict[bytes, StateValue] = values
+
+    @classmethod
+    def fromstore(cls, store: TealKeyValueStore) -> AppState:
+        values: Dict[bytes, StateValue] = {}
+        for entry in store:
+            value = entry['value']
+            values[base64.b64decode(entry['key'])] = (
+                base64.b64decode(value['bytes']) if value['type'] == TEAL_BYTES else value['uint']
+            )
+        return cls(values)
+
+    @classmethod
+    def fromapp(cls, appinfo: ApplicationInfo) -> AppState:
+        """The global state of an app"""
+        return cls.fromstore(appinfo['params'].get('global-state', []))
+
+    @classmethod
+    def fromaccount(cls, accountinfo: AccountInfo, appid: int) -> AppState:
+        """The local state of an account in an app"""
+        for localstate in accountinfo.get('apps-local-state', []):
+            if localstate['id'] == appid:
+                return cls.fromstore(localstate.get('key-value', []))
+        return cls({})
+
+    def __getitem__(self, key: Union[bytes, ContractVariables]) -> StateValue:
+        if isinstance(key, ContractVariables):
+            return self._values.get(_statekey(key, None), b'' if key.isbytes else 0)
+        return self._values[key]
+
+    def __contains__(self, key: object) -> bool:
+        # whether the variable is set, although unset ones read as 0 or b''
+        if isinstance(key, (bytes, ContractVariables)):
+            return _statekey(key, None) in self._values
+        return False
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"AppState({self._values!r})"
+
+    def getint(self, key: Union[bytes, ContractVariables], slot: Optional[int] = None) -> int:
+        value = self._values.get(_statekey(key, slot))
+        return value if isinstance(value, int) else 0
+
+    def getbytes(self, key: Union[bytes, ContractVariables], slot: Optional[int] = None) -> bytes:
+        value = self._values.get(_statekey(key, slot))
+        return value if isinstance(value, bytes) else b''
+
+
+def _statekey(key: Union[bytes, ContractVariables], slot: Optional[int]) -> bytes:
+    if isinstance(key, SlotVariables):
+        assert slot is not None, "Slot variables are read at a slot"
+        return key.keybytes(slot)
+    if isinstance(key, ContractVariables):
+        return key.name.encode()
+    return key
+
+
 class CreateContract(abc.ABC):
     @abc.abstractmethod
     def approval_program(self) -> Expr:
@@ -66,14 +209,40 @@ class CreateContract(abc.ABC):
         """Return the arguments to pass to create the contract"""
         pass
 
+    def programkey(self) -> str:
+        """
+        Identifies the programs of this contract in the compile cache. The
+        programs of all contracts in this package only depend on the contract
+        class (per-contract settings are passed as creation arguments); a
+        contract whose programs depend on its settings must include them in
+        the key.
+        """
+        return f'{type(self).__module__}.{type(self).__qualname__}'
+
+    def compile(self, algod: Optional[AlgodClient], cache: Optional[CompileCache] = None) -> Tuple[bytes, bytes]:
+        """
+        Compiles the approval and clear programs and returns their bytecode.
+        Without an algod client the programs are assembled offline.
+        """
+        if cache is None:
+            cache = algodao.compilecache.default_cache()
+        programkey = self.programkey()
+        approval_teal = cache.compileteal(f'{programkey}:approval', self.approval_program)
+        approval_compiled = algodao.deploy.compile_program(algod, approval_teal, cache)
+        clear_teal = cache.compileteal(f'{programkey}:clear', self.clear_program)
+        clear_compiled = algodao.deploy.compile_program(algod, clear_teal, cache)
+        return approval_compiled, clear_compiled
+
     def deploy(self, algod: AlgodClient, privkey: str) -> int:
         """
-        Deploys the program and returns the app ID
+        Deploys the program and returns the app ID. Programs precompiled by
+        algod are used if they are up to date (see algodao.artifacts).
         """
-        approval_teal = pyteal.compileTeal(self.approval_program(), Mode.Application, version=5)
-        approval_compiled = algodao.deploy.compile_program(algod, approval_teal)
-        clear_teal = pyteal.compileTeal(self.clear_program(), Mode.Application, version=5)
-        clear_compiled = algodao.deploy.compile_program(algod, clear_teal)
+        precompiled = algodao.artifacts.load(self.programkey())
+        if precompiled is not None:
+            approval_compiled, clear_compiled = precompiled
+        else:
+            approval_compiled, clear_compiled = self.compile(algod)
         appid = algodao.deploy.create_app(
             algod,
             privkey,
@@ -91,22 +260,21 @@ class DeployedContract(abc.ABC):
         self._appid: int = appid
 
     @property
-    def appid(self):
+    def appid(self) -> int:
         return self._appid
 
-    def call_method(
+    def method_txn(
             self,
-            algod: AlgodClient,
+            params: transaction.SuggestedParams,
             addr: str,
-            privkey: str,
             method: bytes,
             args: List[bytes],
             accounts=None,
             foreign_apps=None,
             foreign_assets=None,
-    ) -> PendingTransactionInfo:
-        params = algod.suggested_params()
-        txn = transaction.ApplicationNoOpTxn(
+    ) -> transaction.Transaction:
+        """Build (but do not sign or send) a call of one of the contract's methods"""
+        return transaction.ApplicationNoOpTxn(
             addr,
             params,
             self._appid,
@@ -115,12 +283,55 @@ class DeployedContract(abc.ABC):
             foreign_apps=foreign_apps,
             foreign_assets=foreign_assets,
         )
-        signed = txn.sign(privkey)
+
+    def submit(
+            self,
+            algod: AlgodClient,
+            privkey: str,
+            txns: List[transaction.Transaction],
+    ) -> PendingTransactionInfo:
+        """
+        Sign the transactions (as an atomic group if there are several), send
+        them and wait for them to be confirmed. Returns the pending
+        transaction information of the first transaction.
+        """
+        signed = signgroup(txns, privkey)
         try:
-            txid = algod.send_transaction(signed)
-            algodao.helpers.wait_for_confirmation(algod, txid)
+            txid = algod.send_transactions(signed)
+            info: PendingTransactionInfo = algodao.helpers.wait_for_confirmation(algod, txid)
         except algosdk.error.AlgodHTTPError as exc:
-            algodao.helpers.writedryrun(algod, [signed], 'failed_txn')
+            algodao.helpers.writedryrun(algod, signed, 'failed_txn')
             raise
-        info: PendingTransactionInfo = algod.pending_transaction_info(txid)
+        algodao.readcache.invalidatetxns(algod, txns)
+        algodao.holdings.observetxns(algod, txns)
         return info
+
+    def call_method(
+            self,
+            algod: AlgodClient,
+            addr: str,
+            privkey: str,
+            method: bytes,
+            args: List[bytes],
+            accounts=None,
+            foreign_apps=None,
+            foreign_assets=None,
+    ) -> PendingTransactionInfo:
+        params = algodao.params.suggested_params(algod)
+        txn = self.method_txn(
+            params,
+            addr,
+            method,
+            args,
+            accounts=accounts,
+            foreign_apps=foreign_apps,
+            foreign_assets=foreign_assets,
+        )
+        return self.submit(algod, privkey, [txn])
+
+
+def signgroup(txns: List[transaction.Transaction], privkey: str) -> List[transaction.SignedTransaction]:
+    """Sign the transactions, grouping them first if there are several"""
+    if len(txns) > 1:
+        transaction.assign_group_id(txns)
+    return [txn.sign(privkey) for txn in txns]
@@ -1,23 +1,30 @@
 # based off https://github.com/algorand/docs/blob/cdf11d48a4b1168752e6ccaf77c8b9e8e599713a/examples/smart_contracts/v2/python/stateful_smart_contracts.py
 import base64
 import logging
+from typing import Optional
 
+import algosdk.error
 from algosdk.v2client.algod import AlgodClient
 from algosdk.future import transaction
 from algosdk import account, mnemonic
 
+import algodao.compilecache
+import algodao.contract
 import algodao.helpers
+import algodao.params
+import algodao.readcache
+import algodao.states
+from algodao.compilecache import CompileCache
 from algodao.types import PendingTransactionInfo
 
 log = logging.getLogger(__name__)
 
 
 # helper function to compile program source
-def compile_program(client, source_code) -> bytes:
-    log.info("Compiling program")
-    compile_response = client.compile(source_code)
-    log.info(f"Compiler response: {compile_response}")
-    return base64.b64decode(compile_response["result"])
+def compile_program(client, source_code, cache: Optional[CompileCache] = None) -> bytes:
+    if cache is None:
+        cache = algodao.compilecache.default_cache()
+    return cache.assemble(client, source_code)
 
 
 # helper function that converts a mnemonic passphrase into a private signing key
@@ -26,13 +33,9 @@ def get_private_key_from_mnemonic(mn):
     return private_key
 
 
-def wait_for_round(algod: AlgodClient, algoround: int):
-    last_round = algod.status().get("last-round")
-    print(f"Waiting for round {algoround}")
-    while last_round < algoround:
-        last_round += 1
-        algod.status_after_block(last_round)
-        print(f"Round {last_round}")
+def wait_for_round(algod: AlgodClient, algoround: int) -> None:
+    """Block until a round has been reached; an alias of algodao.helpers.wait_for_round"""
+    algodao.helpers.wait_for_round(algod, algoround)
 
 
 def create_app(
@@ -46,7 +49,7 @@ def create_app(
 ) -> int:
     sender = account.address_from_private_key(private_key)
     on_complete = transaction.OnComplete.NoOpOC.real
-    params = client.suggested_params()
+    params = algodao.params.suggested_params(client)
     txn = transaction.ApplicationCreateTxn(
         sender,
         params,
@@ -68,40 +71,39 @@ def create_app(
 
 
 def format_state(state):
+    return format_appstate(algodao.contract.AppState.fromstore(state))
+
+
+def format_appstate(state):
     formatted = {}
-    for item in state:
-        key = item["key"]
-        value = item["value"]
-        formatted_key = base64.b64decode(key).decode("utf-8")
-        if value["type"] == 1:
+    for key, value in state.items():
+        formatted_key = key.decode("utf-8")
+        if isinstance(value, bytes):
             # byte string
             if formatted_key == "voted":
-                formatted_value = base64.b64decode(value["bytes"]).decode("utf-8")
+                formatted[formatted_key] = value.decode("utf-8")
             else:
-                formatted_value = value["bytes"]
-            formatted[formatted_key] = formatted_value
+                formatted[formatted_key] = base64.b64encode(value).decode()
         else:
             # integer
-            formatted[formatted_key] = value["uint"]
+            formatted[formatted_key] = value
     return formatted
 
 
 # read user local state
 def read_local_state(client, addr, app_id):
-    results = client.account_info(addr)
-    for local_state in results["apps-local-state"]:
-        if local_state["id"] == app_id:
-            if "key-value" not in local_state:
-                return {}
-            return format_state(local_state["key-value"])
-    return {}
+    state = algodao.states.localstate(client, app_id, addr)
+    if state is None:
+        return {}
+    return format_appstate(state)
 
 
-# read app global state
+# read app global state (the creator's address is not needed)
 def read_global_state(client, addr, app_id):
-    results = client.account_info(addr)
-    apps_created = results["created-apps"]
-    for app in apps_created:
-        if app["id"] == app_id:
-            return format_state(app["params"]["global-state"])
-    return {}
+    try:
+        app = algodao.readcache.application_info(client, app_id)
+    except algosdk.error.AlgodHTTPError as exc:
+        if exc.code == 404:
+            return {}
+        raise
+    return format_state(app["params"].get("global-state", []))
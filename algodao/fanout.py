@@ -0,0 +1,50 @@
+"""
+Bounded concurrent calls from a thread pool, in the context (see
+algodao.scheduler) of the calling thread. This module imports nothing from
+algodao, so that any module can use it without import cycles.
+"""
+import concurrent.futures
+import contextvars
+from typing import Any, Callable, Iterable, Iterator, List, Set, TypeVar
+
+DEFAULT_MAX_WORKERS = 32
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def fanout(fn: Callable[[T], R], items: List[T], max_workers: int = DEFAULT_MAX_WORKERS) -> List[R]:
+    """Call fn on every item concurrently, in the context of the caller"""
+    if not items:
+        return []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        # each call gets its own copy of the context: a context can only be
+        # entered by one thread at a time
+        futures = [executor.submit(contextvars.copy_context().run, fn, item) for item in items]
+        return [future.result() for future in futures]
+
+
+def stream(fn: Callable[[T], R], items: Iterable[T], max_workers: int = DEFAULT_MAX_WORKERS) -> Iterator[R]:
+    """
+    Call fn on every item concurrently, in the context of the caller, and
+    yield the results as they complete
+    """
+    items = iter(items)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: Set[concurrent.futures.Future] = set()
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < 2 * max_workers:
+                item = next(items, _DONE)
+                if item is _DONE:
+                    exhausted = True
+                else:
+                    pending.add(executor.submit(contextvars.copy_context().run, fn, item))
+            if not pending:
+                return
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+_DONE: Any = object()
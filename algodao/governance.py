@@ -4,131 +4,72 @@ Top-level contracts for deploying the DAO
 from __future__ import annotations
 
 import enum
-from typing import List, Optional
+import hashlib
+from typing import Callable, List, Optional, Tuple, TYPE_CHECKING
 
+import algosdk.constants
 import algosdk.logic
 from algosdk.v2client.algod import AlgodClient
 from algosdk.future import transaction
-from pyteal import Seq, Assert, App, Return, Int, Btoi, Txn, Expr, Bytes
-from pyteal import Cond, Gtxn, Global, Len, Concat, OnComplete, And, Or, Not
-from pyteal import InnerTxnBuilder, TxnField, TxnType, If, Subroutine, TealType
-from pyteal import InnerTxn, AssetHolding, ScratchVar, For, Substring
 
 import algodao.helpers
-from algodao.committee import is_member, current_committee_size_ex, set_asset_freeze, send_asset
+import algodao.holdings
+import algodao.membership
+import algodao.params
+import algodao.programs
+import algodao.readcache
+import algodao.signing
+from algodao.contract import AppState, CreateContract, DeployedContract, GlobalVariables
+from algodao.contract import SlotGlobalVariables, SlotLocalVariables
+from algodao.contract import MAX_TXN_ACCOUNTS, MAX_GLOBAL_KEYS
 from algodao.committee import Committee
-from algodao.contract import CreateContract, DeployedContract, GlobalVariables
-from algodao.contract import LocalVariables
-from algodao.helpers import readintfromstore, appaddr
-from algodao.voting import Proposal, ProposalType, proposal_payment_amount, proposal_payment_address
+from algodao.voting import Proposal, ProposalType
 from algodao.voting import VoteType
-from algodao.types import ApplicationInfo
+from algodao.types import ApplicationInfo, PendingTransactionInfo
+
+if TYPE_CHECKING:
+    from pyteal import Expr
 
 RULE_LEN = 16
 PROPOSAL_RULE_LEN = 24
-
-
-@Subroutine(TealType.uint64)
-def proposal_trusted(proposal_appid: Expr, trust_assetid: Expr):
-    """
-    Check that the proposal is trusted (has been assigned a Trust token)
-    """
-    trusted = AssetHolding.balance(appaddr(proposal_appid), trust_assetid)
-    return Seq([
-        trusted,
-        Return(And(trusted.hasValue(), trusted.value() > Int(0)))
-    ])
-
-
-@Subroutine(TealType.bytes)
-def find_rule(proposal_rules: Expr, proposal_type: Expr):
+# each gate slot takes two local ints (VotedConsideration and Vote) and local
+# state is limited to 16 key/value pairs
+MAX_GATE_SLOTS = 8
+# global key prefix of the program hashes allowlisted by the PreapprovalGate
+PROGRAM_HASH_PREFIX = 'Hash'
+# each implemented proposal takes an implementproposal and a setimplemented call
+IMPLEMENT_TXNS_PER_PROPOSAL = 2
+
+
+def plan_implementation_groups(
+        proposals: List[Tuple[Proposal.DeployedProposal, List[str]]],
+) -> List[List[Tuple[Proposal.DeployedProposal, List[str]]]]:
     """
-    Find the rule that applies to the specified proposal type
+    Split the (proposal, accounts) pairs to implement into transaction groups.
+    The implementproposal call references the proposal app, its address, the
+    trust asset and the given accounts, so those must stay within the
+    reference limits of a single application call.
     """
-    index = ScratchVar(TealType.uint64)
-    return Seq([
-        For(
-            index.store(Int(0)),
-            index.load() < Len(proposal_rules),
-            index.store(index.load() + Int(PROPOSAL_RULE_LEN))
-        ).Do(
-            If(
-                Btoi(Substring(proposal_rules, index.load(), index.load() + Int(8))) == proposal_type,
-                Return(Substring(
-                    proposal_rules,
-                    index.load() + Int(8),
-                    index.load() + Int(PROPOSAL_RULE_LEN)
-                )),
+    for proposal, accounts in proposals:
+        # within the accounts limit, the accounts, the proposal app and the
+        # trust asset always fit in the total reference limit
+        if 1 + len(accounts) > MAX_TXN_ACCOUNTS:
+            raise ValueError(
+                f"Too many accounts to implement proposal {proposal.appid}: {accounts}"
             )
-        ),
-        # proposal type not found in rules
-        Assert(Int(0)),
-        # previous assert will always fail by TEAL still requires a Return
-        Return(Bytes('')),
-    ])
-
-
-@Subroutine(TealType.uint64)
-def satisfies_rule(proposal_appid: Expr, rule: Expr):
-    """
-    Check that the given Proposal satisfies the specified rule
-    """
-    vtype_data = App.globalGetEx(proposal_appid, Proposal.GlobalBytes.VoteTypeData.bytes)
-    return Seq([
-        vtype_data,
-        Assert(vtype_data.hasValue()),
-        Return(rule == vtype_data.value()),
-    ])
+    per_group = algosdk.constants.TX_GROUP_LIMIT // IMPLEMENT_TXNS_PER_PROPOSAL
+    return [
+        proposals[index:index + per_group]
+        for index in range(0, len(proposals), per_group)
+    ]
 
 
-@Subroutine(TealType.uint64)
-def proposal_meets_criteria(proposal_appid: Expr, proposal_rules: Expr):
+def programhash(approval_program: bytes, clear_program: bytes) -> bytes:
     """
-    Check that the proposal meets the criteria specified by the DAO for this
-    type of proposal.
+    Hash of an app's compiled approval and clear programs, as allowlisted by
+    the PreapprovalGate
     """
-    proposal_type = App.globalGetEx(proposal_appid, Proposal.GlobalInts.ProposalType.bytes)
-    rule = ScratchVar(TealType.bytes)
-    return Seq([
-        proposal_type,
-        Assert(proposal_type.hasValue()),
-        rule.store(find_rule(proposal_rules, proposal_type.value())),
-        Return(satisfies_rule(proposal_appid, rule.load())),
-    ])
-
-
-@Subroutine(TealType.uint64)
-def proposal_passed(proposal_appid: Expr):
-    passed = App.globalGetEx(proposal_appid, Proposal.GlobalInts.Passed.bytes)
-    return Seq([
-        passed,
-        Return(And(passed.hasValue(), passed.value()))
-    ])
-
-
-@Subroutine(TealType.none)
-def implement_proposal(proposal_appid: Expr):
-    proposal_type = App.globalGetEx(proposal_appid, Proposal.GlobalInts.ProposalType.bytes)
-    addl_data = App.globalGetEx(proposal_appid, Proposal.GlobalBytes.AdditionalData.bytes)
-    return Seq([
-        proposal_type,
-        addl_data,
-        Assert(And(proposal_type.hasValue(), addl_data.hasValue())),
-        If(
-            proposal_type.value() == Int(ProposalType.PAYMENT.value),
-            Seq([
-                InnerTxnBuilder.Begin(),
-                InnerTxnBuilder.SetFields({
-                    TxnField.type_enum: TxnType.Payment,
-                    TxnField.receiver: proposal_payment_address(addl_data.value()),
-                    TxnField.amount: proposal_payment_amount(addl_data.value()),
-                }),
-                InnerTxnBuilder.Submit(),
-            ])
-
-        )
-        # TODO: implement other proposal types
-    ])
+    return hashlib.sha256(approval_program + clear_program).digest()
 
 
 class AlgoDao:
@@ -157,86 +98,12 @@ class AlgoDao:
             ]
 
         def approval_program(self) -> Expr:
-            GlobalBytes = AlgoDao.GlobalBytes
-            GlobalInts = AlgoDao.GlobalInts
-            on_creation = Seq([
-                Assert(Txn.application_args.length() == Int(2)),
-                GlobalBytes.Name.put(Txn.application_args[0]),
-                GlobalInts.TrustAsset.put(Btoi(Txn.application_args[1])),
-                GlobalBytes.Committees.put(Bytes(b'')),
-                GlobalInts.Finalized.put(Int(0)),
-                GlobalInts.Closed.put(Int(0)),
-                GlobalBytes.ProposalRules.put(Bytes(b'')),
-                Return(Int(1)),
-            ])
-            setup_phase_approved = And(
-                Not(GlobalInts.Finalized.get()),
-                Txn.sender() == Global.creator_address()
-            )
-            on_addcommittee = Seq([
-                Assert(setup_phase_approved),
-                Assert(Txn.application_args.length() == Int(2)),
-                Assert(Len(Txn.application_args[1]) == Int(8)),
-                GlobalBytes.Committees.put(Concat(
-                    GlobalBytes.Committees.get(),
-                    Txn.application_args[1]
-                )),
-                Return(Int(1)),
-            ])
-            on_addrule = Seq([
-                Assert(setup_phase_approved),
-                Assert(Txn.application_args.length() == Int(2)),
-                Assert(Len(Txn.application_args[1]) == Int(PROPOSAL_RULE_LEN)),
-                GlobalBytes.ProposalRules.put(Concat(
-                    GlobalBytes.ProposalRules.get(),
-                    Txn.application_args[1]
-                )),
-                Return(Int(1)),
-            ])
-            on_finalize = Seq([
-                Assert(setup_phase_approved),
-                Assert(Txn.application_args.length() == Int(1)),
-                GlobalInts.Finalized.put(Int(1)),
-                Return(Int(1)),
-            ])
-            proposal_appid = Gtxn[1].application_id()
-            on_implementproposal = Seq([
-                Assert(GlobalInts.Finalized.get()),
-                Assert(Global.group_size() == Int(2)),
-                Assert(Txn.group_index() == Int(0)),
-                Assert(Txn.application_args.length() == Int(1)),
-                Assert(Gtxn[1].application_args[0] == Bytes('setimplemented')),
-                Assert(proposal_trusted(proposal_appid, GlobalInts.TrustAsset.get())),
-                Assert(proposal_meets_criteria(proposal_appid, GlobalBytes.ProposalRules.get())),
-                Assert(proposal_passed(proposal_appid)),
-                implement_proposal(proposal_appid),
-                Return(Int(1)),
-            ])
-            can_delete = Seq([
-                Return(Or(
-                    # DAO has not been finalized and sender is attempting to delete
-                    setup_phase_approved,
-                    # or, DAO has been closed out by the specified closure process,
-                    And(
-                        GlobalInts.Closed.get(),
-                        Txn.sender() == Global.creator_address()
-                    )
-                ))
-            ])
-            # TODO: add ability to change governance structure via proposal
-            can_update = Return(Int(0))
-            return Cond(
-                [Txn.application_id() == Int(0), on_creation],
-                [Txn.on_completion() == OnComplete.DeleteApplication, can_delete],
-                [Txn.on_completion() == OnComplete.UpdateApplication, can_update],
-                [Txn.application_args[0] == Bytes('addcommittee'), on_addcommittee],
-                [Txn.application_args[0] == Bytes('addrule'), on_addrule],
-                [Txn.application_args[0] == Bytes('finalize'), on_finalize],
-                [Txn.application_args[0] == Bytes('implementproposal'), on_implementproposal]
-            )
+            from algodao.programs.governance import dao_approval_program
+            return dao_approval_program()
 
         def clear_program(self) -> Expr:
-            return Return(Int(1))
+            from algodao.programs.governance import dao_clear_program
+            return dao_clear_program()
 
         def global_schema(self) -> transaction.StateSchema:
             return transaction.StateSchema(len(AlgoDao.GlobalInts), len(AlgoDao.GlobalBytes))
@@ -245,38 +112,51 @@ class AlgoDao:
             return transaction.StateSchema(0, 0)
 
     class DeployedDao(DeployedContract):
-        def __init__(self, algod: AlgodClient, appid: int):
-            info: ApplicationInfo = algod.application_info(appid)
-            self._trust_assetid = readintfromstore(
-                info['params']['global-state'],
-                AlgoDao.GlobalInts.TrustAsset.name.encode()
-            )
+        def __init__(
+                self,
+                algod: Optional[AlgodClient],
+                appid: int,
+                info: Optional[ApplicationInfo] = None,
+        ):
+            """The app info is fetched unless given (e.g., by algodao.aio)"""
+            if info is None:
+                info = algodao.readcache.application_info(algod, appid)
+            self._trust_assetid = AppState.fromapp(info).getint(AlgoDao.GlobalInts.TrustAsset)
             super(AlgoDao.DeployedDao, self).__init__(appid)
 
         @property
         def trust_assetid(self):
             return self._trust_assetid
 
+        def build_addcommittee(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+                committee_id: int,
+        ) -> List[transaction.Transaction]:
+            return [
+                self.method_txn(
+                    params,
+                    addr,
+                    b'addcommittee',
+                    [
+                        algodao.helpers.int2bytes(committee_id),
+                    ],
+                )
+            ]
+
         def call_addcommittee(self, algod, addr, privkey, committee_id):
-            return self.call_method(
-                algod,
-                addr,
-                privkey,
-                b'addcommittee',
-                [
-                    algodao.helpers.int2bytes(committee_id),
-                ],
-            )
+            params = algodao.params.suggested_params(algod)
+            return self.submit(algod, privkey, self.build_addcommittee(params, addr, committee_id))
 
-        def call_addrule(
+        def build_addrule(
                 self,
-                algod,
-                addr,
-                privkey,
+                params: transaction.SuggestedParams,
+                addr: str,
                 proposal_type: ProposalType,
                 vote_type: VoteType,
                 win_pct: int,
-        ):
+        ) -> List[transaction.Transaction]:
             if win_pct < 0 or win_pct > 100:
                 raise ValueError(win_pct)
             rule = (
@@ -284,24 +164,49 @@ class AlgoDao:
                 + algodao.helpers.int2bytes(vote_type.value)
                 + algodao.helpers.int2bytes(win_pct)
             )
-            return self.call_method(
+            return [
+                self.method_txn(
+                    params,
+                    addr,
+                    b'addrule',
+                    [
+                        rule,
+                    ],
+                )
+            ]
+
+        def call_addrule(
+                self,
                 algod,
                 addr,
                 privkey,
-                b'addrule',
-                [
-                    rule,
-                ],
-            )
+                proposal_type: ProposalType,
+                vote_type: VoteType,
+                win_pct: int,
+        ):
+            params = algodao.params.suggested_params(algod)
+            txns = self.build_addrule(params, addr, proposal_type, vote_type, win_pct)
+            return self.submit(algod, privkey, txns)
+
+        def build_finalize(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+        ) -> List[transaction.Transaction]:
+            return [self.method_txn(params, addr, b'finalize', [])]
 
         def call_finalize(self, algod, addr, privkey):
-            return self.call_method(
-                algod,
-                addr,
-                privkey,
-                b'finalize',
-                [],
-            )
+            params = algodao.params.suggested_params(algod)
+            return self.submit(algod, privkey, self.build_finalize(params, addr))
+
+        def build_implementproposal(
+                self,
+                params: transaction.SuggestedParams,
+                proposal: Proposal.DeployedProposal,
+                addr: str,
+                accounts: List[str],
+        ) -> List[transaction.Transaction]:
+            return self._implementproposal_txns(params, proposal, addr, accounts)
 
         def call_implementproposal(
                 self,
@@ -311,7 +216,71 @@ class AlgoDao:
                 privkey: str,
                 accounts: List[str],
         ):
-            params = algod.suggested_params()
+            params = algodao.params.suggested_params(algod)
+            txns = self.build_implementproposal(params, proposal, addr, accounts)
+            return self.submit(algod, privkey, txns)
+
+        def build_implementproposals(
+                self,
+                params: transaction.SuggestedParams,
+                proposals: List[Tuple[Proposal.DeployedProposal, List[str]]],
+                addr: str,
+        ) -> List[List[transaction.Transaction]]:
+            """
+            Build groups implementing several passed proposals, packing up to
+            eight (implementproposal, setimplemented) pairs into each group.
+            Each entry of proposals is the proposal along with the additional
+            accounts its implementation references (e.g., the receiver of a
+            PAYMENT).
+            """
+            return [
+                [
+                    txn
+                    for proposal, accounts in planned
+                    for txn in self._implementproposal_txns(params, proposal, addr, accounts)
+                ]
+                for planned in plan_implementation_groups(proposals)
+            ]
+
+        def call_implementproposals(
+                self,
+                algod: AlgodClient,
+                proposals: List[Tuple[Proposal.DeployedProposal, List[str]]],
+                addr: str,
+                privkey: str,
+                signer: Optional[algodao.signing.BatchSigner] = None,
+        ) -> List[str]:
+            """
+            Implement several passed proposals (see build_implementproposals).
+            All groups are submitted before waiting for confirmation so that
+            they can be confirmed in the same round. The groups are signed
+            with the batch signer if given. Returns the transaction ID of the
+            first transaction in each group.
+            """
+            params = algodao.params.suggested_params(algod)
+            built = self.build_implementproposals(params, proposals, addr)
+            groups = algodao.signing.signgroups(built, privkey, signer)
+            txids: List[str] = []
+            for signed in groups:
+                try:
+                    txids.append(algodao.signing.sendgroup(algod, signed))
+                except Exception:
+                    algodao.helpers.writedryrun(algod, algodao.signing.decode(signed), 'failed_txn')
+                    raise
+            for txid in txids:
+                algodao.helpers.wait_for_confirmation(algod, txid)
+            txns = [txn for group in built for txn in group]
+            algodao.readcache.invalidatetxns(algod, txns)
+            algodao.holdings.observetxns(algod, txns)
+            return txids
+
+        def _implementproposal_txns(
+                self,
+                params: transaction.SuggestedParams,
+                proposal: Proposal.DeployedProposal,
+                addr: str,
+                accounts: List[str],
+        ) -> List[transaction.Transaction]:
             txn1 = transaction.ApplicationNoOpTxn(
                 addr,
                 params,
@@ -331,17 +300,7 @@ class AlgoDao:
                     b'setimplemented',
                 ]
             )
-            groupid = transaction.calculate_group_id([txn1, txn2])
-            txn1.group = groupid
-            txn2.group = groupid
-            signed1 = txn1.sign(privkey)
-            signed2 = txn2.sign(privkey)
-            try:
-                txid = algod.send_transactions([signed1, signed2])
-                algodao.helpers.wait_for_confirmation(algod, txid)
-            except Exception as exc:
-                algodao.helpers.writedryrun(algod, [signed1, signed2], 'failed_txn')
-                raise
+            return [txn1, txn2]
 
     @classmethod
     def deploy(cls, algod, createdao: CreateDao, privkey):
@@ -349,6 +308,16 @@ class AlgoDao:
         return AlgoDao.DeployedDao(algod, appid)
 
 
+class ConsiderationKind(enum.Enum):
+    """
+    What a PreapprovalGate slot is considering: whether to trust an app, or
+    whether to add or remove a program hash from the allowlist.
+    """
+    TRUST_APP = 0
+    ALLOW_HASH = 1
+    DISALLOW_HASH = 2
+
+
 class PreapprovalGate:
     """
     A statically deployed smart contract (i.e., one that is created when the
@@ -363,27 +332,45 @@ class PreapprovalGate:
     proposal is legitimate (e.g., by checking the hash of the deployed contract)
     this contract passes along a single Trusted ASA token to indicate to the
     governance contract that it should be followed.
+
+    The committee can consider several proposals at once: each proposal under
+    consideration occupies one of NumSlots slots, and the votes for each slot
+    are tracked separately.
+
+    The committee can also vote to add the hash of an approval and clear
+    program pair to an allowlist (see programhash). Any app whose programs
+    match an allowed hash can then be trusted immediately through the
+    autotrust method, without waiting for a committee vote.
     """
     class GlobalInts(GlobalVariables):
         Initialized = enum.auto()
+        CommitteeId = enum.auto()
+        TrustAssetId = enum.auto()
+        MinRoundsPerProposal = enum.auto()
+        NumSlots = enum.auto()
+        Considerations = enum.auto()
+
+    class GlobalBytes(GlobalVariables):
+        CommitteeAddr = enum.auto()
+
+    class SlotInts(SlotGlobalVariables):
         ConsideredAppId = enum.auto()
+        ConsideredKind = enum.auto()
+        ConsiderationId = enum.auto()
         YesVotes = enum.auto()
         NoVotes = enum.auto()
-        CommitteeId = enum.auto()
         VotingStartRound = enum.auto()
         VoteInProgress = enum.auto()
-        TrustAssetId = enum.auto()
-        MinRoundsPerProposal = enum.auto()
 
-    class GlobalBytes(GlobalVariables):
+    class SlotBytes(SlotGlobalVariables):
+        # the address of the considered app, or the considered program hash
         ConsideredAppAddr = enum.auto()
-        CommitteeAddr = enum.auto()
 
-    class LocalInts(LocalVariables):
-        VotedAppId = enum.auto()
+    class LocalInts(SlotLocalVariables):
+        VotedConsideration = enum.auto()
         Vote = enum.auto()
 
-    class LocalBytes(LocalVariables):
+    class LocalBytes(SlotLocalVariables):
         pass
 
     class CreateGate(CreateContract):
@@ -391,219 +378,111 @@ class PreapprovalGate:
                 self,
                 committee_id: int,
                 minrounds: int,
+                numslots: int = 1,
+                numhashes: int = 4,
         ):
+            if numslots < 1 or numslots > MAX_GATE_SLOTS:
+                raise ValueError(f"Invalid number of slots: {numslots}")
             self._committee_id: int = committee_id
             self._committee_addr: str = algosdk.logic.get_application_address(committee_id)
             self._minrounds: int = minrounds
+            self._numslots: int = numslots
+            self._numhashes: int = numhashes
+            schema = self.global_schema()
+            if numhashes < 0 or schema.num_uints + schema.num_byte_slices > MAX_GLOBAL_KEYS:
+                raise ValueError(
+                    f"Too many slots and hashes for global state: {numslots}, {numhashes}"
+                )
 
         def createapp_args(self) -> List[bytes]:
             return [
                 algodao.helpers.int2bytes(self._committee_id),
                 algosdk.encoding.decode_address(self._committee_addr),
                 algodao.helpers.int2bytes(self._minrounds),
+                algodao.helpers.int2bytes(self._numslots),
             ]
 
-        def approval_program(self):
-            GlobalInts = PreapprovalGate.GlobalInts
-            GlobalBytes = PreapprovalGate.GlobalBytes
-            LocalInts = PreapprovalGate.LocalInts
-            on_creation = Seq([
-                GlobalInts.Initialized.put(Int(0)),
-                GlobalInts.ConsideredAppId.put(Int(0)),
-                GlobalBytes.ConsideredAppAddr.put(Bytes(b'')),
-                GlobalInts.YesVotes.put(Int(0)),
-                GlobalInts.NoVotes.put(Int(0)),
-                GlobalInts.CommitteeId.put(Btoi(Txn.application_args[0])),
-                # TODO: necessary to save both the app id and the address?
-                GlobalBytes.CommitteeAddr.put(Txn.application_args[1]),
-                GlobalInts.VotingStartRound.put(Int(0)),
-                GlobalInts.VoteInProgress.put(Int(0)),
-                GlobalInts.TrustAssetId.put(Int(0)),
-                GlobalInts.MinRoundsPerProposal.put(Btoi(Txn.application_args[2])),
-                Return(Int(1)),
-            ])
-            on_inittoken = Seq([
-                Assert(Not(GlobalInts.Initialized.get())),
-                InnerTxnBuilder.Begin(),
-                InnerTxnBuilder.SetFields({
-                    TxnField.type_enum: TxnType.AssetConfig,
-                    TxnField.config_asset_total: Btoi(Txn.application_args[1]),
-                    TxnField.config_asset_unit_name: Txn.application_args[2],
-                    TxnField.config_asset_name: Txn.application_args[3],
-                    TxnField.config_asset_url: Txn.application_args[4],
-                    TxnField.config_asset_manager: Global.current_application_address(),
-                    # TxnField.config_asset_default_frozen: Int(1),
-                    TxnField.config_asset_freeze: Global.current_application_address(),
-                    TxnField.config_asset_clawback: Global.current_application_address(),
-                    TxnField.config_asset_reserve: Global.current_application_address(),
-                    TxnField.config_asset_decimals: Int(0),
-                }),
-                InnerTxnBuilder.Submit(),
-                GlobalInts.TrustAssetId.put(InnerTxn.created_asset_id()),
-                GlobalInts.Initialized.put(Int(1)),
-                Return(Int(1)),
-            ])
-            assetid = App.globalGetEx(
-                GlobalInts.CommitteeId.get(),
-                Committee.GlobalInts.AssetId.bytes,
-            )
-            committeesize = current_committee_size_ex(
-                GlobalInts.CommitteeId.get(),
-                GlobalBytes.CommitteeAddr.get(),
-            )
-            on_assessproposal = Seq([
-                # Any committee member can submit a proposal for consideration.
-                # If another contract is being considered, it can be replaced
-                # without a definite conclusion. This allows thet committee to move
-                # on to another contract if there is uncertainty. However a
-                # certain number of rounds must have passed before moving on to
-                # another contract. This prevents a single member from spamming
-                # the contract and preventing other contracts from being
-                # considered.
-                assetid,
-                Assert(And(
-                    assetid.hasValue(),
-                    is_member(assetid.value(), Txn.sender())
-                )),
-                If(
-                    GlobalInts.VoteInProgress.get(),
-                    Assert(
-                        Global.round() > GlobalInts.VotingStartRound.get()
-                           + GlobalInts.MinRoundsPerProposal.get()
-                    )
-                ),
-                GlobalInts.VoteInProgress.put(Int(1)),
-                GlobalInts.VotingStartRound.put(Global.round()),
-                GlobalInts.ConsideredAppId.put(Btoi(Txn.application_args[1])),
-                GlobalBytes.ConsideredAppAddr.put(Txn.application_args[2]),
-                Return(Int(1)),
-            ])
-            on_vote = Seq([
-                assetid,
-                Assert(And(
-                    assetid.hasValue(),
-                    is_member(assetid.value(), Txn.sender()))
-                ),
-                # check that the application ID the member is attempting to vote
-                # on is in fact the applicatoin ID under consideration
-                Assert(GlobalInts.ConsideredAppId.get() == Btoi(Txn.application_args[1])),
-                # check that the vote is in fact in progress
-                Assert(GlobalInts.VoteInProgress.get()),
-                If(
-                    LocalInts.VotedAppId.get(Txn.sender()) == GlobalInts.ConsideredAppId.get(),
-                    # user has already voted on this proposal; first rescind their
-                    # previous vote
-                    If(
-                        LocalInts.Vote.get(Txn.sender()),
-                        GlobalInts.YesVotes.put(GlobalInts.YesVotes.get() - Int(1)),
-                        GlobalInts.NoVotes.put(GlobalInts.NoVotes.get() - Int(1))
-                    )
-                ),
-                LocalInts.VotedAppId.put(Txn.sender(), GlobalInts.ConsideredAppId.get()),
-                LocalInts.Vote.put(Txn.sender(), Btoi(Txn.application_args[2])),
-                If(
-                    LocalInts.Vote.get(Txn.sender()),
-                    GlobalInts.YesVotes.put(GlobalInts.YesVotes.get() + Int(1)),
-                    GlobalInts.NoVotes.put(GlobalInts.NoVotes.get() + Int(1))
-                ),
-                # if this vote leads to a definitive result, immediately close the
-                # vote and execute on the result
-                If(
-                    # TODO: allow approval method other than majority vote
-                    GlobalInts.YesVotes.get() > committeesize / Int(2),
-                    Seq([
-                        set_asset_freeze(
-                            Global.current_application_address(),
-                            GlobalInts.TrustAssetId.get(),
-                            Int(0)
-                        ),
-                        send_asset(
-                            GlobalBytes.ConsideredAppAddr.get(),
-                            GlobalInts.TrustAssetId.get()
-                        ),
-                        set_asset_freeze(
-                            GlobalBytes.ConsideredAppAddr.get(),
-                            GlobalInts.TrustAssetId.get(),
-                            Int(1),
-                        ),
-                        GlobalInts.VoteInProgress.put(Int(0)),
-                    ])
-                ),
-                If(
-                    GlobalInts.NoVotes.get() > committeesize / Int(2),
-                    Seq([
-                        GlobalInts.VoteInProgress.put(Int(0)),
-                    ])
-                ),
-                Return(Int(1)),
-            ])
-            on_closeout = self.clear_program()
-            return Cond(
-                [Txn.application_id() == Int(0), on_creation],
-                [Txn.on_completion() == OnComplete.UpdateApplication, Return(Int(0))],
-                [Txn.on_completion() == OnComplete.DeleteApplication, Return(Int(0))],
-                [Txn.on_completion() == OnComplete.OptIn, Return(Int(1))],
-                [Txn.on_completion() == OnComplete.CloseOut, on_closeout],
-                [Txn.application_args[0] == Bytes('inittoken'), on_inittoken],
-                [Txn.application_args[0] == Bytes('assessproposal'), on_assessproposal],
-                [Txn.application_args[0] == Bytes('vote'), on_vote],
-            )
+        def approval_program(self) -> Expr:
+            from algodao.programs.governance import gate_approval_program
+            return gate_approval_program()
 
-        def clear_program(self):
-            GlobalInts = PreapprovalGate.GlobalInts
-            LocalInts = PreapprovalGate.LocalInts
-            return Seq([
-                If(
-                    And(
-                        GlobalInts.VoteInProgress.get(),
-                        LocalInts.VotedAppId.get(Txn.sender()) == GlobalInts.ConsideredAppId.get()
-                    ),
-                    If(
-                        LocalInts.Vote.get(Txn.sender()),
-                        GlobalInts.YesVotes.put(GlobalInts.YesVotes.get() - Int(1)),
-                        GlobalInts.NoVotes.put(GlobalInts.NoVotes.get() - Int(1))
-                    )
-                ),
-                Return(Int(1)),
-            ])
+        def clear_program(self) -> Expr:
+            from algodao.programs.governance import gate_clear_program
+            return gate_clear_program()
 
         def local_schema(self) -> transaction.StateSchema:
             return transaction.StateSchema(
-                len(PreapprovalGate.LocalInts),
-                len(PreapprovalGate.LocalBytes),
+                len(PreapprovalGate.LocalInts) * self._numslots,
+                len(PreapprovalGate.LocalBytes) * self._numslots,
             )
 
         def global_schema(self) -> transaction.StateSchema:
+            # the allowlist stores one int per allowed program hash
             return transaction.StateSchema(
-                len(PreapprovalGate.GlobalInts),
-                len(PreapprovalGate.GlobalBytes),
+                len(PreapprovalGate.GlobalInts)
+                + len(PreapprovalGate.SlotInts) * self._numslots
+                + self._numhashes,
+                len(PreapprovalGate.GlobalBytes) + len(PreapprovalGate.SlotBytes) * self._numslots,
             )
 
     class DeployedGate(DeployedContract):
         def __init__(
                 self,
-                algod: AlgodClient,
+                algod: Optional[AlgodClient],
                 appid: int,
+                appinfo: Optional[ApplicationInfo] = None,
+                committeeinfo: Optional[ApplicationInfo] = None,
         ):
-            appinfo: ApplicationInfo = algod.application_info(appid)
-            self._committee_id: int = readintfromstore(
-                appinfo['params']['global-state'],
-                b'CommitteeId'
-            )
-            committeeinfo: ApplicationInfo = algod.application_info(self._committee_id)
-            self._committee_asset_id: int = readintfromstore(
-                committeeinfo['params']['global-state'],
-                b'AssetId'
-            )
+            """
+            The app info of the gate and of its committee are fetched unless
+            given (e.g., by algodao.aio)
+            """
+            if appinfo is None:
+                appinfo = algodao.readcache.application_info(algod, appid)
+            state = AppState.fromapp(appinfo)
+            self._committee_id: int = state.getint(PreapprovalGate.GlobalInts.CommitteeId)
+            self._numslots: int = state.getint(PreapprovalGate.GlobalInts.NumSlots)
+            self._minrounds: int = state.getint(PreapprovalGate.GlobalInts.MinRoundsPerProposal)
+            if committeeinfo is None:
+                committeeinfo = algodao.readcache.application_info(algod, self._committee_id)
+            self._committee_asset_id: int = AppState.fromapp(committeeinfo).getint(Committee.GlobalInts.AssetId)
             # self._committee_asset_id: int = committee_asset_id
             self._committee_addr: str = algosdk.logic.get_application_address(self._committee_id)
-            self._trust_asset_id: Optional[int] = None
+            # set by inittoken, until which it reads as 0
+            self._trust_asset_id: Optional[int] = state.getint(PreapprovalGate.GlobalInts.TrustAssetId) or None
             super(PreapprovalGate.DeployedGate, self).__init__(appid)
 
         @property
         def trust_assetid(self):
             return self._trust_asset_id
 
+        @property
+        def numslots(self) -> int:
+            return self._numslots
+
+        def build_inittoken(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+                asset_total: int,
+                asset_unit_name: str,
+                asset_name: str,
+                asset_url: str
+        ) -> List[transaction.Transaction]:
+            return [
+                self.method_txn(
+                    params,
+                    addr,
+                    b'inittoken',
+                    [
+                        algodao.helpers.int2bytes(asset_total),
+                        asset_unit_name.encode(),
+                        asset_name.encode(),
+                        asset_url.encode(),
+                    ]
+                )
+            ]
+
         def call_inittoken(
                 self,
                 algod: AlgodClient,
@@ -614,41 +493,86 @@ class PreapprovalGate:
                 asset_name: str,
                 asset_url: str
         ):
-            info = self.call_method(
-                algod,
-                addr,
-                privkey,
-                b'inittoken',
-                [
-                    algodao.helpers.int2bytes(asset_total),
-                    asset_unit_name.encode(),
-                    asset_name.encode(),
-                    asset_url.encode(),
-                ]
-            )
-            self._trust_asset_id = info['inner-txns'][0]['asset-index']
+            params = algodao.params.suggested_params(algod)
+            txns = self.build_inittoken(params, addr, asset_total, asset_unit_name, asset_name, asset_url)
+            info = self.submit(algod, privkey, txns)
+            self.oninittoken(info)
             return info
 
+        def oninittoken(self, info: PendingTransactionInfo) -> int:
+            """Record the trust token created by a confirmed inittoken call"""
+            assetid: int = info['inner-txns'][0]['asset-index']
+            self._trust_asset_id = assetid
+            return assetid
+
+        def build_assessproposal(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+                considered_appid: int,
+                slot: int,
+        ) -> List[transaction.Transaction]:
+            considered_appaddr = algosdk.logic.get_application_address(considered_appid)
+            return [
+                self.method_txn(
+                    params,
+                    addr,
+                    b'assessproposal',
+                    [
+                        algodao.helpers.int2bytes(considered_appid),
+                        algosdk.encoding.decode_address(considered_appaddr),
+                        algodao.helpers.int2bytes(slot),
+                    ],
+                    foreign_apps=[self._committee_id],
+                    foreign_assets=[self._committee_asset_id],
+                )
+            ]
+
         def call_assessproposal(
                 self,
                 algod: AlgodClient,
                 addr: str,
                 privkey: str,
-                considered_appid: int
+                considered_appid: int,
+                slot: Optional[int] = None,
         ):
+            """
+            Submit a proposal for consideration by the committee. If no slot
+            is given, a free slot (or the slot whose consideration has been
+            open the longest, once it can be replaced) is used. Raises
+            NotAMember if a membership index shows addr is not a member of
+            the committee (see algodao.membership).
+            """
+            algodao.membership.checkmember(algod, addr, self._committee_id)
+            if slot is None:
+                slot = self.freeslot(algod)
+            params = algodao.params.suggested_params(algod)
+            return self.submit(algod, privkey, self.build_assessproposal(params, addr, considered_appid, slot))
+
+        def build_vote(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+                considered_appid: int,
+                vote: int,
+                slot: int,
+        ) -> List[transaction.Transaction]:
             considered_appaddr = algosdk.logic.get_application_address(considered_appid)
-            return self.call_method(
-                algod,
-                addr,
-                privkey,
-                b'assessproposal',
-                [
-                    algodao.helpers.int2bytes(considered_appid),
-                    algosdk.encoding.decode_address(considered_appaddr),
-                ],
-                foreign_apps=[self._committee_id],
-                foreign_assets=[self._committee_asset_id],
-            )
+            return [
+                self.method_txn(
+                    params,
+                    addr,
+                    b'vote',
+                    [
+                        algodao.helpers.int2bytes(considered_appid),
+                        algodao.helpers.int2bytes(vote),
+                        algodao.helpers.int2bytes(slot),
+                    ],
+                    foreign_apps=[self._committee_id],
+                    foreign_assets=[self._committee_asset_id, self._trust_asset_id],
+                    accounts=[self._committee_addr, considered_appaddr],
+                )
+            ]
 
         def call_vote(
                 self,
@@ -656,23 +580,230 @@ class PreapprovalGate:
                 addr: str,
                 privkey: str,
                 considered_appid: int,
-                vote: int
+                vote: int,
+                slot: Optional[int] = None,
+        ):
+            """
+            Vote on a proposal under consideration. If no slot is given, the
+            slot in which the proposal is being considered is looked up.
+            Raises NotAMember if a membership index shows addr is not a
+            member of the committee (see algodao.membership).
+            """
+            algodao.membership.checkmember(algod, addr, self._committee_id)
+            if slot is None:
+                slot = self.findslot(algod, considered_appid)
+            params = algodao.params.suggested_params(algod)
+            return self.submit(algod, privkey, self.build_vote(params, addr, considered_appid, vote, slot))
+
+        def build_assesshash(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+                program_hash: bytes,
+                allow: bool,
+                slot: int,
+        ) -> List[transaction.Transaction]:
+            return [
+                self.method_txn(
+                    params,
+                    addr,
+                    b'assesshash',
+                    [
+                        program_hash,
+                        algodao.helpers.int2bytes(int(allow)),
+                        algodao.helpers.int2bytes(slot),
+                    ],
+                    foreign_apps=[self._committee_id],
+                    foreign_assets=[self._committee_asset_id],
+                )
+            ]
+
+        def call_assesshash(
+                self,
+                algod: AlgodClient,
+                addr: str,
+                privkey: str,
+                program_hash: bytes,
+                allow: bool = True,
+                slot: Optional[int] = None,
+        ):
+            """
+            Submit a program hash (see programhash) for consideration by the
+            committee, to be added to the allowlist (or removed from it if
+            allow is False). Like call_assessproposal, raises NotAMember if a
+            membership index shows addr is not a member of the committee.
+            """
+            algodao.membership.checkmember(algod, addr, self._committee_id)
+            if slot is None:
+                slot = self.freeslot(algod)
+            params = algodao.params.suggested_params(algod)
+            return self.submit(algod, privkey, self.build_assesshash(params, addr, program_hash, allow, slot))
+
+        def build_votehash(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+                program_hash: bytes,
+                vote: int,
+                slot: int,
+        ) -> List[transaction.Transaction]:
+            return [
+                self.method_txn(
+                    params,
+                    addr,
+                    b'vote',
+                    [
+                        program_hash,
+                        algodao.helpers.int2bytes(vote),
+                        algodao.helpers.int2bytes(slot),
+                    ],
+                    foreign_apps=[self._committee_id],
+                    foreign_assets=[self._committee_asset_id],
+                    accounts=[self._committee_addr],
+                )
+            ]
+
+        def call_votehash(
+                self,
+                algod: AlgodClient,
+                addr: str,
+                privkey: str,
+                program_hash: bytes,
+                vote: int,
+                slot: Optional[int] = None,
         ):
+            """
+            Vote on a program hash under consideration. Like call_vote, raises
+            NotAMember if a membership index shows addr is not a member of
+            the committee.
+            """
+            algodao.membership.checkmember(algod, addr, self._committee_id)
+            if slot is None:
+                slot = self.findhashslot(algod, program_hash)
+            params = algodao.params.suggested_params(algod)
+            return self.submit(algod, privkey, self.build_votehash(params, addr, program_hash, vote, slot))
+
+        def build_autotrust(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+                considered_appid: int,
+        ) -> List[transaction.Transaction]:
             considered_appaddr = algosdk.logic.get_application_address(considered_appid)
-            return self.call_method(
-                algod,
-                addr,
-                privkey,
-                b'vote',
-                [
-                    algodao.helpers.int2bytes(considered_appid),
-                    algodao.helpers.int2bytes(vote)
-                ],
-                foreign_apps=[self._committee_id],
-                foreign_assets=[self._committee_asset_id, self._trust_asset_id],
-                accounts=[self._committee_addr, considered_appaddr],
+            return [
+                self.method_txn(
+                    params,
+                    addr,
+                    b'autotrust',
+                    [
+                        algodao.helpers.int2bytes(considered_appid),
+                    ],
+                    foreign_apps=[considered_appid],
+                    foreign_assets=[self._trust_asset_id],
+                    accounts=[considered_appaddr],
+                )
+            ]
+
+        def call_autotrust(
+                self,
+                algod: AlgodClient,
+                addr: str,
+                privkey: str,
+                considered_appid: int,
+        ):
+            """
+            Have the app trusted immediately; the app's programs must match a
+            hash on the allowlist.
+            """
+            params = algodao.params.suggested_params(algod)
+            return self.submit(algod, privkey, self.build_autotrust(params, addr, considered_appid))
+
+        def allowedhashes(self, algod: AlgodClient) -> List[bytes]:
+            """
+            Return the program hashes currently on the allowlist
+            """
+            state = AppState.fromapp(algodao.readcache.application_info(algod, self.appid))
+            return self.allowedhashesinstate(state)
+
+        def allowedhashesinstate(self, state: AppState) -> List[bytes]:
+            prefix = PROGRAM_HASH_PREFIX.encode()
+            return [
+                key[len(prefix):]
+                for key in state
+                if key.startswith(prefix) and len(key) == len(prefix) + 32
+            ]
+
+        def findslot(self, algod: AlgodClient, considered_appid: int) -> int:
+            """
+            Return the slot in which the given app is being considered
+            """
+            state = AppState.fromapp(algodao.readcache.application_info(algod, self.appid))
+            return self.findslotinstate(state, considered_appid)
+
+        def findslotinstate(self, state: AppState, considered_appid: int) -> int:
+            return self._findslot(
+                state,
+                ConsiderationKind.TRUST_APP,
+                lambda slot: state.getint(PreapprovalGate.SlotInts.ConsideredAppId, slot) == considered_appid
             )
 
+        def findhashslot(self, algod: AlgodClient, program_hash: bytes) -> int:
+            """
+            Return the slot in which the given program hash is being considered
+            """
+            state = AppState.fromapp(algodao.readcache.application_info(algod, self.appid))
+            return self.findhashslotinstate(state, program_hash)
+
+        def findhashslotinstate(self, state: AppState, program_hash: bytes) -> int:
+            return self._findslot(
+                state,
+                None,
+                lambda slot: state.getbytes(PreapprovalGate.SlotBytes.ConsideredAppAddr, slot) == program_hash
+            )
+
+        def _findslot(
+                self,
+                state: AppState,
+                kind: Optional[ConsiderationKind],
+                matches: Callable[[int], bool],
+        ) -> int:
+            SlotInts = PreapprovalGate.SlotInts
+            for slot in range(self._numslots):
+                slotkind = state.getint(SlotInts.ConsideredKind, slot)
+                if (
+                        state.getint(SlotInts.VoteInProgress, slot)
+                        and (kind is None or slotkind == kind.value)
+                        and matches(slot)
+                ):
+                    return slot
+            raise ValueError("Not under consideration")
+
+        def freeslot(self, algod: AlgodClient) -> int:
+            """
+            Return a slot in which a new proposal can be considered: a slot
+            with no vote in progress or, failing that, the slot whose vote has
+            been in progress the longest if it is past MinRoundsPerProposal.
+            """
+            state = AppState.fromapp(algodao.readcache.application_info(algod, self.appid))
+            return self.freeslotinstate(state, lambda: algod.status()['last-round'])
+
+        def freeslotinstate(self, state: AppState, lastround: Callable[[], int]) -> int:
+            """
+            As freeslot, for the given global state. lastround returns the
+            latest round; it is only called if every slot is in use.
+            """
+            SlotInts = PreapprovalGate.SlotInts
+            startrounds: List[Tuple[int, int]] = []
+            for slot in range(self._numslots):
+                if not state.getint(SlotInts.VoteInProgress, slot):
+                    return slot
+                startround = state.getint(SlotInts.VotingStartRound, slot)
+                startrounds.append((startround, slot))
+            startround, slot = min(startrounds)
+            if lastround() + 1 <= startround + self._minrounds:
+                raise ValueError("No preapproval slot is available")
+            return slot
+
     @classmethod
     def deploy(cls, algod: AlgodClient, creategate: PreapprovalGate.CreateGate, privkey: str):
         appid = creategate.deploy(algod, privkey)
@@ -680,6 +811,7 @@ class PreapprovalGate:
 
 
 
+
 class QuorumRequirement(enum.Enum):
     """
     Specify a requirement for a quorum; not implemented.
@@ -696,3 +828,17 @@ class ApprovalMechanism(enum.Enum):
     PERCENTAGE_CUTOFF = 0
     TOP_VOTE_GETTERS = 1
 
+
+# PyTeal helpers that moved to algodao.programs.governance, still importable from
+# here; they load PyTeal on first use
+__getattr__ = algodao.programs.forwarder(__name__, [
+    'considered_in_other_slot',
+    'find_rule',
+    'grant_trust',
+    'implement_proposal',
+    'proposal_meets_criteria',
+    'proposal_passed',
+    'proposal_trusted',
+    'rescind_vote',
+    'satisfies_rule',
+])
@@ -7,13 +7,24 @@ import algosdk
 from algosdk.future import transaction
 from algosdk.v2client.algod import AlgodClient
 from algosdk.v2client.indexer import IndexerClient
-from pyteal import Sha512_256, Bytes, Itob, Concat, Expr
 
+import algodao.confirmations
+import algodao.contract
+import algodao.holdings
+import algodao.params
+import algodao.programs
+import algodao.readcache
+import algodao.transport
+from algodao.router import RouterAlgodClient, RouterIndexerClient
+from algodao.transport import PooledAlgodClient, PooledIndexerClient
 from algodao.types import TealKeyValueStore
 
 
 log = logging.getLogger(__name__)
 
+# requests per second allowed by PureStake's free tier
+PURESTAKE_RATELIMIT = 10.0
+
 
 def wait_for_confirmation(
         client: AlgodClient,
@@ -22,65 +33,90 @@ def wait_for_confirmation(
 ):
     """
     Wait until the transaction is confirmed or rejected, or until 'timeout'
-    number of rounds have passed.
+    number of rounds have passed. Waits for concurrently submitted
+    transactions share a single follower of the chain (see
+    algodao.confirmations).
     Args:
         client (AlgodClient): an algod client
         transaction_id (str): the transaction to wait for
         timeout (int): maximum number of rounds to wait
     Returns:
         dict: pending transaction information, or throws an error if the
-            transaction is not confirmed or rejected in the next timeout rounds
+            transaction is rejected or not confirmed in the next timeout rounds,
+            or if the chain cannot be followed
     """
-    start_round = client.status()["last-round"] + 1
-    current_round = start_round
-
-    while current_round < start_round + timeout:
-        try:
-            pending_txn = client.pending_transaction_info(transaction_id)
-        except Exception:
-            return
-        if pending_txn.get("confirmed-round", 0) > 0:
-            return pending_txn
-        elif pending_txn["pool-error"]:
-            raise Exception("pool error: {}".format(pending_txn["pool-error"]))
-        client.status_after_block(current_round)
-        current_round += 1
-    raise Exception(
-        "pending tx not found in timeout rounds, timeout value = : {}".format(timeout)
-    )
+    pending_txn = algodao.confirmations.tracker(client).wait(transaction_id, timeout)
+    # params and records read before this round must not be reused
+    algodao.params.observeround(client, pending_txn["confirmed-round"])
+    algodao.readcache.observeround(client, pending_txn["confirmed-round"])
+    return pending_txn
 
 
+# the client factories return clients sharing a pool of keep-alive connections
+# per host (see algodao.transport). With a comma-separated list of addresses
+# in ALGODAO_ALGOD_ADDRESSES or ALGODAO_INDEXER_ADDRESSES, the local clients
+# route requests over those nodes instead (see algodao.router).
 def createclient() -> AlgodClient:
     algod_address = 'http://localhost:4001'
     algod_token = 'a' * 64
-    return AlgodClient(algod_token, algod_address)
+    addresses = os.getenv('ALGODAO_ALGOD_ADDRESSES')
+    if addresses:
+        return createrouter(addresses.split(','), algod_token)
+    return PooledAlgodClient(algod_token, algod_address)
+
+
+def createrouter(addresses: List[str], algod_token: str = 'a' * 64, preferred: int = 0) -> AlgodClient:
+    """
+    A client of several algod nodes that reads from the fastest and submits
+    transactions to `addresses[preferred]`
+    """
+    clients: List[AlgodClient] = [PooledAlgodClient(algod_token, address) for address in addresses]
+    return RouterAlgodClient(clients, preferred)
+
+
+def _purestake_token() -> str:
+    token = os.getenv('PURESTAKE_API_TOKEN')
+    if not token:
+        raise ValueError("Set PURESTAKE_API_TOKEN to the PureStake API key to use PureStake")
+    return token
 
 
 def algodclient_purestake() -> AlgodClient:
     algod_address = "https://mainnet-algorand.api.purestake.io/ps2"
-    token = os.getenv('PURESTAKE_API_TOKEN')
+    token = _purestake_token()
     headers = {
         'X-API-Key': token,
     }
-    return AlgodClient(token, algod_address, headers=headers)
+    transport = algodao.transport.sharedtransport(algod_address, PURESTAKE_RATELIMIT)
+    return PooledAlgodClient(token, algod_address, headers=headers, transport=transport)
 
 
 def indexer_client() -> IndexerClient:
     """Instantiate and return Indexer client object."""
     indexer_address = "http://localhost:8980"
     indexer_token = 'a' * 64
-    return IndexerClient(indexer_token, indexer_address)
+    addresses = os.getenv('ALGODAO_INDEXER_ADDRESSES')
+    if addresses:
+        return indexer_router(addresses.split(','), indexer_token)
+    return PooledIndexerClient(indexer_token, indexer_address)
+
+
+def indexer_router(addresses: List[str], indexer_token: str = 'a' * 64) -> IndexerClient:
+    """A client of several indexers that reads from the fastest"""
+    clients: List[IndexerClient] = [PooledIndexerClient(indexer_token, address) for address in addresses]
+    return RouterIndexerClient(clients)
 
 
 def indexer_purestake() -> IndexerClient:
     indexer_address = 'https://mainnet-algorand.api.purestake.io/idx2'
     headers = {
-        'X-API-Key': os.getenv('PURESTAKE_API_TOKEN')
+        'X-API-Key': _purestake_token()
     }
-    return IndexerClient('', indexer_address, headers)
+    transport = algodao.transport.sharedtransport(indexer_address, PURESTAKE_RATELIMIT)
+    return PooledIndexerClient('', indexer_address, headers, transport)
 
 
-def loggingconfig():
+def loggingconfig() -> None:
     logging.basicConfig(
         level=logging.INFO,
         format='[%(asctime)s] {%(pathname)s:%(lineno)d} %(levelname)s - %(message)s',
@@ -108,7 +144,7 @@ def add_transaction(
     If the first item is None then the error is non-field/integration error.
     Returned two-tuple of empty strings marks successful transaction.
     """
-    params = client.suggested_params()
+    params = algodao.params.suggested_params(client)
     unsigned_txn = transaction.PaymentTxn(
         sender,
         params,
@@ -130,7 +166,7 @@ def int2bytes(num: int) -> bytes:
 def optinapp(algod: AlgodClient, private_key: str, addr: str, appid: int):
     """Opt-in to an application"""
     log.info(f"Opting {addr} into application {appid}")
-    params = algod.suggested_params()
+    params = algodao.params.suggested_params(algod)
     txn = transaction.ApplicationOptInTxn(addr, params, appid)
     signed = txn.sign(private_key)
     txid = algod.send_transaction(signed)
@@ -157,7 +193,7 @@ def transferasset(
         assetid: int,
         amount: int
 ):
-    params = algod.suggested_params()
+    params = algodao.params.suggested_params(algod)
     txn = algosdk.future.transaction.AssetTransferTxn(
         sendaddr,
         params,
@@ -168,6 +204,7 @@ def transferasset(
     signed = txn.sign(sendprivkey)
     txid = algod.send_transaction(signed)
     wait_for_confirmation(algod, txid)
+    algodao.holdings.observetxns(algod, [txn])
 
 
 def optinasset(
@@ -180,39 +217,43 @@ def optinasset(
 
 
 def readbytesfromstore(store: TealKeyValueStore, key: bytes) -> bytes:
+    """Read a single value; decode the store once with AppState to read several"""
+    encoded = base64.b64encode(key).decode()
     return next(
         (
             base64.b64decode(entry['value']['bytes'])
             for entry in store
-            if base64.b64decode(entry['key']) == key
+            if entry['key'] == encoded
         ),
         b''
     )
 
 
 def readintfromstore(store: TealKeyValueStore, key: bytes) -> int:
+    """Read a single value; decode the store once with AppState to read several"""
+    encoded = base64.b64encode(key).decode()
     return next(
         (
             entry['value']['uint']
             for entry in store
-            if base64.b64decode(entry['key']) == key
+            if entry['key'] == encoded
         ),
         0
     )
 
 
-def appaddr(appid: Expr):
-    return Sha512_256(
-        Concat(Bytes("appID"), Itob(appid))
-    )
-
-
-def wait_for_round(client, round):
+def wait_for_round(client: AlgodClient, round: int) -> None:
+    """
+    Block until a round has been reached. To wait for many rounds (e.g. the
+    ends of the votes of many proposals) see algodao.lifecycle.
+    """
     last_round = client.status().get("last-round")
     log.info(f"Waiting for round {round}")
     while last_round < round:
-        last_round += 1
-        client.status_after_block(last_round)
-        log.info(f"Round {last_round}")
+        last_round = client.status_after_block(last_round).get("last-round")
+    log.info(f"Round {last_round}")
 
 
+# the PyTeal helper that moved to algodao.programs.governance, still importable
+# from here; it loads PyTeal on first use
+__getattr__ = algodao.programs.forwarder(__name__, ['appaddr'], 'algodao.programs.governance')
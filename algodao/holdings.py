@@ -0,0 +1,148 @@
+"""
+Cache of which accounts hold (are opted in to) which assets. Checking a
+single holding through account_info downloads every asset, app and local
+state of the account; the holdings cache instead looks up the one holding
+with algod's account asset endpoint (/v2/accounts/{addr}/assets/{id},
+algod 3.6 or later), and many holdings concurrently.
+
+An account that holds an asset keeps holding it until it closes out of the
+asset, so positive results are remembered and later checks cost nothing.
+The opt-ins and close-outs we submit and confirm (through
+DeployedContract.submit or algodao.helpers.transferasset) update the cache;
+a close-out sent by someone else is not seen until the cache is cleared.
+Negative results are not remembered, since the account may opt in at any
+time.
+"""
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import algosdk.error
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+import algodao.fanout
+
+log = logging.getLogger(__name__)
+
+Holding = Tuple[str, int]
+
+
+class HoldingsCache:
+    def __init__(self, algod: AlgodClient):
+        self._algod: AlgodClient = algod
+        self._lock = threading.Lock()
+        # (address, asset ID) known to be held
+        self._held: Set[Holding] = set()
+        self._stats: Dict[str, int] = {'hits': 0, 'lookups': 0}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def hasasset(self, addr: str, assetid: int) -> bool:
+        """Whether an account holds (is opted in to) an asset"""
+        with self._lock:
+            if (addr, assetid) in self._held:
+                self._stats['hits'] += 1
+                return True
+            self._stats['lookups'] += 1
+        held = self._lookup(addr, assetid)
+        if held:
+            with self._lock:
+                self._held.add((addr, assetid))
+        return held
+
+    def hasassets(
+            self,
+            holdings: Iterable[Holding],
+            max_workers: int = algodao.fanout.DEFAULT_MAX_WORKERS,
+    ) -> Dict[Holding, bool]:
+        """Check many (address, asset ID) holdings, looking up those not known concurrently"""
+        holdings = list(holdings)
+        with self._lock:
+            unknown = [holding for holding in dict.fromkeys(holdings) if holding not in self._held]
+            self._stats['hits'] += len(holdings) - len(unknown)
+            self._stats['lookups'] += len(unknown)
+        found = algodao.fanout.fanout(lambda holding: self._lookup(*holding), unknown, max_workers)
+        with self._lock:
+            self._held.update(holding for holding, held in zip(unknown, found) if held)
+            return {holding: holding in self._held for holding in holdings}
+
+    def observetxns(self, txns: Iterable[transaction.Transaction]):
+        """Note the opt-ins and close-outs of confirmed transactions"""
+        with self._lock:
+            for txn in txns:
+                if not isinstance(txn, transaction.AssetTransferTxn):
+                    continue
+                if txn.close_assets_to:
+                    self._held.discard((txn.sender, txn.index))
+                    # the account closed to must hold the asset
+                    self._held.add((txn.close_assets_to, txn.index))
+                    continue
+                # the receiver of a transfer holds the asset (an opt-in
+                # included), and so does its sender unless it is clawing back
+                if txn.receiver:
+                    self._held.add((txn.receiver, txn.index))
+                if not txn.revocation_target:
+                    self._held.add((txn.sender, txn.index))
+
+    def clear(self):
+        with self._lock:
+            self._held.clear()
+
+    def _lookup(self, addr: str, assetid: int) -> bool:
+        try:
+            response: Dict[str, Any] = self._algod.algod_request('GET', f'/accounts/{addr}/assets/{assetid}')
+        except algosdk.error.AlgodHTTPError as exc:
+            if exc.code == 404:
+                return False
+            raise
+        return response.get('asset-holding') is not None
+
+
+# caches are shared by all clients of the same node
+_caches: Dict[Tuple[str, str], HoldingsCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _nodekey(algod: AlgodClient) -> Tuple[str, str]:
+    return algod.algod_address, algod.algod_token
+
+
+def cache(algod: AlgodClient) -> HoldingsCache:
+    """The holdings cache shared by all clients of the client's node"""
+    key = _nodekey(algod)
+    with _caches_lock:
+        existing = _caches.get(key)
+        if existing is None:
+            existing = _caches[key] = HoldingsCache(algod)
+        return existing
+
+
+def _existing(algod: AlgodClient) -> Optional[HoldingsCache]:
+    with _caches_lock:
+        return _caches.get(_nodekey(algod))
+
+
+def hasasset(algod: AlgodClient, addr: str, assetid: int) -> bool:
+    return cache(algod).hasasset(addr, assetid)
+
+
+def hasassets(algod: AlgodClient, holdings: Iterable[Holding]) -> Dict[Holding, bool]:
+    return cache(algod).hasassets(holdings)
+
+
+def needsoptin(algod: AlgodClient, addrs: Iterable[str], assetid: int) -> List[str]:
+    """The accounts that must opt in to an asset before receiving it"""
+    addrs = list(addrs)
+    held = hasassets(algod, ((addr, assetid) for addr in addrs))
+    return [addr for addr in addrs if not held[(addr, assetid)]]
+
+
+def observetxns(algod: AlgodClient, txns: Iterable[transaction.Transaction]):
+    """Note the opt-ins and close-outs of confirmed transactions"""
+    existing = _existing(algod)
+    if existing is not None:
+        existing.observetxns(txns)
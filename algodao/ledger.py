@@ -0,0 +1,155 @@
+"""
+An incremental ledger of asset balances, built from blocks, for snapshots
+of balances at any round. Snapshotting the governance token through the
+indexer's asset_balances is slow, only gives the current balances, and
+needs an indexer; the ledger only needs the blocks from algod (or a
+recorded stream of them).
+
+For each asset followed, the ledger keeps:
+
+- the delta log: every change of a balance (transfers, clawbacks,
+  close-outs) in round order,
+- checkpoints: a copy of all the balances every `checkpoint_interval`
+  rounds.
+
+The balances at a round are those of the nearest checkpoint at or before it
+plus the deltas logged since, so a snapshot costs the changes since that
+checkpoint rather than the history of the asset.
+
+Assets created in the blocks applied are followed from their creation; the
+balances of an asset created earlier are given with `seed`.
+"""
+import bisect
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from algosdk.v2client.algod import AlgodClient
+
+import algodao.blocks
+from algodao.blocks import AssetDelta
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_INTERVAL = 1000
+
+
+class _AssetHistory:
+    def __init__(self, algoround: int, balances: Dict[str, int]):
+        self.balances: Dict[str, int] = dict(balances)
+        # rounds of the checkpoints and the balances after each
+        self.checkpointrounds: List[int] = [algoround]
+        self.checkpoints: List[Dict[str, int]] = [dict(balances)]
+        # rounds of the deltas logged and the deltas
+        self.deltarounds: List[int] = []
+        self.deltas: List[AssetDelta] = []
+
+    def apply(self, algoround: int, delta: AssetDelta):
+        _applydelta(self.balances, delta)
+        self.deltarounds.append(algoround)
+        self.deltas.append(delta)
+
+    def checkpoint(self, algoround: int):
+        self.checkpointrounds.append(algoround)
+        self.checkpoints.append(dict(self.balances))
+
+    def at(self, algoround: int) -> Dict[str, int]:
+        nearest = bisect.bisect_right(self.checkpointrounds, algoround) - 1
+        if nearest < 0:
+            raise ValueError(f"No balances before round {self.checkpointrounds[0]}")
+        balances = dict(self.checkpoints[nearest])
+        start = bisect.bisect_right(self.deltarounds, self.checkpointrounds[nearest])
+        end = bisect.bisect_right(self.deltarounds, algoround)
+        for delta in self.deltas[start:end]:
+            _applydelta(balances, delta)
+        return balances
+
+
+def blockdeltas(block: Dict[str, Any]) -> List[AssetDelta]:
+    """The changes of asset holdings in a block, in order"""
+    deltas: List[AssetDelta] = []
+    for blocktxn in algodao.blocks.blocktxns(block):
+        if blocktxn.txn.get('type') in ('acfg', 'axfer'):
+            deltas.extend(algodao.blocks.assetdeltas(blocktxn))
+    return deltas
+
+
+def _applydelta(balances: Dict[str, int], delta: AssetDelta):
+    if delta.closed:
+        balances.pop(delta.address, None)
+    else:
+        balances[delta.address] = balances.get(delta.address, 0) + delta.amount
+
+
+class AssetLedger:
+    """
+    The balances of a set of assets, as of every round from when each was
+    seeded or created to the last round applied. Accounts that have opted
+    in hold a balance of 0; accounts that have closed out hold none.
+    """
+    def __init__(self, assetids: Iterable[int], checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL):
+        self._assetids = set(assetids)
+        self._checkpoint_interval: int = checkpoint_interval
+        self._lock = threading.Lock()
+        self._assets: Dict[int, _AssetHistory] = {}
+        # last round applied
+        self.round: Optional[int] = None
+
+    def seed(self, assetid: int, balances: Dict[str, int], algoround: int):
+        """Start following an asset from its balances at the end of a round"""
+        with self._lock:
+            self._assetids.add(assetid)
+            self._assets[assetid] = _AssetHistory(algoround, balances)
+
+    def balances(self, assetid: int, algoround: Optional[int] = None) -> Dict[str, int]:
+        """The balances of an asset at the end of a round, by default the last round applied"""
+        with self._lock:
+            history = self._assets.get(assetid)
+            if history is None:
+                raise KeyError(f"Asset {assetid} is not in the ledger")
+            if algoround is None or algoround == self.round:
+                return dict(history.balances)
+            if self.round is not None and algoround > self.round:
+                raise ValueError(f"Round {algoround} is after the last round applied ({self.round})")
+            return history.at(algoround)
+
+    def applyblock(self, algoround: int, block: Dict[str, Any]):
+        """Apply the asset transactions of a block"""
+        self.applydeltas(algoround, blockdeltas(block))
+
+    def applydeltas(self, algoround: int, deltas: Iterable[AssetDelta]):
+        """Apply the changes of balances of a round"""
+        with self._lock:
+            for delta in deltas:
+                if delta.assetid not in self._assetids:
+                    continue
+                history = self._assets.get(delta.assetid)
+                if history is None:
+                    # created in this round
+                    history = self._assets[delta.assetid] = _AssetHistory(algoround - 1, {})
+                history.apply(algoround, delta)
+            if algoround % self._checkpoint_interval == 0:
+                for history in self._assets.values():
+                    history.checkpoint(algoround)
+            self.round = algoround
+
+    def consume(self, blocks: Iterable[Tuple[int, Dict[str, Any]]]):
+        """Apply a stream of (round, block), e.g. recorded blocks"""
+        for algoround, block in blocks:
+            self.applyblock(algoround, block)
+
+    def sync(self, algod: AlgodClient, start: Optional[int] = None) -> int:
+        """
+        Apply the blocks produced since the last round applied (or from
+        `start`, by default the current round) and return the last round
+        applied
+        """
+        lastround: int = algod.status()['last-round']
+        applied = self.round
+        if applied is None:
+            applied = (lastround if start is None else start) - 1
+        self.consume(
+            (algoround, algodao.blocks.getblock(algod, algoround))
+            for algoround in range(applied + 1, lastround + 1)
+        )
+        return max(applied, lastround)
@@ -0,0 +1,345 @@
+"""
+A round-driven scheduler for the lifecycle of proposals and gate
+considerations. Instead of a thread blocked in wait_for_round for every
+proposal, one follower watches the rounds and runs the jobs that are due:
+
+- CLOSE_REGISTRATION once the registration period of a proposal has ended
+  (e.g. to snapshot the distribution of its vote tokens),
+- FINALIZE_VOTE once its vote has ended, then
+- IMPLEMENT if it passed,
+- CONSIDERATION_EXPIRED once a consideration of a gate may be replaced by
+  another (see PreapprovalGate).
+
+Jobs are persisted in SQLite (in memory unless a path is given), so a
+process that restarts carries on with the jobs it had; scheduling the same
+job twice has no effect. Jobs are run on a thread pool with at most
+`max_workers` running at a time, and at most `limits[action]` of an action
+(e.g. 1 for IMPLEMENT, whose groups all call the DAO). A failed job is
+retried in the next round, up to `max_attempts` times.
+
+    scheduler = LifecycleScheduler(algod, 'lifecycle.db')
+    manageproposals(scheduler, deployeddao, addr, privkey)
+    scheduleproposal(scheduler, proposal_appid, accounts=[receiver])
+    scheduler.start()
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import json
+import logging
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from algosdk.v2client.algod import AlgodClient
+
+import algodao.readcache
+from algodao.contract import AppState
+from algodao.governance import AlgoDao, PreapprovalGate
+from algodao.voting import Proposal
+
+log = logging.getLogger(__name__)
+
+CLOSE_REGISTRATION = 'closeregistration'
+FINALIZE_VOTE = 'finalizevote'
+IMPLEMENT = 'implement'
+CONSIDERATION_EXPIRED = 'considerationexpired'
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_MAX_ATTEMPTS = 3
+# seconds to wait before following the rounds again after an error
+FOLLOW_RETRY_SECONDS = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    jobid INTEGER PRIMARY KEY AUTOINCREMENT,
+    action TEXT NOT NULL,
+    appid INTEGER NOT NULL,
+    args TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    UNIQUE (action, appid, args)
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (state, round);
+"""
+
+
+class Job(NamedTuple):
+    jobid: int
+    action: str
+    appid: int
+    # JSON arguments of the action
+    args: Dict[str, Any]
+    # the job is due once this round has been reached
+    round: int
+    state: str
+    attempts: int
+    error: Optional[str]
+
+
+Handler = Callable[[Job], None]
+
+
+class LifecycleScheduler:
+    def __init__(
+            self,
+            algod: AlgodClient,
+            path: str = ':memory:',
+            max_workers: int = DEFAULT_MAX_WORKERS,
+            limits: Optional[Dict[str, int]] = None,
+            max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ):
+        self._algod: AlgodClient = algod
+        self._handlers: Dict[str, Handler] = {}
+        self._limits: Dict[str, int] = dict(limits or {})
+        self._max_workers: int = max_workers
+        self._max_attempts: int = max_attempts
+        self._lock = threading.Condition()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.executescript(SCHEMA)
+        # jobs left running by a process that stopped are run again
+        self._db.execute('UPDATE jobs SET state = ? WHERE state = ?', (PENDING, RUNNING))
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix='algodao-lifecycle')
+        # action -> number of its jobs running
+        self._running: Dict[str, int] = {}
+        # round -> futures resolved once it is reached
+        self._waiters: Dict[int, List[concurrent.futures.Future]] = {}
+        self._stopped = threading.Event()
+        self._follower: Optional[threading.Thread] = None
+        # last round seen
+        self.round: int = 0
+
+    @property
+    def algod(self) -> AlgodClient:
+        return self._algod
+
+    def register(self, action: str, handler: Handler, limit: Optional[int] = None):
+        """Run `handler` for the jobs of an action, at most `limit` at a time"""
+        with self._lock:
+            self._handlers[action] = handler
+            if limit is not None:
+                self._limits[action] = limit
+
+    def handles(self, action: str) -> bool:
+        with self._lock:
+            return action in self._handlers
+
+    def schedule(self, action: str, appid: int, algoround: int, **args: Any) -> Optional[int]:
+        """
+        Run an action on an app once a round has been reached. Returns the ID
+        of the job, or None if the job was already scheduled.
+        """
+        if not self.handles(action):
+            raise ValueError(f"No handler is registered for {action}")
+        with self._lock:
+            cursor = self._db.execute(
+                'INSERT OR IGNORE INTO jobs (action, appid, args, round, state) VALUES (?, ?, ?, ?, ?)',
+                (action, appid, json.dumps(args, sort_keys=True), algoround, PENDING),
+            )
+            if not cursor.rowcount:
+                return None
+            log.info(f"Scheduled {action} of app {appid} at round {algoround}")
+            self._dispatch()
+            return cursor.lastrowid
+
+    def jobs(self, state: Optional[str] = None, appid: Optional[int] = None) -> List[Job]:
+        sql = 'SELECT * FROM jobs WHERE 1'
+        params: List[Any] = []
+        if state is not None:
+            sql += ' AND state = ?'
+            params.append(state)
+        if appid is not None:
+            sql += ' AND appid = ?'
+            params.append(appid)
+        with self._lock:
+            return [_job(row) for row in self._db.execute(sql + ' ORDER BY round, jobid', params)]
+
+    def whenround(self, algoround: int) -> concurrent.futures.Future:
+        """A future resolved with the last round once a round has been reached"""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            if self.round >= algoround:
+                future.set_result(self.round)
+            else:
+                self._waiters.setdefault(algoround, []).append(future)
+        return future
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until no job is pending or running; returns False on timeout"""
+        with self._lock:
+            return self._lock.wait_for(
+                lambda: not self._db.execute(
+                    'SELECT 1 FROM jobs WHERE state IN (?, ?) LIMIT 1', (PENDING, RUNNING)
+                ).fetchone(),
+                timeout,
+            )
+
+    def observeround(self, lastround: int):
+        """Note the last round and run the jobs that are due"""
+        with self._lock:
+            if lastround <= self.round or self._stopped.is_set():
+                return
+            self.round = lastround
+            for algoround in [algoround for algoround in self._waiters if algoround <= lastround]:
+                for future in self._waiters.pop(algoround):
+                    future.set_result(lastround)
+            self._dispatch()
+
+    def start(self) -> LifecycleScheduler:
+        """Follow the rounds from a background thread"""
+        with self._lock:
+            if self._follower is None:
+                self._follower = threading.Thread(target=self.run, name='algodao-lifecycle', daemon=True)
+                self._follower.start()
+        return self
+
+    def run(self) -> None:
+        """Follow the rounds until closed"""
+        lastround: Optional[int] = None
+        while not self._stopped.is_set():
+            try:
+                if lastround is None:
+                    status = self._algod.status()
+                else:
+                    status = self._algod.status_after_block(lastround)
+                lastround = status['last-round']
+                algodao.readcache.observeround(self._algod, lastround)
+                self.observeround(lastround)
+            except Exception:
+                log.exception("Error following the rounds for the lifecycle scheduler")
+                self._stopped.wait(FOLLOW_RETRY_SECONDS)
+
+    def close(self) -> None:
+        """Stop following the rounds and wait for the running jobs"""
+        self._stopped.set()
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._db.close()
+
+    def _dispatch(self) -> None:
+        # called with the lock held
+        if self._stopped.is_set():
+            return
+        running = sum(self._running.values())
+        due = self._db.execute(
+            'SELECT * FROM jobs WHERE state = ? AND round <= ? ORDER BY round, jobid',
+            (PENDING, self.round),
+        )
+        for job in [_job(row) for row in due]:
+            if running >= self._max_workers:
+                return
+            handler = self._handlers.get(job.action)
+            if handler is None:
+                continue
+            limit = self._limits.get(job.action)
+            if limit is not None and self._running.get(job.action, 0) >= limit:
+                continue
+            self._db.execute('UPDATE jobs SET state = ? WHERE jobid = ?', (RUNNING, job.jobid))
+            self._running[job.action] = self._running.get(job.action, 0) + 1
+            running += 1
+            self._executor.submit(self._runjob, handler, job)
+
+    def _runjob(self, handler: Handler, job: Job):
+        error: Optional[str] = None
+        try:
+            handler(job)
+        except Exception as exc:
+            log.exception(f"{job.action} of app {job.appid} failed")
+            error = f'{type(exc).__name__}: {exc}'
+        with self._lock:
+            self._running[job.action] -= 1
+            if error is None:
+                self._db.execute('UPDATE jobs SET state = ?, error = NULL WHERE jobid = ?', (DONE, job.jobid))
+                log.info(f"{job.action} of app {job.appid} done")
+            elif job.attempts + 1 < self._max_attempts:
+                self._db.execute(
+                    'UPDATE jobs SET state = ?, attempts = ?, error = ?, round = ? WHERE jobid = ?',
+                    (PENDING, job.attempts + 1, error, self.round + 1, job.jobid),
+                )
+            else:
+                self._db.execute(
+                    'UPDATE jobs SET state = ?, attempts = ?, error = ? WHERE jobid = ?',
+                    (FAILED, job.attempts + 1, error, job.jobid),
+                )
+            self._dispatch()
+            self._lock.notify_all()
+
+
+def _job(row: Any) -> Job:
+    jobid, action, appid, args, algoround, state, attempts, error = row
+    return Job(jobid, action, appid, json.loads(args), algoround, state, attempts, error)
+
+
+def manageproposals(scheduler: LifecycleScheduler, dao: AlgoDao.DeployedDao, addr: str, privkey: str):
+    """
+    Finalize the votes of the proposals scheduled (see scheduleproposal) and
+    implement those that pass, sending the calls from `addr`
+    """
+    algod = scheduler.algod
+
+    def finalizevote(job: Job):
+        proposal = Proposal.DeployedProposal(algod, job.appid)
+        proposal.call_finalizevote(algod, addr, privkey)
+        state = AppState.fromapp(algodao.readcache.application_info(algod, job.appid))
+        if state.getint(Proposal.GlobalInts.Passed):
+            scheduler.schedule(IMPLEMENT, job.appid, scheduler.round, **job.args)
+        else:
+            log.info(f"Proposal {job.appid} did not pass")
+
+    def implement(job: Job):
+        proposal = Proposal.DeployedProposal(algod, job.appid)
+        dao.call_implementproposal(algod, proposal, addr, privkey, accounts=job.args.get('accounts', []))
+
+    scheduler.register(FINALIZE_VOTE, finalizevote)
+    # the implementations of a DAO are sent one at a time
+    scheduler.register(IMPLEMENT, implement, limit=1)
+
+
+def scheduleproposal(scheduler: LifecycleScheduler, appid: int, accounts: Iterable[str] = ()):
+    """
+    Schedule the lifecycle of a proposal from its global state: the end of
+    its registration (if an action is registered for it) and the
+    finalization of its vote. `accounts` are the additional accounts its
+    implementation references (e.g. the receiver of a PAYMENT).
+    """
+    state = AppState.fromapp(algodao.readcache.application_info(scheduler.algod, appid))
+    if scheduler.handles(CLOSE_REGISTRATION):
+        scheduler.schedule(CLOSE_REGISTRATION, appid, state.getint(Proposal.GlobalInts.RegEnd) + 1)
+    if state.getint(Proposal.GlobalInts.Implemented):
+        return
+    # finalizevote needs a round after VoteEnd, which is the round of a
+    # transaction sent once VoteEnd is the last round
+    scheduler.schedule(
+        FINALIZE_VOTE,
+        appid,
+        state.getint(Proposal.GlobalInts.VoteEnd),
+        accounts=list(accounts),
+    )
+
+
+def schedulegate(scheduler: LifecycleScheduler, appid: int):
+    """
+    Schedule CONSIDERATION_EXPIRED for each consideration in progress in a
+    gate, once it may be replaced: after MinRoundsPerProposal rounds. The
+    job's args hold the slot and the consideration ID, which the handler
+    should check against the gate's state before acting.
+    """
+    state = AppState.fromapp(algodao.readcache.application_info(scheduler.algod, appid))
+    minrounds = state.getint(PreapprovalGate.GlobalInts.MinRoundsPerProposal)
+    for slot in range(state.getint(PreapprovalGate.GlobalInts.NumSlots)):
+        if not state.getint(PreapprovalGate.SlotInts.VoteInProgress, slot):
+            continue
+        scheduler.schedule(
+            CONSIDERATION_EXPIRED,
+            appid,
+            state.getint(PreapprovalGate.SlotInts.VotingStartRound, slot) + minrounds,
+            slot=slot,
+            considerationid=state.getint(PreapprovalGate.SlotInts.ConsiderationId, slot),
+        )
@@ -0,0 +1,237 @@
+"""
+An off-chain index of committee membership. A member of a committee is an
+account holding its (frozen) membership asset, other than the committee's
+app account, which holds the tokens not given out. Checking membership on
+chain costs a checkmembership transaction; the index answers members()
+and is_member() from memory in O(1):
+
+- the holders of each committee's asset are loaded once from the indexer,
+  paging through its asset balances,
+- they are then kept current from the blocks produced since (see `sync`
+  and `start`), which add and remove members as the asset is transferred,
+  clawed back and closed out. The holdings are kept in an
+  algodao.ledger.AssetLedger, which applies the changes of each block.
+
+Registered with `register`, the index is shared by the clients of a node:
+DeployedGate checks the sender of vote and assessproposal calls against it,
+so that calls by non-members fail before they are sent.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import AbstractSet, Any, Dict, FrozenSet, Optional, Set, Tuple
+
+import algosdk.logic
+from algosdk.v2client.algod import AlgodClient
+from algosdk.v2client.indexer import IndexerClient
+
+import algodao.blocks
+import algodao.ledger
+import algodao.readcache
+import algodao.scheduler
+from algodao.committee import Committee
+from algodao.contract import AppState
+from algodao.ledger import AssetLedger
+
+log = logging.getLogger(__name__)
+
+# seconds to wait before following the chain again after an error
+FOLLOW_RETRY_SECONDS = 1.0
+
+
+class NotAMember(Exception):
+    """The sender of a call restricted to committee members is not a member"""
+    def __init__(self, addr: str, committee_appid: int):
+        super(NotAMember, self).__init__(f"{addr} is not a member of committee {committee_appid}")
+        self.addr = addr
+        self.committee_appid = committee_appid
+
+
+class MembershipIndex:
+    def __init__(self, algod: AlgodClient, indexer: Optional[IndexerClient] = None):
+        self._algod: AlgodClient = algod
+        self._indexer: Optional[IndexerClient] = indexer
+        self._lock = threading.RLock()
+        # membership asset -> committee app
+        self._committees: Dict[int, int] = {}
+        # the holdings of the membership assets
+        self._ledger = AssetLedger([])
+        # committee app -> members
+        self._members: Dict[int, FrozenSet[str]] = {}
+        # account -> committees it is a member of
+        self._memberships: Dict[str, Set[int]] = {}
+        # membership asset -> last round applied to its holdings
+        self._applied: Dict[int, int] = {}
+        self._stopped = threading.Event()
+        self._follower: Optional[threading.Thread] = None
+
+    @property
+    def algod(self) -> AlgodClient:
+        return self._algod
+
+    @property
+    def round(self) -> Optional[int]:
+        """The last round applied to every committee indexed"""
+        with self._lock:
+            return min(self._applied.values()) if self._applied else None
+
+    def tracks(self, committee_appid: int) -> bool:
+        with self._lock:
+            return committee_appid in self._members
+
+    def members(self, committee_appid: int) -> FrozenSet[str]:
+        with self._lock:
+            members = self._members.get(committee_appid)
+            if members is None:
+                raise KeyError(f"Committee {committee_appid} is not in the index")
+            return members
+
+    def is_member(self, addr: str, committee_appid: Optional[int] = None) -> bool:
+        """Whether an account is a member of a committee, or of any committee"""
+        with self._lock:
+            committees = self._memberships.get(addr)
+            if not committees:
+                return False
+            return committee_appid is None or committee_appid in committees
+
+    def committees(self, addr: str) -> AbstractSet[int]:
+        """The committees an account is a member of"""
+        with self._lock:
+            return frozenset(self._memberships.get(addr, ()))
+
+    def load(self, committee_appid: int, assetid: Optional[int] = None, limit: int = 1000):
+        """
+        Index a committee from the holders of its membership asset, read
+        from the indexer. The asset is read from the committee's state
+        unless given.
+        """
+        if assetid is None:
+            state = AppState.fromapp(algodao.readcache.application_info(self._algod, committee_appid))
+            assetid = state.getint(Committee.GlobalInts.AssetId)
+        if self._indexer is None:
+            raise ValueError("Loading a committee needs an indexer")
+        holdings: Dict[str, int] = {}
+        nextpage: Optional[str] = None
+        loadedround = 0
+        # loading must not hold up interactive calls to a rate-limited API
+        with algodao.scheduler.bulk():
+            while True:
+                response: Dict[str, Any] = self._indexer.asset_balances(assetid, limit=limit, next_page=nextpage)
+                loadedround = max(loadedround, response.get('current-round', 0))
+                for balance in response['balances']:
+                    holdings[balance['address']] = balance['amount']
+                nextpage = response.get('next-token')
+                if not nextpage or not response['balances']:
+                    break
+        self.seed(committee_appid, assetid, holdings, loadedround)
+
+    def seed(self, committee_appid: int, assetid: int, holdings: Dict[str, int], algoround: int):
+        """Index a committee from the holdings of its membership asset at a round"""
+        with self._lock:
+            self._committees[assetid] = committee_appid
+            self._ledger.seed(assetid, holdings, algoround)
+            self._applied[assetid] = algoround
+            self._update(assetid)
+        log.info(f"Indexed {len(self._members[committee_appid])} members of committee {committee_appid}")
+
+    def applyblock(self, algoround: int, block: Dict[str, Any]):
+        """Apply the transfers of membership assets in a block"""
+        with self._lock:
+            # committees loaded from the indexer may be ahead of the others
+            pending = {assetid for assetid, applied in self._applied.items() if applied < algoround}
+            if not pending:
+                return
+            deltas = [delta for delta in algodao.ledger.blockdeltas(block) if delta.assetid in pending]
+            self._ledger.applydeltas(algoround, deltas)
+            for assetid in {delta.assetid for delta in deltas}:
+                self._update(assetid)
+            for assetid in pending:
+                self._applied[assetid] = algoround
+
+    def sync(self, algod: Optional[AlgodClient] = None) -> int:
+        """Apply the blocks produced since the last round applied, and return the last round"""
+        if algod is None:
+            algod = self._algod
+        lastround: int = algod.status()['last-round']
+        applied = self.round
+        if applied is None:
+            applied = lastround
+        for algoround in range(applied + 1, lastround + 1):
+            self.applyblock(algoround, algodao.blocks.getblock(algod, algoround))
+        return lastround
+
+    def start(self) -> MembershipIndex:
+        """Keep the index current from a background thread"""
+        with self._lock:
+            if self._follower is None:
+                self._follower = threading.Thread(target=self._follow, name='algodao-membership', daemon=True)
+                self._follower.start()
+        return self
+
+    def close(self):
+        self._stopped.set()
+
+    def _follow(self):
+        lastround = self.sync()
+        while not self._stopped.is_set():
+            try:
+                self._algod.status_after_block(lastround)
+                lastround = self.sync()
+            except Exception:
+                log.exception("Error following the chain for committee membership")
+                self._stopped.wait(FOLLOW_RETRY_SECONDS)
+
+    def _update(self, assetid: int):
+        # called with the lock held
+        committee_appid = self._committees[assetid]
+        appaddr = algosdk.logic.get_application_address(committee_appid)
+        members = frozenset(
+            addr for addr, amount in self._ledger.balances(assetid).items()
+            if amount > 0 and addr != appaddr
+        )
+        for addr in self._members.get(committee_appid, frozenset()) - members:
+            self._memberships[addr].discard(committee_appid)
+            if not self._memberships[addr]:
+                del self._memberships[addr]
+        for addr in members:
+            self._memberships.setdefault(addr, set()).add(committee_appid)
+        self._members[committee_appid] = members
+
+
+# indexes are shared by all clients of the same node
+_indexes: Dict[Tuple[str, str], MembershipIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _nodekey(algod: AlgodClient) -> Tuple[str, str]:
+    return algod.algod_address, algod.algod_token
+
+
+def register(index: MembershipIndex):
+    """Share an index with the clients of its node"""
+    with _indexes_lock:
+        _indexes[_nodekey(index.algod)] = index
+
+
+def existing(algod: AlgodClient) -> Optional[MembershipIndex]:
+    """The index registered for the client's node, if any"""
+    with _indexes_lock:
+        return _indexes.get(_nodekey(algod))
+
+
+def checkmember(algod: AlgodClient, addr: str, committee_appid: int):
+    """
+    Raise NotAMember if the index registered for the node tracks the
+    committee and the account is not a member, even once the index has
+    caught up with the last round
+    """
+    index = existing(algod)
+    if index is None or not index.tracks(committee_appid):
+        return
+    if index.is_member(addr, committee_appid):
+        return
+    # the account may have been made a member since the last round applied
+    index.sync(algod)
+    if not index.is_member(addr, committee_appid):
+        raise NotAMember(addr, committee_appid)
@@ -0,0 +1,198 @@
+"""
+Shared, round-scoped cache of suggested transaction parameters. Every
+transaction built by this package needs suggested params, and fetching them
+before each transaction doubles the RPC count of bulk voting or claiming.
+The params are instead fetched once per round: a background thread follows
+new blocks and refreshes the params when one is produced, and confirmations
+seen by algodao.helpers.wait_for_confirmation also mark the cached params as
+stale, so transactions built after a confirmation never reuse the params of
+an earlier round.
+"""
+import copy
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from algosdk.future.transaction import SuggestedParams
+from algosdk.v2client.algod import AlgodClient
+
+import algodao.readcache
+
+log = logging.getLogger(__name__)
+
+# the params are refetched after this many seconds even if no new round has
+# been seen, e.g. if the block follower is not running
+DEFAULT_MAXAGE = 10.0
+# seconds to wait before following blocks again after an error, doubled
+# after each consecutive error up to FOLLOW_MAX_RETRY_SECONDS
+FOLLOW_RETRY_SECONDS = 1.0
+FOLLOW_MAX_RETRY_SECONDS = 30.0
+
+
+class ParamsProvider:
+    """
+    Suggested params for a single algod node. The params are reused for
+    transactions until a newer round than `maxrounds` rounds past the round
+    they were fetched in has been seen, or until they are `maxage` seconds
+    old. A copy is returned on each call, since callers modify the params
+    (e.g., to set a flat fee).
+    """
+    def __init__(
+            self,
+            algod: AlgodClient,
+            maxrounds: int = 0,
+            maxage: float = DEFAULT_MAXAGE,
+            follow: bool = True,
+    ):
+        self._algod: AlgodClient = algod
+        self._maxrounds: int = maxrounds
+        self._maxage: float = maxage
+        self._follow: bool = follow
+        self._lock = threading.Lock()
+        self._params: Optional[SuggestedParams] = None
+        self._fetched: float = 0.0
+        # latest round known to have been produced
+        self._round: int = 0
+        self._follower: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._stats: Dict[str, int] = {'hits': 0, 'fetches': 0}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def get(self) -> SuggestedParams:
+        """Return suggested params valid for the current round"""
+        self._startfollower()
+        with self._lock:
+            if self._fresh():
+                self._stats['hits'] += 1
+                return copy.copy(self._params)
+        return copy.copy(self._refresh())
+
+    def follow(self) -> None:
+        """Start following blocks (if enabled), e.g. for other caches of the node"""
+        self._startfollower()
+
+    def observeround(self, algoround: int):
+        """Note that a round has been produced, e.g. a transaction confirmed in it"""
+        with self._lock:
+            self._round = max(self._round, algoround)
+
+    def invalidate(self):
+        with self._lock:
+            self._params = None
+
+    def close(self) -> None:
+        """Stop following blocks"""
+        self._stopped.set()
+
+    def _fresh(self) -> bool:
+        return (
+            self._params is not None
+            and self._round <= self._params.first + self._maxrounds
+            and time.monotonic() - self._fetched < self._maxage
+        )
+
+    def _refresh(self) -> SuggestedParams:
+        params = self._algod.suggested_params()
+        with self._lock:
+            self._stats['fetches'] += 1
+            # params of a later round may have been stored in the meantime
+            if self._params is None or params.first >= self._params.first:
+                self._params = params
+                self._fetched = time.monotonic()
+            self._round = max(self._round, params.first)
+            return self._params
+
+    def _startfollower(self) -> None:
+        if not self._follow or self._follower is not None:
+            return
+        with self._lock:
+            if self._follower is not None:
+                return
+            self._follower = threading.Thread(
+                target=self._followblocks,
+                name='algodao-params',
+                daemon=True,
+            )
+            self._follower.start()
+
+    def _followblocks(self):
+        retry = FOLLOW_RETRY_SECONDS
+        errors = 0
+        while not self._stopped.is_set():
+            try:
+                with self._lock:
+                    algoround = self._round
+                # returns once the round after algoround has been produced
+                status = self._algod.status_after_block(algoround)
+                self.observeround(status['last-round'])
+                algodao.readcache.observeround(self._algod, status['last-round'])
+                with self._lock:
+                    stale = not self._fresh()
+                if stale and not self._stopped.is_set():
+                    self._refresh()
+                retry = FOLLOW_RETRY_SECONDS
+                errors = 0
+            except Exception as exc:
+                errors += 1
+                if errors == 1:
+                    log.exception("Error following blocks for suggested params")
+                else:
+                    log.warning(f"Following blocks for suggested params failed {errors} times: {exc}")
+                self._stopped.wait(retry)
+                retry = min(2 * retry, FOLLOW_MAX_RETRY_SECONDS)
+
+
+# providers are shared by all clients of the same node
+_providers: Dict[Tuple[str, str], ParamsProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def _nodekey(algod: AlgodClient) -> Tuple[str, str]:
+    return algod.algod_address, algod.algod_token
+
+
+def provider(algod: AlgodClient) -> ParamsProvider:
+    """
+    The params provider shared by all transactions sent to the client's node.
+    The validity window can be widened with the ALGODAO_PARAMS_MAXROUNDS
+    environment variable.
+    """
+    key = _nodekey(algod)
+    with _providers_lock:
+        existing = _providers.get(key)
+        if existing is None:
+            existing = ParamsProvider(
+                algod,
+                maxrounds=int(os.getenv('ALGODAO_PARAMS_MAXROUNDS', '0')),
+            )
+            _providers[key] = existing
+        return existing
+
+
+def setprovider(algod: AlgodClient, params_provider: ParamsProvider):
+    """Use a custom provider (e.g., with a wider validity window) for the client's node"""
+    key = _nodekey(algod)
+    with _providers_lock:
+        previous = _providers.get(key)
+        _providers[key] = params_provider
+    if previous is not None and previous is not params_provider:
+        previous.close()
+
+
+def suggested_params(algod: AlgodClient) -> SuggestedParams:
+    """Suggested params for a new transaction, fetched at most once per round"""
+    return provider(algod).get()
+
+
+def observeround(algod: AlgodClient, algoround: int):
+    """Note a round seen by the client so cached params of earlier rounds expire"""
+    with _providers_lock:
+        existing = _providers.get(_nodekey(algod))
+    if existing is not None:
+        existing.observeround(algoround)
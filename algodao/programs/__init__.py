@@ -0,0 +1,25 @@
+"""
+PyTeal programs of the contracts. These are only needed to build contracts and
+are imported on first use by the approval_program and clear_program methods of
+the Create* classes, so that the deployed contract clients import without
+PyTeal.
+"""
+import importlib
+from typing import Any, Callable, Iterable, Optional
+
+
+def forwarder(module: str, names: Iterable[str], target: Optional[str] = None) -> Callable[[str], Any]:
+    """
+    A module __getattr__ for the module `module`, loading the PyTeal helpers
+    `names` that moved from it to algodao.programs on first use. They moved
+    to the programs module of the same name unless `target` is given.
+    """
+    moved = frozenset(names)
+    if target is None:
+        target = f'algodao.programs.{module.rsplit(".", 1)[-1]}'
+
+    def __getattr__(name: str) -> Any:
+        if name in moved:
+            return getattr(importlib.import_module(target), name)
+        raise AttributeError(f"module {module!r} has no attribute {name!r}")
+    return __getattr__
@@ -0,0 +1,163 @@
+"""
+PyTeal programs of the TokenDistributionTree contract and the NftCheckProgram
+example
+"""
+from pyteal import App, Seq, Bytes, Btoi, Txn, Int, Assert, Return, AssetHolding
+from pyteal import Cond, Global, InnerTxnBuilder, TxnField, TxnType
+from pyteal import InnerTxn, And, ScratchVar, TealType, Sha256, Concat
+from pyteal import OnComplete, Len, For, If, Substring, Expr
+
+from algodao.assets import TokenDistributionTree
+
+
+def tree_approval_program() -> Expr:
+    # creation arguments: RootHash, RegBegin, RegEnd
+    # Claim arguments: address, vote count, Merkle index, Merkle proof
+    GlobalInts = TokenDistributionTree.GlobalInts
+    GlobalBytes = TokenDistributionTree.GlobalBytes
+    on_creation = Seq([
+        Assert(Txn.application_args.length() == Int(3)),
+        GlobalBytes.RootHash.put(Txn.application_args[0]),
+        GlobalInts.RegBegin.put(Btoi(Txn.application_args[1])),
+        GlobalInts.RegEnd.put(Btoi(Txn.application_args[2])),
+        GlobalInts.AssetId.put(Int(0)),
+        Return(Int(1)),
+    ])
+    is_creator = Txn.sender() == Global.creator_address()
+    on_optintoken = Seq([
+        Assert(is_creator),
+        Assert(Txn.application_args.length() == Int(2)),
+        InnerTxnBuilder.Begin(),
+        InnerTxnBuilder.SetFields({
+            TxnField.type_enum: TxnType.AssetTransfer,
+            TxnField.asset_receiver: Global.current_application_address(),
+            TxnField.xfer_asset: Btoi(Txn.application_args[1]),
+            TxnField.asset_amount: Int(0),
+        }),
+        InnerTxnBuilder.Submit(),
+        GlobalInts.AssetId.put(Btoi(Txn.application_args[1])),
+        Return(Int(1)),
+    ])
+    on_inittoken = Seq([
+        Assert(is_creator),
+        Assert(Txn.application_args.length() == Int(5)),
+        InnerTxnBuilder.Begin(),
+        InnerTxnBuilder.SetFields({
+            TxnField.type_enum: TxnType.AssetConfig,
+            TxnField.config_asset_total: Btoi(Txn.application_args[1]),
+            TxnField.config_asset_unit_name: Txn.application_args[2],
+            TxnField.config_asset_name: Txn.application_args[3],
+            TxnField.config_asset_url: Txn.application_args[4],
+            TxnField.config_asset_manager: Global.current_application_address(),
+        }),
+        InnerTxnBuilder.Submit(),
+        GlobalInts.AssetId.put(InnerTxn.created_asset_id()),
+        Return(Int(1)),
+    ])
+    on_closeout = Return(Int(1))
+    on_register = Return(
+        And(
+            Global.round() >= App.globalGet(Bytes("RegBegin")),
+            Global.round() <= App.globalGet(Bytes("RegEnd")),
+        )
+    )
+    count = Txn.application_args[1]  # bytes representation of a uint64
+    index = Btoi(Txn.application_args[2])  # uint64
+    proof = Txn.application_args[3]  # bytes
+    runninghash = ScratchVar(TealType.bytes)
+    on_claim = Seq([
+        Assert(
+            And(
+                Txn.application_args.length() == Int(4),
+                Global.round() >= GlobalInts.RegBegin.get(),
+                Global.round() <= GlobalInts.RegEnd.get(),
+            )
+        ),
+        runninghash.store(Sha256(Concat(Txn.sender(), Bytes(':'), count))),
+        verifymerkle(index, proof, runninghash, GlobalBytes.RootHash.get()),
+        transferelectiontokens(Btoi(count)),
+        Return(Int(1)),
+    ])
+    program = Cond(
+        [Txn.application_id() == Int(0), on_creation],
+        [Txn.on_completion() == OnComplete.DeleteApplication, Return(is_creator)],
+        [Txn.on_completion() == OnComplete.UpdateApplication, Return(is_creator)],
+        [Txn.on_completion() == OnComplete.CloseOut, on_closeout],
+        [Txn.on_completion() == OnComplete.OptIn, on_register],
+        [Txn.application_args[0] == Bytes("claim"), on_claim],
+        [Txn.application_args[0] == Bytes('inittoken'), on_inittoken],
+        [Txn.application_args[0] == Bytes('optintoken'), on_optintoken],
+    )
+    return program
+
+
+def tree_clear_program() -> Expr:
+    return Return(Int(1))
+
+
+def verifymerkle(index: Expr, proof: Expr, runninghash: ScratchVar, roothash: Expr):
+    i = ScratchVar(TealType.uint64)
+    levelindex = ScratchVar(TealType.uint64)
+    return Seq([
+        Assert(Len(proof) % Int(32) == Int(0)),
+        levelindex.store(index),
+        For(
+            i.store(Int(0)),
+            i.load() < Len(proof),
+            i.store(i.load() + Int(32))
+        ).Do(
+            Seq([
+                If(
+                    levelindex.load() % Int(2) == Int(0),
+                    runninghash.store(Sha256(Concat(
+                        runninghash.load(),
+                        Substring(proof, i.load(), i.load() + Int(32)),
+                    ))),
+                    runninghash.store(Sha256(Concat(
+                        Substring(proof, i.load(), i.load() + Int(32)),
+                        runninghash.load()
+                    )))
+                ),
+                levelindex.store(levelindex.load() / Int(2)),
+            ])
+        ),
+        Assert(runninghash.load() == roothash)
+    ])
+
+
+def transferelectiontokens(count) -> Expr:
+    return Seq([
+        InnerTxnBuilder.Begin(),
+        InnerTxnBuilder.SetFields({
+            TxnField.type_enum: TxnType.AssetTransfer,
+            TxnField.xfer_asset: App.globalGet(Bytes("AssetId")),
+            TxnField.asset_receiver: Txn.sender(),
+            TxnField.asset_amount: count,
+        }),
+        InnerTxnBuilder.Submit(),
+    ])
+
+
+def nftcheck_approval_program() -> Expr:
+    on_creation = Seq(
+        [
+            Assert(Txn.application_args.length() == Int(1)),
+            App.globalPut(Bytes("AssetId"), Btoi(Txn.application_args[0])),
+            Return(Int(1)),
+        ]
+    )
+    assetbalance = AssetHolding.balance(
+        Txn.sender(),
+        App.globalGet(Bytes("AssetId"))
+    )
+    on_run = Seq(
+        assetbalance,
+        Assert(assetbalance.hasValue()),
+        Assert(assetbalance.value() > Int(0)),
+        Return(Int(1))
+    )
+    program = Cond(
+        [Txn.application_id() == Int(0), on_creation],
+        [Int(1) == Int(1), on_run],
+    )
+    return program
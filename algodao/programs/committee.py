@@ -0,0 +1,202 @@
+"""
+PyTeal programs of the Committee contract
+"""
+from pyteal import Expr, Seq, Assert, App, Bytes, Btoi, Return, Int, Txn, And, Or, Not
+from pyteal import Len, Subroutine, TealType, For, ScratchVar
+from pyteal import Substring, Concat, Cond, OnComplete
+from pyteal import InnerTxnBuilder, TxnField, TxnType, Global, InnerTxn
+from pyteal import AssetHolding, Gtxn
+
+from algodao.committee import Committee
+
+
+@Subroutine(TealType.uint64)
+def is_member(asset_id: Expr, address: Expr) -> Expr:
+    assetbalance = AssetHolding.balance(address, asset_id)
+    return Seq([
+        assetbalance,
+        Return(And(
+            assetbalance.hasValue(),
+            assetbalance.value() > Int(0))
+        )
+    ])
+
+
+@Subroutine(TealType.uint64)
+def current_committee_size_ex(app_id: Expr, app_addr: Expr):
+    """
+    Find the current number of committee members by subtracting
+    the number of assets currently owned by the Committee contract from
+    the max members allowed (i.e., the total number of assets
+    created).
+    """
+    assetid = App.globalGetEx(app_id, Bytes("AssetId"))
+    maxmembers = App.globalGetEx(app_id, Bytes("MaxMembers"))
+    reservebalance = AssetHolding.balance(app_addr, assetid.value())
+    return Seq([
+        assetid,
+        Assert(assetid.hasValue()),
+        maxmembers,
+        Assert(maxmembers.hasValue()),
+        reservebalance,
+        Assert(reservebalance.hasValue()),
+        Return(maxmembers.value() - reservebalance.value())
+    ])
+
+
+@Subroutine(TealType.none)
+def set_asset_freeze(address: Expr, assetid: Expr, frozen: Expr) -> Expr:
+    return Seq([
+        InnerTxnBuilder.Begin(),
+        InnerTxnBuilder.SetFields({
+            TxnField.type_enum: TxnType.AssetFreeze,
+            TxnField.freeze_asset_account: address,
+            TxnField.freeze_asset_frozen: frozen,
+            TxnField.freeze_asset: assetid,
+        }),
+        InnerTxnBuilder.Submit(),
+    ])
+
+
+@Subroutine(TealType.none)
+def send_asset(address: Expr, assetid: Expr):
+    return Seq([
+       InnerTxnBuilder.Begin(),
+       InnerTxnBuilder.SetFields({
+           TxnField.type_enum: TxnType.AssetTransfer,
+           TxnField.asset_receiver: address,
+           TxnField.xfer_asset: assetid,
+           TxnField.asset_amount: Int(1),
+       }),
+       InnerTxnBuilder.Submit(),
+    ])
+
+
+@Subroutine(TealType.none)
+def add_member(address: Expr) -> Expr:
+    return Seq([
+        send_asset(address, App.globalGet(Bytes("AssetId"))),
+        set_asset_freeze(address, App.globalGet(Bytes("AssetId")), Int(1)),
+    ])
+
+
+@Subroutine(TealType.none)
+def add_members(addresses: Expr) -> Expr:
+    index = ScratchVar(TealType.uint64)
+    return Seq([
+        Assert(Len(addresses) % Int(32) == Int(0)),
+        For(
+            index.store(Int(0)),
+            index.load() < Len(addresses),
+            index.store(index.load() + Int(32))
+        ).Do(
+            add_member(Substring(
+                addresses,
+                index.load(),
+                index.load() + Int(32)
+            ))
+        ),
+    ])
+
+
+def committee_approval_program() -> Expr:
+    GlobalInts = Committee.GlobalInts
+    GlobalBytes = Committee.GlobalBytes
+    on_creation = Seq([
+        Assert(Txn.application_args.length() == Int(3)),
+        GlobalBytes.CommitteeName.put(Txn.application_args[0]),
+        GlobalInts.MaxMembers.put(Btoi(Txn.application_args[1])),
+        GlobalInts.AssetId.put(Int(0)),
+        GlobalInts.MembersSet.put(Int(0)),
+        GlobalInts.SeedingEnd.put(Global.round() + Btoi(Txn.application_args[2])),
+        Return(Int(1)),
+    ])
+    on_register = Return(Int(1))
+    on_inittoken = Seq([
+        InnerTxnBuilder.Begin(),
+        InnerTxnBuilder.SetFields({
+            TxnField.type_enum: TxnType.AssetConfig,
+            TxnField.config_asset_total: GlobalInts.MaxMembers.get(),
+            TxnField.config_asset_unit_name: Bytes("CMT"),
+            TxnField.config_asset_name: Concat(
+                GlobalBytes.CommitteeName.get(),
+                Bytes(" Membership")
+            ),
+            TxnField.config_asset_url: Txn.application_args[1],
+            TxnField.config_asset_freeze: Global.current_application_address(),
+            TxnField.config_asset_clawback: Global.current_application_address(),
+            TxnField.config_asset_manager: Global.current_application_address(),
+        }),
+        InnerTxnBuilder.Submit(),
+        GlobalInts.AssetId.put(InnerTxn.created_asset_id()),
+        Return(Int(1)),
+    ])
+    on_optintoken = Seq([
+        Assert(Txn.sender() == Global.creator_address()),
+        InnerTxnBuilder.Begin(),
+        InnerTxnBuilder.SetFields({
+            TxnField.type_enum: TxnType.AssetTransfer,
+            TxnField.asset_receiver: Global.current_application_address(),
+            TxnField.xfer_asset: Btoi(Txn.application_args[1]),
+            TxnField.asset_amount: Int(0),
+        }),
+        Return(Int(1)),
+    ])
+    assetbalance = AssetHolding.balance(
+        Global.current_application_address(),
+        GlobalInts.AssetId.get(),
+    )
+    remaining = AssetHolding.balance(
+        Global.current_application_address(),
+        GlobalInts.AssetId.get(),
+    )
+    on_setmembers = Seq([
+        # only allow arbitrary selection of members by creator while the
+        # initial members are being seeded. Large committees are seeded
+        # over several calls; seeding closes when a call sets the final
+        # flag, when every token has been given out, or when the seeding
+        # rounds set at creation have passed, whichever comes first.
+        # TODO: allow addition and removal of committee members according
+        # TODO: to DAO charter (e.g., vote)
+        Assert(Global.creator_address() == Txn.sender()),
+        Assert(Txn.application_args.length() == Int(3)),
+        Assert(Not(GlobalInts.MembersSet.get())),
+        Assert(Global.round() <= GlobalInts.SeedingEnd.get()),
+        assetbalance,
+        Assert(assetbalance.hasValue()),
+        add_members(Txn.application_args[1]),
+        remaining,
+        GlobalInts.MembersSet.put(Or(
+            Btoi(Txn.application_args[2]),
+            remaining.value() == Int(0),
+        )),
+        Return(Int(1)),
+    ])
+    on_resign = Seq([
+        Assert(And(
+            Global.group_size() == Int(2),
+            Txn.group_index() == Int(0),
+            Gtxn[1].xfer_asset() == GlobalInts.AssetId.get(),
+            Gtxn[1].asset_amount() == Int(1),
+            Gtxn[1].asset_receiver() == Global.current_application_address(),
+        )),
+        set_asset_freeze(Txn.sender(), GlobalInts.AssetId.get(), Int(0)),
+        Return(Int(1))
+    ])
+    on_checkmembership = Return(is_member(GlobalInts.AssetId.get(), Txn.sender()))
+    return Cond(
+        [Txn.application_id() == Int(0), on_creation],
+        [Txn.on_completion() == OnComplete.DeleteApplication, Return(Int(0))],
+        [Txn.on_completion() == OnComplete.UpdateApplication, Return(Int(0))],
+        [Txn.on_completion() == OnComplete.CloseOut, Return(Int(1))],
+        [Txn.on_completion() == OnComplete.OptIn, on_register],
+        [Txn.application_args[0] == Bytes("resign"), on_resign],
+        [Txn.application_args[0] == Bytes("checkmembership"), on_checkmembership],
+        [Txn.application_args[0] == Bytes("inittoken"), on_inittoken],
+        [Txn.application_args[0] == Bytes("setmembers"), on_setmembers],
+        [Txn.application_args[0] == Bytes("optintoken"), on_optintoken],
+    )
+
+
+def committee_clear_program() -> Expr:
+    return Return(Int(1))
@@ -0,0 +1,506 @@
+"""
+PyTeal programs of the AlgoDao and PreapprovalGate contracts
+"""
+from pyteal import Seq, Assert, App, Return, Int, Btoi, Txn, Expr, Bytes
+from pyteal import Cond, Gtxn, Global, Len, Concat, OnComplete, And, Or, Not
+from pyteal import InnerTxnBuilder, TxnField, TxnType, If, Subroutine, TealType
+from pyteal import InnerTxn, AssetHolding, ScratchVar, For, Substring
+from pyteal import AppParam, Sha256, Sha512_256, Itob
+
+from algodao.committee import Committee
+from algodao.governance import AlgoDao, PreapprovalGate, ConsiderationKind
+from algodao.governance import PROPOSAL_RULE_LEN, PROGRAM_HASH_PREFIX
+from algodao.programs.committee import is_member, current_committee_size_ex
+from algodao.programs.committee import set_asset_freeze, send_asset
+from algodao.programs.voting import proposal_payment_amount, proposal_payment_address
+from algodao.voting import Proposal, ProposalType
+
+
+def appaddr(appid: Expr):
+    return Sha512_256(
+        Concat(Bytes("appID"), Itob(appid))
+    )
+
+
+@Subroutine(TealType.uint64)
+def proposal_trusted(proposal_appid: Expr, trust_assetid: Expr):
+    """
+    Check that the proposal is trusted (has been assigned a Trust token)
+    """
+    trusted = AssetHolding.balance(appaddr(proposal_appid), trust_assetid)
+    return Seq([
+        trusted,
+        Return(And(trusted.hasValue(), trusted.value() > Int(0)))
+    ])
+
+
+@Subroutine(TealType.bytes)
+def find_rule(proposal_rules: Expr, proposal_type: Expr):
+    """
+    Find the rule that applies to the specified proposal type
+    """
+    index = ScratchVar(TealType.uint64)
+    return Seq([
+        For(
+            index.store(Int(0)),
+            index.load() < Len(proposal_rules),
+            index.store(index.load() + Int(PROPOSAL_RULE_LEN))
+        ).Do(
+            If(
+                Btoi(Substring(proposal_rules, index.load(), index.load() + Int(8))) == proposal_type,
+                Return(Substring(
+                    proposal_rules,
+                    index.load() + Int(8),
+                    index.load() + Int(PROPOSAL_RULE_LEN)
+                )),
+            )
+        ),
+        # proposal type not found in rules
+        Assert(Int(0)),
+        # previous assert will always fail by TEAL still requires a Return
+        Return(Bytes('')),
+    ])
+
+
+@Subroutine(TealType.uint64)
+def satisfies_rule(proposal_appid: Expr, rule: Expr):
+    """
+    Check that the given Proposal satisfies the specified rule
+    """
+    vtype_data = App.globalGetEx(proposal_appid, Proposal.GlobalBytes.VoteTypeData.bytes)
+    return Seq([
+        vtype_data,
+        Assert(vtype_data.hasValue()),
+        Return(rule == vtype_data.value()),
+    ])
+
+
+@Subroutine(TealType.uint64)
+def proposal_meets_criteria(proposal_appid: Expr, proposal_rules: Expr):
+    """
+    Check that the proposal meets the criteria specified by the DAO for this
+    type of proposal.
+    """
+    proposal_type = App.globalGetEx(proposal_appid, Proposal.GlobalInts.ProposalType.bytes)
+    rule = ScratchVar(TealType.bytes)
+    return Seq([
+        proposal_type,
+        Assert(proposal_type.hasValue()),
+        rule.store(find_rule(proposal_rules, proposal_type.value())),
+        Return(satisfies_rule(proposal_appid, rule.load())),
+    ])
+
+
+@Subroutine(TealType.none)
+def grant_trust(address: Expr, trust_assetid: Expr):
+    """
+    Send a single (frozen) trust token to the address
+    """
+    return Seq([
+        set_asset_freeze(Global.current_application_address(), trust_assetid, Int(0)),
+        send_asset(address, trust_assetid),
+        set_asset_freeze(address, trust_assetid, Int(1)),
+    ])
+
+
+@Subroutine(TealType.uint64)
+def considered_in_other_slot(subject: Expr, slot: Expr, numslots: Expr):
+    """
+    Check whether the app address (or program hash) is already under
+    consideration in another slot of the PreapprovalGate
+    """
+    SlotInts = PreapprovalGate.SlotInts
+    index = ScratchVar(TealType.uint64)
+    return Seq([
+        For(
+            index.store(Int(0)),
+            index.load() < numslots,
+            index.store(index.load() + Int(1))
+        ).Do(
+            If(
+                And(
+                    index.load() != slot,
+                    SlotInts.VoteInProgress.get(index.load()),
+                    PreapprovalGate.SlotBytes.ConsideredAppAddr.get(index.load()) == subject,
+                ),
+                Return(Int(1)),
+            )
+        ),
+        Return(Int(0)),
+    ])
+
+
+@Subroutine(TealType.none)
+def rescind_vote(account: Expr, slot: Expr):
+    """
+    Remove the account's vote from the tally of the given PreapprovalGate slot
+    """
+    SlotInts = PreapprovalGate.SlotInts
+    LocalInts = PreapprovalGate.LocalInts
+    return If(
+        LocalInts.Vote.get(account, slot),
+        SlotInts.YesVotes.put(slot, SlotInts.YesVotes.get(slot) - Int(1)),
+        SlotInts.NoVotes.put(slot, SlotInts.NoVotes.get(slot) - Int(1))
+    )
+
+
+@Subroutine(TealType.uint64)
+def proposal_passed(proposal_appid: Expr):
+    passed = App.globalGetEx(proposal_appid, Proposal.GlobalInts.Passed.bytes)
+    return Seq([
+        passed,
+        Return(And(passed.hasValue(), passed.value()))
+    ])
+
+
+@Subroutine(TealType.none)
+def implement_proposal(proposal_appid: Expr):
+    proposal_type = App.globalGetEx(proposal_appid, Proposal.GlobalInts.ProposalType.bytes)
+    addl_data = App.globalGetEx(proposal_appid, Proposal.GlobalBytes.AdditionalData.bytes)
+    return Seq([
+        proposal_type,
+        addl_data,
+        Assert(And(proposal_type.hasValue(), addl_data.hasValue())),
+        If(
+            proposal_type.value() == Int(ProposalType.PAYMENT.value),
+            Seq([
+                InnerTxnBuilder.Begin(),
+                InnerTxnBuilder.SetFields({
+                    TxnField.type_enum: TxnType.Payment,
+                    TxnField.receiver: proposal_payment_address(addl_data.value()),
+                    TxnField.amount: proposal_payment_amount(addl_data.value()),
+                }),
+                InnerTxnBuilder.Submit(),
+            ])
+
+        )
+        # TODO: implement other proposal types
+    ])
+
+
+def dao_approval_program() -> Expr:
+    GlobalBytes = AlgoDao.GlobalBytes
+    GlobalInts = AlgoDao.GlobalInts
+    on_creation = Seq([
+        Assert(Txn.application_args.length() == Int(2)),
+        GlobalBytes.Name.put(Txn.application_args[0]),
+        GlobalInts.TrustAsset.put(Btoi(Txn.application_args[1])),
+        GlobalBytes.Committees.put(Bytes(b'')),
+        GlobalInts.Finalized.put(Int(0)),
+        GlobalInts.Closed.put(Int(0)),
+        GlobalBytes.ProposalRules.put(Bytes(b'')),
+        Return(Int(1)),
+    ])
+    setup_phase_approved = And(
+        Not(GlobalInts.Finalized.get()),
+        Txn.sender() == Global.creator_address()
+    )
+    on_addcommittee = Seq([
+        Assert(setup_phase_approved),
+        Assert(Txn.application_args.length() == Int(2)),
+        Assert(Len(Txn.application_args[1]) == Int(8)),
+        GlobalBytes.Committees.put(Concat(
+            GlobalBytes.Committees.get(),
+            Txn.application_args[1]
+        )),
+        Return(Int(1)),
+    ])
+    on_addrule = Seq([
+        Assert(setup_phase_approved),
+        Assert(Txn.application_args.length() == Int(2)),
+        Assert(Len(Txn.application_args[1]) == Int(PROPOSAL_RULE_LEN)),
+        GlobalBytes.ProposalRules.put(Concat(
+            GlobalBytes.ProposalRules.get(),
+            Txn.application_args[1]
+        )),
+        Return(Int(1)),
+    ])
+    on_finalize = Seq([
+        Assert(setup_phase_approved),
+        Assert(Txn.application_args.length() == Int(1)),
+        GlobalInts.Finalized.put(Int(1)),
+        Return(Int(1)),
+    ])
+    # each implementproposal call is immediately followed in the group
+    # by the setimplemented call of the proposal it implements, which
+    # allows several proposals to be implemented in a single group
+    setimplemented_txn = Gtxn[Txn.group_index() + Int(1)]
+    proposal_appid = setimplemented_txn.application_id()
+    on_implementproposal = Seq([
+        Assert(GlobalInts.Finalized.get()),
+        Assert(Txn.group_index() + Int(1) < Global.group_size()),
+        Assert(Txn.application_args.length() == Int(1)),
+        Assert(setimplemented_txn.type_enum() == TxnType.ApplicationCall),
+        Assert(setimplemented_txn.application_args[0] == Bytes('setimplemented')),
+        Assert(proposal_trusted(proposal_appid, GlobalInts.TrustAsset.get())),
+        Assert(proposal_meets_criteria(proposal_appid, GlobalBytes.ProposalRules.get())),
+        Assert(proposal_passed(proposal_appid)),
+        implement_proposal(proposal_appid),
+        Return(Int(1)),
+    ])
+    can_delete = Seq([
+        Return(Or(
+            # DAO has not been finalized and sender is attempting to delete
+            setup_phase_approved,
+            # or, DAO has been closed out by the specified closure process,
+            And(
+                GlobalInts.Closed.get(),
+                Txn.sender() == Global.creator_address()
+            )
+        ))
+    ])
+    # TODO: add ability to change governance structure via proposal
+    can_update = Return(Int(0))
+    return Cond(
+        [Txn.application_id() == Int(0), on_creation],
+        [Txn.on_completion() == OnComplete.DeleteApplication, can_delete],
+        [Txn.on_completion() == OnComplete.UpdateApplication, can_update],
+        [Txn.application_args[0] == Bytes('addcommittee'), on_addcommittee],
+        [Txn.application_args[0] == Bytes('addrule'), on_addrule],
+        [Txn.application_args[0] == Bytes('finalize'), on_finalize],
+        [Txn.application_args[0] == Bytes('implementproposal'), on_implementproposal]
+    )
+
+
+def dao_clear_program() -> Expr:
+    return Return(Int(1))
+
+
+def gate_approval_program() -> Expr:
+    GlobalInts = PreapprovalGate.GlobalInts
+    GlobalBytes = PreapprovalGate.GlobalBytes
+    SlotInts = PreapprovalGate.SlotInts
+    SlotBytes = PreapprovalGate.SlotBytes
+    LocalInts = PreapprovalGate.LocalInts
+    # slot variables that have not been written yet read as zero or
+    # empty bytes, so they do not need to be initialized on creation
+    on_creation = Seq([
+        Assert(Txn.application_args.length() == Int(4)),
+        GlobalInts.Initialized.put(Int(0)),
+        GlobalInts.CommitteeId.put(Btoi(Txn.application_args[0])),
+        # TODO: necessary to save both the app id and the address?
+        GlobalBytes.CommitteeAddr.put(Txn.application_args[1]),
+        GlobalInts.TrustAssetId.put(Int(0)),
+        GlobalInts.MinRoundsPerProposal.put(Btoi(Txn.application_args[2])),
+        GlobalInts.NumSlots.put(Btoi(Txn.application_args[3])),
+        GlobalInts.Considerations.put(Int(0)),
+        Return(Int(1)),
+    ])
+    on_inittoken = Seq([
+        Assert(Not(GlobalInts.Initialized.get())),
+        InnerTxnBuilder.Begin(),
+        InnerTxnBuilder.SetFields({
+            TxnField.type_enum: TxnType.AssetConfig,
+            TxnField.config_asset_total: Btoi(Txn.application_args[1]),
+            TxnField.config_asset_unit_name: Txn.application_args[2],
+            TxnField.config_asset_name: Txn.application_args[3],
+            TxnField.config_asset_url: Txn.application_args[4],
+            TxnField.config_asset_manager: Global.current_application_address(),
+            # TxnField.config_asset_default_frozen: Int(1),
+            TxnField.config_asset_freeze: Global.current_application_address(),
+            TxnField.config_asset_clawback: Global.current_application_address(),
+            TxnField.config_asset_reserve: Global.current_application_address(),
+            TxnField.config_asset_decimals: Int(0),
+        }),
+        InnerTxnBuilder.Submit(),
+        GlobalInts.TrustAssetId.put(InnerTxn.created_asset_id()),
+        GlobalInts.Initialized.put(Int(1)),
+        Return(Int(1)),
+    ])
+    assetid = App.globalGetEx(
+        GlobalInts.CommitteeId.get(),
+        Committee.GlobalInts.AssetId.bytes,
+    )
+    committeesize = current_committee_size_ex(
+        GlobalInts.CommitteeId.get(),
+        GlobalBytes.CommitteeAddr.get(),
+    )
+    slot = ScratchVar(TealType.uint64)
+    kind = SlotInts.ConsideredKind.get(slot.load())
+    subject = SlotBytes.ConsideredAppAddr.get(slot.load())
+
+    def consider(appid: Expr, subject: Expr, kind: Expr) -> Expr:
+        return Seq([
+            # Any committee member can submit a proposal (or program
+            # hash) for consideration in any slot. If another contract
+            # is being considered in that slot, it can be replaced
+            # without a definite conclusion. This allows thet committee
+            # to move on to another contract if there is uncertainty.
+            # However a certain number of rounds must have passed before
+            # moving on to another contract. This prevents a single
+            # member from spamming the contract and preventing other
+            # contracts from being considered.
+            assetid,
+            Assert(And(
+                assetid.hasValue(),
+                is_member(assetid.value(), Txn.sender())
+            )),
+            Assert(Txn.application_args.length() == Int(4)),
+            slot.store(Btoi(Txn.application_args[3])),
+            Assert(slot.load() < GlobalInts.NumSlots.get()),
+            Assert(Not(considered_in_other_slot(
+                subject,
+                slot.load(),
+                GlobalInts.NumSlots.get(),
+            ))),
+            If(
+                SlotInts.VoteInProgress.get(slot.load()),
+                Assert(
+                    Global.round() > SlotInts.VotingStartRound.get(slot.load())
+                       + GlobalInts.MinRoundsPerProposal.get()
+                )
+            ),
+            GlobalInts.Considerations.put(GlobalInts.Considerations.get() + Int(1)),
+            SlotInts.ConsiderationId.put(slot.load(), GlobalInts.Considerations.get()),
+            SlotInts.VoteInProgress.put(slot.load(), Int(1)),
+            SlotInts.VotingStartRound.put(slot.load(), Global.round()),
+            SlotInts.ConsideredAppId.put(slot.load(), appid),
+            SlotInts.ConsideredKind.put(slot.load(), kind),
+            SlotBytes.ConsideredAppAddr.put(slot.load(), subject),
+            SlotInts.YesVotes.put(slot.load(), Int(0)),
+            SlotInts.NoVotes.put(slot.load(), Int(0)),
+            Return(Int(1)),
+        ])
+    on_assessproposal = consider(
+        Btoi(Txn.application_args[1]),
+        Txn.application_args[2],
+        Int(ConsiderationKind.TRUST_APP.value),
+    )
+    # arguments: program hash, 1 to add it to the allowlist or 0 to
+    # remove it, slot
+    on_assesshash = Seq([
+        Assert(Len(Txn.application_args[1]) == Int(32)),
+        consider(
+            Int(0),
+            Txn.application_args[1],
+            If(
+                Btoi(Txn.application_args[2]),
+                Int(ConsiderationKind.ALLOW_HASH.value),
+                Int(ConsiderationKind.DISALLOW_HASH.value),
+            ),
+        ),
+    ])
+    on_passed = Cond(
+        [
+            kind == Int(ConsiderationKind.TRUST_APP.value),
+            grant_trust(subject, GlobalInts.TrustAssetId.get()),
+        ],
+        [
+            kind == Int(ConsiderationKind.ALLOW_HASH.value),
+            App.globalPut(Concat(Bytes(PROGRAM_HASH_PREFIX), subject), Int(1)),
+        ],
+        [
+            kind == Int(ConsiderationKind.DISALLOW_HASH.value),
+            App.globalDel(Concat(Bytes(PROGRAM_HASH_PREFIX), subject)),
+        ],
+    )
+    on_vote = Seq([
+        assetid,
+        Assert(And(
+            assetid.hasValue(),
+            is_member(assetid.value(), Txn.sender()))
+        ),
+        Assert(Txn.application_args.length() == Int(4)),
+        slot.store(Btoi(Txn.application_args[3])),
+        Assert(slot.load() < GlobalInts.NumSlots.get()),
+        # check that the application ID (or program hash) the member is
+        # attempting to vote on is in fact the one under consideration
+        Assert(If(
+            kind == Int(ConsiderationKind.TRUST_APP.value),
+            SlotInts.ConsideredAppId.get(slot.load()) == Btoi(Txn.application_args[1]),
+            subject == Txn.application_args[1],
+        )),
+        # check that the vote is in fact in progress
+        Assert(SlotInts.VoteInProgress.get(slot.load())),
+        If(
+            LocalInts.VotedConsideration.get(Txn.sender(), slot.load())
+                == SlotInts.ConsiderationId.get(slot.load()),
+            # user has already voted on this proposal; first rescind their
+            # previous vote
+            rescind_vote(Txn.sender(), slot.load()),
+        ),
+        LocalInts.VotedConsideration.put(
+            Txn.sender(),
+            slot.load(),
+            SlotInts.ConsiderationId.get(slot.load())
+        ),
+        LocalInts.Vote.put(Txn.sender(), slot.load(), Btoi(Txn.application_args[2])),
+        If(
+            LocalInts.Vote.get(Txn.sender(), slot.load()),
+            SlotInts.YesVotes.put(slot.load(), SlotInts.YesVotes.get(slot.load()) + Int(1)),
+            SlotInts.NoVotes.put(slot.load(), SlotInts.NoVotes.get(slot.load()) + Int(1))
+        ),
+        # if this vote leads to a definitive result, immediately close the
+        # vote and execute on the result
+        If(
+            # TODO: allow approval method other than majority vote
+            SlotInts.YesVotes.get(slot.load()) > committeesize / Int(2),
+            Seq([
+                on_passed,
+                SlotInts.VoteInProgress.put(slot.load(), Int(0)),
+            ])
+        ),
+        If(
+            SlotInts.NoVotes.get(slot.load()) > committeesize / Int(2),
+            Seq([
+                SlotInts.VoteInProgress.put(slot.load(), Int(0)),
+            ])
+        ),
+        Return(Int(1)),
+    ])
+    # anyone may have an app trusted without a committee vote if its
+    # programs match a hash on the allowlist
+    candidate_appid = Btoi(Txn.application_args[1])
+    approval = AppParam.approvalProgram(candidate_appid)
+    clear = AppParam.clearStateProgram(candidate_appid)
+    on_autotrust = Seq([
+        Assert(Txn.application_args.length() == Int(2)),
+        approval,
+        clear,
+        Assert(And(approval.hasValue(), clear.hasValue())),
+        Assert(App.globalGet(Concat(
+            Bytes(PROGRAM_HASH_PREFIX),
+            Sha256(Concat(approval.value(), clear.value()))
+        )) == Int(1)),
+        # only a single trust token is ever sent to an app
+        Assert(Not(proposal_trusted(candidate_appid, GlobalInts.TrustAssetId.get()))),
+        grant_trust(appaddr(candidate_appid), GlobalInts.TrustAssetId.get()),
+        Return(Int(1)),
+    ])
+    on_closeout = gate_clear_program()
+    return Cond(
+        [Txn.application_id() == Int(0), on_creation],
+        [Txn.on_completion() == OnComplete.UpdateApplication, Return(Int(0))],
+        [Txn.on_completion() == OnComplete.DeleteApplication, Return(Int(0))],
+        [Txn.on_completion() == OnComplete.OptIn, Return(Int(1))],
+        [Txn.on_completion() == OnComplete.CloseOut, on_closeout],
+        [Txn.application_args[0] == Bytes('inittoken'), on_inittoken],
+        [Txn.application_args[0] == Bytes('assessproposal'), on_assessproposal],
+        [Txn.application_args[0] == Bytes('assesshash'), on_assesshash],
+        [Txn.application_args[0] == Bytes('vote'), on_vote],
+        [Txn.application_args[0] == Bytes('autotrust'), on_autotrust],
+    )
+
+
+def gate_clear_program() -> Expr:
+    GlobalInts = PreapprovalGate.GlobalInts
+    SlotInts = PreapprovalGate.SlotInts
+    LocalInts = PreapprovalGate.LocalInts
+    slot = ScratchVar(TealType.uint64)
+    return Seq([
+        For(
+            slot.store(Int(0)),
+            slot.load() < GlobalInts.NumSlots.get(),
+            slot.store(slot.load() + Int(1))
+        ).Do(
+            If(
+                And(
+                    SlotInts.VoteInProgress.get(slot.load()),
+                    LocalInts.VotedConsideration.get(Txn.sender(), slot.load())
+                        == SlotInts.ConsiderationId.get(slot.load())
+                ),
+                rescind_vote(Txn.sender(), slot.load()),
+            )
+        ),
+        Return(Int(1)),
+    ])
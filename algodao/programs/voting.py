@@ -0,0 +1,186 @@
+"""
+PyTeal programs of the Proposal contract
+"""
+from pyteal import Int, Expr, Return, Bytes, App, Assert, InnerTxnBuilder
+from pyteal import Txn, Btoi, Global, Seq, And, TxnField, Concat, TxnType
+from pyteal import Gtxn, Cond, OnComplete, Subroutine, Or, If, Itob
+from pyteal import TealType, Substring, ScratchVar
+
+from algodao.voting import Proposal, ProposalType, VoteType
+
+
+@Subroutine(TealType.uint64)
+def is_updown_vote(votetype: Expr) -> Expr:
+    return Return(Or(
+        votetype == Int(ProposalType.PAYMENT.value),
+        votetype == Int(ProposalType.ADD_COMMITTEE_MEMBER.value),
+        votetype == Int(ProposalType.CLOSE_AND_DISBURSE.value),
+        votetype == Int(ProposalType.EJECT_COMMITTEE_MEMBER.value),
+        votetype == Int(ProposalType.NEW_COMMITTEE.value),
+    ))
+
+
+@Subroutine(TealType.bytes)
+def proposal_payment_address(addl_data: Expr):
+    return Return(Substring(addl_data, Int(0), Int(32)))
+
+
+@Subroutine(TealType.uint64)
+def proposal_payment_amount(addl_data: Expr):
+    return Return(Btoi(Substring(addl_data, Int(32), Int(40))))
+
+
+@Subroutine(TealType.uint64)
+def minvotesneeded(vtype_data: Expr, total_votes: Expr):
+    win_pct = ScratchVar(TealType.uint64)
+    return Seq([
+        win_pct.store(Btoi(Substring(vtype_data, Int(8), Int(16)))),
+        Return(win_pct.load() * total_votes / Int(100))
+    ])
+
+
+def proposal_approval_program() -> Expr:
+    GlobalInts = Proposal.GlobalInts
+    GlobalBytes = Proposal.GlobalBytes
+    on_creation = Seq([
+        Assert(Txn.application_args.length() == Int(11)),
+        GlobalBytes.Name.put(Txn.application_args[0]),
+        GlobalInts.VoteAssetId.put(Btoi(Txn.application_args[1])),
+        GlobalInts.RegBegin.put(Btoi(Txn.application_args[2])),
+        GlobalInts.RegEnd.put(Btoi(Txn.application_args[3])),
+        GlobalInts.VoteBegin.put(Btoi(Txn.application_args[4])),
+        GlobalInts.VoteEnd.put(Btoi(Txn.application_args[5])),
+        GlobalInts.NumOptions.put(Btoi(Txn.application_args[6])),
+        GlobalInts.ProposalType.put(Btoi(Txn.application_args[7])),
+        GlobalInts.DaoId.put(Btoi(Txn.application_args[8])),
+        GlobalBytes.VoteTypeData.put(Txn.application_args[9]),
+        GlobalBytes.AdditionalData.put(Txn.application_args[10]),
+        GlobalInts.Passed.put(Int(0)),
+        GlobalInts.Implemented.put(Int(0)),
+        GlobalInts.VoteType.put(Int(VoteType.GOVERNANCE_TOKEN.value)),
+        If(
+            is_updown_vote(GlobalInts.ProposalType.get()),
+            Seq([
+                App.globalPut(Concat(Bytes("Option"), Itob(Int(1))), Bytes("Yes")),
+                App.globalPut(Concat(Bytes("Option"), Itob(Int(2))), Bytes("No")),
+            ]),
+            # Currently all implemented vote types are up/down votes;
+            # to support multioption proposals we could pass in the
+            # options as additional application args
+            Assert(Int(0)),
+        ),
+        Return(Int(1)),
+    ])
+    on_register = Return(
+        And(
+            Global.round() >= GlobalInts.RegBegin.get(),
+            Global.round() <= GlobalInts.RegEnd.get(),
+        )
+    )
+    is_creator = Txn.sender() == Global.creator_address()
+    on_optintoken = Seq([
+        Assert(is_creator),
+        InnerTxnBuilder.Begin(),
+        InnerTxnBuilder.SetFields({
+            TxnField.type_enum: TxnType.AssetTransfer,
+            TxnField.asset_receiver: Global.current_application_address(),
+            TxnField.xfer_asset: Btoi(Txn.application_args[1]),
+            TxnField.asset_amount: Int(0),
+        }),
+        InnerTxnBuilder.Submit(),
+        Return(Int(1)),
+    ])
+    on_setvotetoken = Seq([
+        Assert(is_creator),
+        Assert(GlobalInts.VoteAssetId.get() == Int(0)),
+        GlobalInts.VoteAssetId.put(Btoi(Txn.application_args[1])),
+        Return(Int(1)),
+    ])
+    option = Txn.application_args[1]
+    globalname = Concat(Bytes("AllVotes"), option)
+    votes = Gtxn[1].asset_amount()
+    on_vote = Seq([
+        Assert(And(
+            Global.round() >= GlobalInts.VoteBegin.get(),
+            Global.round() <= GlobalInts.VoteEnd.get(),
+            Global.group_size() == Int(2),
+            Txn.group_index() == Int(0),
+            Gtxn[1].xfer_asset() == GlobalInts.VoteAssetId.get(),
+            Gtxn[1].asset_receiver() == Global.current_application_address(),
+            Btoi(option) > Int(0),
+            Btoi(option) <= GlobalInts.NumOptions.get(),
+        )),
+        App.localPut(
+            Txn.sender(),
+            Concat(Bytes("Voted"), option),
+            votes
+        ),
+        App.globalPut(
+            globalname,
+            App.globalGet(globalname) + votes
+        ),
+        Return(Int(1)),
+    ])
+    yesvotes = ScratchVar(TealType.uint64)
+    novotes = ScratchVar(TealType.uint64)
+    minvotes = ScratchVar(TealType.uint64)
+    on_finalizevote = Seq([
+        Assert(And(
+            Global.round() > GlobalInts.VoteEnd.get(),
+            Txn.application_args.length() == Int(1),
+        )),
+        If(
+            is_updown_vote(GlobalInts.VoteType.get()),
+            Seq([
+                Assert(And(
+                    App.globalGet(GlobalInts.option(Int(1))) == Bytes("Yes"),
+                    App.globalGet(GlobalInts.option(Int(2))) == Bytes("No"),
+                )),
+                yesvotes.store(App.globalGet(GlobalInts.allvotes(Int(1)))),
+                novotes.store(App.globalGet(GlobalInts.allvotes(Int(2)))),
+                minvotes.store(minvotesneeded(
+                    GlobalBytes.VoteTypeData.get(),
+                    yesvotes.load() + novotes.load()
+                )),
+                If(
+                    yesvotes.load() >= minvotes.load(),
+                    GlobalInts.Passed.put(Int(1))
+                ),
+                Return(Int(1)),
+            ]),
+        ),
+        Return(Int(0)),
+    ])
+    # the DAO's implementproposal call immediately precedes this call
+    # in the group (see algodao.programs.governance.dao_approval_program)
+    implement_txn = Gtxn[Txn.group_index() - Int(1)]
+    on_setimplemented = Seq([
+        Assert(Txn.group_index() > Int(0)),
+        Assert(And(
+            Txn.application_args.length() == Int(1),
+            implement_txn.type_enum() == TxnType.ApplicationCall,
+            implement_txn.application_id() == GlobalInts.DaoId.get(),
+            implement_txn.application_args[0] == Bytes("implementproposal"),
+            GlobalInts.Implemented.get() == Int(0),
+        )),
+        GlobalInts.Implemented.put(Int(1)),
+        Return(Int(1)),
+    ])
+    on_closeout = Return(Int(1))
+    program = Cond(
+        [Txn.application_id() == Int(0), on_creation],
+        [Txn.on_completion() == OnComplete.DeleteApplication, Return(Int(0))],
+        [Txn.on_completion() == OnComplete.UpdateApplication, Return(Int(0))],
+        [Txn.on_completion() == OnComplete.CloseOut, on_closeout],
+        [Txn.on_completion() == OnComplete.OptIn, on_register],
+        [Txn.application_args[0] == Bytes("vote"), on_vote],
+        [Txn.application_args[0] == Bytes("optintoken"), on_optintoken],
+        [Txn.application_args[0] == Bytes("setvotetoken"), on_setvotetoken],
+        [Txn.application_args[0] == Bytes("setimplemented"), on_setimplemented],
+        [Txn.application_args[0] == Bytes("finalizevote"), on_finalizevote],
+    )
+    return program
+
+
+def proposal_clear_program() -> Expr:
+    return Return(Int(1))
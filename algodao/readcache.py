@@ -0,0 +1,184 @@
+"""
+Shared, round-scoped read-through cache of application, account and asset
+info. Constructing Deployed* wrappers, checking asset holdings or reading
+app state fetches the same records many times within a round, while they can
+only change when a block is produced. The records are instead cached per
+node and reused until a later round is observed, either by the block follower
+of algodao.params or through a confirmation seen by
+algodao.helpers.wait_for_confirmation. Confirming one of our own
+transactions also drops the records it touched. The cached records are
+shared and must not be modified.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+import algosdk.logic
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+import algodao.params
+from algodao.types import AccountInfo, ApplicationInfo
+
+# records are refetched after this many seconds even if no new round has been
+# seen, e.g. if the block follower is not running
+DEFAULT_MAXAGE = 10.0
+
+APPLICATION = 'application'
+ACCOUNT = 'account'
+ASSET = 'asset'
+
+_Key = Tuple[str, Hashable]
+
+
+class ReadCache:
+    """
+    Application, account and asset info read from a single algod node. A
+    record is labelled with the latest round observed when it was fetched,
+    and is reused until a later round is observed or it is `maxage` seconds
+    old.
+    """
+    def __init__(self, algod: AlgodClient, maxage: float = DEFAULT_MAXAGE, follow: bool = True):
+        self._algod: AlgodClient = algod
+        self._maxage: float = maxage
+        self._follow: bool = follow
+        self._lock = threading.Lock()
+        # latest round known to have been produced
+        self._round: int = 0
+        self._records: Dict[_Key, Tuple[int, float, Any]] = {}
+        self._stats: Dict[str, int] = {'hits': 0, 'fetches': 0}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def application_info(self, appid: int) -> ApplicationInfo:
+        info: ApplicationInfo = self._get((APPLICATION, appid), lambda: self._algod.application_info(appid))
+        return info
+
+    def account_info(self, addr: str) -> AccountInfo:
+        info: AccountInfo = self._get((ACCOUNT, addr), lambda: self._algod.account_info(addr))
+        return info
+
+    def asset_info(self, assetid: int) -> Dict[str, Any]:
+        info: Dict[str, Any] = self._get((ASSET, assetid), lambda: self._algod.asset_info(assetid))
+        return info
+
+    def observeround(self, algoround: int):
+        """Note that a round has been produced: records of earlier rounds expire"""
+        with self._lock:
+            if algoround > self._round:
+                self._round = algoround
+                self._records.clear()
+
+    def invalidate(self, kind: str, key: Hashable):
+        with self._lock:
+            self._records.pop((kind, key), None)
+
+    def invalidatetxns(self, txns: Iterable[transaction.Transaction]):
+        """Drop the records of the apps, accounts and assets touched by the transactions"""
+        keys: Set[_Key] = set()
+        for txn in txns:
+            keys.update(touched(txn))
+        with self._lock:
+            for key in keys:
+                self._records.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def _get(self, key: _Key, fetch: Callable[[], Any]) -> Any:
+        if self._follow:
+            # rounds are observed by the params provider's block follower
+            algodao.params.provider(self._algod).follow()
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None and record[0] >= self._round and time.monotonic() - record[1] < self._maxage:
+                self._stats['hits'] += 1
+                return record[2]
+            algoround = self._round
+        value = fetch()
+        with self._lock:
+            self._stats['fetches'] += 1
+            # a later round may have been observed while fetching
+            if algoround == self._round:
+                self._records[key] = (algoround, time.monotonic(), value)
+        return value
+
+
+def touched(txn: transaction.Transaction) -> Set[_Key]:
+    """The apps, accounts and assets whose records a transaction may change"""
+    keys: Set[_Key] = {(ACCOUNT, txn.sender)}
+    for attr in ('receiver', 'close_remainder_to', 'close_assets_to', 'revocation_target'):
+        addr = getattr(txn, attr, None)
+        if addr:
+            keys.add((ACCOUNT, addr))
+    if isinstance(txn, transaction.ApplicationCallTxn):
+        appids = [txn.index] + list(txn.foreign_apps or [])
+        keys.update((APPLICATION, appid) for appid in appids if appid)
+        # the apps' own accounts may send inner transactions
+        keys.update((ACCOUNT, algosdk.logic.get_application_address(appid)) for appid in appids if appid)
+        keys.update((ACCOUNT, addr) for addr in txn.accounts or [])
+        keys.update((ASSET, assetid) for assetid in txn.foreign_assets or [])
+    elif isinstance(txn, (transaction.AssetConfigTxn, transaction.AssetTransferTxn, transaction.AssetFreezeTxn)):
+        if txn.index:
+            keys.add((ASSET, txn.index))
+        target = getattr(txn, 'target', None)
+        if target:
+            keys.add((ACCOUNT, target))
+    return keys
+
+
+# caches are shared by all clients of the same node
+_caches: Dict[Tuple[str, str], ReadCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _nodekey(algod: AlgodClient) -> Tuple[str, str]:
+    return algod.algod_address, algod.algod_token
+
+
+def cache(algod: AlgodClient) -> ReadCache:
+    """The read cache shared by all clients of the client's node"""
+    key = _nodekey(algod)
+    with _caches_lock:
+        existing = _caches.get(key)
+        if existing is None:
+            existing = _caches[key] = ReadCache(algod)
+        return existing
+
+
+def _existing(algod: AlgodClient) -> Optional[ReadCache]:
+    with _caches_lock:
+        return _caches.get(_nodekey(algod))
+
+
+def application_info(algod: AlgodClient, appid: int) -> ApplicationInfo:
+    """Application info, fetched at most once per round"""
+    return cache(algod).application_info(appid)
+
+
+def account_info(algod: AlgodClient, addr: str) -> AccountInfo:
+    """Account info, fetched at most once per round"""
+    return cache(algod).account_info(addr)
+
+
+def asset_info(algod: AlgodClient, assetid: int) -> Dict[str, Any]:
+    """Asset info, fetched at most once per round"""
+    return cache(algod).asset_info(assetid)
+
+
+def observeround(algod: AlgodClient, algoround: int):
+    """Note a round seen by the client so cached records of earlier rounds expire"""
+    existing = _existing(algod)
+    if existing is not None:
+        existing.observeround(algoround)
+
+
+def invalidatetxns(algod: AlgodClient, txns: Iterable[transaction.Transaction]):
+    """Drop the cached records touched by confirmed transactions"""
+    existing = _existing(algod)
+    if existing is not None:
+        existing.invalidatetxns(txns)
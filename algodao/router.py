@@ -0,0 +1,331 @@
+"""
+Clients that spread requests over several algod or indexer nodes. The router
+keeps, for each node, an exponentially weighted moving average (EWMA) of its
+latency and error rate and the latest round it is known to have, and:
+
+- sends reads to the fastest healthy node,
+- sends writes (submitted transactions) to a preferred submitter, failing
+  over to the other nodes while it is down, and pending transaction lookups
+  to the node that took the last write,
+- only reads from nodes known to have every round the caller has already
+  seen, e.g. the round a transaction was confirmed in, so a read that
+  follows a write sees its effects. Reads whose response shows the round of
+  the node (e.g. status) go to the fastest node and are retried on another
+  one if it is behind.
+
+A node that fails (a connection error, a timeout or a 5xx response) is
+skipped for a backoff period, doubling with each consecutive failure. A
+background thread probes every node periodically, which keeps their latency
+and rounds current and brings recovered nodes back.
+"""
+import http.client
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import algosdk.error
+from algosdk.v2client.algod import AlgodClient
+from algosdk.v2client.indexer import IndexerClient
+
+log = logging.getLogger(__name__)
+
+# weight of the latest sample in the moving averages
+DEFAULT_ALPHA = 0.2
+# seconds between probes of every node; 0 disables probing
+DEFAULT_PROBE_INTERVAL = 2.0
+# a node with an error rate of 1 scores as if ERROR_PENALTY times slower
+ERROR_PENALTY = 10.0
+MIN_BACKOFF = 1.0
+MAX_BACKOFF = 30.0
+
+T = TypeVar('T')
+
+
+class Endpoint:
+    """The routing state of one node"""
+    def __init__(self, client: Any):
+        self.client: Any = client
+        # EWMA of the latency in seconds, None until the first sample
+        self.latency: Optional[float] = None
+        # EWMA of the fraction of failed requests
+        self.errorrate: float = 0.0
+        # latest round the node is known to have
+        self.round: int = 0
+        self.requests: int = 0
+        self.errors: int = 0
+        self._backoff: float = 0.0
+        self._retryat: float = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self._retryat
+
+    def score(self) -> float:
+        # nodes without a latency sample yet are tried first
+        return (self.latency or 0.0) * (1.0 + ERROR_PENALTY * self.errorrate)
+
+    def succeeded(self, alpha: float, elapsed: Optional[float]):
+        self.requests += 1
+        if elapsed is not None:
+            self.latency = elapsed if self.latency is None else alpha * elapsed + (1 - alpha) * self.latency
+        self.errorrate *= 1 - alpha
+        self._backoff = 0.0
+        self._retryat = 0.0
+
+    def failed(self, alpha: float, now: float):
+        self.requests += 1
+        self.errors += 1
+        self.errorrate = alpha + (1 - alpha) * self.errorrate
+        self._backoff = min(MAX_BACKOFF, max(MIN_BACKOFF, 2 * self._backoff))
+        self._retryat = now + self._backoff
+
+
+class Router:
+    """
+    Chooses the node for each request among `clients` (algosdk clients of
+    the same network) and keeps their statistics. `probe` returns the latest
+    round of a node, e.g. from its status.
+    """
+    def __init__(
+            self,
+            clients: List[Any],
+            probe: Callable[[Any], int],
+            preferred: int = 0,
+            probeinterval: float = DEFAULT_PROBE_INTERVAL,
+            alpha: float = DEFAULT_ALPHA,
+    ):
+        if not clients:
+            raise ValueError("A router needs at least one node")
+        self._endpoints: List[Endpoint] = [Endpoint(client) for client in clients]
+        self._probe: Callable[[Any], int] = probe
+        self._preferred: Endpoint = self._endpoints[preferred]
+        self._probeinterval: float = probeinterval
+        self._alpha: float = alpha
+        self._lock = threading.Lock()
+        # latest round seen by the caller: reads go to nodes that have it
+        self._round: int = 0
+        # node that took the last write
+        self._writer: Endpoint = self._preferred
+        self._prober: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def round(self) -> int:
+        with self._lock:
+            return self._round
+
+    @property
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {
+                    'latency': endpoint.latency,
+                    'errorrate': endpoint.errorrate,
+                    'round': endpoint.round,
+                    'requests': endpoint.requests,
+                    'errors': endpoint.errors,
+                    'healthy': endpoint.healthy(now),
+                }
+                for endpoint in self._endpoints
+            ]
+
+    def request(
+            self,
+            send: Callable[[Any], T],
+            write: bool = False,
+            affine: bool = False,
+            minround: int = 0,
+            timed: bool = True,
+            roundof: Callable[[T], Optional[int]] = lambda result: None,
+            checked: bool = False,
+    ) -> T:
+        """
+        Send a request with `send(client)`, failing over to the next node on
+        node errors. Writes go to the preferred submitter first, and `affine`
+        requests to the node that took the last write. Other reads go to
+        nodes known to have `minround` and every round seen so far, unless
+        they are `checked`: their response shows the round of its node
+        (given by `roundof`), so they go to the fastest node and are retried
+        on the next one if it is behind. Latency is only sampled for `timed`
+        requests (not e.g. long polls).
+        """
+        self._startprober()
+        with self._lock:
+            required = max(minround, self._round)
+        error: Optional[Exception] = None
+        stale: Optional[Tuple[int, T]] = None
+        for endpoint in self._candidates(write, affine, required, checked):
+            start = time.monotonic()
+            try:
+                result = send(endpoint.client)
+            except Exception as exc:
+                if not isnodeerror(exc):
+                    with self._lock:
+                        endpoint.succeeded(self._alpha, None)
+                    raise
+                log.warning(f"Request failed, trying another node: {exc!r}")
+                with self._lock:
+                    endpoint.failed(self._alpha, time.monotonic())
+                error = exc
+                continue
+            elapsed = time.monotonic() - start
+            algoround = roundof(result)
+            with self._lock:
+                endpoint.succeeded(self._alpha, elapsed if timed else None)
+                if write:
+                    self._writer = endpoint
+                if algoround is not None:
+                    endpoint.round = max(endpoint.round, algoround)
+                    self._round = max(self._round, algoround)
+            if checked and algoround is not None and algoround < required:
+                if stale is None or algoround > stale[0]:
+                    stale = (algoround, result)
+                continue
+            return result
+        if stale is not None:
+            # no node has caught up: the most recent response will have to do
+            return stale[1]
+        assert error is not None
+        raise error
+
+    def close(self):
+        self._stopped.set()
+
+    def _candidates(self, write: bool, affine: bool, required: int, checked: bool) -> List[Endpoint]:
+        with self._lock:
+            now = time.monotonic()
+            byscore = sorted(self._endpoints, key=Endpoint.score)
+            healthy = [endpoint for endpoint in byscore if endpoint.healthy(now)]
+            down = [endpoint for endpoint in byscore if not endpoint.healthy(now)]
+            if write or affine:
+                first = self._preferred if write else self._writer
+                ordered = [first] + [endpoint for endpoint in healthy if endpoint is not first]
+                if not first.healthy(now):
+                    ordered = ordered[1:] + [first]
+                return ordered + [endpoint for endpoint in down if endpoint is not first]
+            if checked:
+                return healthy + down
+            current = [endpoint for endpoint in healthy if endpoint.round >= required]
+            # otherwise the nodes most likely to have caught up come first
+            behind = sorted(
+                (endpoint for endpoint in healthy if endpoint.round < required),
+                key=lambda endpoint: -endpoint.round,
+            )
+            return current + behind + down
+
+    def _startprober(self) -> None:
+        if self._probeinterval <= 0:
+            return
+        with self._lock:
+            if self._prober is not None:
+                return
+            self._prober = threading.Thread(target=self._probeloop, name='algodao-router', daemon=True)
+        self._prober.start()
+
+    def _probeloop(self):
+        while not self._stopped.wait(self._probeinterval):
+            for endpoint in self._endpoints:
+                start = time.monotonic()
+                try:
+                    algoround = self._probe(endpoint.client)
+                except Exception as exc:
+                    if not isnodeerror(exc):
+                        log.exception("Unexpected error probing a node")
+                    with self._lock:
+                        endpoint.failed(self._alpha, time.monotonic())
+                    continue
+                elapsed = time.monotonic() - start
+                with self._lock:
+                    endpoint.succeeded(self._alpha, elapsed)
+                    endpoint.round = max(endpoint.round, algoround)
+
+
+def isnodeerror(exc: Exception) -> bool:
+    """Whether an error from a client shows a problem with the node rather than the request"""
+    if isinstance(exc, algosdk.error.AlgodHTTPError):
+        return exc.code is not None and exc.code >= 500
+    return isinstance(exc, (OSError, http.client.HTTPException))
+
+
+# requests whose responses show the latest round of their node
+_CHECKED_PATHS = ('/status', '/transactions/params', '/accounts/')
+
+
+def _algodround(requrl: str) -> Callable[[Any], Optional[int]]:
+    def roundof(result: Any) -> Optional[int]:
+        if requrl.startswith('/blocks/'):
+            return int(requrl.rsplit('/', 1)[1])
+        if isinstance(result, dict):
+            return result.get('last-round') or result.get('confirmed-round') or result.get('round') or None
+        return None
+    return roundof
+
+
+class RouterAlgodClient(AlgodClient):
+    """
+    An algosdk AlgodClient that routes each request to one of several nodes.
+    Transactions are submitted to `clients[preferred]`, whose address and
+    token the router client takes.
+    """
+    def __init__(
+            self,
+            clients: List[AlgodClient],
+            preferred: int = 0,
+            probeinterval: float = DEFAULT_PROBE_INTERVAL,
+    ):
+        submitter = clients[preferred]
+        super().__init__(submitter.algod_token, submitter.algod_address, submitter.headers)
+        self.router = Router(
+            clients,
+            lambda client: client.status()['last-round'],
+            preferred,
+            probeinterval,
+        )
+
+    def algod_request(
+            self,
+            method,
+            requrl,
+            params=None,
+            data=None,
+            headers=None,
+            response_format='json',
+    ):
+        def send(client: AlgodClient):
+            return client.algod_request(method, requrl, params, data, headers, response_format)
+
+        return self.router.request(
+            send,
+            write=method == 'POST' and requrl == '/transactions',
+            affine=requrl.startswith('/transactions/pending'),
+            minround=int(requrl.rsplit('/', 1)[1]) if requrl.startswith('/blocks/') else 0,
+            timed=not requrl.startswith('/status/wait-for-block-after/'),
+            roundof=_algodround(requrl),
+            checked=requrl.startswith(_CHECKED_PATHS),
+        )
+
+
+class RouterIndexerClient(IndexerClient):
+    """An algosdk IndexerClient that routes each request to one of several indexers"""
+    def __init__(
+            self,
+            clients: List[IndexerClient],
+            probeinterval: float = DEFAULT_PROBE_INTERVAL,
+    ):
+        first = clients[0]
+        super().__init__(first.indexer_token, first.indexer_address, first.headers)
+        self.router = Router(
+            clients,
+            lambda client: client.health()['round'],
+            probeinterval=probeinterval,
+        )
+
+    def indexer_request(self, method, requrl, params=None, data=None, headers=None):
+        def send(client: IndexerClient):
+            return client.indexer_request(method, requrl, params, data, headers)
+
+        def roundof(result: Any) -> Optional[int]:
+            return result.get('current-round') or result.get('round') or None
+
+        return self.router.request(send, roundof=roundof, checked=True)
@@ -0,0 +1,216 @@
+"""
+Client-side scheduling of the requests to a rate-limited API such as
+PureStake's. An RPCScheduler plugs into the HTTPTransport of a host (see
+algodao.transport), so it covers the algod and indexer clients of that host.
+It:
+
+- admits requests at the host's rate with a token bucket,
+- gives interactive requests (votes, implementing proposals, ...) the next
+  token before any bulk request (snapshots, exports, state scans), and keeps
+  a reserve of tokens that only interactive requests may use, so that bulk
+  jobs can saturate the rest of the quota without delaying them,
+- pauses every request when the API answers 429 Too Many Requests, for the
+  Retry-After period or an exponential backoff, then retries,
+- coalesces identical GET requests in flight at the same priority into one.
+
+Requests are interactive unless made within `bulk()`:
+
+    with algodao.scheduler.bulk():
+        balances = indexer.asset_balances(assetid)
+
+The priority is held in a context variable, so worker threads of a bulk job
+must enter `bulk()` themselves.
+"""
+import concurrent.futures
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BULK = 1
+
+# tokens that bulk requests leave in the bucket for interactive ones
+DEFAULT_RESERVE = 1.0
+DEFAULT_MAXRETRIES = 5
+MIN_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+
+_priority: 'contextvars.ContextVar[int]' = contextvars.ContextVar('algodao_rpc_priority', default=INTERACTIVE)
+
+
+@contextlib.contextmanager
+def bulk() -> Iterator[None]:
+    """Make the requests sent within the context bulk requests"""
+    token = _priority.set(BULK)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def priority() -> int:
+    """The priority of requests sent from the current context"""
+    return _priority.get()
+
+
+class TokenBucket:
+    """
+    Admits `rate` requests per second on average, and bursts of up to
+    `burst`. Not thread-safe; RPCScheduler holds its lock while using it.
+    """
+    def __init__(self, rate: float, burst: float):
+        self.rate: float = rate
+        self.burst: float = burst
+        self.tokens: float = burst
+        self._updated: float = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, needed: float) -> float:
+        """Seconds until the bucket holds `needed` tokens"""
+        return max(0.0, (needed - self.tokens) / self.rate)
+
+
+class RPCScheduler:
+    """
+    Schedules the requests to one host at up to `rate` requests per second,
+    with bursts of up to `burst` requests (by default a second's worth).
+    """
+    def __init__(
+            self,
+            rate: float,
+            burst: Optional[float] = None,
+            reserve: float = DEFAULT_RESERVE,
+            maxretries: int = DEFAULT_MAXRETRIES,
+    ):
+        burst = max(burst or rate, 1.0)
+        self._bucket = TokenBucket(rate, burst)
+        self._reserve: float = min(reserve, burst - 1.0)
+        self._maxretries: int = maxretries
+        self._lock = threading.Condition()
+        # tickets of the requests waiting for a token, by priority then arrival
+        self._queue: List[Tuple[int, int]] = []
+        self._tickets = itertools.count()
+        self._pausedtill: float = 0.0
+        # when the last 429 that extended the pause was answered
+        self._throttled: float = 0.0
+        self._backoff: float = 0.0
+        self._inflight: Dict[Hashable, concurrent.futures.Future] = {}
+        self._stats: Dict[str, float] = {
+            'interactive': 0,
+            'bulk': 0,
+            # seconds spent waiting for a token
+            'interactivewait': 0.0,
+            'bulkwait': 0.0,
+            'coalesced': 0,
+            'throttled': 0,
+        }
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._stats)
+
+    def run(self, key: Optional[Hashable], send: Callable[[], Any]) -> Any:
+        """
+        Send a request with `send()` once admitted, and return its response,
+        an HTTPResponse. Requests with the same `key` (e.g. identical GETs)
+        share a single response while one is in flight.
+        """
+        if key is None:
+            return self._run(send)
+        key = (priority(), key)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = concurrent.futures.Future()
+            else:
+                self._stats['coalesced'] += 1
+        assert future is not None
+        if not leader:
+            return future.result()
+        try:
+            response = self._run(send)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _run(self, send: Callable[[], Any]) -> Any:
+        attempt = 0
+        while True:
+            admitted = self._acquire(priority())
+            response = send()
+            with self._lock:
+                if response.status != 429:
+                    self._backoff = 0.0
+                    return response
+                self._stats['throttled'] += 1
+                # requests admitted before the last 429 was answered were in
+                # flight together: they only extend the pause once
+                if admitted >= self._throttled:
+                    self._throttled = time.monotonic()
+                    self._backoff = min(MAX_BACKOFF, max(MIN_BACKOFF, 2 * self._backoff))
+                    delay = _retryafter(response) or self._backoff
+                    self._pausedtill = max(self._pausedtill, self._throttled + delay)
+                    # the bucket was fuller than the API's: start again from empty
+                    self._bucket.tokens = 0.0
+                    self._lock.notify_all()
+            attempt += 1
+            if attempt > self._maxretries:
+                return response
+            log.debug("Rate limited, retrying")
+
+    def _acquire(self, requestpriority: int) -> float:
+        """Wait for a token and return the time it was granted"""
+        start = time.monotonic()
+        with self._lock:
+            ticket = (requestpriority, next(self._tickets))
+            heapq.heappush(self._queue, ticket)
+            # bulk requests leave the reserve to interactive ones
+            needed = 1.0 + (self._reserve if requestpriority == BULK else 0.0)
+            while True:
+                now = time.monotonic()
+                self._bucket.refill(now)
+                if now < self._pausedtill:
+                    delay: Optional[float] = self._pausedtill - now
+                elif self._queue[0] != ticket:
+                    # woken when the requests ahead are admitted
+                    delay = None
+                elif self._bucket.tokens >= needed:
+                    break
+                else:
+                    delay = self._bucket.delay(needed)
+                self._lock.wait(delay)
+            self._bucket.tokens -= 1.0
+            heapq.heappop(self._queue)
+            self._lock.notify_all()
+            name = 'bulk' if requestpriority == BULK else 'interactive'
+            self._stats[name] += 1
+            now = time.monotonic()
+            self._stats[name + 'wait'] += now - start
+            return now
+
+
+def _retryafter(response: Any) -> Optional[float]:
+    value = response.headers.get('retry-after')
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        # an HTTP date; fall back to the backoff
+        return None
@@ -7,6 +7,7 @@ import algosdk.logic
 
 import algodao.assets
 import algodao.helpers
+import algodao.lifecycle
 import tests.helpers
 from algodao.committee import Committee
 from algodao.governance import PreapprovalGate, AlgoDao
@@ -93,7 +94,6 @@ deployeddao.call_finalize(algod, creatoraddr, creatorprivkey)
 # represent votes.
 lastround = algod.status()['last-round']
 voting_rounds = 40
-waitforround = lastround + voting_rounds + 1
 beginreg = lastround
 endreg = lastround + voting_rounds
 indexer = algodao.helpers.indexer_client()
@@ -167,23 +167,19 @@ deployedproposal.call_vote(
     10  # 10 votes
 )
 
-# wait for the voting period to end
-algodao.helpers.wait_for_round(algod, waitforround)
-# finalize the vote (assesses whether the vote passed or not)
-deployedproposal.call_finalizevote(algod, creatoraddr, creatorprivkey)
-
-# implement the (now passed) proposal from the DAO-side. the DAO contract will
-# verify that the election has ended and that the proposal has passed in
-# accordance with the requirements for this proposal type set by the DAO (i.e.,
-# that it was a governance vote with over 60% voting Yes)
+# once the voting period ends, the lifecycle scheduler finalizes the vote
+# (assessing whether the vote passed or not) and implements the (now passed)
+# proposal from the DAO-side. the DAO contract will verify that the election
+# has ended and that the proposal has passed in accordance with the
+# requirements for this proposal type set by the DAO (i.e., that it was a
+# governance vote with over 60% voting Yes)
 before = algod.account_info(receiveraddr)
-deployeddao.call_implementproposal(
-    algod,
-    deployedproposal,
-    creatoraddr,
-    creatorprivkey,
-    accounts=[receiveraddr],
-)
+scheduler = algodao.lifecycle.LifecycleScheduler(algod)
+algodao.lifecycle.manageproposals(scheduler, deployeddao, creatoraddr, creatorprivkey)
+algodao.lifecycle.scheduleproposal(scheduler, deployedproposal.appid, accounts=[receiveraddr])
+scheduler.start()
+scheduler.join()
+scheduler.close()
 after = algod.account_info(receiveraddr)
 print(f"Before implementing proposal, receiver account: {before}")
 print(f"After implementing proposal, receiver amount: {after}")
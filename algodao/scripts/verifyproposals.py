@@ -0,0 +1,31 @@
+"""
+Check that the given app IDs are deployments of the standard Proposal
+contract, e.g.:
+
+    python -m algodao.scripts.verifyproposals 12 13 14
+"""
+import argparse
+import sys
+
+import algodao.helpers
+import algodao.verify
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('appids', metavar='APPID', type=int, nargs='+')
+    parser.add_argument('--workers', type=int, default=32)
+    args = parser.parse_args()
+    algod = algodao.helpers.createclient()
+    verifier = algodao.verify.proposal_verifier(algod)
+    print(f"Reference program hash: {verifier.program_hash}")
+    results = verifier.verifymany(args.appids, args.workers)
+    for result in results.values():
+        status = 'MATCH' if result.matches else 'MISMATCH'
+        detail = result.error or result.program_hash
+        print(f"{result.appid}\t{status}\t{detail}")
+    return 0 if all(result.matches for result in results.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Batch signing of transactions in a process pool. Signing a transaction
+encodes it with msgpack, signs it with ed25519 and encodes the signed
+transaction again, most of it in Python; when tens of thousands of claim,
+vote or funding transactions are sent at once that is a visible CPU cost
+which a single process cannot spread over several cores.
+
+A BatchSigner signs groups of transactions in chunks on a pool of worker
+processes and returns, in order, the signed transactions encoded as they
+are sent (msgpack blobs). The blobs are sent as they are with `sendgroup`,
+without decoding them again. The keys are registered with the signer,
+which hands out a handle (the address of the key) to sign with; each chunk
+carries only the keys it needs to the workers.
+
+Batches too small to pay for the round trip to the pool are signed in the
+calling process, so `signgroups` can be used whatever the batch size.
+"""
+from __future__ import annotations
+
+import base64
+import concurrent.futures
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import algosdk.account
+import algosdk.encoding
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+log = logging.getLogger(__name__)
+
+# transactions signed by a worker process per task
+DEFAULT_CHUNKSIZE = 256
+
+# a group of transactions with the handle of the key that signs them
+Group = Tuple[List[transaction.Transaction], str]
+
+
+class BatchSigner:
+    def __init__(
+            self,
+            max_workers: Optional[int] = None,
+            chunksize: int = DEFAULT_CHUNKSIZE,
+            inline_below: Optional[int] = None,
+    ):
+        """
+        Sign with up to max_workers processes (by default, one per CPU),
+        sending them chunks of about chunksize transactions. Batches of fewer
+        than inline_below transactions (by default, one chunk) are signed in
+        the calling process.
+        """
+        self._max_workers: Optional[int] = max_workers
+        self._chunksize: int = chunksize
+        self._inline_below: int = chunksize if inline_below is None else inline_below
+        self._lock = threading.Lock()
+        # handle (address) -> private key
+        self._keys: Dict[str, str] = {}
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+    def __enter__(self) -> BatchSigner:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def addkey(self, privkey: str) -> str:
+        """Register a private key and return its handle, the address of the key"""
+        handle: str = algosdk.account.address_from_private_key(privkey)
+        with self._lock:
+            self._keys[handle] = privkey
+        return handle
+
+    def sign(self, txns: Iterable[Tuple[transaction.Transaction, str]]) -> List[bytes]:
+        """Sign (ungrouped) transactions, each with the key of its handle"""
+        return [blobs[0] for blobs in self.signgroups(([txn], handle) for txn, handle in txns)]
+
+    def signgroups(self, groups: Iterable[Group]) -> List[List[bytes]]:
+        """
+        Sign groups of transactions, each with the key of its handle,
+        grouping the transactions of a group first if there are several.
+        As with algodao.contract.signgroup, the transactions passed in are
+        given their group ID, whether they are signed inline or by the
+        worker processes.
+        """
+        groups = list(groups)
+        with self._lock:
+            missing = {handle for _, handle in groups} - self._keys.keys()
+            if missing:
+                raise KeyError(f"No key registered for {', '.join(sorted(missing))}")
+            keys = dict(self._keys)
+        chunks = list(_chunks(groups, self._chunksize))
+        if sum(len(txns) for txns, _ in groups) < self._inline_below or len(chunks) < 2:
+            return [blobs for _, blobs in _signgroups(groups, keys)]
+        executor = self._pool()
+        futures = [
+            executor.submit(_signgroups, chunk, {handle: keys[handle] for _, handle in chunk})
+            for chunk in chunks
+        ]
+        signed: List[List[bytes]] = []
+        for chunk, future in zip(chunks, futures):
+            for (txns, _), (group, blobs) in zip(chunk, future.result()):
+                # the workers grouped copies of the transactions
+                for txn in txns:
+                    txn.group = group
+                signed.append(blobs)
+        return signed
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def _pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(self._max_workers)
+            return self._executor
+
+
+def _chunks(groups: Sequence[Group], chunksize: int) -> Iterable[List[Group]]:
+    # groups are never split across chunks
+    chunk: List[Group] = []
+    size = 0
+    for group in groups:
+        chunk.append(group)
+        size += len(group[0])
+        if size >= chunksize:
+            yield chunk
+            chunk = []
+            size = 0
+    if chunk:
+        yield chunk
+
+
+def _signgroups(groups: List[Group], keys: Dict[str, str]) -> List[Tuple[Optional[bytes], List[bytes]]]:
+    # runs in the worker processes (or inline); returns the group ID and
+    # the signed transactions of each group
+    signed: List[Tuple[Optional[bytes], List[bytes]]] = []
+    for txns, handle in groups:
+        if len(txns) > 1:
+            transaction.assign_group_id(txns)
+        privkey = keys[handle]
+        blobs = [base64.b64decode(algosdk.encoding.msgpack_encode(txn.sign(privkey))) for txn in txns]
+        signed.append((txns[0].group, blobs))
+    return signed
+
+
+def signgroups(
+        groups: List[List[transaction.Transaction]],
+        privkey: str,
+        signer: Optional[BatchSigner] = None,
+) -> List[List[bytes]]:
+    """
+    Sign groups of transactions with one key, with the signer if given and
+    in the calling process otherwise. The transactions are given their
+    group ID either way.
+    """
+    if signer is None:
+        return [blobs for _, blobs in _signgroups([(txns, '') for txns in groups], {'': privkey})]
+    handle = signer.addkey(privkey)
+    return signer.signgroups((txns, handle) for txns in groups)
+
+
+def sendgroup(algod: AlgodClient, blobs: List[bytes]) -> str:
+    """Send a signed group of transactions, returning the ID of the first"""
+    txid: str = algod.send_raw_transaction(base64.b64encode(b''.join(blobs)))
+    return txid
+
+
+def decode(blobs: List[bytes]) -> List[transaction.SignedTransaction]:
+    """Decode signed transactions (e.g., to write a dry run of a failed group)"""
+    return [algosdk.encoding.future_msgpack_decode(base64.b64encode(blob).decode()) for blob in blobs]
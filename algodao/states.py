@@ -0,0 +1,117 @@
+"""
+Bulk readers of app state. Reading the state of many apps one call at a
+time (or through the account info of their creator, which holds every app
+it created) makes dashboards and audits slow; these readers fetch the state
+of each app concurrently, with bounded parallelism, and decode it once into
+AppState. Likewise, the local states of many accounts in one app (e.g. the
+votes cast on a Proposal) are fetched concurrently and streamed, rather
+than through the full account info of each account.
+
+Global state is read through algodao.readcache. The reads are sent at the
+priority of the calling thread (see algodao.scheduler), so that
+
+    with algodao.scheduler.bulk():
+        states = algodao.states.globalstates(algod, appids)
+
+does not hold up interactive calls to a rate-limited API.
+"""
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, TYPE_CHECKING
+
+import algosdk.error
+from algosdk.v2client.algod import AlgodClient
+from algosdk.v2client.indexer import IndexerClient
+
+import algodao.contract
+import algodao.readcache
+from algodao.fanout import DEFAULT_MAX_WORKERS, fanout, stream
+
+if TYPE_CHECKING:
+    from algodao.contract import AppState
+
+log = logging.getLogger(__name__)
+
+
+def globalstate(algod: AlgodClient, appid: int) -> Optional[AppState]:
+    """The global state of an app, or None if the app does not exist"""
+    try:
+        return algodao.contract.AppState.fromapp(algodao.readcache.application_info(algod, appid))
+    except algosdk.error.AlgodHTTPError as exc:
+        if exc.code == 404:
+            log.info(f"App {appid} does not exist")
+            return None
+        raise
+
+
+def globalstates(
+        algod: AlgodClient,
+        appids: Iterable[int],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Dict[int, AppState]:
+    """
+    The global states of many apps, fetched concurrently. Returns the states
+    keyed by app ID, in the order the app IDs were given; apps that do not
+    exist (e.g. deleted proposals) are left out.
+    """
+    appids = list(appids)
+    states = fanout(lambda appid: globalstate(algod, appid), appids, max_workers)
+    found = OrderedDict((appid, state) for appid, state in zip(appids, states) if state is not None)
+    log.info(f"Read the global state of {len(found)} of {len(appids)} apps")
+    return found
+
+
+def localstate(algod: AlgodClient, appid: int, addr: str) -> Optional[AppState]:
+    """
+    The local state of an account in an app, or None if the account has not
+    opted in. Only the app's local state is fetched, with the account
+    application endpoint of algod (version 3.6 or later).
+    """
+    try:
+        response: Dict[str, Any] = algod.algod_request('GET', f'/accounts/{addr}/applications/{appid}')
+    except algosdk.error.AlgodHTTPError as exc:
+        if exc.code == 404:
+            return None
+        raise
+    appstate = response.get('app-local-state')
+    if appstate is None:
+        return None
+    return algodao.contract.AppState.fromstore(appstate.get('key-value', []))
+
+
+def localstates(
+        algod: AlgodClient,
+        appid: int,
+        addrs: Iterable[str],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Iterator[Tuple[str, AppState]]:
+    """
+    The local states in an app of many accounts, fetched concurrently and
+    yielded as they arrive (not in the order of `addrs`). Accounts that have
+    not opted in are left out. At most 2 * max_workers reads are queued at
+    a time, so `addrs` may be a long or lazy iterable.
+    """
+    for addr, state in stream(lambda addr: (addr, localstate(algod, appid, addr)), addrs, max_workers):
+        if state is not None:
+            yield addr, state
+
+
+def indexerlocalstates(
+        indexer: IndexerClient,
+        appid: int,
+        limit: int = 1000,
+) -> Iterator[Tuple[str, AppState]]:
+    """
+    The local states of every account opted in to an app, as of the
+    indexer's latest round, paging through the indexer's accounts search.
+    """
+    nextpage: Optional[str] = None
+    while True:
+        response: Dict[str, Any] = indexer.accounts(application_id=appid, limit=limit, next_page=nextpage)
+        for account in response['accounts']:
+            yield account['address'], algodao.contract.AppState.fromaccount(account, appid)
+        nextpage = response.get('next-token')
+        if not nextpage or not response['accounts']:
+            return
@@ -0,0 +1,276 @@
+"""
+Off-chain tally and turnout analytics for a Proposal. The on-chain tally
+only happens in finalizevote; this module reports the standing of a vote
+while it is open, from:
+
+- the proposal's global state: the AllVotes<option> totals, NumOptions, the
+  win percentage of the DAO rule (in VoteTypeData) and VoteEnd,
+- the voters' local Voted<option> keys (see DeployedProposal.votes),
+- the election's distribution table: the vote tokens each account may claim
+  from the TokenDistributionTree, its weight.
+
+The votes and weights are held in numpy arrays with a row per account, so
+standings and turnout over 100k voters take milliseconds. The tally is kept
+current incrementally by reading only the blocks produced since the last
+refresh: votes on the proposal and claims from the distribution tree.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+from algosdk.v2client.algod import AlgodClient
+
+import algodao.blocks
+import algodao.readcache
+from algodao.contract import AppState
+from algodao.voting import Proposal
+
+log = logging.getLogger(__name__)
+
+DECILES = 10
+# options of up/down votes (see algodao.programs.voting)
+YES = 1
+NO = 2
+
+
+class Standing(NamedTuple):
+    yes: int
+    no: int
+    # yes votes needed to pass given the votes cast, as finalizevote computes it
+    needed: int
+    passing: bool
+    # whether the outcome holds however the weight not voted yet is cast
+    decided: bool
+
+
+class Turnout(NamedTuple):
+    """Turnout by weight decile, from the lightest tenth of the distribution to the heaviest"""
+    weight: np.ndarray
+    voted: np.ndarray
+    accounts: np.ndarray
+    voters: np.ndarray
+
+    @property
+    def rate(self) -> np.ndarray:
+        """The fraction of each decile's weight that has been voted"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate: np.ndarray = np.where(self.weight > 0, self.voted / self.weight, 0.0)
+        return rate
+
+
+class Tally:
+    """
+    The votes cast on a proposal by the accounts of a distribution table
+    (address -> vote tokens). Accounts outside the table (e.g. that were
+    sent vote tokens) are tallied with no weight.
+    """
+    def __init__(
+            self,
+            appid: int,
+            addr2count: Mapping[str, int],
+            win_pct: int,
+            numoptions: int = 2,
+            voteend: Optional[int] = None,
+            treeappid: Optional[int] = None,
+    ):
+        self._appid: int = appid
+        self._treeappid: Optional[int] = treeappid
+        self._win_pct: int = win_pct
+        self._numoptions: int = numoptions
+        self._voteend: Optional[int] = voteend
+        self._rows: Dict[str, int] = {}
+        for addr in addr2count:
+            self._rows[addr] = len(self._rows)
+        self._size: int = len(self._rows)
+        self._weights: np.ndarray = np.fromiter(addr2count.values(), dtype=np.int64, count=self._size)
+        # votes cast by each account for each option, as in its local state
+        self._votes: np.ndarray = np.zeros((self._size, numoptions), dtype=np.int64)
+        self._claimed: np.ndarray = np.zeros(self._size, dtype=bool)
+        # weight decile of each account of the table, -1 for the others
+        self._deciles: np.ndarray = np.empty(self._size, dtype=np.int64)
+        order = np.argsort(self._weights, kind='stable')
+        self._deciles[order] = np.arange(self._size) * DECILES // max(self._size, 1)
+        # the on-chain AllVotes totals, once read
+        self._totals: Optional[np.ndarray] = None
+        # last round whose votes have been tallied
+        self.round: int = 0
+
+    @classmethod
+    def fromproposal(
+            cls,
+            algod: AlgodClient,
+            appid: int,
+            addr2count: Mapping[str, int],
+            treeappid: Optional[int] = None,
+    ) -> Tally:
+        """
+        Tally a deployed proposal: read its global state and the local state
+        of every account of the table, then follow the blocks from there
+        """
+        algoround: int = algod.status()['last-round']
+        state = AppState.fromapp(algodao.readcache.application_info(algod, appid))
+        tally = cls(
+            appid,
+            addr2count,
+            _winpct(state),
+            state.getint(Proposal.GlobalInts.NumOptions),
+            state.getint(Proposal.GlobalInts.VoteEnd),
+            treeappid,
+        )
+        deployed = Proposal.DeployedProposal(algod, appid)
+        tally.load(deployed.votes(algod, addr2count))
+        tally.settotals(state)
+        tally.round = algoround
+        return tally
+
+    @property
+    def weight(self) -> int:
+        return int(self._weights.sum())
+
+    @property
+    def totals(self) -> np.ndarray:
+        """The votes for each option: the on-chain totals if read, else the sum of the local votes"""
+        if self._totals is not None:
+            return self._totals
+        totals: np.ndarray = self._votes[:self._size].sum(axis=0)
+        return totals
+
+    @property
+    def voted(self) -> np.ndarray:
+        """The votes cast by each account, in the order of the table"""
+        voted: np.ndarray = self._votes[:self._size].sum(axis=1)
+        return voted
+
+    @property
+    def unclaimed(self) -> int:
+        """The weight of the accounts that have not claimed their vote tokens"""
+        weights = self._weights[:self._size]
+        return int(weights[~self._claimed[:self._size]].sum())
+
+    @property
+    def unvoted(self) -> int:
+        """The weight claimed but not voted"""
+        claimed = self._claimed[:self._size]
+        remaining = np.clip(self._weights[:self._size] - self.voted, 0, None)
+        return int(remaining[claimed].sum())
+
+    def load(self, votes: Iterable[Tuple[str, Dict[int, int]]]):
+        """Set the votes of accounts, as read from their local states"""
+        rows: List[int] = []
+        options: List[int] = []
+        amounts: List[int] = []
+        for addr, cast in votes:
+            row = self._row(addr)
+            self._votes[row] = 0
+            for option, amount in cast.items():
+                rows.append(row)
+                options.append(option - 1)
+                amounts.append(amount)
+        self._votes[rows, options] = amounts
+        self._claimed[rows] = True
+
+    def setclaimed(self, addrs: Iterable[str]):
+        """Note accounts that have claimed their vote tokens"""
+        self._claimed[[self._row(addr) for addr in addrs]] = True
+
+    def settotals(self, state: AppState):
+        """Take the totals of the proposal's global state"""
+        self._totals = np.array(
+            [
+                state.getint(b'AllVotes' + option.to_bytes(8, 'big'))
+                for option in range(1, self._numoptions + 1)
+            ],
+            dtype=np.int64,
+        )
+
+    def applyblock(self, algoround: int, block: Dict):
+        """Tally the votes and claims of a block"""
+        outer = [blocktxn for blocktxn in algodao.blocks.blocktxns(block) if not blocktxn.inner]
+        for blocktxn in outer:
+            txn = blocktxn.txn
+            if txn.get('type') != 'appl':
+                continue
+            args = algodao.blocks.appargs(txn)
+            appid = txn.get('apid')
+            if appid == self._appid and args[:1] == [b'vote']:
+                # the vote tokens are transferred by the next transaction of the group
+                transfer = outer[blocktxn.position + 1].txn
+                option = int.from_bytes(args[1], 'big')
+                row = self._row(algodao.blocks.address(txn['snd']))
+                self._votes[row, option - 1] = transfer.get('aamt', 0)
+                # until the on-chain totals are read again
+                self._totals = None
+                self._claimed[row] = True
+            elif appid == self._treeappid and self._treeappid and args[:1] == [b'claim']:
+                self._claimed[self._row(algodao.blocks.address(txn['snd']))] = True
+        self.round = max(self.round, algoround)
+
+    def refresh(self, algod: AlgodClient):
+        """Tally the blocks produced since the last refresh, and take the on-chain totals"""
+        lastround: int = algod.status()['last-round']
+        for algoround in range(self.round + 1, lastround + 1):
+            self.applyblock(algoround, algodao.blocks.getblock(algod, algoround))
+        self.settotals(AppState.fromapp(algodao.readcache.application_info(algod, self._appid)))
+        self.round = max(self.round, lastround)
+
+    def standing(self) -> Standing:
+        """The standing of an up/down vote against the DAO rule's win percentage"""
+        totals = self.totals
+        yes, no = int(totals[YES - 1]), int(totals[NO - 1])
+        needed = self._needed(yes + no)
+        passing = yes >= needed
+        closed = self._voteend is not None and self.round > self._voteend
+        remaining = self.unclaimed + self.unvoted
+        if passing:
+            # all the remaining weight is voted against
+            decided = closed or yes >= self._needed(yes + no + remaining)
+        else:
+            # all the remaining weight is voted for
+            decided = closed or yes + remaining < self._needed(yes + no + remaining)
+        return Standing(yes, no, needed, passing, decided)
+
+    def turnout(self) -> Turnout:
+        deciles = self._deciles[:self._size]
+        intable = deciles >= 0
+        deciles = deciles[intable]
+        voted = self.voted[intable]
+        return Turnout(
+            np.bincount(deciles, weights=self._weights[:self._size][intable], minlength=DECILES),
+            np.bincount(deciles, weights=voted, minlength=DECILES),
+            np.bincount(deciles, minlength=DECILES),
+            np.bincount(deciles, weights=voted > 0, minlength=DECILES),
+        )
+
+    def _needed(self, total: int) -> int:
+        # as minvotesneeded in algodao.programs.voting
+        return self._win_pct * total // 100
+
+    def _row(self, addr: str) -> int:
+        row = self._rows.get(addr)
+        if row is not None:
+            return row
+        # an account outside the table
+        if self._size == len(self._weights):
+            self._grow()
+        row = self._rows[addr] = self._size
+        self._weights[row] = 0
+        self._votes[row] = 0
+        self._claimed[row] = False
+        self._deciles[row] = -1
+        self._size += 1
+        return row
+
+    def _grow(self) -> None:
+        capacity = max(2 * len(self._weights), 16)
+        extra = capacity - len(self._weights)
+        self._weights = np.concatenate([self._weights, np.zeros(extra, dtype=np.int64)])
+        self._votes = np.concatenate([self._votes, np.zeros((extra, self._numoptions), dtype=np.int64)])
+        self._claimed = np.concatenate([self._claimed, np.zeros(extra, dtype=bool)])
+        self._deciles = np.concatenate([self._deciles, np.full(extra, -1, dtype=np.int64)])
+
+
+def _winpct(state: AppState) -> int:
+    # VoteTypeData holds the vote type then the win percentage, as uint64s
+    return int.from_bytes(state.getbytes(Proposal.GlobalBytes.VoteTypeData)[8:16], 'big')
@@ -0,0 +1,284 @@
+"""
+Pooled keep-alive HTTP transport for the algod and indexer clients. The stock
+algosdk clients open a new urllib connection, and over https a new TLS
+session, for every request, which dominates the latency of small calls such
+as pending_transaction_info. PooledAlgodClient and PooledIndexerClient send
+their requests through an HTTPTransport instead. It keeps connections open
+between requests and is shared by every client of the same scheme, host and
+port, so e.g. the PureStake algod and indexer clients share one pool.
+
+The pool size, timeouts and gzip can be set per transport, or for the shared
+transports with the ALGODAO_HTTP_MAXCONNECTIONS, ALGODAO_HTTP_CONNECT_TIMEOUT,
+ALGODAO_HTTP_TIMEOUT and ALGODAO_HTTP_GZIP environment variables. Requests to
+rate-limited hosts are scheduled by an RPCScheduler (see algodao.scheduler),
+with the rate given when the shared transport is created or in
+ALGODAO_HTTP_RATELIMIT (requests per second).
+"""
+import gzip
+import http.client
+import json
+import logging
+import os
+import threading
+import urllib.parse
+from typing import Any, Dict, List, Optional, Tuple
+
+import algosdk.constants
+import algosdk.error
+from algosdk.v2client.algod import AlgodClient, api_version_path_prefix
+from algosdk.v2client.indexer import IndexerClient
+
+from algodao.scheduler import RPCScheduler
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAXCONNECTIONS = 16
+DEFAULT_CONNECT_TIMEOUT = 10.0
+# algod holds status_after_block requests for up to a minute
+DEFAULT_TIMEOUT = 120.0
+
+
+class HTTPResponse:
+    def __init__(self, status: int, reason: str, headers: Dict[str, str], body: bytes):
+        self.status: int = status
+        self.reason: str = reason
+        # header names are lower case
+        self.headers: Dict[str, str] = headers
+        self.body: bytes = body
+
+
+class HTTPTransport:
+    """
+    Sends requests to a single origin (scheme, host and port) over at most
+    `maxconnections` concurrent connections, which are kept open between
+    requests. Threads wait for a free connection once all are in use.
+    `connecttimeout` bounds opening a connection, and `timeout` each read of
+    a response. With `gzip`, compressed responses are accepted. With a
+    `scheduler`, requests are sent when it admits them.
+    """
+    def __init__(
+            self,
+            origin: str,
+            maxconnections: int = DEFAULT_MAXCONNECTIONS,
+            connecttimeout: Optional[float] = DEFAULT_CONNECT_TIMEOUT,
+            timeout: Optional[float] = DEFAULT_TIMEOUT,
+            gzip: bool = True,
+            scheduler: Optional[RPCScheduler] = None,
+    ):
+        url = urllib.parse.urlsplit(origin)
+        if url.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL: {origin}")
+        self._https: bool = url.scheme == 'https'
+        self._host: str = url.hostname or 'localhost'
+        self._port: int = url.port or (443 if self._https else 80)
+        self._connecttimeout: Optional[float] = connecttimeout
+        self._timeout: Optional[float] = timeout
+        self._gzip: bool = gzip
+        self.scheduler: Optional[RPCScheduler] = scheduler
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconnections)
+        self._idle: List[http.client.HTTPConnection] = []
+        self._stats: Dict[str, int] = {'requests': 0, 'connections': 0}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def request(
+            self,
+            method: str,
+            path: str,
+            body: Optional[bytes] = None,
+            headers: Optional[Dict[str, str]] = None,
+    ) -> HTTPResponse:
+        """Send a request for `path` (including any query) and read the whole response"""
+        headers = dict(headers or {})
+        if self._gzip:
+            headers['Accept-Encoding'] = 'gzip'
+        if self.scheduler is None:
+            return self._send(method, path, body, headers)
+        # identical reads in flight share a response
+        key = (path, tuple(sorted(headers.items()))) if method == 'GET' else None
+        response: HTTPResponse = self.scheduler.run(key, lambda: self._send(method, path, body, headers))
+        return response
+
+    def _send(self, method: str, path: str, body: Optional[bytes], headers: Dict[str, str]) -> HTTPResponse:
+        with self._slots:
+            while True:
+                connection, reused = self._connection()
+                try:
+                    connection.request(method, path, body=body, headers=headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                except (ConnectionError, http.client.BadStatusLine) as exc:
+                    # covers RemoteDisconnected
+                    connection.close()
+                    # the server may close an idle connection at any time;
+                    # retry on a new connection, but not if a new connection
+                    # failed
+                    if reused:
+                        log.debug(f"Reconnecting after {exc!r} on an idle connection")
+                        continue
+                    raise
+                except BaseException:
+                    connection.close()
+                    raise
+                with self._lock:
+                    self._stats['requests'] += 1
+                    if not response.will_close:
+                        self._idle.append(connection)
+                if response.will_close:
+                    connection.close()
+                responseheaders = {name.lower(): value for name, value in response.getheaders()}
+                if responseheaders.get('content-encoding', '').lower() == 'gzip':
+                    data = gzip.decompress(data)
+                return HTTPResponse(response.status, response.reason, responseheaders, data)
+
+    def close(self):
+        """Close the idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def _connection(self) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+            self._stats['connections'] += 1
+        connection: http.client.HTTPConnection
+        if self._https:
+            connection = http.client.HTTPSConnection(self._host, self._port, timeout=self._connecttimeout)
+        else:
+            connection = http.client.HTTPConnection(self._host, self._port, timeout=self._connecttimeout)
+        connection.connect()
+        connection.sock.settimeout(self._timeout)
+        return connection, False
+
+
+def _origin(address: str) -> str:
+    url = urllib.parse.urlsplit(address)
+    return f'{url.scheme}://{url.netloc}'
+
+
+def _optionalfloat(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return float(value) if value else None
+
+
+# transports are shared by all clients of an origin
+_transports: Dict[str, HTTPTransport] = {}
+_transports_lock = threading.Lock()
+
+
+def sharedtransport(address: str, ratelimit: Optional[float] = None) -> HTTPTransport:
+    """
+    The shared transport for the origin of a client address. The first call
+    for an origin creates it, scheduling requests at up to `ratelimit`
+    requests per second if given.
+    """
+    origin = _origin(address)
+    with _transports_lock:
+        if origin not in _transports:
+            ratelimit = _optionalfloat('ALGODAO_HTTP_RATELIMIT', ratelimit)
+            _transports[origin] = HTTPTransport(
+                origin,
+                maxconnections=int(os.getenv('ALGODAO_HTTP_MAXCONNECTIONS', str(DEFAULT_MAXCONNECTIONS))),
+                connecttimeout=_optionalfloat('ALGODAO_HTTP_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT),
+                timeout=_optionalfloat('ALGODAO_HTTP_TIMEOUT', DEFAULT_TIMEOUT),
+                gzip=os.getenv('ALGODAO_HTTP_GZIP', '1') != '0',
+                scheduler=RPCScheduler(ratelimit) if ratelimit else None,
+            )
+        return _transports[origin]
+
+
+def _url(address: str, requrl: str, params: Optional[Dict[str, Any]]) -> str:
+    if requrl not in algosdk.constants.unversioned_paths:
+        requrl = api_version_path_prefix + requrl
+    if params:
+        requrl = requrl + '?' + urllib.parse.urlencode(params)
+    return urllib.parse.urlsplit(address).path.rstrip('/') + requrl
+
+
+def _errormessage(response: HTTPResponse) -> Any:
+    message: Any = response.body.decode('utf-8', errors='replace')
+    try:
+        return json.loads(message)['message']
+    except (ValueError, KeyError, TypeError):
+        return message
+
+
+class PooledAlgodClient(AlgodClient):
+    """An algosdk AlgodClient whose requests go through a pooled HTTPTransport"""
+    def __init__(
+            self,
+            algod_token: str,
+            algod_address: str,
+            headers: Optional[Dict[str, str]] = None,
+            transport: Optional[HTTPTransport] = None,
+    ):
+        super().__init__(algod_token, algod_address, headers)
+        self.transport: HTTPTransport = transport or sharedtransport(algod_address)
+
+    def algod_request(
+            self,
+            method,
+            requrl,
+            params=None,
+            data=None,
+            headers=None,
+            response_format='json',
+    ):
+        header = {'User-Agent': 'py-algorand-sdk'}
+        if self.headers:
+            header.update(self.headers)
+        if headers:
+            header.update(headers)
+        if requrl not in algosdk.constants.no_auth:
+            header[algosdk.constants.algod_auth_header] = self.algod_token
+        response = self.transport.request(method, _url(self.algod_address, requrl, params), data, header)
+        if response.status >= 400:
+            raise algosdk.error.AlgodHTTPError(_errormessage(response), response.status)
+        if response_format == 'json':
+            try:
+                return json.loads(response.body)
+            except ValueError as exc:
+                raise algosdk.error.AlgodResponseError("Failed to parse JSON response from algod") from exc
+        return response.body
+
+
+def _sortdict(dictionary: Dict[str, Any]) -> Dict[str, Any]:
+    # as algosdk's IndexerClient does
+    return {
+        key: _sortdict(value) if isinstance(value, dict) else value
+        for key, value in sorted(dictionary.items())
+    }
+
+
+class PooledIndexerClient(IndexerClient):
+    """An algosdk IndexerClient whose requests go through a pooled HTTPTransport"""
+    def __init__(
+            self,
+            indexer_token: str,
+            indexer_address: str,
+            headers: Optional[Dict[str, str]] = None,
+            transport: Optional[HTTPTransport] = None,
+    ):
+        super().__init__(indexer_token, indexer_address, headers)
+        self.transport: HTTPTransport = transport or sharedtransport(indexer_address)
+
+    def indexer_request(self, method, requrl, params=None, data=None, headers=None):
+        header = {'User-Agent': 'py-algorand-sdk'}
+        if self.headers:
+            header.update(self.headers)
+        if headers:
+            header.update(headers)
+        if requrl not in algosdk.constants.no_auth and self.indexer_token:
+            header[algosdk.constants.indexer_auth_header] = self.indexer_token
+        response = self.transport.request(method, _url(self.indexer_address, requrl, params), data, header)
+        if response.status >= 400:
+            raise algosdk.error.IndexerHTTPError(_errormessage(response))
+        return _sortdict(json.loads(response.body.decode('utf-8')))
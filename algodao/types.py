@@ -14,6 +14,8 @@ PendingTransactionInfo = TypedDict(
     {
         'asset-index': int,
         'application-index': int,
+        'confirmed-round': int,
+        'pool-error': str,
         # mypy does not support cyclic references but the elements of this
         # list will also be PendingTransactionInfo type
         'inner-txns': List[Any]
@@ -31,15 +33,6 @@ AssetInfo = TypedDict(
     }
 )
 
-AccountInfo = TypedDict(
-    'AccountInfo',
-    {
-        'amount': int,
-        'assets': List[AssetInfo]
-    }
-)
-
-
 AssetBalanceInfo = TypedDict(
     'AssetBalanceInfo',
     {
@@ -104,3 +97,23 @@ ApplicationInfo = TypedDict(
     }
 )
 
+
+ApplicationLocalState = TypedDict(
+    'ApplicationLocalState',
+    {
+        'id': int,
+        'key-value': TealKeyValueStore,
+        'schema': ApplicationStateSchema,
+    }
+)
+
+
+AccountInfo = TypedDict(
+    'AccountInfo',
+    {
+        'amount': int,
+        'assets': List[AssetInfo],
+        'apps-local-state': List[ApplicationLocalState],
+        'created-apps': List[ApplicationInfo],
+    }
+)
@@ -0,0 +1,107 @@
+"""
+Off-chain verification that deployed apps run the expected programs. This is
+the check the Trust Committee performs before preapproving a Proposal in the
+PreapprovalGate: the compiled programs of a reference contract are compared to
+the programs of each candidate app.
+"""
+import base64
+import concurrent.futures
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import algosdk.error
+from algosdk.v2client.algod import AlgodClient
+
+import algodao.scheduler
+from algodao.assets import ElectionToken
+from algodao.contract import CreateContract
+from algodao.governance import programhash
+from algodao.types import ApplicationInfo
+from algodao.voting import Proposal, ProposalType
+
+log = logging.getLogger(__name__)
+
+
+class VerificationResult(NamedTuple):
+    appid: int
+    matches: bool
+    # hex-encoded sha256 of the deployed approval and clear programs
+    approval_hash: Optional[str]
+    clear_hash: Optional[str]
+    # hex-encoded hash of both programs, as allowlisted by the PreapprovalGate
+    program_hash: Optional[str]
+    error: Optional[str] = None
+
+
+class ProgramVerifier:
+    """
+    Compares the programs of deployed apps against the programs of a
+    reference contract. The reference contract is compiled once, the first
+    time it is needed.
+    """
+    def __init__(self, algod: AlgodClient, reference: CreateContract):
+        self._algod: AlgodClient = algod
+        self._reference: CreateContract = reference
+        self._programs: Optional[Tuple[bytes, bytes]] = None
+
+    @property
+    def programs(self) -> Tuple[bytes, bytes]:
+        if self._programs is None:
+            self._programs = self._reference.compile(self._algod)
+        return self._programs
+
+    @property
+    def program_hash(self) -> str:
+        return programhash(*self.programs).hex()
+
+    def verify(self, appid: int) -> VerificationResult:
+        try:
+            info: ApplicationInfo = self._algod.application_info(appid)
+        except algosdk.error.AlgodHTTPError as exc:
+            return VerificationResult(appid, False, None, None, None, str(exc))
+        approval = base64.b64decode(info['params']['approval-program'])
+        clear = base64.b64decode(info['params']['clear-state-program'])
+        return VerificationResult(
+            appid,
+            (approval, clear) == self.programs,
+            hashlib.sha256(approval).hexdigest(),
+            hashlib.sha256(clear).hexdigest(),
+            programhash(approval, clear).hex(),
+        )
+
+    def _verifybulk(self, appid: int) -> VerificationResult:
+        # a scan must not hold up interactive calls to a rate-limited API
+        with algodao.scheduler.bulk():
+            return self.verify(appid)
+
+    def verifymany(
+            self,
+            appids: Iterable[int],
+            max_workers: int = 32,
+    ) -> Dict[int, VerificationResult]:
+        """
+        Verify many apps, fetching their programs concurrently. Returns the
+        results keyed by app ID, in the order the app IDs were given.
+        """
+        appids = list(appids)
+        # compile the reference before fanning out so it is only done once
+        self.programs
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results: List[VerificationResult] = list(executor.map(self._verifybulk, appids))
+        mismatches = sum(not result.matches for result in results)
+        log.info(f"Verified {len(results)} apps, {mismatches} do not match")
+        return OrderedDict((result.appid, result) for result in results)
+
+
+def proposal_verifier(algod: AlgodClient) -> ProgramVerifier:
+    """
+    Create a verifier for the standard Proposal contract. The Proposal program
+    does not depend on the proposal's settings (they are passed as creation
+    arguments), so any CreateProposal serves as the reference.
+    """
+    reference = Proposal.CreateProposal(
+        '', ElectionToken(0), 0, 0, 0, 0, 2, 0, ProposalType.PAYMENT
+    )
+    return ProgramVerifier(algod, reference)
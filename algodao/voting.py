@@ -1,27 +1,33 @@
 # This example is provided for informational purposes only and has not been
 # audited for security.
+from __future__ import annotations
+
 import enum
 import logging
 from collections import OrderedDict
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING
 
 import algosdk.account
 import algosdk.logic
-import pyteal
 from algosdk.future import transaction
 from algosdk.v2client.algod import AlgodClient
 from algosdk.v2client.indexer import IndexerClient
-from pyteal import Int, Expr, Return, Bytes, App, Assert, InnerTxnBuilder
-from pyteal import Txn, Btoi, Global, Seq, And, TxnField, Concat, TxnType
-from pyteal import Gtxn, Cond, OnComplete, Subroutine, Or, If, Itob
-from pyteal import TealType, Substring, ScratchVar
 
 import algodao.deploy
 import algodao.helpers
-from algodao.contract import CreateContract, DeployedContract, GlobalVariables
+import algodao.ledger
+import algodao.params
+import algodao.programs
+import algodao.readcache
+import algodao.scheduler
+import algodao.states
+from algodao.contract import AppState, CreateContract, DeployedContract, GlobalVariables
 from algodao.types import AssetBalances, ApplicationInfo
 from algodao.assets import ElectionToken, GovernanceToken, TokenDistributionTree
 
+if TYPE_CHECKING:
+    from pyteal import Expr
+
 log = logging.getLogger(__name__)
 
 
@@ -38,36 +44,6 @@ class VoteType(enum.Enum):
     GOVERNANCE_TOKEN = 1
 
 
-@Subroutine(TealType.uint64)
-def is_updown_vote(votetype: Expr) -> Expr:
-    return Return(Or(
-        votetype == Int(ProposalType.PAYMENT.value),
-        votetype == Int(ProposalType.ADD_COMMITTEE_MEMBER.value),
-        votetype == Int(ProposalType.CLOSE_AND_DISBURSE.value),
-        votetype == Int(ProposalType.EJECT_COMMITTEE_MEMBER.value),
-        votetype == Int(ProposalType.NEW_COMMITTEE.value),
-    ))
-
-
-@Subroutine(TealType.bytes)
-def proposal_payment_address(addl_data: Expr):
-    return Return(Substring(addl_data, Int(0), Int(32)))
-
-
-@Subroutine(TealType.uint64)
-def proposal_payment_amount(addl_data: Expr):
-    return Return(Btoi(Substring(addl_data, Int(32), Int(40))))
-
-
-@Subroutine(TealType.uint64)
-def minvotesneeded(vtype_data: Expr, total_votes: Expr):
-    win_pct = ScratchVar(TealType.uint64)
-    return Seq([
-        win_pct.store(Btoi(Substring(vtype_data, Int(8), Int(16)))),
-        Return(win_pct.load() * total_votes / Int(100))
-    ])
-
-
 class Proposal:
     class GlobalInts(GlobalVariables):
         RegBegin = enum.auto()
@@ -84,10 +60,12 @@ class Proposal:
 
         @classmethod
         def option(cls, num: Expr):
+            from pyteal import Bytes, Concat, Itob
             return Concat(Bytes("Option"), Itob(num))
 
         @classmethod
         def allvotes(cls, num: Expr):
+            from pyteal import Bytes, Concat, Itob
             return Concat(Bytes("AllVotes"), Itob(num))
 
     class GlobalBytes(GlobalVariables):
@@ -139,146 +117,12 @@ class Proposal:
             )
 
         def approval_program(self) -> Expr:
-            GlobalInts = Proposal.GlobalInts
-            GlobalBytes = Proposal.GlobalBytes
-            on_creation = Seq([
-                Assert(Txn.application_args.length() == Int(11)),
-                GlobalBytes.Name.put(Txn.application_args[0]),
-                GlobalInts.VoteAssetId.put(Btoi(Txn.application_args[1])),
-                GlobalInts.RegBegin.put(Btoi(Txn.application_args[2])),
-                GlobalInts.RegEnd.put(Btoi(Txn.application_args[3])),
-                GlobalInts.VoteBegin.put(Btoi(Txn.application_args[4])),
-                GlobalInts.VoteEnd.put(Btoi(Txn.application_args[5])),
-                GlobalInts.NumOptions.put(Btoi(Txn.application_args[6])),
-                GlobalInts.ProposalType.put(Btoi(Txn.application_args[7])),
-                GlobalInts.DaoId.put(Btoi(Txn.application_args[8])),
-                GlobalBytes.VoteTypeData.put(Txn.application_args[9]),
-                GlobalBytes.AdditionalData.put(Txn.application_args[10]),
-                GlobalInts.Passed.put(Int(0)),
-                GlobalInts.Implemented.put(Int(0)),
-                GlobalInts.VoteType.put(Int(VoteType.GOVERNANCE_TOKEN.value)),
-                If(
-                    is_updown_vote(GlobalInts.ProposalType.get()),
-                    Seq([
-                        App.globalPut(Concat(Bytes("Option"), Itob(Int(1))), Bytes("Yes")),
-                        App.globalPut(Concat(Bytes("Option"), Itob(Int(2))), Bytes("No")),
-                    ]),
-                    # Currently all implemented vote types are up/down votes;
-                    # to support multioption proposals we could pass in the
-                    # options as additional application args
-                    Assert(Int(0)),
-                ),
-                Return(Int(1)),
-            ])
-            on_register = Return(
-                And(
-                    Global.round() >= GlobalInts.RegBegin.get(),
-                    Global.round() <= GlobalInts.RegEnd.get(),
-                )
-            )
-            is_creator = Txn.sender() == Global.creator_address()
-            on_optintoken = Seq([
-                Assert(is_creator),
-                InnerTxnBuilder.Begin(),
-                InnerTxnBuilder.SetFields({
-                    TxnField.type_enum: TxnType.AssetTransfer,
-                    TxnField.asset_receiver: Global.current_application_address(),
-                    TxnField.xfer_asset: Btoi(Txn.application_args[1]),
-                    TxnField.asset_amount: Int(0),
-                }),
-                InnerTxnBuilder.Submit(),
-                Return(Int(1)),
-            ])
-            on_setvotetoken = Seq([
-                Assert(is_creator),
-                Assert(GlobalInts.VoteAssetId.get() == Int(0)),
-                GlobalInts.VoteAssetId.put(Btoi(Txn.application_args[1])),
-                Return(Int(1)),
-            ])
-            option = Txn.application_args[1]
-            globalname = Concat(Bytes("AllVotes"), option)
-            votes = Gtxn[1].asset_amount()
-            on_vote = Seq([
-                Assert(And(
-                    Global.round() >= GlobalInts.VoteBegin.get(),
-                    Global.round() <= GlobalInts.VoteEnd.get(),
-                    Global.group_size() == Int(2),
-                    Txn.group_index() == Int(0),
-                    Gtxn[1].xfer_asset() == GlobalInts.VoteAssetId.get(),
-                    Gtxn[1].asset_receiver() == Global.current_application_address(),
-                    Btoi(option) > Int(0),
-                    Btoi(option) <= GlobalInts.NumOptions.get(),
-                )),
-                App.localPut(
-                    Txn.sender(),
-                    Concat(Bytes("Voted"), option),
-                    votes
-                ),
-                App.globalPut(
-                    globalname,
-                    App.globalGet(globalname) + votes
-                ),
-                Return(Int(1)),
-            ])
-            yesvotes = ScratchVar(TealType.uint64)
-            novotes = ScratchVar(TealType.uint64)
-            minvotes = ScratchVar(TealType.uint64)
-            on_finalizevote = Seq([
-                Assert(And(
-                    Global.round() > GlobalInts.VoteEnd.get(),
-                    Txn.application_args.length() == Int(1),
-                )),
-                If(
-                    is_updown_vote(GlobalInts.VoteType.get()),
-                    Seq([
-                        Assert(And(
-                            App.globalGet(GlobalInts.option(Int(1))) == Bytes("Yes"),
-                            App.globalGet(GlobalInts.option(Int(2))) == Bytes("No"),
-                        )),
-                        yesvotes.store(App.globalGet(GlobalInts.allvotes(Int(1)))),
-                        novotes.store(App.globalGet(GlobalInts.allvotes(Int(2)))),
-                        minvotes.store(minvotesneeded(
-                            GlobalBytes.VoteTypeData.get(),
-                            yesvotes.load() + novotes.load()
-                        )),
-                        If(
-                            yesvotes.load() >= minvotes.load(),
-                            GlobalInts.Passed.put(Int(1))
-                        ),
-                        Return(Int(1)),
-                    ]),
-                ),
-                Return(Int(0)),
-            ])
-            on_setimplemented = Seq([
-                Assert(And(
-                    Global.group_size() == Int(2),
-                    Txn.group_index() == Int(1),
-                    Txn.application_args.length() == Int(1),
-                    Gtxn[0].application_id() == GlobalInts.DaoId.get(),
-                    Gtxn[0].application_args[0] == Bytes("implementproposal"),
-                    GlobalInts.Implemented.get() == Int(0),
-                )),
-                GlobalInts.Implemented.put(Int(1)),
-                Return(Int(1)),
-            ])
-            on_closeout = Return(Int(1))
-            program = Cond(
-                [Txn.application_id() == Int(0), on_creation],
-                [Txn.on_completion() == OnComplete.DeleteApplication, Return(Int(0))],
-                [Txn.on_completion() == OnComplete.UpdateApplication, Return(Int(0))],
-                [Txn.on_completion() == OnComplete.CloseOut, on_closeout],
-                [Txn.on_completion() == OnComplete.OptIn, on_register],
-                [Txn.application_args[0] == Bytes("vote"), on_vote],
-                [Txn.application_args[0] == Bytes("optintoken"), on_optintoken],
-                [Txn.application_args[0] == Bytes("setvotetoken"), on_setvotetoken],
-                [Txn.application_args[0] == Bytes("setimplemented"), on_setimplemented],
-                [Txn.application_args[0] == Bytes("finalizevote"), on_finalizevote],
-            )
-            return program
+            from algodao.programs.voting import proposal_approval_program
+            return proposal_approval_program()
 
         def clear_program(self) -> Expr:
-            return Return(Int(1))
+            from algodao.programs.voting import proposal_clear_program
+            return proposal_clear_program()
 
         def createapp_args(self) -> List[bytes]:
             return [
@@ -307,36 +151,53 @@ class Proposal:
             return transaction.StateSchema(local_ints, local_bytes)
 
     class DeployedProposal(DeployedContract):
-        def __init__(self, algod: AlgodClient, appid: int):
-            appinfo: ApplicationInfo = algod.application_info(appid)
-            self._assetid = algodao.helpers.readintfromstore(
-                appinfo['params']['global-state'],
-                Proposal.GlobalInts.VoteAssetId.name.encode()
-            )
-            self._num_options = algodao.helpers.readintfromstore(
-                appinfo['params']['global-state'],
-                Proposal.GlobalInts.NumOptions.name.encode()
-            )
+        def __init__(
+                self,
+                algod: Optional[AlgodClient],
+                appid: int,
+                appinfo: Optional[ApplicationInfo] = None,
+        ):
+            """The app info is fetched unless given (e.g., by algodao.aio)"""
+            if appinfo is None:
+                appinfo = algodao.readcache.application_info(algod, appid)
+            state = AppState.fromapp(appinfo)
+            self._assetid = state.getint(Proposal.GlobalInts.VoteAssetId)
+            self._num_options = state.getint(Proposal.GlobalInts.NumOptions)
             super(Proposal.DeployedProposal, self).__init__(appid)
 
+        def build_optintoken(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+                assetid: int,
+        ) -> List[transaction.Transaction]:
+            return [
+                self.method_txn(
+                    params,
+                    addr,
+                    b'optintoken',
+                    [
+                        algodao.helpers.int2bytes(assetid),
+                    ],
+                    foreign_assets=[assetid],
+                )
+            ]
+
         def call_optintoken(self, algod: AlgodClient, addr: str, privkey: str, assetid: int):
-            return self.call_method(
-                algod,
-                addr,
-                privkey,
-                b'optintoken',
-                [
-                    algodao.helpers.int2bytes(assetid),
-                ],
-                foreign_assets=[assetid],
-            )
+            params = algodao.params.suggested_params(algod)
+            return self.submit(algod, privkey, self.build_optintoken(params, addr, assetid))
 
-        def call_vote(self, algod: AlgodClient, addr: str, privkey: str, option: int, amount: int):
+        def build_vote(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+                option: int,
+                amount: int,
+        ) -> List[transaction.Transaction]:
             args: List[bytes] = [
                 b"vote",
                 algodao.helpers.int2bytes(option)
             ]
-            params = algod.suggested_params()
             appaddr = algosdk.logic.get_application_address(self._appid)
             txn1 = transaction.ApplicationNoOpTxn(
                 addr,
@@ -351,26 +212,40 @@ class Proposal:
                 amount,
                 self._assetid,
             )
-            groupid = transaction.calculate_group_id([txn1, txn2])
-            txn1.group = groupid
-            txn2.group = groupid
-            signed1 = txn1.sign(privkey)
-            signed2 = txn2.sign(privkey)
-            try:
-                txid = algod.send_transactions([signed1, signed2])
-                algodao.helpers.wait_for_confirmation(algod, txid)
-            except Exception as exc:
-                algodao.helpers.writedryrun(algod, [signed1, signed2,], 'failed_txn1')
-                raise
+            return [txn1, txn2]
+
+        def call_vote(self, algod: AlgodClient, addr: str, privkey: str, option: int, amount: int):
+            params = algodao.params.suggested_params(algod)
+            return self.submit(algod, privkey, self.build_vote(params, addr, option, amount))
+
+        def votes(
+                self,
+                algod: AlgodClient,
+                addrs: Iterable[str],
+                max_workers: int = algodao.states.DEFAULT_MAX_WORKERS,
+        ) -> Iterator[Tuple[str, Dict[int, int]]]:
+            """
+            The votes cast by those of the accounts that voted, as the number
+            of votes for each option, yielded as their local states arrive
+            """
+            for addr, state in algodao.states.localstates(algod, self.appid, addrs, max_workers):
+                cast = {
+                    option: state.getint(b'Voted' + algodao.helpers.int2bytes(option))
+                    for option in range(1, self._num_options + 1)
+                }
+                if any(cast.values()):
+                    yield addr, {option: votes for option, votes in cast.items() if votes}
+
+        def build_finalizevote(
+                self,
+                params: transaction.SuggestedParams,
+                addr: str,
+        ) -> List[transaction.Transaction]:
+            return [self.method_txn(params, addr, b'finalizevote', [])]
 
         def call_finalizevote(self, algod: AlgodClient, addr: str, privkey: str):
-            return self.call_method(
-                algod,
-                addr,
-                privkey,
-                b'finalizevote',
-                []
-            )
+            params = algodao.params.suggested_params(algod)
+            return self.submit(algod, privkey, self.build_finalizevote(params, addr))
 
     @classmethod
     def deploy(cls, algod: AlgodClient, createprop: CreateProposal, privkey: str):
@@ -381,22 +256,29 @@ class Proposal:
 class Election:
     def __init__(
             self,
-            indexer: IndexerClient,
+            indexer: Optional[IndexerClient],
             governence_token: GovernanceToken,
             vote_token: ElectionToken,
             governance2votes: Callable[[int], int],
             beginreg: int,
             endreg: int,
+            ledger: Optional[algodao.ledger.AssetLedger] = None,
     ):
         self._governance_token: GovernanceToken = governence_token
         self._vote_token: ElectionToken = vote_token
-        self._indexer: IndexerClient = indexer
+        self._indexer: Optional[IndexerClient] = indexer
         self._gov2votes = governance2votes
         self._beginreg = beginreg
         self._endreg = endreg
-
-    def builddistribution(self):
-        balance_dict: Dict[str, int] = self.gettokencounts()
+        # snapshots are taken from the ledger rather than the indexer if given
+        self._ledger: Optional[algodao.ledger.AssetLedger] = ledger
+
+    def builddistribution(self, algoround: Optional[int] = None):
+        """
+        Build the distribution tree of vote tokens from the governance token
+        balances, at a round if the election has a ledger
+        """
+        balance_dict: Dict[str, int] = self.gettokencounts(algoround)
         votedist: OrderedDict[str, int] = OrderedDict(
             (address, self._gov2votes(govcount))
             for address, govcount in balance_dict.items()
@@ -408,11 +290,17 @@ class Election:
             self._endreg
         )
 
-    def gettokencounts(self) -> Dict[str, int]:
+    def gettokencounts(self, algoround: Optional[int] = None) -> Dict[str, int]:
+        if self._ledger is not None:
+            return self._ledger.balances(self._governance_token.asset_id, algoround)
+        assert self._indexer is not None, "Snapshots need an indexer or a ledger"
+        assert algoround is None, "Snapshots at a round need a ledger"
         balance_dict = {}
-        balances: AssetBalances = self._indexer.asset_balances(
-            self._governance_token.asset_id
-        )
+        # a snapshot must not hold up interactive calls to a rate-limited API
+        with algodao.scheduler.bulk():
+            balances: AssetBalances = self._indexer.asset_balances(
+                self._governance_token.asset_id
+            )
         for balance in balances['balances']:
             amount: int = balance['amount']
             address: str = balance['address']
@@ -420,4 +308,11 @@ class Election:
         return balance_dict
 
 
-
+# PyTeal helpers that moved to algodao.programs.voting, still importable from
+# here; they load PyTeal on first use
+__getattr__ = algodao.programs.forwarder(__name__, [
+    'is_updown_vote',
+    'minvotesneeded',
+    'proposal_payment_address',
+    'proposal_payment_amount',
+])
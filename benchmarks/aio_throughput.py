@@ -0,0 +1,77 @@
+"""
+Benchmark the throughput of votes through the sync API, sequentially and from
+a thread pool, against the asyncio API driving every vote from one event loop.
+This runs against the local stand-in node (see tests/standin.py), with a fixed
+latency added to every response, rather than the sandbox:
+
+    python -m benchmarks.aio_throughput
+"""
+import asyncio
+import concurrent.futures
+import time
+
+import algosdk.account
+from algosdk.v2client.algod import AlgodClient
+
+import algodao.aio
+import algodao.aio.confirmations
+from algodao.voting import Proposal
+
+from tests.standin import StandinAlgod
+
+APPID = 7
+LATENCY = 0.005
+BLOCKINTERVAL = 0.2
+SEQUENTIAL_VOTES = 20
+THREADS = 32
+CONCURRENT_VOTES = 1000
+
+
+def accounts(count: int):
+    return [algosdk.account.generate_account() for _ in range(count)]
+
+
+def syncsequential(node: StandinAlgod) -> float:
+    algod = AlgodClient('', node.address)
+    proposal = Proposal.DeployedProposal(algod, APPID)
+    start = time.perf_counter()
+    for privkey, addr in accounts(SEQUENTIAL_VOTES):
+        proposal.call_vote(algod, addr, privkey, 1, 1)
+    return SEQUENTIAL_VOTES / (time.perf_counter() - start)
+
+
+def syncthreads(node: StandinAlgod) -> float:
+    algod = AlgodClient('', node.address)
+    proposal = Proposal.DeployedProposal(algod, APPID)
+    voters = accounts(CONCURRENT_VOTES)
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(THREADS) as executor:
+        list(executor.map(lambda voter: proposal.call_vote(algod, voter[1], voter[0], 1, 1), voters))
+    return CONCURRENT_VOTES / (time.perf_counter() - start)
+
+
+async def asyncvotes(node: StandinAlgod) -> float:
+    client = algodao.aio.AsyncAlgodClient('', node.address)
+    try:
+        proposal = await algodao.aio.AsyncProposal.load(client, APPID)
+        voters = accounts(CONCURRENT_VOTES)
+        start = time.perf_counter()
+        await asyncio.gather(*(proposal.call_vote(addr, privkey, 1, 1) for privkey, addr in voters))
+        elapsed = time.perf_counter() - start
+        print(f"aio connections opened: {client.stats['connections']}")
+        return CONCURRENT_VOTES / elapsed
+    finally:
+        await algodao.aio.confirmations.tracker(client).close()
+        await client.close()
+
+
+def main():
+    with StandinAlgod(blockinterval=BLOCKINTERVAL, latency=LATENCY) as node:
+        node.setapp(APPID, {b'VoteAssetId': 9, b'NumOptions': 2})
+        print(f"sync, sequential:    {syncsequential(node):7.1f} votes/s ({SEQUENTIAL_VOTES} votes)")
+        print(f"sync, {THREADS} threads:    {syncthreads(node):7.1f} votes/s ({CONCURRENT_VOTES} votes)")
+        print(f"aio, one event loop: {asyncio.run(asyncvotes(node)):7.1f} votes/s ({CONCURRENT_VOTES} votes)")
+
+
+if __name__ == '__main__':
+    main()
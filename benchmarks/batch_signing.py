@@ -0,0 +1,64 @@
+"""
+Benchmark signing throughput: signing and encoding vote transactions inline,
+one at a time as the call_* helpers do, against signing them with a
+BatchSigner in a pool of worker processes (one per CPU, and a few fixed
+pool sizes). Nothing is sent; only the signed, encoded blobs are produced:
+
+    python -m benchmarks.batch_signing
+"""
+import base64
+import os
+import time
+from typing import List, Tuple
+
+import algosdk.account
+import algosdk.encoding
+from algosdk.future import transaction
+
+from algodao.signing import DEFAULT_CHUNKSIZE, BatchSigner
+
+APPID = 7
+SIGNERS = 16
+TRANSACTIONS = 20000
+POOL_SIZES = (2, 4, 8)
+
+
+def transactions() -> List[Tuple[transaction.Transaction, str]]:
+    params = transaction.SuggestedParams(0, 1, 1000, 'A' * 44, 'bench-v1', flat_fee=True)
+    keys = [algosdk.account.generate_account() for _ in range(SIGNERS)]
+    return [
+        (transaction.ApplicationNoOpTxn(addr, params, APPID, [b'vote', (index % 2).to_bytes(8, 'big')]), privkey)
+        for index in range(TRANSACTIONS)
+        for privkey, addr in [keys[index % SIGNERS]]
+    ]
+
+
+def inline(txns: List[Tuple[transaction.Transaction, str]]) -> float:
+    start = time.perf_counter()
+    for txn, privkey in txns:
+        base64.b64decode(algosdk.encoding.msgpack_encode(txn.sign(privkey)))
+    return len(txns) / (time.perf_counter() - start)
+
+
+def pooled(txns: List[Tuple[transaction.Transaction, str]], workers: int) -> float:
+    with BatchSigner(max_workers=workers) as signer:
+        handles = {privkey: signer.addkey(privkey) for _, privkey in txns}
+        items = [(txn, handles[privkey]) for txn, privkey in txns]
+        # start every worker before timing
+        signer.sign(items[:2 * workers * DEFAULT_CHUNKSIZE])
+        start = time.perf_counter()
+        signer.sign(items)
+        return len(txns) / (time.perf_counter() - start)
+
+
+def main():
+    txns = transactions()
+    cpus = os.cpu_count() or 1
+    print(f"{TRANSACTIONS} transactions, {cpus} CPUs")
+    print(f"inline:              {inline(txns):9.1f} signatures/s")
+    for workers in sorted({cpus, *POOL_SIZES}):
+        print(f"pool, {workers:2d} processes: {pooled(txns, workers):9.1f} signatures/s")
+
+
+if __name__ == '__main__':
+    main()
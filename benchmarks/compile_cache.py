@@ -0,0 +1,70 @@
+"""
+Benchmark contract deployment with a cold and a warm compile cache. Like the
+tests, this runs against the Algorand sandbox:
+
+    python -m benchmarks.compile_cache
+"""
+import tempfile
+import time
+from collections import OrderedDict
+
+import algosdk.account
+
+import algodao.helpers
+import tests.helpers
+from algodao.assets import TokenDistributionTree
+from algodao.committee import Committee
+from algodao.compilecache import CompileCache
+from algodao.voting import Proposal, ProposalType, ElectionToken
+
+
+def contracts():
+    addr = algosdk.account.generate_account()[1]
+    return [
+        Proposal.CreateProposal('Proposal', ElectionToken(1), 0, 1, 0, 1, 2, 0, ProposalType.PAYMENT),
+        Committee.CreateCommittee('Committee', 5),
+        TokenDistributionTree.CreateTree(ElectionToken(1), OrderedDict({addr: 1}), 0, 1),
+    ]
+
+
+def timecompile(algod, cache: CompileCache) -> float:
+    start = time.perf_counter()
+    for contract in contracts():
+        contract.compile(algod, cache)
+    return time.perf_counter() - start
+
+
+def timedeploy(algod, privkey, cache: CompileCache) -> float:
+    start = time.perf_counter()
+    for contract in contracts():
+        approval, clear = contract.compile(algod, cache)
+        algodao.deploy.create_app(
+            algod,
+            privkey,
+            approval,
+            clear,
+            contract.global_schema(),
+            contract.local_schema(),
+            contract.createapp_args(),
+        )
+    return time.perf_counter() - start
+
+
+def main():
+    algod = algodao.helpers.createclient()
+    privkey, _ = tests.helpers.create_funded(algod, 100000000)
+    with tempfile.TemporaryDirectory() as directory:
+        cache = CompileCache(directory)
+        print(f"compile, cold cache:      {timecompile(algod, cache):.3f}s")
+        print(f"compile, warm memory:     {timecompile(algod, cache):.3f}s")
+        cache.clear()
+        print(f"compile, warm disk:       {timecompile(algod, cache):.3f}s")
+        print(f"cache stats: {cache.stats}")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = CompileCache(directory)
+        print(f"deploy x3, cold cache:    {timedeploy(algod, privkey, cache):.3f}s")
+        print(f"deploy x3, warm cache:    {timedeploy(algod, privkey, cache):.3f}s")
+
+
+if __name__ == '__main__':
+    main()
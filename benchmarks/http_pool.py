@@ -0,0 +1,72 @@
+"""
+Benchmark the latency of small algod RPCs through the stock algosdk client,
+which opens a connection per request, and through the pooled keep-alive
+transport of algodao.transport. This runs against the local stand-in node
+(see tests/standin.py) over plain http, so connection setup is a TCP
+handshake only; over https each new connection also costs a TLS handshake,
+which the pool saves as well:
+
+    python -m benchmarks.http_pool
+"""
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import algosdk.error
+from algosdk.v2client.algod import AlgodClient
+
+from algodao.transport import HTTPTransport, PooledAlgodClient
+
+from tests.standin import StandinAlgod
+
+APPID = 7
+CALLS = 500
+TXID = 'A' * 52
+
+
+def rpcs(algod: AlgodClient) -> Dict[str, Callable[[], object]]:
+    def pendinginfo():
+        try:
+            algod.pending_transaction_info(TXID)
+        except algosdk.error.AlgodHTTPError:
+            # not found
+            pass
+
+    return {
+        'status': algod.status,
+        'suggested_params': algod.suggested_params,
+        'pending_transaction_info': pendinginfo,
+        'application_info': lambda: algod.application_info(APPID),
+    }
+
+
+def latencies(rpc: Callable[[], object]) -> List[float]:
+    times: List[float] = []
+    for _ in range(CALLS):
+        start = time.perf_counter()
+        rpc()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def percentile(times: List[float], pct: int) -> float:
+    return statistics.quantiles(times, n=100)[pct - 1] * 1000
+
+
+def main():
+    with StandinAlgod() as node:
+        node.setapp(APPID, {b'NumOptions': 2})
+        clients = {
+            'stock': AlgodClient('a' * 64, node.address),
+            'pooled': PooledAlgodClient('a' * 64, node.address, transport=HTTPTransport(node.address)),
+        }
+        print(f"{'rpc':<26} {'client':<8} {'p50 ms':>8} {'p99 ms':>8}")
+        for name in rpcs(clients['stock']):
+            for kind, algod in clients.items():
+                times = latencies(rpcs(algod)[name])
+                print(f"{name:<26} {kind:<8} {percentile(times, 50):8.3f} {percentile(times, 99):8.3f}")
+        print(f"pooled transport: {clients['pooled'].transport.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark the cold import time of the runtime client surface (what a claim or
+vote worker imports) against the contract builders, using the interpreter's
+import profiler. Unlike the other benchmarks this does not need the sandbox:
+
+    python -m benchmarks.importtime
+"""
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+RUNS = 5
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+SCENARIOS: List[Tuple[str, str]] = [
+    (
+        'claim worker',
+        'import algodao.assets',
+    ),
+    (
+        'vote worker',
+        'import algodao.voting, algodao.helpers',
+    ),
+    (
+        'dao client',
+        'import algodao.governance',
+    ),
+    (
+        'contract builder',
+        'import algodao.governance; algodao.governance.AlgoDao.CreateDao("", 0).approval_program()',
+    ),
+]
+
+
+def importtimes(statement: str) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Run the statement in a fresh interpreter and return the cumulative import
+    time in microseconds of each top-level import, and all imported modules
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: Dict[str, int] = {}
+    modules: List[str] = []
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        modules.append(match.group(4))
+        # nested imports are indented; only count the outermost ones
+        if len(match.group(3)) == 1:
+            times[match.group(4)] = int(match.group(2))
+    return times, modules
+
+
+def main():
+    print(f"{'scenario':<20}{'total ms':>10}{'pyteal':>8}")
+    for name, statement in SCENARIOS:
+        totals: List[float] = []
+        pyteal = False
+        for _ in range(RUNS):
+            times, modules = importtimes(statement)
+            totals.append(sum(times.values()) / 1000)
+            pyteal = pyteal or 'pyteal' in modules
+        print(f"{name:<20}{statistics.median(totals):>10.1f}{'yes' if pyteal else 'no':>8}")
+
+
+if __name__ == '__main__':
+    main()
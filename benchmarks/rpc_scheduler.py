@@ -0,0 +1,86 @@
+"""
+Benchmark interactive calls made while bulk jobs saturate a rate-limited API,
+with and without the RPC scheduler. This runs against the local stand-in node
+(see tests/standin.py) limited to RATELIMIT requests per second, rather than
+the sandbox:
+
+    python -m benchmarks.rpc_scheduler
+"""
+import concurrent.futures
+import statistics
+import threading
+import time
+from typing import Dict, List, Optional
+
+import algosdk.error
+
+import algodao.scheduler
+from algodao.scheduler import RPCScheduler
+from algodao.transport import HTTPTransport, PooledAlgodClient
+
+from tests.standin import StandinAlgod
+
+APPID = 7
+RATELIMIT = 50
+BULK_THREADS = 8
+INTERACTIVE_CALLS = 40
+INTERACTIVE_INTERVAL = 0.05
+
+
+def run(node: StandinAlgod, scheduler: Optional[RPCScheduler]) -> Dict[str, float]:
+    algod = PooledAlgodClient('a' * 64, node.address, transport=HTTPTransport(node.address, scheduler=scheduler))
+    stopped = threading.Event()
+    counts = {'bulk': 0, 'bulkfailed': 0}
+    lock = threading.Lock()
+
+    def bulkjob(appid: int):
+        with algodao.scheduler.bulk():
+            while not stopped.is_set():
+                try:
+                    algod.application_info(appid)
+                    outcome = 'bulk'
+                except algosdk.error.AlgodHTTPError:
+                    outcome = 'bulkfailed'
+                with lock:
+                    counts[outcome] += 1
+
+    latencies: List[float] = []
+    failed = 0
+    start = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(BULK_THREADS) as executor:
+        # distinct apps, so that the bulk reads are not coalesced
+        for thread in range(BULK_THREADS):
+            executor.submit(bulkjob, APPID + thread)
+        time.sleep(0.5)
+        for _ in range(INTERACTIVE_CALLS):
+            callstart = time.monotonic()
+            try:
+                algod.status()
+                latencies.append(time.monotonic() - callstart)
+            except algosdk.error.AlgodHTTPError:
+                failed += 1
+            time.sleep(INTERACTIVE_INTERVAL)
+        stopped.set()
+    elapsed = time.monotonic() - start
+    return {
+        'interactive p50 ms': statistics.median(latencies) * 1000 if latencies else float('nan'),
+        'interactive max ms': max(latencies) * 1000 if latencies else float('nan'),
+        'interactive failed': failed,
+        'bulk calls/s': counts['bulk'] / elapsed,
+        'bulk failed': counts['bulkfailed'],
+    }
+
+
+def main():
+    for name, scheduler in (('unscheduled', None), ('scheduled', RPCScheduler(RATELIMIT * 0.9))):
+        with StandinAlgod(blockinterval=None) as node:
+            for thread in range(BULK_THREADS):
+                node.setapp(APPID + thread, {b'NumOptions': 2})
+            node.ratelimit = RATELIMIT
+            results = run(node, scheduler)
+            results['429 responses'] = node.requests.get('429', 0)
+        print(f"{name}: " + ', '.join(f"{key} {value:.1f}" for key, value in results.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+"""
+Fixtures for the tests that run against the local stand-in node (see
+tests/standin.py) rather than the sandbox. The stand-in is configured with
+the keyword arguments of the `standin` marker, on a test or a module; by
+default blocks are only produced by calling produceblock:
+
+    pytestmark = pytest.mark.standin(blockinterval=0.05, latency=0.02)
+"""
+import pytest
+
+from tests.standin import StandinAlgod, pooledclient
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'standin(**options): options of the StandinAlgod of the standin fixture')
+
+
+@pytest.fixture
+def standin(request):
+    options = {'blockinterval': None}
+    marker = request.node.get_closest_marker('standin')
+    if marker is not None:
+        options.update(marker.kwargs)
+    with StandinAlgod(**options) as node:
+        yield node
+
+
+@pytest.fixture
+def algod(standin):
+    return pooledclient(standin)
@@ -0,0 +1,327 @@
+"""
+A local stand-in for algod, for tests and benchmarks of the client layer that
+must not depend on the sandbox (e.g. to inject latency). It serves the REST
+endpoints the clients use over HTTP/1.1 with keep-alive, produces a block
+every `blockinterval` seconds containing every transaction sent since the
+previous block, and returns configurable application state. Transactions are
+not validated. It also answers the indexer's health check, asset balance
+searches and searches of the accounts opted in to an application.
+"""
+import base64
+import gzip
+import http.server
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import msgpack
+
+import algodao.confirmations
+from algodao.transport import HTTPTransport, PooledAlgodClient
+
+GENESIS_HASH = b'\x01' * 32
+GENESIS_ID = 'standin-v1'
+
+
+class StandinAlgod:
+    def __init__(self, blockinterval: Optional[float] = 0.2, latency: float = 0.0, port: int = 0):
+        # with no interval, blocks are only produced by calling produceblock
+        self.blockinterval: Optional[float] = blockinterval
+        # seconds added to every response
+        self.latency: float = latency
+        # compress responses for clients that accept gzip
+        self.gzip: bool = False
+        # while down, connections are closed without a response
+        self.down: bool = False
+        # requests per second answered before responding 429 (with bursts of
+        # a second's worth)
+        self.ratelimit: Optional[float] = None
+        self._tokens: float = 0.0
+        self._refilled: float = time.monotonic()
+        self.lock = threading.Condition()
+        self.round: int = 1
+        self.blocks: Dict[int, bytes] = {1: self._encodeblock(1, [], [])}
+        self.pool: List[Dict[str, Any]] = []
+        self.pooltxids: Set[str] = set()
+        self.confirmed: Dict[str, int] = {}
+        # transaction ID -> error returned when the transaction is sent
+        self.rejections: Dict[str, str] = {}
+        self.apps: Dict[int, List[Dict[str, Any]]] = {}
+        # app ID -> local ints in the app's schema
+        self.localschemas: Dict[int, int] = {}
+        # (address, app ID) -> local state of the account in the app
+        self.localstates: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        # asset ID -> address -> amount, as served by the indexer and the
+        # account asset endpoint
+        self.assetbalances: Dict[int, Dict[str, int]] = {}
+        self.requests: Dict[str, int] = {}
+        self._stopped = threading.Event()
+        self._server = _Server(('127.0.0.1', port), _handlerclass(self))
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'StandinAlgod':
+        targets = [self._server.serve_forever]
+        if self.blockinterval is not None:
+            targets.append(self._produceblocks)
+        for target in targets:
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'StandinAlgod':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def setapp(self, appid: int, ints: Dict[bytes, int], localints: int = 0):
+        """
+        Set the global state of an application (integer values only), and the
+        number of local ints in its schema
+        """
+        self.apps[appid] = _store(ints)
+        self.localschemas[appid] = localints
+
+    def setlocal(self, addr: str, appid: int, ints: Dict[bytes, int]):
+        """Opt an account in to an application and set its local state (integer values only)"""
+        self.localstates[(addr, appid)] = _store(ints)
+
+    def produceblock(self, stibs: Optional[List[Dict[str, Any]]] = None):
+        """
+        Produce a block with the transactions in the pool, followed by
+        `stibs`: transactions with apply data in the block's encoding (state
+        keys may be strings with surrogate escapes)
+        """
+        with self.lock:
+            self.round += 1
+            txns, self.pool = self.pool, []
+            self.pooltxids = set()
+            for stxn in txns:
+                self.confirmed[algodao.confirmations.txid(stxn['txn'])] = self.round
+            self.blocks[self.round] = self._encodeblock(self.round, txns, stibs or [])
+            self.lock.notify_all()
+
+    def _produceblocks(self):
+        while not self._stopped.wait(self.blockinterval):
+            self.produceblock()
+
+    def _encodeblock(self, algoround: int, txns: List[Dict[str, Any]], extra: List[Dict[str, Any]]) -> bytes:
+        stibs = []
+        for stxn in txns:
+            stib = dict(stxn)
+            stib['txn'] = {key: value for key, value in stxn['txn'].items() if key not in ('gh', 'gen')}
+            stib['hgi'] = True
+            stibs.append(stib)
+        block = {'gh': GENESIS_HASH, 'gen': GENESIS_ID, 'rnd': algoround, 'txns': stibs + extra}
+        return msgpack.packb({'block': block}, use_bin_type=True, unicode_errors='surrogateescape')
+
+    def handle(self, method: str, path: str, body: bytes):
+        """Return the status, content type and body of the response to a request"""
+        path, _, query = path.partition('?')
+        endpoint = re.sub(r'/([A-Z2-7]{52}|[A-Z2-7]{58}|\d+)(?=/|$)', '/*', path)
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            if self.ratelimit:
+                now = time.monotonic()
+                self._tokens = min(self.ratelimit, self._tokens + (now - self._refilled) * self.ratelimit)
+                self._refilled = now
+                if self._tokens < 1:
+                    self.requests['429'] = self.requests.get('429', 0) + 1
+                    return self._error(429, 'rate limit exceeded')
+                self._tokens -= 1
+        if self.latency:
+            time.sleep(self.latency)
+        msgpackformat = 'format=msgpack' in query
+        if path == '/health':
+            return self._json({'round': self.round, 'db-available': True, 'is-migrating': False, 'message': ''})
+        if path == '/v2/status':
+            return self._json({'last-round': self.round})
+        if path.startswith('/v2/status/wait-for-block-after/'):
+            after = int(path.rsplit('/', 1)[1])
+            with self.lock:
+                self.lock.wait_for(lambda: self.round > after, timeout=60)
+                return self._json({'last-round': self.round})
+        if path == '/v2/transactions/params':
+            return self._json({
+                'fee': 0,
+                'last-round': self.round,
+                'genesis-hash': base64.b64encode(GENESIS_HASH).decode(),
+                'genesis-id': GENESIS_ID,
+                'consensus-version': 'standin',
+                'min-fee': 1000,
+            })
+        if path == '/v2/transactions' and method == 'POST':
+            unpacker = msgpack.Unpacker(raw=False, strict_map_key=False)
+            unpacker.feed(body)
+            txns = list(unpacker)
+            txids = [algodao.confirmations.txid(stxn['txn']) for stxn in txns]
+            with self.lock:
+                rejected = next((self.rejections[txid] for txid in txids if txid in self.rejections), None)
+                if rejected is not None:
+                    return 400, 'application/json', json.dumps({'message': rejected}).encode()
+                self.pool.extend(txns)
+                self.pooltxids.update(txids)
+            return self._json({'txId': txids[0]})
+        if path == '/v2/transactions/pending':
+            with self.lock:
+                pool = list(self.pool)
+            response = {'top-transactions': pool, 'total-transactions': len(pool)}
+            if msgpackformat:
+                return 200, 'application/msgpack', msgpack.packb(response, use_bin_type=True)
+            return self._json({'top-transactions': [], 'total-transactions': len(pool)})
+        if path.startswith('/v2/transactions/pending/'):
+            txid = path.rsplit('/', 1)[1]
+            with self.lock:
+                confirmed = self.confirmed.get(txid)
+                inpool = txid in self.pooltxids
+            if confirmed is None and not inpool:
+                return self._error(404, 'txn not found')
+            return self._json({'confirmed-round': confirmed or 0, 'pool-error': '', 'inner-txns': []})
+        if path.startswith('/v2/blocks/'):
+            block = self.blocks.get(int(path.rsplit('/', 1)[1]))
+            if block is None:
+                return self._error(404, 'block not found')
+            return 200, 'application/msgpack', block
+        if path.startswith('/v2/applications/'):
+            appid = int(path.rsplit('/', 1)[1])
+            if appid not in self.apps:
+                return self._error(404, 'application does not exist')
+            return self._json({'id': appid, 'params': {
+                'global-state': self.apps[appid],
+                'local-state-schema': {'num-uint': self.localschemas.get(appid, 0), 'num-byte-slice': 0},
+            }})
+        match = re.fullmatch(r'/v2/assets/(\d+)/balances', path)
+        if match:
+            return self._assetbalances(int(match.group(1)), query)
+        match = re.fullmatch(r'/v2/accounts/(\w+)/assets/(\d+)', path)
+        if match:
+            addr, assetid = match.group(1), int(match.group(2))
+            amount = self.assetbalances.get(assetid, {}).get(addr)
+            if amount is None:
+                return self._error(404, 'account asset info not found')
+            return self._json({
+                'round': self.round,
+                'asset-holding': {'amount': amount, 'asset-id': assetid, 'is-frozen': False},
+            })
+        if path == '/v2/accounts':
+            return self._appaccounts(query)
+        match = re.fullmatch(r'/v2/accounts/(\w+)/applications/(\d+)', path)
+        if match:
+            localstate = self.localstates.get((match.group(1), int(match.group(2))))
+            if localstate is None:
+                return self._error(404, 'account application info not found')
+            return self._json({
+                'round': self.round,
+                'app-local-state': {'id': int(match.group(2)), 'key-value': localstate},
+            })
+        return self._error(404, f'unknown endpoint {path}')
+
+    def _assetbalances(self, assetid: int, query: str):
+        """A page of the indexer's balances of an asset"""
+        params = dict(param.partition('=')[::2] for param in query.split('&') if param)
+        limit = int(params.get('limit', 1000))
+        start = int(params.get('next', 0))
+        with self.lock:
+            balances = sorted(self.assetbalances.get(assetid, {}).items())
+        page = balances[start:start + limit]
+        response: Dict[str, Any] = {
+            'balances': [{'address': addr, 'amount': amount, 'is-frozen': True} for addr, amount in page],
+            'current-round': self.round,
+        }
+        if start + limit < len(balances):
+            response['next-token'] = str(start + limit)
+        return self._json(response)
+
+    def _appaccounts(self, query: str):
+        """A page of the indexer's accounts opted in to an application"""
+        params = dict(param.partition('=')[::2] for param in query.split('&') if param)
+        appid = int(params['application-id'])
+        limit = int(params.get('limit', 1000))
+        start = int(params.get('next', 0))
+        with self.lock:
+            localstates = sorted(
+                (addr, localstate) for (addr, stateappid), localstate in self.localstates.items()
+                if stateappid == appid
+            )
+        page = localstates[start:start + limit]
+        response: Dict[str, Any] = {
+            'accounts': [
+                {'address': addr, 'apps-local-state': [{'id': appid, 'key-value': localstate}]}
+                for addr, localstate in page
+            ],
+            'current-round': self.round,
+        }
+        if start + limit < len(localstates):
+            response['next-token'] = str(start + limit)
+        return self._json(response)
+
+    def _json(self, response: Any):
+        return 200, 'application/json', json.dumps(response).encode()
+
+    def _error(self, status: int, message: str):
+        return status, 'application/json', json.dumps({'message': message}).encode()
+
+
+def pooledclient(standin: StandinAlgod, **options: Any) -> PooledAlgodClient:
+    """A pooled client of the stand-in, with the given HTTPTransport options"""
+    return PooledAlgodClient('a' * 64, standin.address, transport=HTTPTransport(standin.address, **options))
+
+
+def _store(ints: Dict[bytes, int]) -> List[Dict[str, Any]]:
+    return [
+        {'key': base64.b64encode(key).decode(), 'value': {'type': 2, 'uint': value, 'bytes': ''}}
+        for key, value in ints.items()
+    ]
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    # clients open many connections at once
+    request_queue_size = 1024
+
+
+def _handlerclass(standin: StandinAlgod):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # send the headers and body of each response in a single segment
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self._respond(b'')
+
+        def do_POST(self):
+            self._respond(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+
+        def _respond(self, body: bytes):
+            if standin.down:
+                self.close_connection = True
+                return
+            status, contenttype, response = standin.handle(self.command, self.path, body)
+            self.send_response(status)
+            self.send_header('Content-Type', contenttype)
+            if standin.gzip and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                response = gzip.compress(response)
+                self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
@@ -0,0 +1,102 @@
+"""
+Tests of the asyncio clients
+"""
+import asyncio
+
+import algosdk.account
+import algosdk.error
+import pytest
+from algosdk.v2client.algod import AlgodClient
+
+import algodao.aio
+import algodao.aio.confirmations
+import algodao.aio.http
+import algodao.aio.params
+import algodao.confirmations
+import algodao.contract
+from algodao.voting import Proposal
+
+APPID = 7
+ASSETID = 9
+
+pytestmark = pytest.mark.standin(blockinterval=0.05)
+
+
+@pytest.fixture
+def standin(standin):
+    standin.setapp(APPID, {b'VoteAssetId': ASSETID, b'NumOptions': 2})
+    return standin
+
+
+def test_aio_votes(standin):
+    accounts = [algosdk.account.generate_account() for _ in range(200)]
+
+    async def vote():
+        client = algodao.aio.AsyncAlgodClient('', standin.address)
+        try:
+            proposal = await algodao.aio.AsyncProposal.load(client, APPID)
+            infos = await asyncio.gather(*(
+                proposal.call_vote(addr, privkey, 1, 1)
+                for privkey, addr in accounts
+            ))
+            return (
+                infos,
+                client.stats,
+                algodao.aio.params.provider(client).stats,
+                algodao.aio.confirmations.tracker(client).stats,
+            )
+        finally:
+            await algodao.aio.confirmations.tracker(client).close()
+            await client.close()
+
+    infos, clientstats, paramsstats, trackerstats = asyncio.run(vote())
+    assert all(info['confirmed-round'] > 0 for info in infos)
+    # each vote is an atomic group of two transactions
+    assert len(standin.confirmed) == 2 * len(accounts)
+    assert standin.requests['/v2/transactions'] == len(accounts)
+    # connections are reused, params are fetched once per round, and a single
+    # follower confirms every vote
+    assert clientstats['connections'] <= algodao.aio.http.DEFAULT_MAXCONNECTIONS
+    assert paramsstats['fetches'] <= trackerstats['blocks'] + 1
+    assert trackerstats['rounds'] < len(accounts)
+
+
+def test_aio_build_matches_sync(standin):
+    algod = AlgodClient('', standin.address)
+    deployed = Proposal.DeployedProposal(algod, APPID)
+
+    async def load():
+        client = algodao.aio.AsyncAlgodClient.fromclient(algod)
+        try:
+            return await algodao.aio.AsyncProposal.load(client, APPID), await client.suggested_params()
+        finally:
+            await client.close()
+
+    proposal, params = asyncio.run(load())
+    addr = algosdk.account.generate_account()[1]
+    expected = deployed.build_vote(params, addr, 1, 5)
+    actual = proposal.deployed.build_vote(params, addr, 1, 5)
+    assert [txn.dictify() for txn in actual] == [txn.dictify() for txn in expected]
+
+
+def test_aio_errors(standin):
+    privkey, addr = algosdk.account.generate_account()
+
+    async def run():
+        client = algodao.aio.AsyncAlgodClient('', standin.address)
+        try:
+            proposal = await algodao.aio.AsyncProposal.load(client, APPID)
+            txns = proposal.deployed.build_vote(await proposal.params(), addr, 1, 1)
+            signed = algodao.contract.signgroup(txns, privkey)
+            standin.rejections[signed[0].get_txid()] = 'overspend'
+            with pytest.raises(algosdk.error.AlgodHTTPError, match='overspend'):
+                await client.send_transactions(signed)
+            with pytest.raises(algodao.confirmations.ConfirmationTimeout):
+                await algodao.aio.wait_for_confirmation(client, signed[0].get_txid(), timeout=2)
+            with pytest.raises(algosdk.error.AlgodHTTPError):
+                await client.application_info(APPID + 1)
+        finally:
+            await algodao.aio.confirmations.tracker(client).close()
+            await client.close()
+
+    asyncio.run(run())
@@ -0,0 +1,84 @@
+import base64
+import hashlib
+import os
+
+import pytest
+
+import algodao.artifacts
+import algodao.assembler
+import algodao.compilecache
+import algodao.helpers
+from algodao.assembler import TealAssemblyError
+
+# TEAL source -> base64 bytecode as produced by algod
+GOLDEN = [
+    # the standard clear program
+    ("#pragma version 5\nint 1\nreturn", "BYEBQw=="),
+    # before version 4 every constant goes in the constant blocks
+    ("#pragma version 2\nint 1", "AiABASI="),
+    # repeated constants are pooled, constants used once are pushed, and the
+    # branch skips the pushbytes and pop
+    (
+        '#pragma version 5\n'
+        'int 7\n'
+        'int 7 // seven\n'
+        '==\n'
+        'bnz done\n'
+        'byte "a"\n'
+        'pop\n'
+        'done:\n'
+        'int 1\n'
+        'return\n',
+        base64.b64encode(bytes.fromhex('0520010722221240000480016148810143')).decode(),
+    ),
+]
+
+@pytest.mark.parametrize('teal,expected', GOLDEN)
+def test_assemble_golden(teal, expected):
+    assert base64.b64encode(algodao.assembler.assemble(teal)).decode() == expected
+
+
+def test_assemble_errors():
+    with pytest.raises(TealAssemblyError):
+        algodao.assembler.assemble("#pragma version 5\nb missing")
+    with pytest.raises(TealAssemblyError):
+        algodao.assembler.assemble("#pragma version 3\nloop:\nb loop")
+    with pytest.raises(TealAssemblyError):
+        algodao.assembler.assemble("#pragma version 5\ntxn NotAField")
+
+
+def test_offline_artifacts(tmp_path):
+    # artifacts assembled offline are not deployed, and bytecode assembled
+    # offline is never returned for an algod compile
+    directory = str(tmp_path / 'artifacts')
+    programs = algodao.artifacts.build(directory, cache=algodao.compilecache.CompileCache())
+    committee = algodao.artifacts.reference_contracts()[2]
+    assert algodao.artifacts.load(committee.programkey(), directory) is None
+    compiled = algodao.artifacts.load(committee.programkey(), directory, offline=True)
+    assert [hashlib.sha256(bytecode).hexdigest() for bytecode in compiled] == [
+        programs[committee.programkey()]['approval'], programs[committee.programkey()]['clear'],
+    ]
+    teal = GOLDEN[0][0]
+    assert algodao.compilecache.contentkey(teal) != algodao.compilecache.contentkey(teal, offline=True)
+    cache = algodao.compilecache.CompileCache(str(tmp_path / 'cache'))
+    cache.assemble(None, teal)
+    assert sorted(os.listdir(tmp_path / 'cache')) == [
+        f'{algodao.compilecache.contentkey(teal, offline=True)}.{ext}' for ext in ('bin', 'teal')
+    ]
+
+
+def test_assemble_contracts_algod(tmp_path):
+    # with the sandbox, check the offline assembler against algod itself for
+    # each of the standard contracts
+    algod = algodao.helpers.createclient()
+    cache = algodao.compilecache.CompileCache()
+    for contract in algodao.artifacts.reference_contracts():
+        for name, program in (('approval', contract.approval_program), ('clear', contract.clear_program)):
+            teal = cache.compileteal(f'{contract.programkey()}:{name}', program)
+            compiled = base64.b64decode(algod.compile(teal)['result'])
+            assert algodao.assembler.assemble(teal) == compiled, f'{contract.programkey()}:{name}'
+    # and the artifacts compiled by algod are loaded in place of compiling
+    directory = str(tmp_path)
+    algodao.artifacts.build(directory, algod, cache=cache)
+    committee = algodao.artifacts.reference_contracts()[2]
+    assert algodao.artifacts.load(committee.programkey(), directory) == committee.compile(algod)
@@ -0,0 +1,185 @@
+"""
+Tests of the chain indexer, with blocks of app calls written in the block
+encoding
+"""
+import threading
+import time
+
+import algosdk.account
+import algosdk.encoding
+import algosdk.logic
+import pytest
+from algosdk.v2client.indexer import IndexerClient
+
+import algodao.chainindex
+from algodao.chainindex import ChainIndex
+from algodao.voting import Proposal
+
+PROPOSAL = 20
+PROPOSAL2 = 21
+COMMITTEE = 22
+GATE = 23
+OTHERAPP = 24
+MEMBERASSET = 30
+
+# stand-in programs, identified by their hashes
+PROGRAMS = {
+    'proposal': (b'\x05proposal', b'\x05clear'),
+    'committee': (b'\x05committee', b'\x05clear'),
+    'gate': (b'\x05gate', b'\x05clear'),
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    programs = {algodao.chainindex.programhash(*programs): kind for kind, programs in PROGRAMS.items()}
+    index = ChainIndex(str(tmp_path / 'chain.db'), programs)
+    yield index
+    index.close()
+
+
+def _pk(addr):
+    return algosdk.encoding.decode_address(addr)
+
+
+def _key(key):
+    # state keys are encoded as strings
+    return key.decode('utf-8', 'surrogateescape')
+
+
+def _uint(value):
+    return {'at': 2, 'ui': value}
+
+
+def _create(sender, kind, appid, gd, itx=()):
+    approval, clear = PROGRAMS[kind]
+    txn = {'type': 'appl', 'snd': _pk(sender), 'apap': approval, 'apsu': clear}
+    return {'txn': txn, 'apid': appid, 'dt': {'gd': gd, 'itx': list(itx)}}
+
+
+def _call(sender, appid, args, gd=None, ld=None, itx=(), oncompletion=0, accounts=()):
+    txn = {'type': 'appl', 'snd': _pk(sender), 'apid': appid, 'apaa': args, 'apan': oncompletion}
+    if accounts:
+        txn['apat'] = [_pk(addr) for addr in accounts]
+    return {'txn': txn, 'dt': {'gd': gd or {}, 'ld': ld or {}, 'itx': list(itx)}}
+
+
+def _membership(appid, receiver, amount=1):
+    txn = {'type': 'axfer', 'snd': _pk(algosdk.logic.get_application_address(appid)),
+           'xaid': MEMBERASSET, 'arcv': _pk(receiver), 'aamt': amount}
+    return {'txn': txn}
+
+
+def test_chainindex(standin, algod, index):
+    creator, voter, member1, member2 = (algosdk.account.generate_account()[1] for _ in range(4))
+    committeeaddr = algosdk.logic.get_application_address(COMMITTEE)
+    hashkey = b'ConsideredAppAddr' + (1).to_bytes(8, 'big')
+    programhash = b'\xff\xfe' + bytes(30)
+    standin.produceblock([
+        _create(creator, 'proposal', PROPOSAL, {
+            'VoteBegin': _uint(2), 'VoteEnd': _uint(10), 'Passed': _uint(0), 'Name': {'at': 1, 'bs': 'open'},
+        }),
+        _create(creator, 'proposal', PROPOSAL2, {'VoteBegin': _uint(20), 'VoteEnd': _uint(30)}),
+        _create(creator, 'committee', COMMITTEE, {'AssetId': _uint(MEMBERASSET)}, itx=[{
+            'txn': {'type': 'acfg', 'snd': _pk(committeeaddr), 'apar': {'t': 5}},
+            'caid': MEMBERASSET,
+        }]),
+        # a gate with a program hash in its state, which is not UTF-8
+        _create(creator, 'gate', GATE, {_key(hashkey): {'at': 1, 'bs': _key(programhash)}}),
+        # an app that is not ours
+        {'txn': {'type': 'appl', 'snd': _pk(creator), 'apap': b'other', 'apsu': b'other'}, 'apid': OTHERAPP},
+    ])
+    assert index.sync(algod, start=1) == standin.round
+    assert index.apps() == [PROPOSAL, PROPOSAL2, COMMITTEE, GATE]
+    assert index.apps('proposal') == [PROPOSAL, PROPOSAL2]
+    assert index.globalstate(GATE) == {hashkey: programhash}
+    assert index.globalstate(PROPOSAL).getbytes(Proposal.GlobalBytes.Name) == b'open'
+    votedkey = b'Voted' + (1).to_bytes(8, 'big')
+    standin.produceblock([
+        _call(creator, COMMITTEE, [b'setmembers'], itx=[_membership(COMMITTEE, member1), _membership(COMMITTEE, member2)]),
+        _call(voter, PROPOSAL, [b'vote', (1).to_bytes(8, 'big')], ld={0: {_key(votedkey): _uint(10)}}),
+        _call(creator, OTHERAPP, [b'vote'], gd={'Passed': _uint(1)}),
+        _call(creator, PROPOSAL2, [], oncompletion=5),
+    ])
+    index.sync(algod)
+    assert index.round == standin.round
+    assert index.openproposals() == [PROPOSAL]
+    assert index.apps('proposal') == [PROPOSAL]
+    assert index.localstate(PROPOSAL, voter) == {votedkey: 10}
+    assert index.committeemembers(COMMITTEE) == sorted([member1, member2])
+    assert index.holders(MEMBERASSET)[committeeaddr] == 3
+    assert [call[1:] for call in index.calls(PROPOSAL)] == [(creator, ''), (voter, 'vote')]
+    assert index.calls(OTHERAPP) == []
+    assert index.passednotimplemented() == []
+    # the member leaves, the vote passes and the voter closes out
+    standin.produceblock([
+        _call(creator, COMMITTEE, [b'remove'], itx=[{'txn': {
+            'type': 'axfer', 'snd': _pk(committeeaddr), 'xaid': MEMBERASSET, 'asnd': _pk(member1),
+            'arcv': _pk(committeeaddr), 'aamt': 1,
+        }}]),
+        _call(creator, PROPOSAL, [b'finalizevote'], gd={'Passed': _uint(1)}),
+        _call(voter, PROPOSAL, [], oncompletion=2),
+    ])
+    index.sync(algod)
+    assert index.committeemembers(COMMITTEE) == [member2]
+    assert index.passednotimplemented() == [PROPOSAL]
+    assert index.localstate(PROPOSAL, voter) == {}
+
+
+def test_chainindex_resumes(tmp_path, standin, algod, index):
+    creator = algosdk.account.generate_account()[1]
+    standin.produceblock([_create(creator, 'proposal', PROPOSAL, {'VoteEnd': _uint(10)})])
+    index.sync(algod, start=1)
+    index.close()
+    standin.produceblock([_call(creator, PROPOSAL, [b'finalizevote'], gd={'Passed': _uint(1)})])
+    resumed = ChainIndex(str(tmp_path / 'chain.db'), index.programs)
+    # blocks already applied are not read again
+    blockreads = standin.requests.get('/v2/blocks/*', 0)
+    assert resumed.sync(algod) == standin.round
+    assert standin.requests['/v2/blocks/*'] == blockreads + 1
+    assert resumed.passednotimplemented() == [PROPOSAL]
+    resumed.close()
+
+
+def test_chainindex_follows(standin, algod, index):
+    creator = algosdk.account.generate_account()[1]
+    stopped = threading.Event()
+    follower = threading.Thread(target=index.follow, args=(algod, stopped))
+    follower.start()
+    try:
+        standin.produceblock([_create(creator, 'proposal', PROPOSAL, {'VoteEnd': _uint(10)})])
+        deadline = time.monotonic() + 10
+        while index.round != standin.round and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert index.apps() == [PROPOSAL]
+    finally:
+        stopped.set()
+        # wake the follower from waiting for a block
+        standin.produceblock()
+        follower.join(timeout=10)
+
+
+def test_chainindex_track(standin, algod, index):
+    # apps created before the blocks followed start from the state read from
+    # algod and the indexer
+    member1, member2, voter = (algosdk.account.generate_account()[1] for _ in range(3))
+    committeeaddr = algosdk.logic.get_application_address(COMMITTEE)
+    votedkey = b'Voted' + (1).to_bytes(8, 'big')
+    standin.setapp(COMMITTEE, {b'AssetId': MEMBERASSET})
+    standin.setapp(PROPOSAL, {b'VoteEnd': 10}, localints=2)
+    standin.assetbalances[MEMBERASSET] = {committeeaddr: 8, member1: 1, member2: 0}
+    standin.setlocal(voter, PROPOSAL, {votedkey: 4})
+    with pytest.raises(ValueError):
+        index.track(algod, COMMITTEE, 'committee')
+    indexer = IndexerClient('a' * 64, standin.address)
+    index.track(algod, COMMITTEE, 'committee', indexer)
+    index.track(algod, PROPOSAL, 'proposal', indexer)
+    assert index.committeemembers(COMMITTEE) == [member1]
+    assert index.localstate(PROPOSAL, voter) == {votedkey: 4}
+    # and are kept current from the blocks
+    index.sync(algod)
+    standin.produceblock([
+        _call(member2, COMMITTEE, [b'setmembers'], itx=[_membership(COMMITTEE, member2)]),
+    ])
+    index.sync(algod)
+    assert index.committeemembers(COMMITTEE) == sorted([member1, member2])
@@ -30,3 +30,50 @@ def test_resign():
     deployed.call_resign(algod, pk3, member3)
     with pytest.raises(algosdk.error.AlgodHTTPError, match='transaction rejected by ApprovalProgram'):
         deployed.call_checkmembership(algod, pk3, member3)
+
+
+def test_setmembers_chunked():
+    algod = algodao.helpers.createclient()
+    creatorprivkey, creatoraddr = tests.helpers.create_funded(algod)
+    nummembers = 2 * algodao.committee.MEMBERS_PER_CALL + 1
+    createcommittee = algodao.committee.Committee.CreateCommittee(
+        "My Committee",
+        nummembers + 1,
+    )
+    deployed = algodao.committee.Committee.deploy(algod, createcommittee, creatorprivkey)
+    appaddr = algosdk.logic.get_application_address(deployed.appid)
+    tests.helpers.fund_account(algod, appaddr)
+    assetid = deployed.call_inittoken(algod, creatorprivkey, creatoraddr)
+    members = []
+    for _ in range(nummembers):
+        pk, member = tests.helpers.create_funded(algod)
+        algodao.helpers.optinasset(algod, member, pk, assetid)
+        members.append((pk, member))
+    deployed.call_setmembers(algod, creatorprivkey, creatoraddr, [member for _, member in members])
+    for pk, member in members:
+        deployed.call_checkmembership(algod, pk, member)
+    # seeding is closed once the last chunk has been set
+    with pytest.raises(algosdk.error.AlgodHTTPError, match='transaction rejected by ApprovalProgram'):
+        deployed.call_setmembers(algod, creatorprivkey, creatoraddr, [])
+
+
+def test_setmembers_after_seeding_rounds():
+    algod = algodao.helpers.createclient()
+    creatorprivkey, creatoraddr = tests.helpers.create_funded(algod)
+    pk, member = tests.helpers.create_funded(algod)
+    createcommittee = algodao.committee.Committee.CreateCommittee(
+        "My Committee",
+        4,
+        seeding_rounds=2,
+    )
+    deployed = algodao.committee.Committee.deploy(algod, createcommittee, creatorprivkey)
+    appaddr = algosdk.logic.get_application_address(deployed.appid)
+    tests.helpers.fund_account(algod, appaddr)
+    assetid = deployed.call_inittoken(algod, creatorprivkey, creatoraddr)
+    algodao.helpers.optinasset(algod, member, pk, assetid)
+    algodao.helpers.wait_for_round(algod, algod.status()['last-round'] + 3)
+    # the creator never closed seeding, but its rounds have passed
+    params = algod.suggested_params()
+    txns = deployed.build_setmembers(params, creatoraddr, [member], close=False)[0]
+    with pytest.raises(algosdk.error.AlgodHTTPError, match='transaction rejected by ApprovalProgram'):
+        deployed.submit(algod, creatorprivkey, txns)
@@ -0,0 +1,65 @@
+"""
+Tests of the confirmation tracker bookkeeping
+"""
+import concurrent.futures
+
+import pytest
+
+import algodao.confirmations
+from algodao.confirmations import (
+    ConfirmationTimeout,
+    ConfirmationTracker,
+    TransactionExpired,
+    TransactionRejected,
+    Waiters,
+)
+
+
+def test_waiters():
+    waiters = Waiters()
+    confirmed, expiring, timingout, rejected = (concurrent.futures.Future() for _ in range(4))
+    waiters.add('CONFIRMED', confirmed, 20, None)
+    waiters.add('EXPIRING', expiring, 11, None)
+    waiters.add('TIMINGOUT', timingout, 20, 2)
+    waiters.add('REJECTED', rejected, None, None)
+    assert len(waiters) == 4
+    # timeouts count from the first round observed
+    waiters.observed(10)
+    waiters.blockread(10, ['CONFIRMED'])
+    assert confirmed.result() == 10
+    waiters.blockread(11, [])
+    with pytest.raises(TransactionExpired):
+        expiring.result()
+    assert not timingout.done()
+    waiters.blockread(12, [])
+    with pytest.raises(ConfirmationTimeout):
+        timingout.result()
+    # transactions confirmed in recent blocks resolve when added
+    late = concurrent.futures.Future()
+    waiters.add('CONFIRMED', late, None, None)
+    assert late.result() == 10
+    # only the transactions tracked before the pool was requested are looked up
+    waiters.poolrequested()
+    unsent = concurrent.futures.Future()
+    waiters.add('UNSENT', unsent, None, None)
+    assert waiters.poolchecked(set()) == ['REJECTED']
+    waiters.pendinginfo('REJECTED', {'pool-error': 'overspend'})
+    with pytest.raises(TransactionRejected):
+        rejected.result()
+    error = ConnectionError('unreachable')
+    waiters.failall(error)
+    assert unsent.exception() is error
+    assert len(waiters) == 0
+
+
+def test_tracker_fails_when_unreachable(standin, algod, monkeypatch):
+    # when the node stops answering, the waits fail instead of hanging
+    monkeypatch.setattr(algodao.confirmations, 'FOLLOW_RETRY_SECONDS', 0.01)
+    tracker = ConfirmationTracker(algod)
+    future = tracker.track('UNKNOWN')
+    standin.down = True
+    # end the follower's wait for a block
+    standin.produceblock()
+    assert future.exception(timeout=10) is not None
+    assert tracker.pending == 0
+    tracker.close()
@@ -1,13 +1,22 @@
+import base64
 import logging
+import subprocess
+import sys
 from collections import OrderedDict
 
 import algosdk.error
 import algosdk.future.transaction
 import pytest
 
+import algodao.committee
+import algodao.compilecache
+import algodao.confirmations
+import algodao.contract
 import algodao.deploy
+import algodao.governance
 import algodao.helpers
 import algodao.assets
+import algodao.params
 import algodao.voting
 from algodao.types import AccountInfo
 
@@ -64,6 +73,140 @@ def test_nfttransfer():
     assert algodao.assets.hasasset(client, recvaddr, assetid)
 
 
+def test_compilecache(tmp_path):
+    # assembled offline, without an algod client
+    cache = algodao.compilecache.CompileCache(str(tmp_path))
+    committee = algodao.committee.Committee.CreateCommittee("My Committee", 4)
+    compiled = committee.compile(None, cache)
+    assert cache.stats['misses'] == 2
+    assert committee.compile(None, cache) == compiled
+    assert cache.stats['memory_hits'] == 2
+    assert cache.stats['teal_hits'] == 2
+    # a new process (simulated by a new cache) reads the bytecode from disk
+    diskcache = algodao.compilecache.CompileCache(str(tmp_path))
+    assert committee.compile(None, diskcache) == compiled
+    assert diskcache.stats['disk_hits'] == 2
+    assert diskcache.stats['misses'] == 0
+
+
+def test_confirmationtracker():
+    amount = 1000000
+    algod = algodao.helpers.createclient()
+    privkey, addr = tests.helpers.add_standalone_account()
+    tests.helpers.fund_account(algod, addr, amount)
+    tracker = algodao.confirmations.ConfirmationTracker(algod)
+    params = algod.suggested_params()
+    futures = []
+    for i in range(20):
+        txn = algosdk.future.transaction.PaymentTxn(addr, params, addr, 0, note=f'{i}')
+        signed = txn.sign(privkey)
+        algod.send_transaction(signed)
+        futures.append(tracker.tracksigned(signed))
+    for future in futures:
+        assert future.result(timeout=60) >= params.first
+    # a transaction that was never submitted times out
+    txn = algosdk.future.transaction.PaymentTxn(addr, params, addr, 0, note='unsent')
+    with pytest.raises(algodao.confirmations.ConfirmationTimeout):
+        tracker.track(txn.get_txid(), timeout=2).result(timeout=60)
+    assert tracker.pending == 0
+    tracker.close()
+
+
+def test_appstate():
+    SlotInts = algodao.governance.PreapprovalGate.SlotInts
+    store = [
+        {'key': base64.b64encode(key).decode(), 'value': value}
+        for key, value in (
+            (b'NumOptions', {'type': 2, 'uint': 3, 'bytes': ''}),
+            (b'Name', {'type': 1, 'uint': 0, 'bytes': base64.b64encode(b'vote').decode()}),
+            (SlotInts.VoteInProgress.keybytes(1), {'type': 2, 'uint': 1, 'bytes': ''}),
+        )
+    ]
+    state = algodao.contract.AppState.fromstore(store)
+    assert dict(state) == {b'NumOptions': 3, b'Name': b'vote', SlotInts.VoteInProgress.keybytes(1): 1}
+    assert state[algodao.voting.Proposal.GlobalInts.NumOptions] == 3
+    assert state.getbytes(b'Name') == b'vote'
+    assert state.getint(SlotInts.VoteInProgress, 1) == 1
+    # unset variables read as in TEAL
+    assert state[algodao.voting.Proposal.GlobalInts.VoteEnd] == 0
+    assert state[algodao.voting.Proposal.GlobalBytes.Name] == b'vote'
+    assert state[algodao.voting.Proposal.GlobalBytes.AdditionalData] == b''
+    assert state.getint(SlotInts.VoteInProgress, 0) == 0
+    assert algodao.voting.Proposal.GlobalInts.NumOptions in state
+    assert algodao.voting.Proposal.GlobalInts.VoteEnd not in state
+    assert algodao.voting.Proposal.GlobalInts.VoteEnd not in algodao.contract.AppState({})
+    assert b'Name' in state and 'Name' not in state
+    assert algodao.helpers.readintfromstore(store, b'NumOptions') == 3
+    assert algodao.helpers.readbytesfromstore(store, b'Name') == b'vote'
+    assert algodao.helpers.readintfromstore(store, b'VoteEnd') == 0
+    assert algodao.deploy.format_state(store) == {
+        'NumOptions': 3, 'Name': store[1]['value']['bytes'], 'VoteInProgress\0\0\0\0\0\0\0\1': 1
+    }
+
+
+def test_gate_reads_trust_asset():
+    # a gate client constructed from the app's state, not the one that
+    # created the trust token, builds calls referencing it
+    PreapprovalGate = algodao.governance.PreapprovalGate
+
+    def appinfo(state):
+        return {'params': {'global-state': [
+            {'key': base64.b64encode(key).decode(), 'value': {'type': 2, 'uint': value, 'bytes': ''}}
+            for key, value in state.items()
+        ]}}
+
+    gateinfo = appinfo({b'CommitteeId': 12, b'NumSlots': 2, b'TrustAssetId': 34})
+    gate = PreapprovalGate.DeployedGate(None, 11, gateinfo, appinfo({b'AssetId': 13}))
+    assert gate.trust_assetid == 34
+    params = algosdk.future.transaction.SuggestedParams(0, 1, 1000, 'A' * 44, 'test-v1', flat_fee=True)
+    [txn] = gate.build_autotrust(params, 'A' * 52 + 'Y5HFKQ', 56)
+    assert txn.foreign_assets == [34]
+    fresh = PreapprovalGate.DeployedGate(None, 11, appinfo({b'CommitteeId': 12}), appinfo({b'AssetId': 13}))
+    assert fresh.trust_assetid is None
+
+
+def test_plan_implementation_groups():
+    info = {'params': {'global-state': []}}
+    proposals = [
+        (algodao.voting.Proposal.DeployedProposal(None, appid, info), ['A' * 58] * 2)
+        for appid in range(20)
+    ]
+    groups = algodao.governance.plan_implementation_groups(proposals)
+    assert [len(group) for group in groups] == [8, 8, 4]
+    assert [proposal for group in groups for proposal in group] == proposals
+    # the proposal's address takes one of the accounts
+    toomany = [(proposals[0][0], ['A' * 58] * algodao.contract.MAX_TXN_ACCOUNTS)]
+    with pytest.raises(ValueError):
+        algodao.governance.plan_implementation_groups(toomany)
+
+
+def test_runtime_imports_without_pyteal():
+    # the deployed contract clients must not pull in the program builders
+    statement = (
+        "import sys, algodao.assets, algodao.governance, algodao.verify;"
+        "assert 'pyteal' not in sys.modules"
+    )
+    subprocess.run([sys.executable, '-c', statement], check=True)
+
+
+def test_moved_program_helpers():
+    # the PyTeal helpers that moved to algodao.programs are still importable
+    # from the contract modules
+    statement = (
+        "import sys, algodao.committee;"
+        "assert 'pyteal' not in sys.modules;"
+        "from algodao.committee import is_member;"
+        "from algodao.governance import grant_trust;"
+        "from algodao.voting import minvotesneeded;"
+        "from algodao.helpers import appaddr;"
+        "import algodao.programs.committee;"
+        "assert is_member is algodao.programs.committee.is_member"
+    )
+    subprocess.run([sys.executable, '-c', statement], check=True)
+    with pytest.raises(AttributeError):
+        algodao.committee.not_a_helper
+
+
 def test_proposal():
     amount = 1000000
     algod = algodao.helpers.createclient()
@@ -1,11 +1,15 @@
+import base64
 from typing import Optional
 
+import algosdk.error
 import algosdk.logic
+import pytest
 
 import algodao.helpers
+import algodao.verify
 import tests.helpers
 from algodao.committee import Committee
-from algodao.governance import PreapprovalGate, AlgoDao
+from algodao.governance import PreapprovalGate, AlgoDao, programhash
 from algodao.voting import Proposal, ElectionToken, ProposalType, VoteType
 from tests.test_contracts import _createnft
 
@@ -20,6 +24,70 @@ def test_approvalgate():
     preapprove_proposal(algod, gate, deployedproposal, creatoraddr, creatorprivkey)
 
 
+def test_approvalgate_slots():
+    algod = algodao.helpers.createclient()
+    creatorprivkey, creatoraddr = tests.helpers.create_funded(algod)
+    deployedcommittee = create_trustcommittee(algod, creatoraddr, creatorprivkey)
+    gate = create_preapprovalgate(algod, deployedcommittee, creatoraddr, creatorprivkey, 2)
+    token = ElectionToken(_createnft(algod, creatoraddr, creatorprivkey))
+    proposal1 = create_proposal(algod, gate, creatoraddr, creatorprivkey, token)
+    proposal2 = create_proposal(algod, gate, creatoraddr, creatorprivkey, token)
+    # both proposals are under consideration at the same time
+    gate.call_assessproposal(algod, creatoraddr, creatorprivkey, proposal1.appid)
+    gate.call_assessproposal(algod, creatoraddr, creatorprivkey, proposal2.appid)
+    assert gate.findslot(algod, proposal1.appid) == 0
+    assert gate.findslot(algod, proposal2.appid) == 1
+    gate.call_vote(algod, creatoraddr, creatorprivkey, proposal2.appid, 1)
+    gate.call_vote(algod, creatoraddr, creatorprivkey, proposal1.appid, 1)
+    for proposal in (proposal1, proposal2):
+        appaddr = algosdk.logic.get_application_address(proposal.appid)
+        assets = algod.account_info(appaddr)['assets']
+        assert any(
+            asset['asset-id'] == gate.trust_assetid and asset['amount'] == 1
+            for asset in assets
+        )
+
+
+def test_autotrust():
+    algod = algodao.helpers.createclient()
+    creatorprivkey, creatoraddr = tests.helpers.create_funded(algod)
+    deployedcommittee = create_trustcommittee(algod, creatoraddr, creatorprivkey)
+    gate = create_preapprovalgate(algod, deployedcommittee, creatoraddr, creatorprivkey)
+    token = ElectionToken(_createnft(algod, creatoraddr, creatorprivkey))
+    reference = create_proposal(algod, gate, creatoraddr, creatorprivkey, token)
+    params = algod.application_info(reference.appid)['params']
+    program_hash = programhash(
+        base64.b64decode(params['approval-program']),
+        base64.b64decode(params['clear-state-program']),
+    )
+    gate.call_assesshash(algod, creatoraddr, creatorprivkey, program_hash)
+    gate.call_votehash(algod, creatoraddr, creatorprivkey, program_hash, 1)
+    assert gate.allowedhashes(algod) == [program_hash]
+    deployedproposal = create_proposal(algod, gate, creatoraddr, creatorprivkey, token)
+    # anyone can have an app trusted, through a gate client of their own
+    callerprivkey, calleraddr = tests.helpers.create_funded(algod)
+    anyonesgate = PreapprovalGate.DeployedGate(algod, gate.appid)
+    assert anyonesgate.trust_assetid == gate.trust_assetid
+    anyonesgate.call_autotrust(algod, calleraddr, callerprivkey, deployedproposal.appid)
+    # an app is only ever sent a single trust token
+    with pytest.raises(algosdk.error.AlgodHTTPError, match='transaction rejected by ApprovalProgram'):
+        anyonesgate.call_autotrust(algod, calleraddr, callerprivkey, deployedproposal.appid)
+
+
+def test_verifyproposals():
+    algod = algodao.helpers.createclient()
+    creatorprivkey, creatoraddr = tests.helpers.create_funded(algod)
+    deployedcommittee = create_trustcommittee(algod, creatoraddr, creatorprivkey)
+    gate = create_preapprovalgate(algod, deployedcommittee, creatoraddr, creatorprivkey)
+    token = ElectionToken(_createnft(algod, creatoraddr, creatorprivkey))
+    deployedproposal = create_proposal(algod, gate, creatoraddr, creatorprivkey, token)
+    verifier = algodao.verify.proposal_verifier(algod)
+    results = verifier.verifymany([deployedproposal.appid, gate.appid])
+    assert results[deployedproposal.appid].matches
+    assert results[deployedproposal.appid].program_hash == verifier.program_hash
+    assert not results[gate.appid].matches
+
+
 def test_daoproposal():
     algod = algodao.helpers.createclient()
     creatorprivkey, creatoraddr = tests.helpers.create_funded(algod)
@@ -66,6 +134,57 @@ def test_daoproposal():
     )
 
 
+def test_daoproposals_batch():
+    algod = algodao.helpers.createclient()
+    creatorprivkey, creatoraddr = tests.helpers.create_funded(algod)
+    deployedcommittee = create_trustcommittee(algod, creatoraddr, creatorprivkey)
+    gate = create_preapprovalgate(algod, deployedcommittee, creatoraddr, creatorprivkey)
+    dao = AlgoDao.CreateDao("My DAO", gate.trust_assetid)
+    deployeddao = AlgoDao.deploy(algod, dao, creatorprivkey)
+    tests.helpers.fund_account(algod, algosdk.logic.get_application_address(deployeddao.appid))
+    deployeddao.call_addrule(
+        algod,
+        creatoraddr,
+        creatorprivkey,
+        ProposalType.PAYMENT,
+        VoteType.GOVERNANCE_TOKEN,
+        60
+    )
+    deployeddao.call_finalize(algod, creatoraddr, creatorprivkey)
+    token = ElectionToken(_createnft(algod, creatoraddr, creatorprivkey))
+    proposals = []
+    for _ in range(3):
+        receiverprivkey, receiveraddr = tests.helpers.create_funded(algod)
+        deployedproposal = create_proposal(
+            algod,
+            gate,
+            creatoraddr,
+            creatorprivkey,
+            token,
+            receiveraddr,
+            10000,
+            voting_rounds=20,
+            daoid=deployeddao.appid,
+            win_pct=60,
+        )
+        preapprove_proposal(algod, gate, deployedproposal, creatoraddr, creatorprivkey)
+        algodao.helpers.optinapp(algod, creatorprivkey, creatoraddr, deployedproposal.appid)
+        deployedproposal.call_vote(algod, creatoraddr, creatorprivkey, 1, 10)
+        proposals.append((deployedproposal, [receiveraddr]))
+    waitforround = algod.status()['last-round'] + 21
+    algodao.helpers.wait_for_round(algod, waitforround)
+    for deployedproposal, _ in proposals:
+        deployedproposal.call_finalizevote(algod, creatoraddr, creatorprivkey)
+    txids = deployeddao.call_implementproposals(algod, proposals, creatoraddr, creatorprivkey)
+    assert len(txids) == 1
+    for deployedproposal, _ in proposals:
+        info = algod.application_info(deployedproposal.appid)
+        assert algodao.helpers.readintfromstore(
+            info['params']['global-state'],
+            Proposal.GlobalInts.Implemented.name.encode()
+        ) == 1
+
+
 def preapprove_proposal(algod, gate, deployedproposal, addr, privkey):
     gate.call_assessproposal(algod, addr, privkey, deployedproposal.appid)
     gate.call_vote(algod, addr, privkey, deployedproposal.appid, 1)
@@ -106,8 +225,14 @@ def create_proposal(
     return deployedproposal
 
 
-def create_preapprovalgate(algod, deployedcommittee, addr, privkey) -> PreapprovalGate.DeployedGate:
-    creategate = PreapprovalGate.CreateGate(deployedcommittee.appid, 1)
+def create_preapprovalgate(
+        algod,
+        deployedcommittee,
+        addr,
+        privkey,
+        numslots: int = 1,
+) -> PreapprovalGate.DeployedGate:
+    creategate = PreapprovalGate.CreateGate(deployedcommittee.appid, 1, numslots)
     gate = PreapprovalGate.deploy(algod, creategate, privkey)
     algodao.helpers.optinapp(algod, privkey, addr, gate.appid)
     gate_addr = algosdk.logic.get_application_address(gate.appid)
@@ -0,0 +1,60 @@
+"""
+Tests of the holdings cache
+"""
+import time
+
+import algosdk.account
+import pytest
+from algosdk.future import transaction
+
+import algodao.helpers
+import algodao.holdings
+from algodao.holdings import HoldingsCache
+
+ASSET = 70
+LATENCY = 0.02
+HOLDING = '/v2/accounts/*/assets/*'
+
+pytestmark = pytest.mark.standin(blockinterval=0.05, latency=LATENCY)
+
+
+def test_hasasset(standin, algod):
+    holder, other = (algosdk.account.generate_account()[1] for _ in range(2))
+    standin.assetbalances[ASSET] = {holder: 0}
+    holdings = HoldingsCache(algod)
+    assert holdings.hasasset(holder, ASSET)
+    assert holdings.hasasset(holder, ASSET)
+    assert not holdings.hasasset(other, ASSET)
+    assert not holdings.hasasset(other, ASSET)
+    # only the positive result is remembered
+    assert standin.requests[HOLDING] == 3
+    assert holdings.stats == {'hits': 1, 'lookups': 3}
+
+
+def test_hasassets(standin, algod):
+    addrs = [algosdk.account.generate_account()[1] for _ in range(100)]
+    standin.assetbalances[ASSET] = {addr: 1 for addr in addrs[::2]}
+    holdings = HoldingsCache(algod)
+    start = time.monotonic()
+    held = holdings.hasassets((addr, ASSET) for addr in addrs)
+    # the lookups are concurrent
+    assert time.monotonic() - start < len(addrs) * LATENCY / 4
+    assert [held[(addr, ASSET)] for addr in addrs] == [True, False] * 50
+    holdings.hasassets((addr, ASSET) for addr in addrs)
+    assert standin.requests[HOLDING] == 150
+
+
+def test_observetxns(standin, algod):
+    privkey, addr = algosdk.account.generate_account()
+    closeto = algosdk.account.generate_account()[1]
+    holdings = algodao.holdings.cache(algod)
+    params = algod.suggested_params()
+    # an opt-in sent through the helpers
+    algodao.helpers.optinasset(algod, addr, privkey, ASSET)
+    assert holdings.hasasset(addr, ASSET)
+    assert HOLDING not in standin.requests
+    closeout = transaction.AssetTransferTxn(addr, params, closeto, 0, ASSET, close_assets_to=closeto)
+    holdings.observetxns([closeout])
+    assert holdings.hasasset(closeto, ASSET)
+    assert not holdings.hasasset(addr, ASSET)
+    assert standin.requests[HOLDING] == 1
@@ -0,0 +1,83 @@
+"""
+Tests of the asset ledger, from blocks written in the block encoding.
+"""
+import random
+
+import algosdk.account
+import algosdk.encoding
+import pytest
+
+from algodao.assets import ElectionToken, GovernanceToken
+from algodao.ledger import AssetLedger
+from algodao.voting import Election
+
+ASSET = 5
+OTHERASSET = 6
+
+
+def _pk(addr):
+    return algosdk.encoding.decode_address(addr)
+
+
+def _block(*stibs):
+    return {'txns': [{'txn': txn, **applydata} for txn, applydata in stibs]}
+
+
+def _create(creator, total):
+    return {'type': 'acfg', 'snd': _pk(creator), 'apar': {'t': total}}, {'caid': ASSET}
+
+
+def _transfer(sender, receiver, amount, assetid=ASSET, revoked=None, closeto=None, closeamount=0):
+    txn = {'type': 'axfer', 'snd': _pk(sender), 'xaid': assetid, 'arcv': _pk(receiver), 'aamt': amount}
+    if revoked:
+        txn['asnd'] = _pk(revoked)
+    if closeto:
+        txn['aclose'] = _pk(closeto)
+    return txn, {'aca': closeamount} if closeto else {}
+
+
+def test_ledger():
+    creator, alice, bob = (algosdk.account.generate_account()[1] for _ in range(3))
+    ledger = AssetLedger([ASSET], checkpoint_interval=10)
+    ledger.consume([
+        (3, _block(_create(creator, 100))),
+        # opt-ins
+        (4, _block(_transfer(alice, alice, 0), _transfer(bob, bob, 0))),
+        (5, _block(_transfer(creator, alice, 30), _transfer(creator, bob, 20), _transfer(alice, bob, 5, OTHERASSET))),
+        # a clawback from alice
+        (12, _block(_transfer(creator, creator, 10, revoked=alice))),
+        # bob sends 5 to alice and closes out the rest to the creator
+        (15, _block(_transfer(bob, alice, 5, closeto=creator, closeamount=15))),
+    ])
+    assert ledger.round == 15
+    assert ledger.balances(ASSET) == {creator: 75, alice: 25}
+    assert ledger.balances(ASSET, 3) == {creator: 100}
+    assert ledger.balances(ASSET, 4) == {creator: 100, alice: 0, bob: 0}
+    assert ledger.balances(ASSET, 11) == {creator: 50, alice: 30, bob: 20}
+    assert ledger.balances(ASSET, 12) == {creator: 60, alice: 20, bob: 20}
+    assert ledger.balances(ASSET, 14) == ledger.balances(ASSET, 12)
+    with pytest.raises(ValueError):
+        ledger.balances(ASSET, 1)
+    with pytest.raises(KeyError):
+        ledger.balances(OTHERASSET)
+    # the ledger feeds the distribution of an election
+    election = Election(None, GovernanceToken(ASSET), ElectionToken(0), lambda govcount: govcount // 5, 0, 100, ledger)
+    assert election.builddistribution(11).addr2count == {creator: 10, alice: 6, bob: 4}
+
+
+def test_ledger_checkpoints():
+    addrs = [algosdk.account.generate_account()[1] for _ in range(20)]
+    ledger = AssetLedger([ASSET], checkpoint_interval=50)
+    ledger.seed(ASSET, {addr: 1000 for addr in addrs}, 100)
+    rng = random.Random(0)
+    expected = {100: {addr: 1000 for addr in addrs}}
+    balances = dict(expected[100])
+    for algoround in range(101, 400):
+        sender, receiver = rng.sample(addrs, 2)
+        amount = rng.randrange(balances[sender] + 1)
+        balances[sender] -= amount
+        balances[receiver] += amount
+        ledger.applyblock(algoround, _block(_transfer(sender, receiver, amount)))
+        expected[algoround] = dict(balances)
+    for algoround in (100, 149, 150, 151, 250, 399):
+        assert ledger.balances(ASSET, algoround) == expected[algoround]
@@ -0,0 +1,124 @@
+"""
+Tests of the lifecycle scheduler, with handlers that record the jobs they run
+"""
+import threading
+import time
+
+import pytest
+
+import algodao.lifecycle
+from algodao.lifecycle import LifecycleScheduler
+
+PROPOSAL = 40
+GATE = 41
+
+
+def _waitfor(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_lifecycle(standin, algod):
+    scheduler = LifecycleScheduler(algod)
+    ran = []
+    scheduler.register('record', lambda job: ran.append((job.appid, job.args['n'], scheduler.round)))
+    for appid in range(100):
+        scheduler.schedule('record', appid, standin.round + 1 + appid % 3, n=appid)
+    # scheduling a job again has no effect
+    assert scheduler.schedule('record', 0, standin.round + 1, n=0) is None
+    with pytest.raises(ValueError):
+        scheduler.schedule('unregistered', 0, 0)
+    waited = scheduler.whenround(standin.round + 2)
+    scheduler.start()
+    try:
+        for _ in range(3):
+            standin.produceblock()
+        assert scheduler.join(timeout=10)
+        assert waited.result(timeout=1) >= standin.round - 1
+        assert sorted(appid for appid, _, _ in ran) == list(range(100))
+        # each job ran once its round was reached
+        assert all(algoround >= 2 + appid % 3 for appid, _, algoround in ran)
+        assert len(scheduler.jobs(algodao.lifecycle.DONE)) == 100
+    finally:
+        scheduler.close()
+
+
+def test_lifecycle_limits(standin, algod):
+    scheduler = LifecycleScheduler(algod, max_workers=4)
+    lock = threading.Lock()
+    running = {'now': 0, 'max': 0}
+    release = threading.Event()
+
+    def handler(job):
+        with lock:
+            running['now'] += 1
+            running['max'] = max(running['max'], running['now'])
+        release.wait(10)
+        with lock:
+            running['now'] -= 1
+
+    scheduler.register('limited', handler, limit=2)
+    for appid in range(10):
+        scheduler.schedule('limited', appid, 0)
+    scheduler.observeround(standin.round)
+    _waitfor(lambda: running['now'] == 2)
+    assert len(scheduler.jobs(algodao.lifecycle.RUNNING)) == 2
+    release.set()
+    assert scheduler.join(timeout=10)
+    assert running['max'] == 2
+    scheduler.close()
+
+
+def test_lifecycle_retries_and_resumes(tmp_path, standin, algod):
+    path = str(tmp_path / 'lifecycle.db')
+    scheduler = LifecycleScheduler(algod, path, max_attempts=2)
+    attempts = []
+
+    def failing(job):
+        attempts.append(scheduler.round)
+        raise RuntimeError("not yet")
+
+    scheduler.register('failing', failing)
+    scheduler.register('later', lambda job: None)
+    scheduler.schedule('failing', 1, 5)
+    scheduler.schedule('later', 2, 100)
+    scheduler.observeround(5)
+    _waitfor(lambda: scheduler.jobs(appid=1)[0].round == 6)
+    # retried in the next round, then given up
+    scheduler.observeround(6)
+    _waitfor(lambda: scheduler.jobs(algodao.lifecycle.FAILED))
+    assert attempts == [5, 6]
+    assert scheduler.jobs(algodao.lifecycle.FAILED)[0].error == 'RuntimeError: not yet'
+    scheduler.close()
+    # a new process carries on with the pending jobs
+    resumed = LifecycleScheduler(algod, path)
+    ran = []
+    resumed.register('later', lambda job: ran.append(job.appid))
+    assert [job.appid for job in resumed.jobs(algodao.lifecycle.PENDING)] == [2]
+    resumed.observeround(100)
+    assert resumed.join(timeout=10)
+    assert ran == [2]
+    resumed.close()
+
+
+def test_scheduleproposal(standin, algod):
+    standin.setapp(PROPOSAL, {b'RegEnd': 10, b'VoteEnd': 20})
+    standin.setapp(GATE, {
+        b'NumSlots': 2,
+        b'MinRoundsPerProposal': 30,
+        b'VoteInProgress' + (1).to_bytes(8, 'big'): 1,
+        b'VotingStartRound' + (1).to_bytes(8, 'big'): 5,
+        b'ConsiderationId' + (1).to_bytes(8, 'big'): 3,
+    })
+    scheduler = LifecycleScheduler(algod)
+    for action in (algodao.lifecycle.FINALIZE_VOTE, algodao.lifecycle.CONSIDERATION_EXPIRED):
+        scheduler.register(action, lambda job: None)
+    algodao.lifecycle.scheduleproposal(scheduler, PROPOSAL, accounts=['RECEIVER'])
+    algodao.lifecycle.schedulegate(scheduler, GATE)
+    assert [(job.action, job.appid, job.round, job.args) for job in scheduler.jobs()] == [
+        (algodao.lifecycle.FINALIZE_VOTE, PROPOSAL, 20, {'accounts': ['RECEIVER']}),
+        (algodao.lifecycle.CONSIDERATION_EXPIRED, GATE, 35, {'slot': 1, 'considerationid': 3}),
+    ]
+    scheduler.close()
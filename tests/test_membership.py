@@ -0,0 +1,83 @@
+"""
+Tests of the committee membership index. The stand-in node serves both algod
+and the indexer.
+"""
+import algosdk.account
+import algosdk.encoding
+import algosdk.logic
+import pytest
+from algosdk.v2client.indexer import IndexerClient
+
+import algodao.membership
+from algodao.governance import PreapprovalGate
+from algodao.membership import MembershipIndex, NotAMember
+
+COMMITTEE = 50
+GATE = 51
+ASSET = 60
+
+
+@pytest.fixture
+def standin(standin):
+    standin.setapp(COMMITTEE, {b'AssetId': ASSET, b'MaxMembers': 1000})
+    standin.setapp(GATE, {b'CommitteeId': COMMITTEE, b'NumSlots': 1})
+    return standin
+
+
+def _transfer(sender, receiver, amount, revoked=None):
+    txn = {
+        'type': 'axfer',
+        'snd': algosdk.encoding.decode_address(sender),
+        'xaid': ASSET,
+        'arcv': algosdk.encoding.decode_address(receiver),
+        'aamt': amount,
+    }
+    if revoked:
+        txn['asnd'] = algosdk.encoding.decode_address(revoked)
+    return {'txn': txn}
+
+
+def test_membership(standin, algod):
+    committeeaddr = algosdk.logic.get_application_address(COMMITTEE)
+    members = [algosdk.account.generate_account()[1] for _ in range(25)]
+    standin.assetbalances[ASSET] = {committeeaddr: 975, **{addr: 1 for addr in members}}
+    indexer = IndexerClient('a' * 64, standin.address)
+    index = MembershipIndex(algod, indexer)
+    index.load(COMMITTEE, limit=10)
+    assert standin.requests['/v2/assets/*/balances'] == 3
+    assert index.members(COMMITTEE) == frozenset(members)
+    assert index.is_member(members[0])
+    assert not index.is_member(committeeaddr)
+    # a member is removed (clawed back) and another added
+    newmember = algosdk.account.generate_account()[1]
+    standin.produceblock([
+        _transfer(committeeaddr, committeeaddr, 1, revoked=members[0]),
+        _transfer(committeeaddr, newmember, 1),
+    ])
+    assert index.sync() == standin.round
+    assert index.round == standin.round
+    assert index.members(COMMITTEE) == frozenset(members[1:] + [newmember])
+    assert not index.is_member(members[0], COMMITTEE)
+    assert index.committees(newmember) == {COMMITTEE}
+    with pytest.raises(KeyError):
+        index.members(GATE)
+
+
+def test_gate_prevalidation(standin, algod):
+    committeeaddr = algosdk.logic.get_application_address(COMMITTEE)
+    member, outsider = (algosdk.account.generate_account() for _ in range(2))
+    index = MembershipIndex(algod)
+    index.seed(COMMITTEE, ASSET, {committeeaddr: 9, member[1]: 1}, standin.round)
+    algodao.membership.register(index)
+    gate = PreapprovalGate.DeployedGate(algod, GATE)
+    blockreads = standin.requests.get('/v2/blocks/*', 0)
+    with pytest.raises(NotAMember):
+        gate.call_vote(algod, outsider[1], outsider[0], 7, 1, slot=0)
+    with pytest.raises(NotAMember):
+        gate.call_assessproposal(algod, outsider[1], outsider[0], 7, slot=0)
+    # nothing was sent
+    assert not standin.pool
+    # a member added in a block not applied yet is found once the index catches up
+    standin.produceblock([_transfer(committeeaddr, outsider[1], 1)])
+    algodao.membership.checkmember(algod, outsider[1], COMMITTEE)
+    assert standin.requests['/v2/blocks/*'] == blockreads + 1
@@ -0,0 +1,57 @@
+"""
+Tests of the round-scoped suggested params
+"""
+import concurrent.futures
+
+import algodao.params
+from algodao.params import ParamsProvider
+
+PARAMS = '/v2/transactions/params'
+
+
+def test_paramsprovider(standin, algod):
+    provider = ParamsProvider(algod, follow=False)
+    params = provider.get()
+    # callers may modify the params they are given
+    params.fee = 1234
+    assert provider.get().fee != 1234
+    assert provider.stats == {'hits': 1, 'fetches': 1}
+    # params are refetched once a later round has been seen
+    standin.produceblock()
+    provider.observeround(standin.round)
+    assert provider.get().first == standin.round
+    assert provider.stats['fetches'] == 2
+    assert standin.requests[PARAMS] == 2
+
+
+def test_paramsprovider_rounds(standin, algod):
+    # 8 threads building 1600 transactions over 5 rounds fetch the params
+    # about once per round rather than once per transaction
+    threads, rounds, perthread = 8, 5, 40
+    provider = ParamsProvider(algod, follow=False)
+    with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+        for _ in range(rounds):
+            list(executor.map(lambda _: [provider.get() for _ in range(perthread)], range(threads)))
+            standin.produceblock()
+            provider.observeround(standin.round)
+    stats = provider.stats
+    assert stats['hits'] + stats['fetches'] == threads * rounds * perthread
+    # threads that find the params stale at once may each fetch them
+    assert rounds <= standin.requests[PARAMS] == stats['fetches'] <= rounds * threads
+
+
+def test_paramsprovider_backs_off(standin, algod, monkeypatch):
+    # the follower retries less and less often while the node is down
+    monkeypatch.setattr(algodao.params, 'FOLLOW_RETRY_SECONDS', 0.01)
+    monkeypatch.setattr(algodao.params, 'FOLLOW_MAX_RETRY_SECONDS', 0.08)
+    waits = []
+    provider = ParamsProvider(algod)
+
+    def wait(seconds):
+        waits.append(seconds)
+        if len(waits) == 6:
+            provider.close()
+    monkeypatch.setattr(provider._stopped, 'wait', wait)
+    standin.down = True
+    provider._followblocks()
+    assert waits == [0.01, 0.02, 0.04, 0.08, 0.08, 0.08]
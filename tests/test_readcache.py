@@ -0,0 +1,69 @@
+"""
+Tests of the round-scoped read cache
+"""
+import time
+
+import algosdk.account
+import pytest
+from algosdk.future import transaction
+
+import algodao.readcache
+from algodao.readcache import ReadCache
+
+APPID = 7
+
+
+@pytest.fixture
+def standin(standin):
+    standin.setapp(APPID, {b'NumOptions': 2})
+    return standin
+
+
+def test_readcache_round(standin, algod):
+    cache = ReadCache(algod, follow=False)
+    infos = [cache.application_info(APPID) for _ in range(10)]
+    assert all(info == infos[0] for info in infos)
+    assert standin.requests['/v2/applications/*'] == 1
+    assert cache.stats == {'hits': 9, 'fetches': 1}
+    # the record expires once a later round has been observed
+    standin.setapp(APPID, {b'NumOptions': 3})
+    standin.produceblock()
+    cache.observeround(standin.round)
+    assert cache.application_info(APPID) != infos[0]
+    assert standin.requests['/v2/applications/*'] == 2
+
+
+def test_readcache_follows(standin, algod):
+    cache = algodao.readcache.cache(algod)
+
+    def fetchesafter(fetches: int) -> int:
+        deadline = time.monotonic() + 5
+        while cache.stats['fetches'] <= fetches and time.monotonic() < deadline:
+            algodao.readcache.application_info(algod, APPID)
+            time.sleep(0.01)
+        return cache.stats['fetches']
+
+    # once the block follower has observed the current round
+    algodao.readcache.application_info(algod, APPID)
+    time.sleep(0.2)
+    algodao.readcache.application_info(algod, APPID)
+    fetches = cache.stats['fetches']
+    for _ in range(10):
+        algodao.readcache.application_info(algod, APPID)
+    assert cache.stats['fetches'] == fetches
+    standin.produceblock()
+    # the block follower observes the new round
+    assert fetchesafter(fetches) == fetches + 1
+
+
+def test_readcache_invalidatetxns(standin, algod):
+    cache = ReadCache(algod, follow=False)
+    cache.application_info(APPID)
+    _, addr = algosdk.account.generate_account()
+    params = transaction.SuggestedParams(0, 1, 1000, 'a' * 44, flat_fee=True)
+    cache.invalidatetxns([transaction.PaymentTxn(addr, params, addr, 0)])
+    cache.application_info(APPID)
+    assert standin.requests['/v2/applications/*'] == 1
+    cache.invalidatetxns([transaction.ApplicationNoOpTxn(addr, params, APPID)])
+    cache.application_info(APPID)
+    assert standin.requests['/v2/applications/*'] == 2
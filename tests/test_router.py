@@ -0,0 +1,115 @@
+"""
+Tests of the multi-node router, across several stand-in nodes with different
+latencies
+"""
+import time
+
+import algosdk.account
+import pytest
+from algosdk.future import transaction
+
+import algodao.helpers
+from algodao.router import RouterAlgodClient
+
+from tests.standin import StandinAlgod, pooledclient
+
+APPID = 7
+# the preferred submitter is the slowest node
+LATENCIES = [0.02, 0.001, 0.005]
+
+
+@pytest.fixture
+def nodes():
+    standins = [StandinAlgod(blockinterval=None, latency=latency) for latency in LATENCIES]
+    for standin in standins:
+        standin.setapp(APPID, {b'NumOptions': 2})
+        standin.start()
+    yield standins
+    for standin in standins:
+        standin.stop()
+
+
+def createrouter(nodes, probeinterval: float = 0) -> RouterAlgodClient:
+    return RouterAlgodClient([pooledclient(node) for node in nodes], preferred=0, probeinterval=probeinterval)
+
+
+def counts(nodes, endpoint: str):
+    return [node.requests.get(endpoint, 0) for node in nodes]
+
+
+def sendpayment(algod) -> str:
+    privkey, addr = algosdk.account.generate_account()
+    txn = transaction.PaymentTxn(addr, algod.suggested_params(), addr, 0)
+    return algod.send_transaction(txn.sign(privkey))
+
+
+def test_router_reads(nodes):
+    algod = createrouter(nodes)
+    for _ in range(20):
+        algod.status()
+    before = counts(nodes, '/v2/status')
+    for _ in range(20):
+        algod.status()
+    after = counts(nodes, '/v2/status')
+    # once every node has been sampled, reads go to the fastest
+    assert after[1] - before[1] == 20
+    stats = algod.router.stats
+    assert stats[1]['latency'] < stats[2]['latency'] < stats[0]['latency']
+
+
+def test_router_writes_follow_rounds(nodes):
+    algod = createrouter(nodes, probeinterval=0.05)
+    txid = sendpayment(algod)
+    # the slow preferred node takes the write
+    assert counts(nodes, '/v2/transactions') == [1, 0, 0]
+    for _ in range(4):
+        nodes[0].produceblock()
+    # a pending transaction lookup goes to the node that took the write, and
+    # the round it shows must be visible to the reads that follow
+    confirmed = algod.pending_transaction_info(txid)['confirmed-round']
+    assert confirmed == 2 and counts(nodes, '/v2/transactions/pending/*') == [1, 0, 0]
+    assert algod.router.round == confirmed
+    time.sleep(0.3)
+    # the other nodes are still behind, so reads stay on the slow node
+    before = counts(nodes, '/v2/applications/*')
+    algod.application_info(APPID)
+    assert [after - count for after, count in zip(counts(nodes, '/v2/applications/*'), before)] == [1, 0, 0]
+    # once the fastest node catches up the probes notice
+    nodes[1].produceblock()
+    time.sleep(0.3)
+    assert algod.router.stats[1]['round'] == 2
+    before = counts(nodes, '/v2/applications/*')
+    algod.application_info(APPID)
+    assert [after - count for after, count in zip(counts(nodes, '/v2/applications/*'), before)] == [0, 1, 0]
+    algod.router.close()
+
+
+def test_router_failover(nodes):
+    algod = createrouter(nodes)
+    for _ in range(10):
+        algod.status()
+    # reads fail over from the fastest node while it is down
+    nodes[1].down = True
+    assert algod.status()['last-round'] == 1
+    stats = algod.router.stats
+    assert stats[1]['errors'] == 1 and not stats[1]['healthy']
+    before = counts(nodes, '/v2/status')
+    algod.status()
+    assert counts(nodes, '/v2/status')[1] == before[1]
+    # writes fail over from the preferred submitter, and lookups follow them
+    nodes[0].down = True
+    txid = sendpayment(algod)
+    assert counts(nodes, '/v2/transactions') == [0, 0, 1]
+    assert algod.pending_transaction_info(txid)['confirmed-round'] == 0
+    nodes[2].down = True
+    with pytest.raises(ConnectionError):
+        algod.status()
+
+
+def test_createrouter(nodes, monkeypatch):
+    monkeypatch.setenv('ALGODAO_ALGOD_ADDRESSES', ','.join(node.address for node in nodes))
+    algod = algodao.helpers.createclient()
+    assert isinstance(algod, RouterAlgodClient)
+    assert algod.algod_address == nodes[0].address
+    assert algod.application_info(APPID)['id'] == APPID
+    algod.router.close()
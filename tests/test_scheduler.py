@@ -0,0 +1,80 @@
+"""
+Tests of the RPC scheduler
+"""
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+import algodao.scheduler
+from algodao.scheduler import RPCScheduler
+
+from tests.standin import pooledclient
+
+APPID = 7
+
+
+@pytest.fixture
+def standin(standin):
+    standin.setapp(APPID, {b'NumOptions': 2})
+    return standin
+
+
+def test_scheduler_rate(standin):
+    algod = pooledclient(standin, scheduler=RPCScheduler(50, burst=1))
+    start = time.monotonic()
+    for _ in range(25):
+        algod.status()
+    assert time.monotonic() - start >= 0.45
+
+
+def test_scheduler_priorities(standin):
+    scheduler = RPCScheduler(40, burst=4, reserve=2)
+    algod = pooledclient(standin, scheduler=scheduler)
+    stopped = threading.Event()
+
+    def bulkjob():
+        with algodao.scheduler.bulk():
+            while not stopped.is_set():
+                algod.application_info(APPID)
+
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        for _ in range(8):
+            executor.submit(bulkjob)
+        time.sleep(0.3)
+        latencies = []
+        for _ in range(5):
+            start = time.monotonic()
+            algod.status()
+            latencies.append(time.monotonic() - start)
+            time.sleep(0.1)
+        stopped.set()
+    stats = scheduler.stats
+    # bulk requests used the rest of the quota, but interactive ones never
+    # waited for them
+    assert stats['bulk'] > 20
+    assert stats['interactive'] == 5 and max(latencies) < 0.02
+
+
+def test_scheduler_throttled(standin):
+    standin.ratelimit = 20
+    scheduler = RPCScheduler(100)
+    algod = pooledclient(standin, scheduler=scheduler)
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        rounds = list(executor.map(lambda _: algod.status()['last-round'], range(60)))
+    # the 429 responses were retried after backing off
+    assert rounds == [1] * 60
+    assert standin.requests['429'] > 0
+    assert scheduler.stats['throttled'] == standin.requests['429']
+
+
+def test_scheduler_coalesces(standin):
+    standin.latency = 0.1
+    scheduler = RPCScheduler(1000)
+    algod = pooledclient(standin, scheduler=scheduler)
+    with concurrent.futures.ThreadPoolExecutor(10) as executor:
+        infos = list(executor.map(lambda _: algod.application_info(APPID), range(10)))
+    assert all(info == infos[0] for info in infos)
+    assert standin.requests['/v2/applications/*'] + scheduler.stats['coalesced'] == 10
+    assert standin.requests['/v2/applications/*'] < 10
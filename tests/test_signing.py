@@ -0,0 +1,73 @@
+"""
+Tests of batch signing
+"""
+import base64
+import copy
+
+import algosdk.account
+import algosdk.encoding
+import pytest
+from algosdk.future import transaction
+
+import algodao.committee
+import algodao.contract
+import algodao.signing
+from algodao.committee import Committee
+from algodao.signing import BatchSigner
+
+APPID = 7
+ASSET = 9
+
+
+def _params():
+    return transaction.SuggestedParams(0, 1, 1000, 'A' * 44, 'standin-v1', flat_fee=True)
+
+
+def _inline(txns, privkey):
+    return [
+        base64.b64decode(algosdk.encoding.msgpack_encode(stxn))
+        for stxn in algodao.contract.signgroup(copy.deepcopy(txns), privkey)
+    ]
+
+
+def test_batchsigner():
+    keys = [algosdk.account.generate_account() for _ in range(3)]
+    params = _params()
+    txns = [
+        (transaction.ApplicationNoOpTxn(addr, params, APPID, [b'vote', index.to_bytes(8, 'big')]), privkey)
+        for index in range(50)
+        for privkey, addr in keys
+    ]
+    groups = [([txn for txn, _ in txns[index:index + 3]], keys[0][0]) for index in range(0, 30, 3)]
+    # copies of the groups before they are given a group ID
+    inline = [(copy.deepcopy(txns), privkey) for txns, privkey in groups]
+    with BatchSigner(max_workers=2, chunksize=16) as signer:
+        handles = {privkey: signer.addkey(privkey) for privkey, _ in keys}
+        assert handles[keys[0][0]] == keys[0][1]
+        # ed25519 signatures are deterministic, so the blobs match inline signing
+        signed = signer.sign((txn, handles[privkey]) for txn, privkey in txns)
+        assert signed == [_inline([txn], privkey)[0] for txn, privkey in txns]
+        signedgroups = signer.signgroups((txns, handles[privkey]) for txns, privkey in groups)
+        assert signedgroups == [_inline(txns, privkey) for txns, privkey in inline]
+        assert algodao.signing.decode(signedgroups[0])[0].transaction.group is not None
+        with pytest.raises(KeyError):
+            signer.sign([(txns[0][0], 'UNKNOWN')])
+    # the transactions passed in are grouped the same way signed in the pool
+    # or inline
+    assert algodao.signing.signgroups([txns for txns, _ in inline], keys[0][0]) == signedgroups
+    for (pooled, _), (grouped, _), blobs in zip(groups, inline, signedgroups):
+        expected = algodao.signing.decode(blobs)[0].transaction.group
+        assert [txn.group for txn in pooled] == [txn.group for txn in grouped] == [expected] * 3
+
+
+@pytest.mark.standin(blockinterval=0.05)
+def test_setmembers_with_signer(standin, algod):
+    privkey, addr = algosdk.account.generate_account()
+    members = [algosdk.account.generate_account()[1] for _ in range(100)]
+    with BatchSigner(max_workers=2, chunksize=8) as signer:
+        deployed = Committee.DeployedCommittee(APPID)
+        deployed.oninittoken({'inner-txns': [{'asset-index': ASSET}]})
+        txids = deployed.call_setmembers(algod, privkey, addr, members, signer=signer)
+        groups = deployed.build_setmembers(algod.suggested_params(), addr, members)
+        assert len(txids) == len(groups) == 2
+        assert len(standin.confirmed) == len(members) // algodao.committee.MEMBERS_PER_CALL
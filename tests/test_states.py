@@ -0,0 +1,57 @@
+"""
+Tests of the bulk app state readers
+"""
+import time
+
+import algosdk.account
+import pytest
+
+import algodao.scheduler
+import algodao.states
+import algodao.voting
+from algodao.scheduler import RPCScheduler
+
+from tests.standin import pooledclient
+
+APPIDS = range(100, 200)
+LATENCY = 0.02
+
+
+pytestmark = pytest.mark.standin(latency=LATENCY)
+
+
+@pytest.fixture
+def standin(standin):
+    for appid in APPIDS:
+        standin.setapp(appid, {b'NumOptions': 2, b'Passed': appid % 2})
+    return standin
+
+
+def test_globalstates(standin):
+    scheduler = RPCScheduler(10000)
+    algod = pooledclient(standin, maxconnections=32, scheduler=scheduler)
+    appids = list(APPIDS) + [1]
+    start = time.monotonic()
+    with algodao.scheduler.bulk():
+        states = algodao.states.globalstates(algod, appids)
+    elapsed = time.monotonic() - start
+    # the app that does not exist is left out
+    assert list(states) == list(APPIDS)
+    assert all(state[b'Passed'] == appid % 2 for appid, state in states.items())
+    assert elapsed < len(appids) * LATENCY / 4
+    # the workers read at the caller's priority
+    assert scheduler.stats['bulk'] == len(appids)
+
+
+def test_localstates(standin):
+    appid = APPIDS[0]
+    addrs = [algosdk.account.generate_account()[1] for _ in range(100)]
+    # every other account voted
+    for i, addr in enumerate(addrs[::2]):
+        standin.setlocal(addr, appid, {b'Voted' + (1 + i % 2).to_bytes(8, 'big'): 10 + i})
+    algod = pooledclient(standin, maxconnections=32)
+    start = time.monotonic()
+    votes = dict(algodao.voting.Proposal.DeployedProposal(algod, appid).votes(algod, iter(addrs)))
+    assert time.monotonic() - start < len(addrs) * LATENCY / 4
+    assert votes == {addr: {1 + i % 2: 10 + i} for i, addr in enumerate(addrs[::2])}
+    assert standin.requests['/v2/accounts/*/applications/*'] == len(addrs)
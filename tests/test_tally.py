@@ -0,0 +1,80 @@
+"""
+Tests of the off-chain tally
+"""
+import time
+from collections import OrderedDict
+
+import algosdk.account
+import numpy as np
+import pytest
+from algosdk.future import transaction
+
+import algodao.blocks
+import algodao.tally
+from algodao.tally import Tally
+from algodao.voting import Proposal
+
+APPID = 7
+TREEAPPID = 8
+VOTEASSET = 9
+
+
+@pytest.fixture
+def standin(standin):
+    standin.setapp(APPID, {b'NumOptions': 2, b'VoteAssetId': VOTEASSET})
+    return standin
+
+
+def test_tally_analytics():
+    numaccounts = 100000
+    addrs = [f'ADDR{i}' for i in range(numaccounts)]
+    # weights 1..10, so every decile has a single weight
+    addr2count = OrderedDict((addr, 1 + i * 10 // numaccounts) for i, addr in enumerate(addrs))
+    start = time.monotonic()
+    tally = Tally(APPID, addr2count, win_pct=60)
+    # the heaviest half votes yes with all its weight, a tenth of the rest votes no
+    tally.load(
+        (addr, {algodao.tally.YES: count} if count > 5 else {algodao.tally.NO: count})
+        for i, (addr, count) in enumerate(addr2count.items())
+        if count > 5 or i % 10 == 0
+    )
+    standing = tally.standing()
+    turnout = tally.turnout()
+    elapsed = time.monotonic() - start
+    assert elapsed < 1.0
+    yes = sum(count for count in addr2count.values() if count > 5)
+    no = sum(count for i, count in enumerate(addr2count.values()) if count <= 5 and i % 10 == 0)
+    assert standing == (yes, no, 60 * (yes + no) // 100, True, True)
+    assert list(turnout.accounts) == [numaccounts // 10] * 10
+    assert np.allclose(turnout.rate, [0.1] * 5 + [1.0] * 5)
+    assert tally.unclaimed == tally.weight - yes - no
+    assert tally.unvoted == 0
+
+
+def test_tally_blocks(standin, algod):
+    accounts = [algosdk.account.generate_account() for _ in range(4)]
+    addr2count = OrderedDict((addr, 100) for _, addr in accounts)
+    tally = Tally(APPID, addr2count, win_pct=50, treeappid=TREEAPPID)
+    tally.round = standin.round
+    deployed = Proposal.DeployedProposal(None, APPID, algod.application_info(APPID))
+    params = algod.suggested_params()
+    # two accounts vote, one of them twice: their local state holds the last
+    # vote, while the on-chain totals count both
+    for (privkey, addr), option, amount in zip(accounts[:2] + accounts[1:2], (1, 2, 2), (60, 50, 30)):
+        algod.send_transactions([txn.sign(privkey) for txn in deployed.build_vote(params, addr, option, amount)])
+    privkey, addr = accounts[2]
+    algod.send_transaction(transaction.ApplicationNoOpTxn(addr, params, TREEAPPID, [b'claim']).sign(privkey))
+    standin.produceblock()
+    allvotes = {b'AllVotes' + option.to_bytes(8, 'big'): votes for option, votes in ((1, 60), (2, 80))}
+    standin.setapp(APPID, {b'NumOptions': 2, b'VoteAssetId': VOTEASSET, **allvotes})
+    tally.refresh(algod)
+    assert tally.round == standin.round
+    assert list(tally.voted) == [60, 30, 0, 0]
+    assert list(tally.totals) == [60, 80]
+    assert tally.unclaimed == 100
+    assert tally.unvoted == 40 + 70 + 100
+    # with 310 votes left, the outcome is open
+    assert tally.standing() == (60, 80, 70, False, False)
+    # the tally of the blocks alone
+    tally.applyblock(standin.round, algodao.blocks.getblock(algod, standin.round))
+    assert list(tally.totals) == [60, 30]
@@ -0,0 +1,61 @@
+"""
+Tests of the pooled HTTP transport
+"""
+import concurrent.futures
+
+import algosdk.error
+import pytest
+from algosdk.v2client.algod import AlgodClient
+from algosdk.v2client.indexer import IndexerClient
+
+import algodao.transport
+from algodao.transport import PooledAlgodClient, PooledIndexerClient
+
+from tests.standin import pooledclient
+
+APPID = 7
+
+
+pytestmark = pytest.mark.standin(blockinterval=0.05)
+
+
+@pytest.fixture
+def standin(standin):
+    standin.setapp(APPID, {b'NumOptions': 2})
+    return standin
+
+
+def test_pooledclient(standin):
+    stock = AlgodClient('a' * 64, standin.address)
+    pooled = pooledclient(standin, maxconnections=4)
+    assert pooled.application_info(APPID) == stock.application_info(APPID)
+    with pytest.raises(algosdk.error.AlgodHTTPError) as pooledexc:
+        pooled.application_info(APPID + 1)
+    with pytest.raises(algosdk.error.AlgodHTTPError) as stockexc:
+        stock.application_info(APPID + 1)
+    assert (str(pooledexc.value), pooledexc.value.code) == (str(stockexc.value), stockexc.value.code)
+    # a round's requests from many threads share the pool's connections
+    with concurrent.futures.ThreadPoolExecutor(16) as executor:
+        rounds = list(executor.map(lambda _: pooled.status()['last-round'], range(200)))
+    assert all(rounds)
+    assert pooled.transport.stats == {'requests': 202, 'connections': 4}
+
+
+def test_pooledclient_gzip(standin):
+    standin.gzip = True
+    stock = AlgodClient('a' * 64, standin.address)
+    pooled = pooledclient(standin)
+    assert pooled.application_info(APPID) == stock.application_info(APPID)
+    raw = pooledclient(standin, gzip=False)
+    assert raw.application_info(APPID) == stock.application_info(APPID)
+
+
+def test_sharedtransport(standin):
+    # clients of the same host share a transport, whatever their base path
+    algod = PooledAlgodClient('a' * 64, standin.address)
+    indexer = PooledIndexerClient('', standin.address + '/idx2')
+    assert algod.transport is indexer.transport
+    assert algod.transport is algodao.transport.sharedtransport(standin.address + '/ps2')
+    assert PooledIndexerClient('', standin.address).health() == IndexerClient('', standin.address).health()
+    with pytest.raises(algosdk.error.IndexerHTTPError):
+        indexer.health()